@@ -0,0 +1,150 @@
+import threading
+import time
+
+import numpy as np
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from apps.automation.providerchain.base import AbstractBaseProvider, ProviderResult
+from apps.automation.providerchain.fallback_router import FallbackRouter, HedgeBudget
+from apps.automation.providerchain.registry import ProviderRegistry
+
+
+class SimulatedProvider(AbstractBaseProvider):
+    """Proveedor falso: latencia log-normal y probabilidad de fallar al final."""
+
+    supports_structured_output = True
+
+    def __init__(self, name, median_ms, sigma, fail_rate, time_scale, rng):
+        """__init__."""
+        self.provider_name = name
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.fail_rate = fail_rate
+        self.time_scale = time_scale
+        self.rng = rng
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def sample(self) -> tuple[float, bool]:
+        """Latencia (ms) y éxito de una llamada."""
+        with self._lock:
+            latency = float(self.rng.lognormal(np.log(self.median_ms), self.sigma))
+            failed = bool(self.rng.random() < self.fail_rate)
+        return latency, not failed
+
+    def test_connection(self):
+        """test_connection."""
+        return True
+
+    def generate(self, prompt, **kw):
+        """generate."""
+        with self._lock:
+            self.calls += 1
+        latency, ok = self.sample()
+        time.sleep(latency * self.time_scale / 1000)
+        if not ok:
+            return ProviderResult(success=False, error="timeout", provider=self.provider_name)
+        return ProviderResult(text='{"ok": true}', provider=self.provider_name, success=True)
+
+
+class SimulationRegistry(ProviderRegistry):
+    """Registro sin circuit breaker: cada solicitud recorre la cadena completa."""
+
+    def _circuit_open(self, provider_name):
+        """_circuit_open."""
+        return False
+
+    def open_circuit(self, provider_name):
+        """open_circuit."""
+
+
+class Command(BaseCommand):
+    """Simula la cadena de IA con proveedores falsos: secuencial vs hedged."""
+
+    help = (
+        "Benchmark offline del FallbackRouter en modo secuencial y hedged con proveedores "
+        "simulados (latencia log-normal, tasa de fallo configurable): percentiles de "
+        "latencia y llamadas por solicitud."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--primary-median", type=float, default=2500, help="ms")
+        parser.add_argument("--primary-sigma", type=float, default=0.6)
+        parser.add_argument(
+            "--primary-fail", type=float, default=0.1, help="Fallos tras la latencia."
+        )
+        parser.add_argument("--secondary-median", type=float, default=3000, help="ms")
+        parser.add_argument("--secondary-sigma", type=float, default=0.4)
+        parser.add_argument("--secondary-fail", type=float, default=0.02)
+        parser.add_argument("--budget", type=float, default=0.2, help="Hedges por solicitud.")
+        parser.add_argument(
+            "--time-scale",
+            type=float,
+            default=0.01,
+            help="Factor de tiempo real (0.01: 1 s simulado = 10 ms).",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        scale = options["time_scale"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nSimulación ({options['requests']} solicitudes, presupuesto "
+                f"{options['budget']:.0%})"
+            )
+        )
+        for hedged in (False, True):
+            rng = np.random.default_rng(options["seed"])
+            primary = SimulatedProvider(
+                "gemini",
+                options["primary_median"],
+                options["primary_sigma"],
+                options["primary_fail"],
+                scale,
+                rng,
+            )
+            secondary = SimulatedProvider(
+                "openai",
+                options["secondary_median"],
+                options["secondary_sigma"],
+                options["secondary_fail"],
+                scale,
+                rng,
+            )
+            registry = SimulationRegistry()
+            registry.register(primary)
+            registry.register(secondary)
+
+            # p90 "observado" a partir de una muestra previa, como en tracing.
+            warmup = {
+                p.provider_name: float(np.percentile([p.sample()[0] for _ in range(500)], 90))
+                for p in (primary, secondary)
+            }
+            router = FallbackRouter(
+                registry=registry,
+                hedge_delay=lambda name, warmup=warmup: warmup[name] * scale / 1000,
+                budget=HedgeBudget(
+                    ratio=options["budget"], store=LocMemCache("benchmark-ai-hedging", {})
+                ),
+            )
+
+            latencies, failures = [], 0
+            for _ in range(options["requests"]):
+                t0 = time.perf_counter()
+                result = router.generate("prompt", schema=dict, hedged=hedged)
+                latencies.append((time.perf_counter() - t0) * 1000 / scale)
+                failures += int(not result.success)
+            # Deja terminar las llamadas perdedoras antes de contar.
+            if router._executor is not None:
+                router._executor.shutdown(wait=True)
+
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            calls = (primary.calls + secondary.calls) / options["requests"]
+            label = "Hedged" if hedged else "Secuencial"
+            self.stdout.write(
+                f" - {label}: p50 {p50:.0f} ms, p95 {p95:.0f} ms, p99 {p99:.0f} ms, "
+                f"{calls:.2f} llamadas/solicitud, {failures} fallidas"
+                + (f" (hedge tras p90 = {warmup['gemini']:.0f} ms)" if hedged else "")
+            )
@@ -0,0 +1,89 @@
+import random
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from apps.automation.providerchain import tracing
+
+LEGACY_SAMPLE_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """Mide el costo de registrar latencias de IA y de leer sus percentiles."""
+
+    help = (
+        "Benchmark de tracing de la cadena de proveedores: lista de muestras con tope por "
+        "hora (get/set por llamada) vs. histograma de buckets fijos (HINCRBY en Redis). "
+        "Usa el cache configurado; con Redis mide el camino de producción."
+    )
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument("--llamadas", type=int, default=20000)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        """handle."""
+        rnd = random.Random(options["seed"])  # noqa: S311
+        latencias = [int(rnd.lognormvariate(7, 0.7)) for _ in range(options["llamadas"])]
+        hour_key = f"bench{datetime.utcnow():%Y%m%d%H}"
+        provider = "gemini"
+        legacy_key = f"ai_metrics:{hour_key}:latency:{provider}"
+        hist_key = tracing._latency_key(hour_key, provider)
+        cache.delete_many([legacy_key, hist_key])
+        redis = tracing._get_redis()
+        if redis:
+            redis.delete(hist_key)
+
+        t0 = time.perf_counter()
+        for ms in latencias:
+            self._legacy_record(legacy_key, ms)
+        legado = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for ms in latencias:
+            tracing._record_latency_sample(hour_key, provider, ms)
+        histograma = time.perf_counter() - t0
+
+        guardadas = cache.get(legacy_key) or []
+        leido = tracing._get_latency_histograms([hist_key])[hist_key]
+        cache.delete_many([legacy_key, hist_key])
+        if redis:
+            redis.delete(hist_key)
+
+        exacto = sorted(latencias)
+        muestra = sorted(guardadas)
+        n = len(latencias)
+        backend = settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1]
+        self.stdout.write(self.style.SUCCESS(f"\nRegistro de {n} latencias ({backend})"))
+        self.stdout.write(
+            f" - Lista con tope:   {legado / n * 1e6:.1f} µs/llamada, "
+            f"{len(guardadas)} muestras retenidas"
+        )
+        self.stdout.write(
+            f" - Histograma:       {histograma / n * 1e6:.1f} µs/llamada, "
+            f"{leido.total} muestras en {len(leido.counts)} buckets"
+        )
+        for nombre, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            real = exacto[min(n - 1, int(n * p))]
+            lista = muestra[min(len(muestra) - 1, int(len(muestra) * p))] if muestra else 0
+            self.stdout.write(
+                f" - {nombre}: real {real} ms | lista {lista} ms | "
+                f"histograma {leido.percentile(p):.1f} ms"
+            )
+
+        t0 = time.perf_counter()
+        tracing.get_hourly_metrics(hours=24)
+        lectura = time.perf_counter() - t0
+        self.stdout.write(f" - get_hourly_metrics(24): {lectura * 1000:.1f} ms")
+
+    @staticmethod
+    def _legacy_record(key, duration_ms):
+        """Réplica del registro anterior: lectura-modificación-escritura de la lista."""
+        samples = cache.get(key) or []
+        if len(samples) < LEGACY_SAMPLE_SIZE:
+            samples.append(duration_ms)
+            cache.set(key, samples, tracing.LATENCY_TTL)
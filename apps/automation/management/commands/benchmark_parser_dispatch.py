@@ -0,0 +1,110 @@
+import glob
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.automation.parsers.amadeus_parser import AmadeusParser
+from apps.automation.parsers.gemini_parser import GeminiParser
+from apps.automation.parsers.kiu_parser import KIUParser
+from apps.automation.parsers.registry import ParserRegistry
+
+DEFAULT_CORPUS = [
+    os.path.join("core", "tests", "dataset", "*.eml"),
+    os.path.join("tests", "fixtures", "*.txt"),
+]
+
+
+class Command(BaseCommand):
+    """Compara la detección secuencial con can_parse() contra el índice de firmas."""
+
+    help = (
+        "Benchmark de ParserRegistry.find_parser sobre un corpus de boletos: pasadas "
+        "completas sobre el texto y latencia, secuencial vs índice de firmas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            help="Globs de archivos del corpus (por defecto: core/tests/dataset y tests/fixtures).",
+        )
+        parser.add_argument("--rounds", type=int, default=5, help="Repeticiones del corpus.")
+
+    def handle(self, *args, **options):
+        patterns = options["paths"] or [
+            os.path.join(settings.BASE_DIR, pattern) for pattern in DEFAULT_CORPUS
+        ]
+        files = sorted({f for pattern in patterns for f in glob.glob(pattern)})
+        if not files:
+            self.stdout.write(self.style.ERROR("No se encontraron archivos en el corpus."))
+            return
+        texts = []
+        for path in files:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                texts.append(f.read())
+
+        registry = ParserRegistry()
+        for parser in (KIUParser(), AmadeusParser(), GeminiParser()):
+            registry.register(parser)
+        parsers = registry.get_all_parsers()
+
+        def sequential(text):
+            checks = 0
+            for parser in parsers:
+                checks += 1
+                if parser.can_parse(text):
+                    return parser, checks
+            return None, checks
+
+        mismatches = sum(
+            1 for text in texts if sequential(text)[0] is not registry.find_parser(text)
+        )
+        # Boletos que el primer parser registrado no reconoce: el caso en que el recorrido
+        # secuencial re-normaliza y re-escanea el texto una vez por parser.
+        tail = [text for text in texts if sequential(text)[1] > 1]
+
+        rounds = options["rounds"]
+        self.stdout.write(self.style.SUCCESS(f"\nResultados ({len(texts)} boletos x {rounds})"))
+        self.stdout.write(f" - Selecciones distintas entre ambos: {mismatches}")
+        for label, subset in (("Corpus completo", texts), ("No resueltos por el 1.º", tail)):
+            if not subset:
+                continue
+            n = len(subset) * rounds
+
+            seq_checks = 0
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                for text in subset:
+                    seq_checks += sequential(text)[1]
+            seq_s = time.perf_counter() - t0
+
+            registry.reset_detection_stats()
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                for text in subset:
+                    registry.find_parser(text)
+            idx_s = time.perf_counter() - t0
+            stats = registry.get_detection_stats()
+            idx_checks = sum(v["checks"] for k, v in stats.items() if k != "_index")
+
+            # Pasadas completas sobre el texto: cada can_parse() normaliza y escanea (2);
+            # el índice normaliza y escanea una vez por boleto, más sus confirmaciones.
+            self.stdout.write(self.style.SUCCESS(f"\n{label} ({len(subset)} boletos)"))
+            self.stdout.write(
+                f" - Secuencial: {2 * seq_checks / n:.2f} pasadas/boleto "
+                f"({seq_checks / n:.2f} can_parse), {seq_s * 1000 / n:.3f} ms/boleto"
+            )
+            self.stdout.write(
+                f" - Índice de firmas: {(2 + 2 * idx_checks / n):.2f} pasadas/boleto "
+                f"({idx_checks / n:.2f} can_parse), {idx_s * 1000 / n:.3f} ms/boleto"
+            )
+
+        self.stdout.write("\nDetección por parser (índice, última corrida):")
+        for name, values in sorted(registry.get_detection_stats().items()):
+            self.stdout.write(
+                f" - {name}: {values['checks']} checks, "
+                f"{values['index_matches']} resueltos por índice, "
+                f"{values['matches']} matches, {values['avg_ms']:.3f} ms promedio"
+            )
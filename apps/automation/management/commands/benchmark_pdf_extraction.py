@@ -0,0 +1,117 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from apps.automation.parsers.text_extraction import TextExtractionService
+
+
+def legacy_extract_from_pdf(file_obj) -> str:
+    """Implementación previa de ``TextExtractionService.extract_from_pdf`` (referencia)."""
+    import fitz
+
+    texto_extraido = ""
+    file_obj.seek(0)
+    file_content = file_obj.read()
+    with fitz.open(stream=file_content, filetype="pdf") as pdf:
+        for page in pdf:
+            text = page.get_text()
+            if text:
+                texto_extraido += text + "\n"
+    return texto_extraido
+
+
+def build_report_pdf(path: str, pages: int, lines: int = 45) -> None:
+    """Genera un reporte BSP sintético de ``pages`` páginas."""
+    import fitz
+
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        for line in range(lines):
+            page.insert_text(
+                (36, 40 + line * 16),
+                f"134725{number:04d}{line:03d}  PEREZ/JUAN MR  FARE 412.50  TAX 61.20  "
+                f"COMM -12.37  TOTAL 461.33  PAG {number + 1}",
+                fontsize=8,
+            )
+    doc.save(path)
+    doc.close()
+
+
+class Command(BaseCommand):
+    """Compara la extracción de texto de PDF anterior contra el extractor por streaming."""
+
+    help = (
+        "Benchmark de TextExtractionService sobre un reporte PDF sintético: lectura completa "
+        "en memoria + concatenación vs streaming por página, pool de procesos y corte temprano."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=400, help="Páginas del reporte.")
+        parser.add_argument("--workers", type=int, default=4, help="Procesos del pool.")
+        parser.add_argument(
+            "--stop-page", type=int, default=10, help="Página en la que el llamador corta."
+        )
+
+    def handle(self, *args, **options):
+        pages = options["pages"]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "reporte_bsp.pdf")
+            build_report_pdf(path, pages)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+
+            def measure(fn):
+                tracemalloc.start()
+                t0 = time.perf_counter()
+                text = fn()
+                elapsed = time.perf_counter() - t0
+                _current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                return text, elapsed, peak / 1024 / 1024
+
+            with open(path, "rb") as f:
+                legacy, legacy_s, legacy_mb = measure(lambda: legacy_extract_from_pdf(f))
+
+            def streaming(parallel_min_pages, workers):
+                return "".join(
+                    t + "\n"
+                    for t in TextExtractionService.iter_pdf_pages(
+                        path, parallel_min_pages=parallel_min_pages, max_workers=workers
+                    )
+                    if t
+                )
+
+            serial, serial_s, serial_mb = measure(lambda: streaming(pages + 1, 1))
+            parallel, parallel_s, parallel_mb = measure(lambda: streaming(1, options["workers"]))
+
+            marker = f"PAG {options['stop_page']}\n"
+            with open(path, "rb") as f:
+                early, early_s, _ = measure(
+                    lambda: TextExtractionService.extract_from_pdf(
+                        f, until=lambda page_text: marker in page_text
+                    )
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"\nResultados ({pages} páginas, {size_mb:.1f} MB)"))
+        self.stdout.write(
+            f" - Anterior (bytes en memoria + +=): {legacy_s * 1000:.0f} ms, "
+            f"pico Python {legacy_mb:.1f} MB"
+        )
+        self.stdout.write(
+            f" - Streaming secuencial desde ruta: {serial_s * 1000:.0f} ms, "
+            f"pico Python {serial_mb:.1f} MB"
+        )
+        self.stdout.write(
+            f" - Streaming con pool de {options['workers']} procesos: {parallel_s * 1000:.0f} ms, "
+            f"pico Python {parallel_mb:.1f} MB ({os.cpu_count()} CPUs)"
+        )
+        self.stdout.write(
+            f" - Corte temprano en la página {options['stop_page']}: {early_s * 1000:.0f} ms"
+        )
+        self.stdout.write(f" - Texto idéntico al anterior: {legacy == serial == parallel}")
+        self.stdout.write(
+            f" - Corte temprano es prefijo del texto completo: {legacy.startswith(early)}"
+        )
@@ -0,0 +1,97 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.automation.parsers.pdf_generation import PdfGenerationService
+from apps.common.services.pdf_renderer import PdfRendererService
+
+
+def legacy_render_html_to_pdf(html_content: str) -> bytes:
+    """Implementación previa de ``PdfRendererService.render_html_to_pdf`` (referencia)."""
+    from weasyprint import HTML
+
+    return HTML(string=html_content, base_url=None).write_pdf()
+
+
+def sample_ticket(index: int) -> dict:
+    """Boleto KIU sintético para el benchmark."""
+    return {
+        "SOURCE_SYSTEM": "KIU",
+        "NOMBRE_DEL_PASAJERO": f"PEREZ/JUAN{index} MR",
+        "NUMERO_DE_BOLETO": f"30870000{index:05d}",
+        "FECHA_DE_EMISION": "18 AUG 2025",
+        "CODIGO_RESERVA": "ABC123",
+        "NOMBRE_AEROLINEA": "LASER AIRLINES",
+        "TARIFA_IMPORTE": "100.00",
+        "TOTAL": "110.00",
+        "moneda": "USD",
+        "segmentos": [
+            {
+                "aerolinea": "QL",
+                "vuelo": "1920",
+                "origen": "CCS",
+                "destino": "PMV",
+                "fecha_salida": "2025-08-25",
+                "hora_salida": "09:45",
+                "fecha_llegada": "2025-08-25",
+                "hora_llegada": "10:46",
+                "clase": "Y",
+            }
+        ],
+    }
+
+
+class Command(BaseCommand):
+    """Compara el renderizado de boletos en frío contra el renderizador caliente y el lote."""
+
+    help = (
+        "Benchmark de WeasyPrint sobre golden_ticket_v2.html: HTML() sin reutilización "
+        "(anterior), render_html_to_pdf (fuentes/recursos cacheados) y render_many (pool)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tickets", type=int, default=12, help="Boletos a renderizar.")
+        parser.add_argument("--workers", type=int, default=None, help="Procesos del pool.")
+
+    def handle(self, *args, **options):
+        documents = [
+            PdfGenerationService._render_ticket_html(sample_ticket(i))[0]
+            for i in range(options["tickets"])
+        ]
+        n = len(documents)
+
+        t0 = time.perf_counter()
+        for html in documents:
+            legacy_render_html_to_pdf(html)
+        legacy_s = time.perf_counter() - t0
+
+        PdfRendererService.reset_render_stats()
+        t0 = time.perf_counter()
+        for html in documents:
+            PdfRendererService.render_html_to_pdf(html)
+        warm_s = time.perf_counter() - t0
+        warm_stats = PdfRendererService.get_render_stats()
+
+        # Primera llamada: incluye el arranque y precalentamiento de los workers.
+        PdfRendererService.reset_render_stats()
+        t0 = time.perf_counter()
+        results = PdfRendererService.render_many(documents, max_workers=options["workers"])
+        pool_cold_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        PdfRendererService.render_many(documents, max_workers=options["workers"])
+        pool_warm_s = time.perf_counter() - t0
+        pool_stats = PdfRendererService.get_render_stats()
+        PdfRendererService.shutdown_pool()
+
+        failed = sum(1 for result in results if not result.ok)
+        self.stdout.write(self.style.SUCCESS(f"\nResultados ({n} boletos)"))
+        self.stdout.write(f" - HTML() sin reutilización: {legacy_s * 1000 / n:.0f} ms/boleto")
+        self.stdout.write(
+            f" - render_html_to_pdf: {warm_s * 1000 / n:.0f} ms/boleto "
+            f"(máx {warm_stats['max_ms']:.0f} ms)"
+        )
+        self.stdout.write(
+            f" - render_many: {pool_cold_s:.2f}s con arranque del pool, "
+            f"{pool_warm_s:.2f}s con el pool caliente "
+            f"({pool_stats['avg_ms']:.0f} ms/boleto en worker, {failed} con error)"
+        )
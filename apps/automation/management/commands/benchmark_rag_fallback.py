@@ -0,0 +1,71 @@
+import hashlib
+import math
+import re
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from apps.automation.services.rag_embeddings import FALLBACK_DIM, hashing_embeddings
+
+
+def legacy_fallback_vector(text: str, dim: int = FALLBACK_DIM) -> list[float]:
+    """Implementación previa de ``RAGKnowledgeService._fallback_vector`` (referencia)."""
+    vector = [0.0] * dim
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return vector
+
+    for word in words:
+        h = int(hashlib.sha256(word.encode("utf-8")).hexdigest(), 16)
+        idx = h % dim
+        vector[idx] += 1.0
+
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm > 0:
+        vector = [v / norm for v in vector]
+    return vector
+
+
+class Command(BaseCommand):
+    """Micro-benchmark del embedder de respaldo (feature hashing) RAG."""
+
+    help = (
+        "Compara el vector hash de respaldo anterior (SHA-256 por palabra + listas Python) "
+        "contra hashing_embeddings (NumPy, por lotes) y verifica que den el mismo vector."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunks", type=int, default=2000, help="Chunks a vectorizar.")
+        parser.add_argument("--words", type=int, default=120, help="Palabras por chunk.")
+        parser.add_argument("--vocabulary", type=int, default=5000, help="Tamaño del vocabulario.")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        vocabulary = np.asarray([f"palabra{i}" for i in range(options["vocabulary"])])
+        texts = [
+            " ".join(rng.choice(vocabulary, size=options["words"]))
+            for _ in range(options["chunks"])
+        ]
+
+        t0 = time.perf_counter()
+        legacy = [legacy_fallback_vector(text) for text in texts]
+        legacy_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        fast = hashing_embeddings(texts)
+        fast_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        hashing_embeddings(texts)
+        warm_s = time.perf_counter() - t0
+
+        max_diff = float(np.max(np.abs(np.asarray(legacy, dtype=np.float32) - fast)))
+        n = len(texts)
+        self.stdout.write(self.style.SUCCESS(f"\nResultados ({n} chunks x {options['words']})"))
+        self.stdout.write(f" - Implementación anterior: {legacy_s * 1000:.0f} ms")
+        self.stdout.write(f" - hashing_embeddings (memo frío): {fast_s * 1000:.0f} ms")
+        self.stdout.write(f" - hashing_embeddings (memo caliente): {warm_s * 1000:.0f} ms")
+        self.stdout.write(f" - Aceleración (caliente): {legacy_s / warm_s:.1f}x")
+        self.stdout.write(f" - Diferencia máxima vs anterior: {max_diff:.2e}")
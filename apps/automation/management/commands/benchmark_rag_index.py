@@ -0,0 +1,86 @@
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from apps.automation.services.rag_service import RAGKnowledgeService
+from apps.automation.services.rag_vector_index import VectorIndex
+
+
+class Command(BaseCommand):
+    """Compara el índice vectorial NumPy contra el escaneo coseno en Python puro."""
+
+    help = (
+        "Benchmark offline (sin BD ni Gemini) del índice vectorial RAG: latencia top-k y "
+        "recall@k frente al escaneo fuerza bruta de RAGKnowledgeService.cosine_similarity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunks", type=int, default=100_000, help="Fragmentos sintéticos.")
+        parser.add_argument("--dim", type=int, default=768, help="Dimensión de los vectores.")
+        parser.add_argument("--queries", type=int, default=20, help="Consultas a evaluar.")
+        parser.add_argument("--k", type=int, default=10, help="Top-k a comparar.")
+        parser.add_argument(
+            "--brute-force-chunks",
+            type=int,
+            default=5_000,
+            help="Tamaño del subconjunto para el escaneo Python (es O(n·dim) por consulta).",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        random.seed(options["seed"])
+        n, dim, k = options["chunks"], options["dim"], options["k"]
+
+        self.stdout.write(f"Generando {n} vectores sintéticos de {dim} dimensiones...")
+        vectors = rng.standard_normal((n, dim), dtype=np.float32)
+        ids = list(range(1, n + 1))
+
+        index = VectorIndex()
+        t0 = time.perf_counter()
+        index.add(ids, vectors)
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        # Consultas: fragmentos existentes con ruido, como una pregunta parafraseada.
+        sample = rng.choice(n, size=options["queries"], replace=False)
+        queries = [
+            (vectors[i] + 0.3 * rng.standard_normal(dim, dtype=np.float32)).tolist() for i in sample
+        ]
+
+        t0 = time.perf_counter()
+        for q in queries:
+            index.search(q, k)
+        index_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+        # Fuerza bruta sobre un subconjunto (el algoritmo anterior, fila a fila).
+        bf_n = min(options["brute_force_chunks"], n)
+        bf_vectors = vectors[:bf_n].tolist()
+        bf_index = VectorIndex()
+        bf_index.add(ids[:bf_n], vectors[:bf_n])
+
+        recall_hits = 0
+        bf_total = 0.0
+        for q in queries:
+            t0 = time.perf_counter()
+            scored = [
+                (RAGKnowledgeService.cosine_similarity(q, vec), cid)
+                for cid, vec in zip(ids[:bf_n], bf_vectors, strict=True)
+            ]
+            scored.sort(reverse=True)
+            bf_total += time.perf_counter() - t0
+            expected = {cid for _score, cid in scored[:k]}
+            got = {cid for cid, _score in bf_index.search(q, k)}
+            recall_hits += len(expected & got)
+        bf_ms = bf_total * 1000 / len(queries)
+        recall = recall_hits / (k * len(queries))
+
+        self.stdout.write(self.style.SUCCESS("\nResultados"))
+        self.stdout.write(f" - Construcción del índice ({n} vectores): {build_ms:.1f} ms")
+        self.stdout.write(f" - Búsqueda top-{k} con índice sobre {n}: {index_ms:.2f} ms/consulta")
+        self.stdout.write(f" - Escaneo Python sobre {bf_n}: {bf_ms:.2f} ms/consulta")
+        self.stdout.write(
+            f" - Escaneo Python extrapolado a {n}: {bf_ms * n / bf_n:.0f} ms/consulta"
+        )
+        self.stdout.write(f" - Recall@{k} índice vs fuerza bruta: {recall:.3f}")
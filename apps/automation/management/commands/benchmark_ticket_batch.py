@@ -0,0 +1,133 @@
+import glob
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.automation.services.batch_ingestion import BatchTicketIngestionService
+from apps.automation.services.ticket_parser_service import TicketParserService
+from apps.bookings.models import BoletoImportado
+from core.middleware import agency_context
+from core.models import Agencia
+
+DEFAULT_CORPUS = os.path.join("core", "tests", "dataset", "*.eml")
+
+
+class Rollback(Exception):
+    """Revierte los datos sintéticos del benchmark."""
+
+
+class Command(BaseCommand):
+    """Compara el parseo boleto a boleto contra la ingesta por lotes."""
+
+    help = (
+        "Benchmark de ingesta de boletos sobre un corpus de fixtures: pipeline individual "
+        "(lock + logs por boleto) vs BatchTicketIngestionService (reclamo único, pool de "
+        "hilos y bulk_update). Los datos se crean en una transacción que se revierte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths", nargs="*", help="Globs del corpus (por defecto: dataset .eml)."
+        )
+        parser.add_argument("--limit", type=int, default=100, help="Boletos a ingerir.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Hilos del lote (las consultas de otros hilos no se cuentan).",
+        )
+
+    def handle(self, *args, **options):
+        patterns = options["paths"] or [os.path.join(settings.BASE_DIR, DEFAULT_CORPUS)]
+        files = sorted({f for pattern in patterns for f in glob.glob(pattern)})[: options["limit"]]
+        if not files:
+            self.stdout.write(self.style.ERROR("No se encontraron archivos en el corpus."))
+            return
+
+        stored = []
+        results = {}
+        try:
+            with transaction.atomic():
+                agencia = Agencia.objects.create(
+                    nombre=f"Benchmark lote {uuid.uuid4().hex[:6]}",
+                    email_principal="benchmark@example.com",
+                )
+                with agency_context(agencia):
+                    # Calentamiento: deja las caches de parseo iguales para ambas variantes.
+                    self._run_batch(agencia, self._create(agencia, files, stored), options)
+                    results["individual"] = self._run_individual(
+                        self._create(agencia, files, stored)
+                    )
+                    results["lote"] = self._run_batch(
+                        agencia, self._create(agencia, files, stored), options
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            storage = BoletoImportado._meta.get_field("archivo_boleto").storage
+            for name in stored:
+                try:
+                    storage.delete(name)
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f"No se pudo borrar {name}: {e}"))
+
+        n = len(files)
+        self.stdout.write(
+            self.style.SUCCESS(f"\nResultados ({n} boletos, caches de parseo calientes)")
+        )
+        for label, (elapsed, queries) in results.items():
+            self.stdout.write(
+                f" - {label}: {elapsed:.2f} s ({n / elapsed:.1f} boletos/s), "
+                f"{queries} consultas ({queries / n:.1f} por boleto)"
+            )
+
+    def _create(self, agencia, files, stored):
+        boletos = []
+        for path in files:
+            with open(path, "rb") as f:
+                boleto = BoletoImportado(agencia=agencia, estado_parseo="PEN")
+                boleto._skip_auto_parse = True
+                boleto.archivo_boleto.save(
+                    os.path.basename(path), ContentFile(f.read()), save=False
+                )
+            boleto.save()
+            stored.append(boleto.archivo_boleto.name)
+            boletos.append(boleto)
+        return boletos
+
+    def _run_individual(self, boletos):
+        """Fases de lock + parseo + persistencia del pipeline individual (sin venta/PDF)."""
+        service = TicketParserService()
+        with CaptureQueriesContext(connection) as queries:
+            t0 = time.perf_counter()
+            for boleto in boletos:
+                BoletoImportado.all_objects.filter(pk=boleto.pk).exclude(
+                    estado_parseo=BoletoImportado.EstadoParseo.EN_PROCESO
+                ).update(estado_parseo=BoletoImportado.EstadoParseo.EN_PROCESO)
+                boleto.log_parseo = "Iniciando pipeline de extracción..."
+                boleto.save(update_fields=["log_parseo"])
+                datos, error = service._parse_boleto(boleto)
+                boleto.datos_parseados = datos
+                boleto.save(update_fields=["datos_parseados", "log_parseo"])
+            elapsed = time.perf_counter() - t0
+        return elapsed, len(queries.captured_queries)
+
+    def _run_batch(self, agencia, boletos, options):
+        with CaptureQueriesContext(connection) as queries:
+            t0 = time.perf_counter()
+            BatchTicketIngestionService.ingest(
+                agencia,
+                limit=len(boletos),
+                boleto_ids=[b.pk for b in boletos],
+                max_workers=options["workers"],
+                dispatch=False,
+            )
+            elapsed = time.perf_counter() - t0
+        return elapsed, len(queries.captured_queries)
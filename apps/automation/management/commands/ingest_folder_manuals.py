@@ -7,6 +7,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 
 from apps.automation.services.rag_service import RAGKnowledgeService
+from apps.automation.services.rag_vector_index import vector_index_registry
 from core.models import Agencia
 
 logger = logging.getLogger(__name__)
@@ -180,10 +181,10 @@ class Command(BaseCommand):
 
                     KnowledgeChunk = apps.get_model("cms", "KnowledgeChunk")
 
-                    for idx, chunk in enumerate(chunks):
-                        vec = RAGKnowledgeService.generate_embedding(chunk, agency=agencia)
-
-                        KnowledgeChunk.objects.create(
+                    created = []
+                    vectors = RAGKnowledgeService.generate_embeddings(chunks, agency=agencia)
+                    for idx, (chunk, vec) in enumerate(zip(chunks, vectors, strict=True)):
+                        obj = KnowledgeChunk.objects.create(
                             agencia=agencia,
                             source_type="MANUAL_GDS",
                             source_title=f"{title} (Parte {idx + 1}/{len(chunks)})",
@@ -191,8 +192,13 @@ class Command(BaseCommand):
                             content_chunk=chunk,
                             embedding_vector=vec,
                         )
+                        created.append(obj)
                         chunks_count += 1
 
+                    vector_index_registry.add(
+                        agencia, [c.id for c in created], [c.embedding_vector for c in created]
+                    )
+
                     doc.is_indexed = True
                     doc.indexed_at = timezone.now()
                     doc.save()
@@ -253,3 +253,185 @@ def validate_airline_numeric_code(ticket_number: str, airline_iata: str) -> bool
     except Exception as e:
         logger.error(f"Error validando código numérico: {e}")
         return True
+
+
+# ─── Resolución de código IATA (reportes y persistencia) ─────────────────────
+
+# Placas (prefijo numérico del boleto) frecuentes en el mercado venezolano.
+# Prevalecen sobre el catálogo, que puede tener placas incompletas.
+TICKET_PREFIX_IATA = {
+    "782": "QL",
+    "067": "ES",
+    "052": "ES",
+    "742": "9V",
+    "765": "WW",
+    "134": "AV",
+    "230": "CM",
+    "045": "LA",
+    "001": "AA",
+    "057": "AF",
+    "074": "KL",
+    "239": "AT",
+    "075": "IB",
+    "996": "UX",
+    "967": "UX",
+    "235": "TK",
+    "020": "LH",
+    "080": "TP",
+    "850": "V0",
+    "880": "T9",
+    "840": "WW",
+    "920": "5R",
+    "921": "5R",
+    "482": "DM",
+}
+
+# Términos del nombre de aerolínea -> código IATA, en orden de prioridad.
+# Los términos de hasta 3 caracteres sólo coinciden como palabra completa
+# ("RAV" no debe coincidir con "TRAVEL", ni "LAN" con "ATLANTIC").
+NOMBRE_IATA = (
+    ("AVIOR", "9V"),
+    ("AVIONES DE ORIENTE", "9V"),
+    ("RUTAS AEREAS DE VENEZUELA", "WW"),
+    ("VENEZOLANA", "WW"),
+    ("RAVSA", "WW"),
+    ("RAV", "WW"),
+    ("RUTACA", "5R"),
+    ("RUTAS AEREAS C A", "5R"),
+    ("LASER", "QL"),
+    ("ESTELAR", "ES"),
+    ("TURPIAL", "T9"),
+    ("AVIANCA", "AV"),
+    ("AEROVIAS DEL CONTINENTE", "AV"),
+    ("COPA", "CM"),
+    ("IBERIA", "IB"),
+    ("EUROPA", "UX"),
+    ("AMERICAN", "AA"),
+    ("LATAM", "LA"),
+    ("LAN", "LA"),
+    ("TURKISH", "TK"),
+    ("CONVIASA", "V0"),
+    ("GLOBAL AIR", "DM"),
+    ("PAWA", "7N"),
+    ("AIR PANAMA", "7P"),
+    ("SATENA", "9R"),
+    ("AEROCARIBE", "CV"),
+    ("AEROPOSTAL", "CW"),
+    ("SKY HIGH", "DO"),
+    ("FLY THE WORLD", "GI"),
+    ("RED AIR", "L5"),
+    ("SASCA", "O3"),
+    ("PLUS ULTRA", "PU"),
+    ("SKY ATLANTIC", "T7"),
+)
+
+
+def normalizar_nombre_aerolinea(nombre: str | None) -> str:
+    """Mayúsculas sin acentos ni puntuación ("Aerolíneas C.A." -> "AEROLINEAS C A")."""
+    import re
+    import unicodedata
+
+    if not nombre:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^A-Z0-9]+", " ", texto.upper()).split())
+
+
+class AirlineCodeResolver:
+    """
+    Resuelve el código IATA de un boleto a partir de su placa, el nombre de la
+    aerolínea emisora o el número de vuelo del primer segmento.
+
+    El índice (placas y nombres del catálogo ``Aerolinea`` más las tablas de este
+    módulo) se construye una vez por proceso y se renueva cada
+    ``AIRLINE_INDEX_TTL`` segundos o al guardar/borrar una aerolínea.
+    """
+
+    _index = None
+    _built_at = 0.0
+
+    @classmethod
+    def resolve(cls, numero_boleto=None, aerolinea=None, datos=None) -> str | None:
+        """Código IATA del boleto o None si ninguna fuente lo identifica."""
+        index = cls.get_index()
+
+        digitos = "".join(filter(str.isdigit, str(numero_boleto or "")))
+        if len(digitos) >= 3 and digitos[:3] in index["prefijos"]:
+            return index["prefijos"][digitos[:3]]
+
+        nombre = normalizar_nombre_aerolinea(aerolinea)
+        if nombre:
+            if nombre in index["nombres"]:
+                return index["nombres"][nombre]
+            palabras = f" {nombre} "
+            for termino, codigo in NOMBRE_IATA:
+                if len(termino) <= 3:
+                    if f" {termino} " in palabras:
+                        return codigo
+                elif termino in nombre:
+                    return codigo
+
+        codigo = extract_airline_code_from_flight(cls._primer_vuelo(datos) or "")
+        if codigo and codigo.isalnum() and not codigo.isdigit():
+            return codigo
+        return None
+
+    @classmethod
+    def resolve_boleto(cls, boleto) -> str | None:
+        """Atajo sobre una instancia de ``BoletoImportado``."""
+        return cls.resolve(boleto.numero_boleto, boleto.aerolinea_emisora, boleto.datos_parseados)
+
+    @classmethod
+    def get_index(cls) -> dict:
+        """Índice ``{"prefijos": {placa: iata}, "nombres": {nombre_normalizado: iata}}``."""
+        import time
+
+        from django.conf import settings
+
+        ttl = getattr(settings, "AIRLINE_INDEX_TTL", 3600)
+        if cls._index is None or time.monotonic() - cls._built_at > ttl:
+            cls._index = cls._build()
+            cls._built_at = time.monotonic()
+        return cls._index
+
+    @classmethod
+    def invalidate(cls, **kwargs) -> None:
+        """Descarta el índice (receptor de post_save/post_delete de ``Aerolinea``)."""
+        cls._index = None
+
+    @staticmethod
+    def _build() -> dict:
+        prefijos, nombres = {}, {}
+        try:
+            catalogo = Aerolinea.objects.exclude(codigo_iata="").values_list(
+                "codigo_iata", "codigo_numerico", "nombre"
+            )
+            # Las de mayor prioridad se cargan al final y prevalecen.
+            for codigo, placa, nombre in catalogo.order_by("-orden_prioridad", "activa"):
+                codigo = codigo.strip().upper()
+                if placa and placa.strip().isdigit():
+                    prefijos[placa.strip().zfill(3)] = codigo
+                if nombre:
+                    nombres[normalizar_nombre_aerolinea(nombre)] = codigo
+        except Exception as e:
+            logger.warning(f"No se pudo cargar el catálogo de aerolíneas para el índice IATA: {e}")
+
+        prefijos.update(TICKET_PREFIX_IATA)
+        logger.debug(f"Índice IATA construido: {len(prefijos)} placas, {len(nombres)} nombres")
+        return {"prefijos": prefijos, "nombres": nombres}
+
+    @staticmethod
+    def _primer_vuelo(datos) -> str | None:
+        if isinstance(datos, str):
+            import json
+
+            try:
+                datos = json.loads(datos)
+            except ValueError:
+                return None
+        if not isinstance(datos, dict):
+            return None
+        segmentos = datos.get("segmentos")
+        if segmentos and isinstance(segmentos, list) and isinstance(segmentos[0], dict):
+            return str(segmentos[0].get("vuelo") or "")
+        return None
@@ -15,6 +15,9 @@ logger = logging.getLogger(__name__)
 class AmadeusParser(BaseTicketParser):
     """Parser determinístico para pasajes e itinerarios GDS Amadeus."""
 
+    detection_keywords = ("AMADEUS", "CHECKMYTRIP", "1A/ELECTRONIC TICKET")
+    detection_patterns = (r"BOOKING REF(?:ERENCE)?\s*:\s*[A-Z0-9]{6}",)
+
     def __init__(self):
         """Inicializa identificadores del parser Amadeus."""
         super().__init__()
@@ -27,7 +30,7 @@ class AmadeusParser(BaseTicketParser):
         if not text:
             return False
 
-        upper_text = text.upper()
+        upper_text = self.purify_text_for_detection(text)
         keywords = [
             "AMADEUS",
             "CHECKMYTRIP",
@@ -15,6 +15,20 @@ from bs4 import BeautifulSoup
 
 logger = logging.getLogger(__name__)
 
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def purify_text_for_detection(text: str) -> str:
+    """
+    Texto normalizado sobre el que se evalúan las firmas de detección de GDS:
+    sin etiquetas HTML ni &nbsp;, espacios condensados y en mayúsculas.
+    """
+    if not text:
+        return ""
+    t = HTML_TAG_RE.sub(" ", text).replace("&nbsp;", " ")
+    # split()/join equivale a re.sub(r"\s+", " ", t).strip() en una sola pasada en C.
+    return " ".join(t.split()).upper()
+
 
 @dataclass
 class ParsedTicketData:
@@ -422,6 +436,19 @@ class BaseTicketParser(ABC):
     quién debe hacerse cargo del archivo subido. Promueve extrema escalabilidad para nuevos proveedores.
     """
 
+    # Firmas de detección para el índice de ParserRegistry (ver registry.py), evaluadas
+    # sobre purify_text_for_detection(text). Si el parser declara firmas, can_parse()
+    # debe ser equivalente a "aparece alguna firma suficiente, o aparece un hint y se
+    # cumple el resto de la condición":
+    #   - detection_keywords / detection_patterns: literales / regex SUFICIENTES; el
+    #     registro elige el parser sin volver a llamar a can_parse().
+    #   - detection_hints: literales NECESARIOS pero no suficientes (condiciones
+    #     compuestas); el registro confirma con can_parse().
+    # Sin firmas, el parser se evalúa siempre con can_parse() (p. ej. GeminiParser).
+    detection_keywords: tuple[str, ...] = ()
+    detection_patterns: tuple[str, ...] = ()
+    detection_hints: tuple[str, ...] = ()
+
     @abstractmethod
     def can_parse(self, text: str) -> bool:
         """
@@ -536,14 +563,7 @@ class BaseTicketParser(ABC):
         Purifica el texto para detección de GDS (can_parse).
         Elimina etiquetas HTML, condensa múltiples espacios y convierte a mayúsculas.
         """
-        if not text:
-            return ""
-        # Eliminar HTML
-        t = re.sub(r"<[^>]+>", " ", text)
-        t = t.replace("&nbsp;", " ")
-        # Condensar múltiples espacios en uno solo
-        t = re.sub(r"\s+", " ", t)
-        return t.strip().upper()
+        return purify_text_for_detection(text)
 
     def extract_field(
         self,
@@ -1,9 +1,15 @@
+import hashlib
+import io
 import logging
 import os
+from dataclasses import dataclass, field
 from email import policy
 from email.parser import BytesParser
 from typing import Any, BinaryIO
 
+from django.conf import settings
+from django.core.cache import cache
+
 try:
     import fitz
 except ImportError:
@@ -18,6 +24,30 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+HEADERS_START = "--- HEADERS START ---"
+HEADERS_END = "--- HEADERS END ---"
+
+
+@dataclass(frozen=True)
+class ExtractionResult:
+    """
+    Resultado de una única lectura del archivo de un boleto.
+
+    Todas las etapas del pipeline (cache de parseo, motor regex/GDS, IA) reutilizan
+    este objeto en lugar de volver a abrir el storage o re-hashear el texto.
+    """
+
+    text: str | None
+    html: str = ""
+    headers: dict[str, str] = field(default_factory=dict)
+    page_count: int = 0
+    fingerprint: str = ""
+
+
+def text_fingerprint(text: str) -> str:
+    """SHA-256 del texto extraído (clave de las caches de parseo)."""
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+
 
 class ExtractionService:
     """
@@ -251,6 +281,95 @@ class ExtractionService:
         except Exception:
             return html_content
 
+    @staticmethod
+    def extract(file_obj: BinaryIO | None, filename: str) -> ExtractionResult:
+        """Lee el archivo una sola vez y deriva texto, HTML, cabeceras, páginas y huella."""
+        filename = filename or ""
+        data = b""
+        if file_obj is not None:
+            try:
+                if hasattr(file_obj, "seek"):
+                    file_obj.seek(0)
+                data = file_obj.read() or b""
+            except Exception as e:
+                logger.error(f"Error leyendo archivo {filename}: {e}")
+
+        text = ExtractionService.extract_text(io.BytesIO(data), filename)
+        if not text:
+            return ExtractionResult(text=text)
+
+        name = filename.lower()
+        html = ""
+        if name.endswith(".eml") or name.endswith(".html"):
+            html = ExtractionService.extract_html(io.BytesIO(data), filename)
+
+        headers = {}
+        if text.startswith(HEADERS_START):
+            headers_end = text.find(HEADERS_END)
+            if headers_end != -1:
+                header_block = text[: headers_end + len(HEADERS_END)]
+                headers = ExtractionService._parse_header_block(header_block)
+                if html and not html.startswith(HEADERS_START):
+                    html = f"{header_block}\n\n{html}"
+
+        page_count = 0
+        if name.endswith(".pdf") and fitz is not None:
+            try:
+                with fitz.open(stream=data, filetype="pdf") as pdf:
+                    page_count = pdf.page_count
+            except Exception as e:
+                logger.debug("No se pudo contar páginas del PDF %s: %s", filename, e)
+
+        return ExtractionResult(
+            text=text,
+            html=html,
+            headers=headers,
+            page_count=page_count,
+            fingerprint=text_fingerprint(text),
+        )
+
+    @staticmethod
+    def _parse_header_block(header_block: str) -> dict[str, str]:
+        headers = {}
+        for line in header_block.splitlines()[1:-1]:
+            key, sep, value = line.partition(":")
+            if sep:
+                headers[key.strip()] = value.strip()
+        return headers
+
+    @staticmethod
+    def extract_boleto(boleto: Any) -> ExtractionResult:
+        """
+        Extracción memoizada del archivo de un boleto.
+
+        El resultado se guarda en cache por boleto y nombre de archivo (el storage
+        asigna un nombre nuevo a cada archivo subido), de modo que los reintentos del
+        pipeline y la revisión manual no vuelven a leer el storage.
+        """
+        filename = boleto.archivo_boleto.name if boleto.archivo_boleto else ""
+        cache_key = None
+        if filename:
+            name_hash = hashlib.sha256(filename.encode("utf-8")).hexdigest()[:16]
+            cache_key = f"extraction:boleto:{boleto.pk}:{name_hash}"
+            cached = cache.get(cache_key)
+            if isinstance(cached, ExtractionResult):
+                return cached
+
+        raw_file = ExtractionService.get_open_file(boleto)
+        try:
+            result = ExtractionService.extract(raw_file, filename)
+        finally:
+            if raw_file:
+                raw_file.close()
+
+        if cache_key and result.text:
+            timeout = getattr(settings, "TICKET_EXTRACTION_CACHE_TIMEOUT", 3600)
+            try:
+                cache.set(cache_key, result, timeout=timeout)
+            except Exception as e:
+                logger.warning(f"No se pudo cachear la extracción del boleto {boleto.pk}: {e}")
+        return result
+
     @staticmethod
     def get_open_file(boleto: Any) -> BinaryIO | None:
         """Obtener un handle de lectura binaria para el archivo del boleto.
@@ -11,6 +11,25 @@ logger = logging.getLogger(__name__)
 class KIUParser(BaseTicketParser):
     """Parser para boletos del sistema KIU"""
 
+    detection_keywords = (
+        "KIU",
+        "PASSENGER ITINERARY RECEIPT",
+        "E-TICKET ITINERARY RECEIPT",
+        "ETICKET ITINERARY RECEIPT",
+        "NAME/NOMBRE",
+        "AVIOR",
+        "RUTACA",
+        "LASER",
+        "VENEZOLANA",
+        "ESTELAR",
+        "TURPIAL",
+    )
+    detection_hints = (
+        "ISSUE AGENT/AGENTE EMISOR",
+        "RECIBO DE BOLETO ELECTRÓNICO",
+        "RECIBO DE BOLETO ELECTRONICO",
+    )
+
     def can_parse(self, text: str) -> bool:
         """Detecta si es un boleto KIU"""
         purified = self.purify_text_for_detection(text)
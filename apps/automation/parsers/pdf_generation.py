@@ -8,6 +8,8 @@ from apps.common.services.pdf_renderer import PdfRendererService
 
 logger = logging.getLogger(__name__)
 
+TICKET_TEMPLATE = "core/tickets/golden_ticket_v2.html"
+
 
 class PdfGenerationService:
     """
@@ -20,46 +22,110 @@ class PdfGenerationService:
     ) -> tuple[bytes, str]:
         """
         Genera el PDF del boleto usando la plantilla unificada y WeasyPrint.
+
+        Si el mismo contenido (datos, plantilla y branding) ya se renderizó, retorna el
+        PDF guardado en ``TicketPdfCache``; ``use_cache=False`` fuerza el renderizado.
         """
-        try:
-            # Selección de plantilla
-            source_system = data.get("SOURCE_SYSTEM", "KIU").upper()
-            template_name = "core/tickets/golden_ticket_v2.html"
+        from apps.automation.services.ticket_pdf_cache import TicketPdfCache
 
-            # Inyección de contexto
-            context = PdfGenerationService._build_context(
-                data, agencia_obj, source_system, boleto_obj=boleto_obj
+        try:
+            cache_key = None
+            if kwargs.get("use_cache", True) and TicketPdfCache.enabled():
+                # Antes de _build_context, que normaliza el nombre dentro de ``data``.
+                cache_key = TicketPdfCache.key_for(data, agencia_obj, boleto_obj)
+                cached = TicketPdfCache.get(cache_key)
+                if cached:
+                    logger.info(f" PDF de boleto servido desde cache: {cached[1]}")
+                    return cached
+
+            html_out, fname = PdfGenerationService._render_ticket_html(
+                data, agencia_obj, boleto_obj
             )
 
-            # Renderizado HTML
-            html_out = render_to_string(template_name, context)
-
             # --- RENDERIZADO DE PDF (WeasyPrint) ---
-            logger.info(f" Generando PDF para PNR: {context.get('CODIGO_RESERVA')}")
+            logger.info(f" Generando PDF {fname}")
             pdf_bytes = PdfRendererService.render_html_to_pdf(html_out)
+            if cache_key and pdf_bytes and len(pdf_bytes) > 100:
+                TicketPdfCache.put(cache_key, pdf_bytes, fname)
+            return pdf_bytes, fname
 
-            # Nombre de archivo profesional
-            num_boleto = (
-                data.get("NUMERO_DE_BOLETO")
-                or data.get("ticket_number")
-                or data.get("numero_boleto")
-                or (boleto_obj.numero_boleto if boleto_obj else None)
-                or "S-N"
-            )
+        except Exception as e:
+            logger.error(f" Fallo crítico en generación de PDF de boleto: {e}", exc_info=True)
+            return b"", "error_generacion.pdf"
+
+    @staticmethod
+    def generate_tickets(
+        tickets: list[dict[str, Any]], agencia_obj=None, boleto_objs=None
+    ) -> list[tuple[bytes, str]]:
+        """
+        Genera los PDFs de varios boletos (p. ej. una emisión multi-pasajero) con
+        ``PdfRendererService.render_many``. Retorna ``(pdf_bytes, fname)`` por boleto,
+        en el mismo orden; los que fallan retornan ``(b"", "error_generacion.pdf")``
+        igual que ``generate_ticket``. Los boletos ya cacheados no se renderizan.
+        """
+        from apps.automation.services.ticket_pdf_cache import TicketPdfCache
+
+        boleto_objs = boleto_objs or [None] * len(tickets)
+        results: list[tuple[bytes, str]] = [(b"", "error_generacion.pdf")] * len(tickets)
+        use_cache = TicketPdfCache.enabled()
+        pending = []
+        for i, (data, boleto_obj) in enumerate(zip(tickets, boleto_objs, strict=True)):
+            try:
+                cache_key = None
+                if use_cache:
+                    cache_key = TicketPdfCache.key_for(data, agencia_obj, boleto_obj)
+                    cached = TicketPdfCache.get(cache_key)
+                    if cached:
+                        results[i] = cached
+                        continue
+                html_out, fname = PdfGenerationService._render_ticket_html(
+                    data, agencia_obj, boleto_obj
+                )
+                pending.append((i, html_out, fname, cache_key))
+            except Exception as e:
+                logger.error(f" Fallo renderizando HTML del boleto {i + 1}: {e}", exc_info=True)
+
+        rendered = PdfRendererService.render_many(item[1] for item in pending)
+        for (i, _, fname, cache_key), result in zip(pending, rendered, strict=True):
+            if result.ok:
+                results[i] = (result.pdf, fname)
+                if cache_key and len(result.pdf) > 100:
+                    TicketPdfCache.put(cache_key, result.pdf, fname)
+            else:
+                logger.error(f" Fallo crítico en generación de PDF {fname}: {result.error}")
+        return results
 
-            import re
+    @staticmethod
+    def _render_ticket_html(data: dict[str, Any], agencia_obj=None, boleto_obj=None):
+        """HTML del boleto (plantilla unificada) y nombre del archivo PDF."""
+        import re
 
-            nombre_pasajero = context.get("NOMBRE_DEL_PASAJERO", "PASAJERO")
-            # Reemplazar caracteres especiales y espacios por guión bajo
-            nombre_limpio = re.sub(r"[^A-Za-z0-9]", "_", nombre_pasajero).strip("_").upper()
+        # Selección de plantilla
+        source_system = data.get("SOURCE_SYSTEM", "KIU").upper()
+        template_name = TICKET_TEMPLATE
 
-            fname = f"Boleto_{num_boleto}_{nombre_limpio}.pdf"
+        # Inyección de contexto
+        context = PdfGenerationService._build_context(
+            data, agencia_obj, source_system, boleto_obj=boleto_obj
+        )
 
-            return pdf_bytes, fname
+        # Renderizado HTML
+        html_out = render_to_string(template_name, context)
 
-        except Exception as e:
-            logger.error(f" Fallo crítico en generación de PDF de boleto: {e}", exc_info=True)
-            return b"", "error_generacion.pdf"
+        # Nombre de archivo profesional
+        num_boleto = (
+            data.get("NUMERO_DE_BOLETO")
+            or data.get("ticket_number")
+            or data.get("numero_boleto")
+            or (boleto_obj.numero_boleto if boleto_obj else None)
+            or "S-N"
+        )
+
+        nombre_pasajero = context.get("NOMBRE_DEL_PASAJERO", "PASAJERO")
+        # Reemplazar caracteres especiales y espacios por guión bajo
+        nombre_limpio = re.sub(r"[^A-Za-z0-9]", "_", nombre_pasajero).strip("_").upper()
+
+        return html_out, f"Boleto_{num_boleto}_{nombre_limpio}.pdf"
 
     @staticmethod
     def _build_context(
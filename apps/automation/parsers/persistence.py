@@ -2,6 +2,7 @@ import logging
 
 from django.db import transaction
 
+from apps.automation.parsers.airline_utils import AirlineCodeResolver
 from apps.bookings.models import BoletoImportado, Proveedor
 from apps.common.models import Aerolinea
 
@@ -83,6 +84,7 @@ class BoletoPersistenceService:
 
             boleto.ruta_vuelo = d.get("ItinerarioFinalLimpio")
             boleto.datos_parseados = d
+            boleto.aerolinea_codigo = AirlineCodeResolver.resolve_boleto(boleto) or ""
 
             # Fecha de emisión
             fecha_str = d.get("issue_date")
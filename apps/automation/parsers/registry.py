@@ -1,15 +1,99 @@
 """
 Registro centralizado de parsers de boletos.
 Permite registrar y buscar parsers dinámicamente.
+
+La detección usa un índice de firmas (``SignatureIndex``): las keywords/patterns
+que cada parser declara (``detection_keywords`` / ``detection_patterns`` /
+``detection_hints``) se combinan en una sola regex al registrar. El boleto se
+normaliza una vez y una pasada sobre él resuelve qué parser lo procesa; solo los
+hints (condiciones compuestas) y los parsers sin firmas confirman con
+``can_parse()``, en lugar de que cada parser re-normalice y re-escanee el texto.
 """
 
 import logging
+import re
 import threading
+import time
 
-from .base_parser import BaseTicketParser
+from .base_parser import BaseTicketParser, purify_text_for_detection
 
 logger = logging.getLogger(__name__)
 
+MATCH = "match"
+HINT = "hint"
+
+
+def _alternation(keywords, patterns=()) -> str | None:
+    alternatives = [re.escape(keyword.upper()) for keyword in keywords if keyword.strip()]
+    alternatives.extend(patterns)
+    if not alternatives:
+        return None
+    return "|".join(f"(?:{alt})" for alt in alternatives)
+
+
+class SignatureIndex:
+    """
+    Índice de firmas de detección de un conjunto de parsers.
+
+    ``scan(text)`` recibe el texto ya normalizado (``purify_text_for_detection``) y
+    retorna ``{posición: MATCH | HINT}`` para los parsers cuyas firmas aparecen. La
+    regex combinada se escanea una vez; al encontrar un parser, se retira de la
+    alternancia y la búsqueda continúa desde esa misma posición con los restantes.
+    Así ningún parser queda "tapado" por la coincidencia de otro y el texto se
+    recorre una sola vez en total.
+    """
+
+    def __init__(self, parsers: list[BaseTicketParser]):
+        self._signatures: dict[int, str] = {}
+        for pos, parser in enumerate(parsers):
+            groups = []
+            sufficient = _alternation(parser.detection_keywords, parser.detection_patterns)
+            if sufficient:
+                groups.append(f"(?P<m{pos}>{sufficient})")
+            hints = _alternation(parser.detection_hints)
+            if hints:
+                groups.append(f"(?P<h{pos}>{hints})")
+            if groups:
+                regex = "|".join(groups)
+                re.compile(regex)  # Falla al registrar, no al primer boleto.
+                self._signatures[pos] = regex
+        self._compiled: dict[frozenset[int], re.Pattern] = {}
+
+    def has_signature(self, pos: int) -> bool:
+        """Indica si el parser en ``pos`` declara firmas de detección."""
+        return pos in self._signatures
+
+    def _pattern(self, positions: frozenset[int]) -> re.Pattern:
+        pattern = self._compiled.get(positions)
+        if pattern is None:
+            regex = "|".join(self._signatures[pos] for pos in sorted(positions))
+            pattern = self._compiled[positions] = re.compile(regex)
+        return pattern
+
+    def scan(self, text: str, first_only: bool = False) -> dict[int, str]:
+        """
+        Firmas presentes en ``text`` por parser.
+
+        Con ``first_only`` el escaneo se corta en cuanto ningún parser anterior a la
+        mejor coincidencia suficiente puede cambiar el resultado de ``find_parser``.
+        """
+        remaining = frozenset(self._signatures)
+        hits: dict[int, str] = {}
+        offset = 0
+        while remaining:
+            match = self._pattern(remaining).search(text, offset)
+            if match is None:
+                break
+            group = match.lastgroup
+            pos = int(group[1:])
+            hits[pos] = MATCH if group[0] == "m" else HINT
+            if first_only and hits[pos] == MATCH:
+                remaining = frozenset(p for p in remaining if p < pos)
+            else:
+                remaining = remaining - {pos}
+            offset = match.start()
+        return hits
+
 
 class ParserRegistry:
     """Registro centralizado de parsers de boletos"""
@@ -17,6 +101,8 @@ class ParserRegistry:
     def __init__(self):
         """__init__."""
         self._parsers: list[BaseTicketParser] = []
+        self._index = SignatureIndex([])
+        self._stats: dict[str, dict[str, float]] = {}
         self._lock = threading.Lock()
 
     def register(self, parser: BaseTicketParser) -> None:
@@ -32,33 +118,91 @@ class ParserRegistry:
             )
 
         with self._lock:
-            self._parsers.append(parser)
+            parsers = [*self._parsers, parser]
+            self._index = SignatureIndex(parsers)
+            self._parsers = parsers
         logger.info(f"Parser registrado: {parser.__class__.__name__}")
 
+    def rank_candidates(self, text: str) -> list[BaseTicketParser]:
+        """
+        Parsers que podrían procesar el texto, en orden de prioridad (registro).
+
+        Incluye los parsers cuyas firmas aparecen en el texto y los que no declaran
+        firmas (siempre candidatos). Los que solo coinciden por hint, y los que no
+        declaran firmas, todavía deben confirmar con ``can_parse()``.
+        """
+        with self._lock:
+            parsers, index = self._parsers, self._index
+        hits = index.scan(purify_text_for_detection(text))
+        return [
+            parser
+            for pos, parser in enumerate(parsers)
+            if pos in hits or not index.has_signature(pos)
+        ]
+
     def find_parser(self, text: str) -> BaseTicketParser | None:
         """
         Encuentra el parser apropiado para el texto dado.
 
+        Equivale a recorrer los parsers en orden de registro con ``can_parse()``,
+        pero resolviendo las firmas declaradas con una sola pasada sobre el texto.
+
         Args:
             text: Texto del boleto a analizar
 
         Returns:
             Parser que puede procesar el texto o None si no se encuentra
         """
+        start = time.perf_counter()
         with self._lock:
-            parsers_copy = list(self._parsers)
-        for parser in parsers_copy:
+            parsers, index = self._parsers, self._index
+        hits = index.scan(purify_text_for_detection(text), first_only=True)
+        self._record("_index", time.perf_counter() - start, matched=bool(hits))
+
+        for pos, parser in enumerate(parsers):
+            name = parser.__class__.__name__
+            hit = hits.get(pos)
+            if hit == MATCH:
+                self._record(name, 0.0, matched=True, confirmed=False)
+                logger.info(f"Parser encontrado: {name}")
+                return parser
+            if hit is None and index.has_signature(pos):
+                continue
+
+            start = time.perf_counter()
             try:
-                if parser.can_parse(text):
-                    logger.info(f"Parser encontrado: {parser.__class__.__name__}")
-                    return parser
+                matched = parser.can_parse(text)
             except Exception as e:
-                logger.warning(f"Error al verificar parser {parser.__class__.__name__}: {e}")
-                continue
+                logger.warning(f"Error al verificar parser {name}: {e}")
+                matched = False
+            self._record(name, time.perf_counter() - start, matched=matched)
+            if matched:
+                logger.info(f"Parser encontrado: {name}")
+                return parser
 
         logger.warning("No se encontró parser compatible para el texto")
         return None
 
+    def get_detection_stats(self) -> dict[str, dict[str, float]]:
+        """
+        Métricas de detección acumuladas en el proceso, por parser.
+
+        ``_index`` corresponde a la normalización y el escaneo de firmas. Por parser:
+        ``checks`` (llamadas a ``can_parse()``), ``index_matches`` (selecciones
+        resueltas por el índice sin ``can_parse()``), ``matches``, ``total_ms`` y
+        ``avg_ms`` (por llamada a ``can_parse()``).
+        """
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+        for values in stats.values():
+            values["avg_ms"] = values["total_ms"] / values["checks"] if values["checks"] else 0.0
+        return stats
+
+    def reset_detection_stats(self) -> None:
+        """Reinicia las métricas de detección acumuladas."""
+        with self._lock:
+            self._stats.clear()
+
     def get_all_parsers(self) -> list[BaseTicketParser]:
         """Retorna lista de todos los parsers registrados"""
         with self._lock:
@@ -67,9 +211,23 @@ class ParserRegistry:
     def clear(self) -> None:
         """Limpia todos los parsers registrados"""
         with self._lock:
-            self._parsers.clear()
+            self._parsers = []
+            self._index = SignatureIndex([])
+            self._stats.clear()
         logger.info("Registro de parsers limpiado")
 
+    def _record(self, name: str, elapsed: float, matched: bool, confirmed: bool = True) -> None:
+        with self._lock:
+            values = self._stats.setdefault(
+                name, {"checks": 0, "index_matches": 0, "matches": 0, "total_ms": 0.0}
+            )
+            if confirmed:
+                values["checks"] += 1
+            else:
+                values["index_matches"] += 1
+            values["matches"] += int(matched)
+            values["total_ms"] += elapsed * 1000
+
 
 # Instancia global del registro
 registry = ParserRegistry()
@@ -1,11 +1,85 @@
 import email
 import logging
+import multiprocessing
 import os
+import shutil
 import tempfile
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from email import policy
 
+from django.conf import settings
+
 logger = logging.getLogger(__name__)
 
+# Páginas por tarea del pool de procesos: suficiente para amortizar la apertura del
+# documento en cada worker sin retrasar la primera página del stream.
+PDF_PAGES_PER_TASK = 16
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> list[str]:
+    """Texto de las páginas ``[start, stop)`` del PDF (se ejecuta en el pool de procesos)."""
+    import fitz
+
+    texts = []
+    with fitz.open(path) as pdf:
+        for number in range(start, stop):
+            try:
+                texts.append(pdf.load_page(number).get_text() or "")
+            except Exception as e:
+                logger.warning(f"Error extrayendo página {number + 1} de PDF: {e}")
+                texts.append("")
+    return texts
+
+
+@contextmanager
+def _pdf_path(source):
+    """
+    Ruta en disco del PDF, para que PyMuPDF lo abra de forma perezosa en lugar de
+    recibir el archivo completo en memoria. Si ``source`` no tiene una ruta local
+    (storage remoto, bytes), se copia por bloques a un temporal que se borra al salir.
+    """
+    if isinstance(source, str | os.PathLike):
+        yield os.fspath(source)
+        return
+
+    for attr in ("path", "name"):
+        try:
+            candidate = getattr(source, attr, None)
+        except Exception:
+            # p. ej. FieldFile.path en storages remotos (NotImplementedError)
+            candidate = None
+        if isinstance(candidate, str) and os.path.isabs(candidate) and os.path.isfile(candidate):
+            yield candidate
+            return
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        if isinstance(source, bytes | bytearray | memoryview):
+            tmp.write(source)
+        else:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            shutil.copyfileobj(source, tmp, length=1024 * 1024)
+        tmp_path = tmp.name
+    try:
+        yield tmp_path
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except OSError as e:
+            logger.warning(f"No se pudo borrar el temporal {tmp_path}: {e}")
+
+
+def _process_pool_workers(max_workers: int | None) -> int:
+    """Workers disponibles para el pool (0 si no se puede usar un pool de procesos)."""
+    if multiprocessing.current_process().daemon:
+        # Los workers prefork de Celery son daemon y no pueden crear procesos hijos.
+        return 0
+    if max_workers is None:
+        max_workers = getattr(settings, "PDF_EXTRACTION_MAX_WORKERS", min(4, os.cpu_count() or 1))
+    return max_workers if max_workers > 1 else 0
+
 
 class TextExtractionService:
     """
@@ -30,25 +104,73 @@ class TextExtractionService:
             return ""
 
     @staticmethod
-    def extract_from_pdf(file_obj) -> str:
-        """Extracción centralizada de PDFs usando pdfplumber."""
-        texto_extraido = ""
+    def iter_pdf_pages(
+        source, parallel_min_pages: int | None = None, max_workers: int | None = None
+    ) -> Iterator[str]:
+        """
+        Genera el texto de cada página del PDF, en orden.
+
+        ``source`` puede ser una ruta, un archivo (local o de storage remoto) o bytes.
+        El documento se abre desde disco; a partir de ``parallel_min_pages`` páginas
+        (``PDF_EXTRACTION_PARALLEL_MIN_PAGES``) las páginas se reparten en un pool de
+        procesos y se emiten a medida que llegan. Si el consumidor deja de iterar, las
+        tareas pendientes se cancelan.
+        """
+        import fitz
+
+        if parallel_min_pages is None:
+            parallel_min_pages = getattr(settings, "PDF_EXTRACTION_PARALLEL_MIN_PAGES", 100)
+
+        with _pdf_path(source) as path:
+            with fitz.open(path) as pdf:
+                page_count = pdf.page_count
+                workers = _process_pool_workers(max_workers)
+                if not workers or page_count < parallel_min_pages:
+                    for page in pdf:
+                        try:
+                            yield page.get_text() or ""
+                        except Exception as e:
+                            logger.warning(f"Error extrayendo página de PDF: {e}")
+                            yield ""
+                    return
+
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            try:
+                futures = [
+                    executor.submit(
+                        _extract_page_range,
+                        path,
+                        start,
+                        min(start + PDF_PAGES_PER_TASK, page_count),
+                    )
+                    for start in range(0, page_count, PDF_PAGES_PER_TASK)
+                ]
+                for future in futures:
+                    yield from future.result()
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def extract_from_pdf(file_obj, until: Callable[[str], bool] | None = None) -> str:
+        """
+        Extracción centralizada de PDFs usando PyMuPDF.
+
+        ``until`` permite cortar la lectura en cuanto el llamador tiene lo que
+        necesita: recibe el texto de cada página leída y retorna True para parar.
+        """
+        parts: list[str] = []
         try:
-            # Aseguramos puntero al inicio
-            if hasattr(file_obj, "seek"):
-                file_obj.seek(0)
-
-            import fitz
-
-            file_content = file_obj.read()
-            with fitz.open(stream=file_content, filetype="pdf") as pdf:
-                for page in pdf:
-                    text = page.get_text()
-                    if text:
-                        texto_extraido += text + "\n"
+            for text in TextExtractionService.iter_pdf_pages(file_obj):
+                if not text:
+                    continue
+                parts.append(text + "\n")
+                if until is not None and until(text):
+                    break
         except Exception as e:
             logger.error(f"Fallo al leer PDF: {e}")
-        return texto_extraido
+        return "".join(parts)
 
     @staticmethod
     def extract_from_eml(file_obj) -> str:
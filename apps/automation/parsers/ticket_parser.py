@@ -1,10 +1,11 @@
-import hashlib
 import logging
 import re
 from typing import Any
 
 from django.core.cache import cache
 
+from apps.automation.parsers.extraction import text_fingerprint
+
 logger = logging.getLogger(__name__)
 
 # Prefijos IATA numéricos de aerolínea (los 3 primeros dígitos del boleto).
@@ -367,18 +368,25 @@ class FastDeterministicParsers:
 
 @track_parser_execution("regex", "ticket_parsing")
 def extract_data_from_text(
-    plain_text: str, html_text: str = "", pdf_path: str | None = None, bypass_cache: bool = False
+    plain_text: str,
+    html_text: str = "",
+    pdf_path: str | None = None,
+    bypass_cache: bool = False,
+    fingerprint: str | None = None,
 ) -> dict[str, Any]:
     """
     ⚡ MOTOR DETERMINÍSTICO (Fallback Regex)
     Utiliza patrones fijos para extraer datos cuando la IA no está disponible o falla.
     Este es el motor de Tier 1 (Gratis).
+
+    ``fingerprint`` es el SHA-256 de ``plain_text`` si el llamador ya lo calculó
+    (``ExtractionResult.fingerprint``); evita re-hashear el boleto completo.
     """
     if not plain_text:
         return {"error": "Texto vacío"}
 
     # 1. 🧱 CACHÉ (Evita procesar dos veces lo mismo)
-    fingerprint = hashlib.sha256(plain_text.encode("utf-8", errors="ignore")).hexdigest()
+    fingerprint = fingerprint or text_fingerprint(plain_text)
     cache_key = f"parser:regex:{fingerprint}"
 
     if not bypass_cache:
@@ -1,18 +1,134 @@
+import contextvars
+import json
 import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
 from typing import Any
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
 from .base import ProviderResult
 from .registry import provider_registry
+from .tracing import get_latency_percentile, record_hedge
 
 logger = logging.getLogger(__name__)
 
+# El p90 por proveedor se recalcula a lo sumo cada HEDGE_DELAY_TTL segundos por proceso.
+HEDGE_DELAY_TTL = 60
+_hedge_delays: dict[str, tuple[float, float | None]] = {}
+
+
+def _observed_hedge_delay(provider_name: str) -> float | None:
+    """Espera antes de duplicar la solicitud: p90 observado del proveedor (segundos)."""
+    now = time.monotonic()
+    cached = _hedge_delays.get(provider_name)
+    if cached and now - cached[0] < HEDGE_DELAY_TTL:
+        return cached[1]
+    delay = _compute_hedge_delay(provider_name)
+    _hedge_delays[provider_name] = (now, delay)
+    return delay
+
+
+def _compute_hedge_delay(provider_name: str) -> float | None:
+    percentile = getattr(settings, "AI_HEDGE_PERCENTILE", 0.9)
+    p90_ms = get_latency_percentile(
+        provider_name,
+        percentile=percentile,
+        min_samples=getattr(settings, "AI_HEDGE_MIN_SAMPLES", 20),
+    )
+    if p90_ms is None:
+        default_ms = getattr(settings, "AI_HEDGE_DEFAULT_DELAY_MS", None)
+        return default_ms / 1000 if default_ms else None
+    return max(p90_ms, getattr(settings, "AI_HEDGE_MIN_DELAY_MS", 250)) / 1000
+
+
+def _is_valid(result: ProviderResult, schema: type | None) -> bool:
+    """Resultado exitoso y, si se pidió schema, con un JSON parseable."""
+    if not result.success:
+        return False
+    if schema is None:
+        return True
+    text = (result.text or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        json.loads(text)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+class HedgeBudget:
+    """
+    Tope de solicitudes duplicadas: como máximo ``ratio`` hedges por solicitud, por
+    hora y compartido entre procesos vía cache. Evita que una degradación general
+    del primario duplique el costo de todo el tráfico.
+    """
+
+    def __init__(self, ratio: float | None = None, store=None):
+        """__init__."""
+        self.ratio = ratio
+        self.store = store or cache
+
+    def _keys(self) -> tuple[str, str]:
+        hour_key = datetime.utcnow().strftime("%Y%m%d%H")
+        return f"ai_hedge_budget:{hour_key}:requests", f"ai_hedge_budget:{hour_key}:hedges"
+
+    def _incr(self, key: str) -> int:
+        try:
+            self.store.add(key, 0, 2 * 60 * 60)
+            return self.store.incr(key)
+        except Exception:
+            logger.debug("No se pudo incrementar %s", key)
+            return 0
+
+    def register_request(self) -> None:
+        """Cuenta una solicitud en modo hedged."""
+        self._incr(self._keys()[0])
+
+    def try_acquire(self) -> bool:
+        """Reserva un hedge si el presupuesto de la hora lo permite."""
+        ratio = self.ratio
+        if ratio is None:
+            ratio = getattr(settings, "AI_HEDGE_BUDGET_RATIO", 0.1)
+        requests_key, hedges_key = self._keys()
+        requests = self.store.get(requests_key) or 0
+        hedges = self.store.get(hedges_key) or 0
+        if hedges + 1 > ratio * requests:
+            return False
+        self._incr(hedges_key)
+        return True
+
 
 class FallbackRouter:
     """
     Enruta una solicitud a través de la cadena de proveedores,
     intentando cada uno en orden hasta obtener una respuesta exitosa.
+
+    En modo hedged (``AI_HEDGED_REQUESTS`` o ``generate(hedged=True)``), si el
+    proveedor en curso no respondió dentro de su p90 observado, se lanza el siguiente
+    de la cadena en paralelo y se toma el primer resultado válido. Los hedges están
+    limitados por ``HedgeBudget`` y por ``AI_HEDGE_MAX_CONCURRENT`` proveedores en vuelo.
     """
 
+    def __init__(
+        self,
+        registry=None,
+        hedge_delay: Callable[[str], float | None] | None = None,
+        budget: HedgeBudget | None = None,
+    ):
+        """__init__."""
+        self.registry = registry or provider_registry
+        self.hedge_delay = hedge_delay or _observed_hedge_delay
+        self.budget = budget or HedgeBudget()
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
     def generate(
         self,
         prompt: str,
@@ -21,24 +137,31 @@ class FallbackRouter:
         schema: type | None = None,
         agency_id: int | None = None,
         feature: str = "unknown",
+        hedged: bool | None = None,
     ) -> ProviderResult:
         """generate."""
-        chain = provider_registry.fallback_chain(needs_structured=schema is not None)
+        chain = self.registry.fallback_chain(needs_structured=schema is not None)
 
         if not chain:
             logger.error("No hay proveedores disponibles en la cadena de fallback")
             return ProviderResult(success=False, error="No hay proveedores disponibles")
 
+        kwargs = {
+            "prompt": prompt,
+            "images": images,
+            "schema": schema,
+            "agency_id": agency_id,
+            "feature": feature,
+        }
+        if hedged is None:
+            hedged = getattr(settings, "AI_HEDGED_REQUESTS", False)
+        if hedged and len(chain) > 1:
+            return self._generate_hedged(chain, kwargs, schema)
+
         last_error: str | None = None
 
         for provider in chain:
-            result = provider.generate(
-                prompt=prompt,
-                images=images,
-                schema=schema,
-                agency_id=agency_id,
-                feature=feature,
-            )
+            result = provider.generate(**kwargs)
             if result.success:
                 if result.provider != chain[0].provider_name:
                     logger.info(
@@ -50,25 +173,133 @@ class FallbackRouter:
                 return result
 
             last_error = result.error
-            logger.warning(
-                "Proveedor %s falló para feature=%s: %s",
-                provider.provider_name,
-                feature,
-                result.error[:100] if result.error else "sin error",
-            )
+            self._on_failure(provider, result, chain, feature)
+
+        return ProviderResult(
+            success=False, error=f"Todos los proveedores fallaron. Último: {last_error}"
+        )
+
+    def _on_failure(self, provider, result, chain, feature) -> None:
+        logger.warning(
+            "Proveedor %s falló para feature=%s: %s",
+            provider.provider_name,
+            feature,
+            result.error[:100] if result.error else "sin error",
+        )
+
+        # Abrir circuit breaker si no es el último proveedor
+        if provider != chain[-1]:
+            self.registry.open_circuit(provider.provider_name)
 
-            # Abrir circuit breaker si no es el último proveedor
-            if provider != chain[-1]:
-                provider_registry.open_circuit(provider.provider_name)
+    def _generate_hedged(self, chain, kwargs, schema) -> ProviderResult:
+        """
+        Cadena con hedging: el siguiente proveedor arranca cuando el actual falla o
+        cuando supera su p90 observado (si hay presupuesto). Gana el primer resultado
+        válido; las llamadas perdedoras terminan en segundo plano y se descartan.
+        """
+        feature = kwargs["feature"]
+        max_concurrent = getattr(settings, "AI_HEDGE_MAX_CONCURRENT", 2)
+        self.budget.register_request()
 
+        in_flight: dict = {}
+        hedged_names: set[str] = set()
+        next_pos = 0
+        last_error: str | None = None
+        last_launch = 0.0
+
+        def launch(hedge: bool) -> None:
+            nonlocal next_pos, last_launch
+            provider = chain[next_pos]
+            next_pos += 1
+            last_launch = time.monotonic()
+            if hedge:
+                hedged_names.add(provider.provider_name)
+                logger.info(
+                    "Hedge: %s sin respuesta tras su p90, lanzando %s (feature=%s)",
+                    chain[next_pos - 2].provider_name,
+                    provider.provider_name,
+                    feature,
+                )
+            in_flight[self._submit(provider, kwargs)] = provider
+
+        launch(hedge=False)
+        while in_flight:
+            timeout = None
+            can_hedge = next_pos < len(chain) and len(in_flight) < max_concurrent
+            if can_hedge:
+                delay = self.hedge_delay(chain[next_pos - 1].provider_name)
+                if delay is not None:
+                    timeout = max(0.0, last_launch + delay - time.monotonic())
+
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if self.budget.try_acquire():
+                    launch(hedge=True)
+                else:
+                    # Sin presupuesto: esperar al proveedor en curso (modo secuencial).
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = ProviderResult(
+                        success=False, error=str(e)[:500], provider=provider.provider_name
+                    )
+                if _is_valid(result, schema):
+                    if hedged_names:
+                        record_hedge(
+                            result.provider or provider.provider_name,
+                            won=provider.provider_name in hedged_names,
+                        )
+                    if provider is not chain[0]:
+                        logger.info(
+                            "Fallback activado: %s -> %s (feature=%s)",
+                            chain[0].provider_name,
+                            result.provider,
+                            feature,
+                        )
+                    return result
+                if result.success:
+                    result = ProviderResult(
+                        success=False,
+                        error="Respuesta estructurada inválida (JSON no parseable)",
+                        provider=provider.provider_name,
+                    )
+                last_error = result.error
+                self._on_failure(provider, result, chain, feature)
+            if not in_flight and next_pos < len(chain):
+                launch(hedge=False)
+
+        if hedged_names:
+            record_hedge(chain[0].provider_name, won=False)
         return ProviderResult(
             success=False, error=f"Todos los proveedores fallaron. Último: {last_error}"
         )
 
+    def _submit(self, provider, kwargs):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "AI_HEDGE_MAX_WORKERS", 8),
+                    thread_name_prefix="ai-hedge",
+                )
+        # Copia del contexto por llamada: el agency_context (ContextVar) no se hereda.
+        ctx = contextvars.copy_context()
+        return self._executor.submit(ctx.run, self._call_provider, provider, kwargs)
+
+    @staticmethod
+    def _call_provider(provider, kwargs) -> ProviderResult:
+        try:
+            return provider.generate(**kwargs)
+        finally:
+            # Los proveedores consultan la API key de la agencia en BD.
+            connections.close_all()
+
     def test_all(self) -> list[dict]:
         """Prueba la conexión de todos los proveedores registrados."""
         results = []
-        for provider in provider_registry.all():
+        for provider in self.registry.all():
             ok = provider.test_connection()
             results.append(
                 {
@@ -79,7 +310,7 @@ class FallbackRouter:
                 }
             )
             if ok:
-                provider_registry.close_circuit(provider.provider_name)
+                self.registry.close_circuit(provider.provider_name)
             else:
                 logger.warning("Health check falló para %s", provider.provider_name)
         return results
@@ -0,0 +1,84 @@
+"""
+Histograma de latencias de buckets fijos (estilo HDR) para los percentiles de la cadena
+de proveedores IA.
+
+Los valores menores a ``SUB_BUCKETS`` ms tienen bucket propio (exactos); por encima, cada
+potencia de dos se divide en ``SUB_BUCKETS // 2`` sub-buckets, con un error relativo
+máximo de ~0.8%. El índice de bucket se calcula con aritmética entera y los histogramas
+se fusionan sumando contadores, por lo que combinar horas, proveedores y workers es
+barato y conmutativo (en Redis: un HINCRBY por llamada).
+"""
+
+from collections import Counter
+
+SUB_BUCKETS = 128
+_HALF = SUB_BUCKETS // 2
+_SHIFT = SUB_BUCKETS.bit_length() - 1
+
+
+def bucket_for(duration_ms: int | float) -> int:
+    """Índice del bucket que contiene ``duration_ms`` (valores negativos cuentan como 0)."""
+    value = max(0, int(duration_ms))
+    if value < SUB_BUCKETS:
+        return value
+    exponent = value.bit_length() - _SHIFT
+    return SUB_BUCKETS + (exponent - 1) * _HALF + (value >> exponent) - _HALF
+
+
+def bucket_value(index: int) -> float:
+    """Valor representativo (punto medio) del bucket ``index``."""
+    if index < SUB_BUCKETS:
+        return float(index)
+    exponent, sub = divmod(index - SUB_BUCKETS, _HALF)
+    exponent += 1
+    lower = (sub + _HALF) << exponent
+    return lower + ((1 << exponent) - 1) / 2
+
+
+class LatencyHistogram:
+    """Contadores por bucket; se construye desde el hash de Redis o un dict del cache."""
+
+    __slots__ = ("counts",)
+
+    def __init__(self, counts=None):
+        """__init__."""
+        self.counts: Counter = Counter()
+        if counts:
+            self.counts.update({int(k): int(v) for k, v in counts.items()})
+
+    def add(self, duration_ms: int | float, count: int = 1) -> None:
+        """add."""
+        self.counts[bucket_for(duration_ms)] += count
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Suma los contadores de ``other`` en este histograma y lo retorna."""
+        self.counts.update(other.counts)
+        return self
+
+    @property
+    def total(self) -> int:
+        """total."""
+        return sum(self.counts.values())
+
+    def percentile(self, percentile: float) -> float | None:
+        """
+        Percentil con la misma convención de rango que la lista ordenada anterior
+        (``values[int(n * p)]``); ``None`` si el histograma está vacío.
+        """
+        total = self.total
+        if not total:
+            return None
+        rank = min(total - 1, int(total * percentile))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                return bucket_value(index)
+        return bucket_value(max(self.counts))
+
+    def percentiles(self) -> dict[str, float]:
+        """p50, p95 y p99 (0 si no hay muestras)."""
+        return {
+            name: self.percentile(p) or 0.0
+            for name, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+        }
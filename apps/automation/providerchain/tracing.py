@@ -4,11 +4,13 @@ from datetime import datetime, timedelta
 
 from django.core.cache import cache
 
+from .latency_histogram import LatencyHistogram, bucket_for
+
 logger = logging.getLogger(__name__)
 
 METRICS_TTL = 60 * 60 * 24  # 24 horas
-LATENCY_TTL = 60 * 60 * 2  # 2 horas (solo retenemos latencias recientes)
-LATENCY_SAMPLE_SIZE = 1000  # máx entradas de latencia por hora
+LATENCY_TTL = METRICS_TTL  # histogramas de buckets fijos: tamaño acotado por hora
+PROVIDERS = ("gemini", "openai", "deepseek")
 
 # Precios por 1K tokens (USD) — referencia pública
 PROVIDER_PRICING: dict[str, dict[str, float]] = {
@@ -99,74 +101,145 @@ def record_call_simple(
     )
 
 
+def _get_redis():
+    """Cliente Redis crudo del cache (django-redis); ``None`` con otros backends."""
+    try:
+        return cache.client.get_client()
+    except Exception:
+        return None
+
+
+def _latency_key(hour_key: str, provider: str) -> str:
+    """_latency_key."""
+    return f"ai_metrics:{hour_key}:latency_hist:{provider}"
+
+
 def _record_latency_sample(hour_key: str, provider: str, duration_ms: int) -> None:
-    """Almacena muestra de latencia para cálculos de percentiles."""
-    key = f"ai_metrics:{hour_key}:latency:{provider}"
+    """Suma la latencia al histograma de la hora (HINCRBY atómico sobre el bucket)."""
+    key = _latency_key(hour_key, provider)
+    bucket = bucket_for(duration_ms)
     try:
-        samples = cache.get(key) or []
-        if isinstance(samples, list) and len(samples) < LATENCY_SAMPLE_SIZE:
-            samples.append(duration_ms)
-            cache.set(key, samples, LATENCY_TTL)
+        redis = _get_redis()
+        if redis:
+            pipe = redis.pipeline(transaction=False)
+            pipe.hincrby(key, bucket, 1)
+            pipe.expire(key, LATENCY_TTL)
+            pipe.execute()
+        else:
+            counts = cache.get(key) or {}
+            counts[bucket] = counts.get(bucket, 0) + 1
+            cache.set(key, counts, LATENCY_TTL)
     except Exception:
         logger.exception("Error almacenando muestra de latencia para %s", provider)
 
 
-def _get_latency_samples(hour_key: str, provider: str) -> list[int]:
-    """_get_latency_samples."""
+def _get_latency_histograms(keys: list[str]) -> dict[str, LatencyHistogram]:
+    """Lee varios histogramas en un solo round-trip (pipeline de HGETALL o get_many)."""
     try:
-        return cache.get(f"ai_metrics:{hour_key}:latency:{provider}") or []
+        redis = _get_redis()
+        if redis:
+            pipe = redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.hgetall(key)
+            rows = pipe.execute()
+        else:
+            found = cache.get_many(keys)
+            rows = [found.get(key) for key in keys]
     except Exception:
-        logger.debug(
-            "Cache get falló para latency samples %s", f"ai_metrics:{hour_key}:latency:{provider}"
-        )
-        return []
-
-
-def _get_percentiles(values: list[int]) -> dict[str, float]:
-    """_get_percentiles."""
-    if not values:
-        return {"p50": 0, "p95": 0, "p99": 0}
-    values.sort()
-    n = len(values)
-    return {
-        "p50": float(values[int(n * 0.5)]),
-        "p95": float(values[int(n * 0.95)]),
-        "p99": float(values[int(n * 0.99)]),
-    }
+        logger.debug("Cache get falló para histogramas de latencia %s", keys[:1])
+        return {key: LatencyHistogram() for key in keys}
+    return {key: LatencyHistogram(row) for key, row in zip(keys, rows, strict=True)}
 
 
-def get_hourly_metrics(hours: int = 24) -> dict:
-    """Retorna métricas agregadas de las últimas N horas con costos y percentiles."""
+def _hour_keys(hours: int) -> list[str]:
+    """_hour_keys."""
     now = datetime.utcnow()
-    totals = defaultdict(float)
-    error_types: dict[str, int] = defaultdict(int)
-    all_latencies: dict[str, list[int]] = defaultdict(list)
+    return [(now - timedelta(hours=i)).strftime("%Y%m%d%H") for i in range(hours)]
+
+
+def get_latency_percentile(
+    provider: str, percentile: float = 0.9, hours: int = 2, min_samples: int = 20
+) -> float | None:
+    """
+    Percentil de latencia (ms) de un proveedor en las últimas ``hours`` horas.
 
-    for i in range(hours):
-        hour_key = (now - timedelta(hours=i)).strftime("%Y%m%d%H")
+    Retorna ``None`` si hay menos de ``min_samples`` muestras (sin historia suficiente).
+    """
+    keys = [_latency_key(hour_key, provider) for hour_key in _hour_keys(hours)]
+    merged = LatencyHistogram()
+    for histogram in _get_latency_histograms(keys).values():
+        merged.merge(histogram)
+    if merged.total < max(1, min_samples):
+        return None
+    return merged.percentile(percentile)
+
+
+def record_hedge(provider: str, won: bool) -> None:
+    """Registra una solicitud duplicada (hedge) del FallbackRouter y si ganó."""
+    hour_key = datetime.utcnow().strftime("%Y%m%d%H")
+    keys = [f"ai_metrics:{hour_key}:hedges", f"ai_metrics:{hour_key}:hedges:{provider}"]
+    if won:
+        keys.append(f"ai_metrics:{hour_key}:hedge_wins")
+    for key in keys:
         try:
-            totals["calls"] += cache.get(f"ai_metrics:{hour_key}:count") or 0
-            totals["errors"] += cache.get(f"ai_metrics:{hour_key}:errors") or 0
-            totals["tokens_in"] += cache.get(f"ai_metrics:{hour_key}:tokens_in") or 0
-            totals["tokens_out"] += cache.get(f"ai_metrics:{hour_key}:tokens_out") or 0
-            totals["duration_ms"] += cache.get(f"ai_metrics:{hour_key}:duration_ms") or 0
-            totals["cost_usd"] += (cache.get(f"ai_metrics:{hour_key}:cost") or 0) / 100000
-
-            for etype in ("timeout", "rate_limit", "auth", "other"):
-                val = cache.get(f"ai_metrics:{hour_key}:error_type:{etype}") or 0
-                error_types[etype] += val
-
-            for provider in ("gemini", "openai", "deepseek"):
-                latencies = _get_latency_samples(hour_key, provider)
-                all_latencies[provider].extend(latencies)
+            cache.set(key, (cache.get(key) or 0) + 1, METRICS_TTL)
         except Exception:
-            logger.exception("Error obteniendo métricas para hora %s", hour_key)
-            continue
+            logger.debug("Cache increment falló para %s", key)
+
+
+ERROR_TYPES = ("timeout", "rate_limit", "auth", "other")
+COUNTER_NAMES = (
+    "count",
+    "errors",
+    "tokens_in",
+    "tokens_out",
+    "duration_ms",
+    "cost",
+    "hedges",
+    "hedge_wins",
+    *(f"error_type:{etype}" for etype in ERROR_TYPES),
+)
+
+
+def get_hourly_metrics(hours: int = 24) -> dict:
+    """
+    Retorna métricas agregadas de las últimas N horas con costos y percentiles.
 
+    Los contadores se leen con un solo ``get_many`` (MGET en Redis) y los histogramas de
+    latencia con un pipeline; los percentiles salen de fusionar los histogramas.
+    """
+    hour_keys = _hour_keys(hours)
+    totals = defaultdict(float)
+    error_types = dict.fromkeys(ERROR_TYPES, 0)
+
+    keys = [f"ai_metrics:{h}:{name}" for h in hour_keys for name in COUNTER_NAMES]
+    try:
+        values = cache.get_many(keys)
+    except Exception:
+        logger.exception("Error obteniendo métricas de las últimas %s horas", hours)
+        values = {}
+    for key, value in values.items():
+        name = key.split(":", 2)[2]
+        if name.startswith("error_type:"):
+            error_types[name.removeprefix("error_type:")] += value or 0
+        else:
+            totals[name] += value or 0
+    totals["calls"] = totals.pop("count", 0)
+    totals["cost_usd"] = totals.pop("cost", 0) / 100000
+
+    latency_keys = {
+        provider: [_latency_key(h, provider) for h in hour_keys] for provider in PROVIDERS
+    }
+    histograms = _get_latency_histograms([k for ks in latency_keys.values() for k in ks])
     percentiles = {}
-    for provider, latencies in all_latencies.items():
-        percentiles[provider] = _get_percentiles(latencies)
-    percentiles["all"] = _get_percentiles([v for vals in all_latencies.values() for v in vals])
+    merged_all = LatencyHistogram()
+    for provider, provider_keys in latency_keys.items():
+        merged = LatencyHistogram()
+        for key in provider_keys:
+            merged.merge(histograms[key])
+        merged_all.merge(merged)
+        percentiles[provider] = merged.percentiles()
+    percentiles["all"] = merged_all.percentiles()
 
     total_calls = totals.get("calls", 0) or 1
 
@@ -179,6 +252,8 @@ def get_hourly_metrics(hours: int = 24) -> dict:
         "total_tokens_out": int(totals.get("tokens_out", 0)),
         "avg_duration_ms": round(totals["duration_ms"] / total_calls, 1),
         "estimated_cost_usd": round(totals.get("cost_usd", 0), 6),
+        "hedges": int(totals.get("hedges", 0)),
+        "hedge_wins": int(totals.get("hedge_wins", 0)),
         "error_types": dict(error_types),
         "latency_percentiles": percentiles,
     }
@@ -0,0 +1,266 @@
+"""
+Ingesta de boletos por lotes.
+
+El pipeline individual (``TicketParserService._run_pipeline``) toma un lock con un
+``UPDATE`` por boleto y escribe ``log_parseo`` varias veces durante el parseo. Para
+un ZIP de cientos de boletos o un barrido IMAP con backlog eso son miles de round
+trips. ``BatchTicketIngestionService``:
+
+1. Reclama N boletos pendientes con un solo ``UPDATE ... RETURNING``
+   (``FOR UPDATE SKIP LOCKED``: varios workers pueden drenar la cola en paralelo).
+2. Ejecuta la extracción + motor de parseo en un pool de hilos, sin escribir en BD.
+3. Persiste resultados y logs con un único ``bulk_update``.
+4. Despacha la fase de venta/PDF por boleto (Celery o en línea), que reutiliza los
+   ``datos_parseados`` ya guardados en lugar de volver a parsear.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from apps.automation.services.ticket_parser_service import TicketParserService, _safe_concat_log
+from apps.bookings.models import BoletoImportado
+
+logger = logging.getLogger(__name__)
+
+CLAIMABLE_STATES = (
+    BoletoImportado.EstadoParseo.PENDIENTE,
+    BoletoImportado.EstadoParseo.COLA_LLENA,
+)
+CLAIM_LOG = "Reclamado para parseo por lote."
+
+
+@dataclass
+class BatchIngestionReport:
+    """Resultado y tiempos de un lote."""
+
+    claimed: int = 0
+    parsed: int = 0
+    failed: int = 0
+    dispatched: int = 0
+    claim_ms: float = 0.0
+    parse_ms: float = 0.0
+    persist_ms: float = 0.0
+    elapsed_s: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Boletos por segundo del lote (reclamo + parseo + persistencia)."""
+        return self.claimed / self.elapsed_s if self.elapsed_s else 0.0
+
+
+class BatchTicketIngestionService:
+    """Ingesta por lotes de boletos importados (ver docstring del módulo)."""
+
+    @classmethod
+    def claim(cls, agencia, limit: int | None = None, boleto_ids=None) -> list[int]:
+        """
+        Marca como ``EN_PROCESO`` hasta ``limit`` boletos pendientes de la agencia y
+        retorna sus IDs. Los boletos bloqueados por otro worker se saltan.
+        """
+        limit = limit or getattr(settings, "TICKET_BATCH_SIZE", 50)
+        if connection.vendor == "postgresql":
+            return cls._claim_returning(agencia, limit, boleto_ids)
+
+        with transaction.atomic():
+            ids = list(
+                cls._claimable(agencia, boleto_ids)
+                .select_for_update(skip_locked=True)
+                .values_list("pk", flat=True)[:limit]
+            )
+            BoletoImportado.all_objects.filter(pk__in=ids).update(
+                estado_parseo=BoletoImportado.EstadoParseo.EN_PROCESO,
+                log_parseo=CLAIM_LOG,
+                updated_at=timezone.now(),
+            )
+        return ids
+
+    @classmethod
+    def _claimable(cls, agencia, boleto_ids=None):
+        qs = (
+            BoletoImportado.all_objects.filter(
+                agencia=agencia, estado_parseo__in=CLAIMABLE_STATES, is_deleted=False
+            )
+            .exclude(archivo_boleto__isnull=True)
+            .exclude(archivo_boleto="")
+            .order_by("fecha_subida")
+        )
+        if boleto_ids is not None:
+            qs = qs.filter(pk__in=list(boleto_ids))
+        return qs
+
+    @classmethod
+    def _claim_returning(cls, agencia, limit, boleto_ids=None) -> list[int]:
+        meta = BoletoImportado._meta
+        qn = connection.ops.quote_name
+
+        def col(name):
+            return qn(meta.get_field(name).column)
+
+        table, pk = qn(meta.db_table), qn(meta.pk.column)
+        where = [
+            f"{col('agencia')} = %s",
+            f"{col('estado_parseo')} IN %s",
+            f"{col('is_deleted')} = false",
+            f"{col('archivo_boleto')} IS NOT NULL",
+            f"{col('archivo_boleto')} <> ''",
+        ]
+        params = [agencia.pk, tuple(CLAIMABLE_STATES)]
+        if boleto_ids is not None:
+            where.append(f"{pk} = ANY(%s)")
+            params.append(list(boleto_ids))
+        # Solo identificadores del modelo (quote_name) en los f-strings; valores por parámetros.
+        subquery = f"SELECT {pk} FROM {table} WHERE {' AND '.join(where)}"  # noqa: S608
+        subquery += f" ORDER BY {col('fecha_subida')} LIMIT %s FOR UPDATE SKIP LOCKED"
+        assignments = (
+            f"{col('estado_parseo')} = %s, {col('log_parseo')} = %s, {col('updated_at')} = %s"
+        )
+        sql = f"UPDATE {table} SET {assignments} WHERE {pk} IN ({subquery}) RETURNING {pk}"  # noqa: S608
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                sql,
+                [BoletoImportado.EstadoParseo.EN_PROCESO, CLAIM_LOG, timezone.now()]
+                + params
+                + [limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    @classmethod
+    def enqueue_batches(cls, agencia, batch_size: int | None = None) -> int:
+        """
+        Fan-out del backlog pendiente de la agencia: una tarea de Celery por lote.
+
+        Cada tarea reclama su propio lote con ``SKIP LOCKED``, así que no se pisan
+        aunque corran en paralelo. Retorna el número de tareas encoladas.
+        """
+        from apps.automation.tasks import procesar_lote_boletos_task
+        from apps.common.utils.celery_utils import safe_delay
+
+        batch_size = batch_size or getattr(settings, "TICKET_BATCH_SIZE", 50)
+        pending = cls._claimable(agencia).count()
+        batches = -(-pending // batch_size)
+        for _ in range(batches):
+            safe_delay(procesar_lote_boletos_task, limit=batch_size, agencia_id=agencia.pk)
+        return batches
+
+    @classmethod
+    def ingest(
+        cls,
+        agencia,
+        limit: int | None = None,
+        boleto_ids=None,
+        max_workers: int | None = None,
+        dispatch: bool = True,
+    ) -> BatchIngestionReport:
+        """
+        Reclama, parsea y persiste un lote de boletos de la agencia.
+
+        Con ``dispatch`` la fase de venta/PDF se encola por boleto en Celery (o se
+        ejecuta en línea si Celery no está disponible).
+        """
+        report = BatchIngestionReport()
+        start = time.perf_counter()
+
+        ids = cls.claim(agencia, limit=limit, boleto_ids=boleto_ids)
+        report.claimed = len(ids)
+        report.claim_ms = (time.perf_counter() - start) * 1000
+        if not ids:
+            return report
+
+        boletos = list(BoletoImportado.all_objects.select_related("agencia").filter(pk__in=ids))
+        for boleto in boletos:
+            boleto.log_parseo = CLAIM_LOG
+
+        t0 = time.perf_counter()
+        outcomes = cls._parse_all(boletos, max_workers)
+        report.parse_ms = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        now = timezone.now()
+        parsed_ids = []
+        for boleto, (datos, error) in zip(boletos, outcomes, strict=True):
+            boleto.updated_at = now
+            if error:
+                boleto.estado_parseo = BoletoImportado.EstadoParseo.REVISION_REQUERIDA
+                boleto.log_parseo = _safe_concat_log(boleto.log_parseo, error)
+                report.failed += 1
+            else:
+                boleto.datos_parseados = datos
+                boleto.log_parseo = _safe_concat_log(
+                    boleto.log_parseo, "Parseo por lote completado."
+                )
+                parsed_ids.append(boleto.pk)
+                report.parsed += 1
+        BoletoImportado.all_objects.bulk_update(
+            boletos, ["estado_parseo", "log_parseo", "datos_parseados", "updated_at"]
+        )
+        report.persist_ms = (time.perf_counter() - t0) * 1000
+        report.elapsed_s = time.perf_counter() - start
+
+        if dispatch and parsed_ids:
+            report.dispatched = cls._dispatch(agencia, parsed_ids)
+
+        logger.info(
+            f"📦 Lote de boletos ({agencia.pk}): {report.claimed} reclamados, {report.parsed} "
+            f"parseados, {report.failed} a revisión en {report.elapsed_s:.2f}s "
+            f"({report.throughput:.1f} boletos/s; reclamo {report.claim_ms:.0f} ms, "
+            f"parseo {report.parse_ms:.0f} ms, persistencia {report.persist_ms:.0f} ms)"
+        )
+        return report
+
+    @classmethod
+    def _parse_all(cls, boletos, max_workers=None) -> list[tuple]:
+        service = TicketParserService()
+        if max_workers is None:
+            max_workers = getattr(settings, "TICKET_BATCH_MAX_WORKERS", 4)
+        if max_workers <= 1 or len(boletos) <= 1:
+            return [cls._parse_one(service, boleto) for boleto in boletos]
+
+        def worker(boleto):
+            try:
+                return cls._parse_one(service, boleto)
+            finally:
+                # Cada hilo abre su propia conexión (consultas de catálogo de los parsers).
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(worker, boletos))
+
+    @classmethod
+    def _parse_one(cls, service, boleto) -> tuple:
+        from core.api import agency_context
+
+        try:
+            # El contexto de agencia es un ContextVar: no se hereda en los hilos del pool.
+            with agency_context(boleto.agencia):
+                return service._parse_boleto(boleto, persist_log=False)
+        except Exception as e:
+            logger.error(f"❌ Error parseando boleto {boleto.pk} en lote: {e}", exc_info=True)
+            return None, f"Error en parseo por lote: {e}"
+
+    @classmethod
+    def _dispatch(cls, agencia, boleto_ids) -> int:
+        """Fase de venta/PDF por boleto; reutiliza los datos parseados del lote."""
+        from apps.common.utils.celery_utils import _is_celery_available, safe_delay
+        from core.api import agency_context
+
+        if _is_celery_available():
+            from apps.bookings.tasks import parsear_boleto_individual
+
+            # safe_delay encola en on_commit: las tareas ven el bulk_update del lote.
+            for pk in boleto_ids:
+                safe_delay(
+                    parsear_boleto_individual, pk, ignore_manual=False, agencia_id=agencia.pk
+                )
+            return len(boleto_ids)
+
+        service = TicketParserService()
+        with agency_context(agencia):
+            for pk in boleto_ids:
+                service.procesar_boleto(pk, ignore_manual=False)
+        return len(boleto_ids)
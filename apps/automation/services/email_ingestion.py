@@ -1,10 +1,10 @@
-import email
-import imaplib
 import logging
 from email.header import decode_header
 
 from django.conf import settings
 
+from apps.communications.services.imap_ingestion import ImapIngestor
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,115 +20,77 @@ class EmailIngestionService:
         self.user = user or getattr(settings, "IMAP_USER", "")
         self.password = password or getattr(settings, "IMAP_PASSWORD", "")
         self.port = port
-        self.imap = None
-
-    def _connect(self):
-        """Establece conexión con el servidor IMAP."""
-        try:
-            if not self.host or not self.user or not self.password:
-                logger.error("Configuración IMAP incompleta.")
-                return False
-
-            self.imap = imaplib.IMAP4_SSL(self.host, self.port)
-            self.imap.login(self.user, self.password)
-            return True
-        except Exception as e:
-            logger.error(f"Error de conexión IMAP a {self.host}: {e}")
-            return False
 
     def fetch_unread_emails(self):
         """
         Busca correos no leídos, extrae contenido y los marca como leídos.
         Retorna una lista de diccionarios estructurados.
+
+        Usa una sesión IMAP persistente y el checkpoint de UIDs del buzón (``ImapIngestor``):
+        de cada mensaje solo se descargan los cuerpos de texto y los adjuntos PDF/EML, y los
+        mensajes sin esas partes no se descargan ni se marcan.
         """
-        if not self._connect():
+        if not self.host or not self.user or not self.password:
+            logger.error("Configuración IMAP incompleta.")
             return []
 
         processed_emails = []
-        try:
-            # Seleccionar bandeja de entrada
-            self.imap.select("INBOX")
 
-            # Buscar correos no leídos (UNSEEN)
-            status, messages = self.imap.search(None, "UNSEEN")
+        def procesar(mensaje, sesion):
+            msg = mensaje.mensaje
+
+            # Extraer y decodificar Asunto
+            subject, encoding = decode_header(msg.get("Subject", "Sin Asunto"))[0]
+            if isinstance(subject, bytes):
+                subject = subject.decode(encoding if encoding else "utf-8", errors="replace")
+
+            # Remitente
+            from_ = msg.get("From")
+
+            # Extraer Cuerpo (Priorizar texto plano, fallback a HTML)
+            body = self._extract_body(msg)
+
+            # Extraer Adjuntos
+            attachments = self._extract_attachments(msg)
+
+            processed_emails.append(
+                {
+                    "uid": str(mensaje.uid),
+                    "subject": subject,
+                    "from": from_,
+                    "body": body,
+                    "date": msg.get("Date"),
+                    "attachments": attachments,
+                    "is_invoice": self._is_invoice_email(subject, attachments),
+                }
+            )
 
-            if status != "OK":
-                logger.warning(f"No se pudieron buscar correos UNSEEN para {self.user}")
-                return []
+            # Auto-indexar en la Base de Conocimiento RAG (Correos informativos y circulares)
+            try:
+                from apps.automation.services.rag_service import RAGKnowledgeService
 
-            email_ids = messages[0].split()
-            logger.info(
-                f"📬 [IMAP] Se encontraron {len(email_ids)} correos no leídos en {self.user}"
-            )
+                RAGKnowledgeService.index_email_content(
+                    subject=subject,
+                    body=body,
+                    source_email=from_,
+                    agencia=getattr(self, "agency", None),
+                )
+            except Exception as e_rag:
+                logger.warning(f"Error indexando correo en RAG: {e_rag}")
 
-            for e_id in email_ids:
-                # Fetch del contenido del correo
-                status, msg_data = self.imap.fetch(e_id, "(RFC822)")
-                if status != "OK":
-                    logger.error(f"Error al obtener correo ID {e_id}")
-                    continue
-
-                for response_part in msg_data:
-                    if isinstance(response_part, tuple):
-                        # Parsear bytes a objeto mensaje
-                        msg = email.message_from_bytes(response_part[1])
-
-                        # Extraer y decodificar Asunto
-                        subject, encoding = decode_header(msg.get("Subject", "Sin Asunto"))[0]
-                        if isinstance(subject, bytes):
-                            subject = subject.decode(
-                                encoding if encoding else "utf-8", errors="replace"
-                            )
-
-                        # Remitente
-                        from_ = msg.get("From")
-
-                        # Extraer Cuerpo (Priorizar texto plano, fallback a HTML)
-                        body = self._extract_body(msg)
-
-                        # Extraer Adjuntos
-                        attachments = self._extract_attachments(msg)
-
-                        processed_emails.append(
-                            {
-                                "uid": e_id.decode(),
-                                "subject": subject,
-                                "from": from_,
-                                "body": body,
-                                "date": msg.get("Date"),
-                                "attachments": attachments,
-                                "is_invoice": self._is_invoice_email(subject, attachments),
-                            }
-                        )
-
-                        # Auto-indexar en la Base de Conocimiento RAG (Correos informativos y circulares)
-                        try:
-                            from apps.automation.services.rag_service import RAGKnowledgeService
-
-                            RAGKnowledgeService.index_email_content(
-                                subject=subject,
-                                body=body,
-                                source_email=from_,
-                                agencia=getattr(self, "agency", None),
-                            )
-                        except Exception as e_rag:
-                            logger.warning(f"Error indexando correo en RAG: {e_rag}")
-
-                        # Marcar como leído
-                        self.imap.store(e_id, "+FLAGS", "\\Seen")
-
-            return processed_emails
+            # Marcar como leído
+            sesion.store(mensaje.uid, "+FLAGS", "\\Seen")
+            return True
 
+        try:
+            stats = ImapIngestor(self.host, self.port, self.user, self.password).ciclo(procesar)
+            logger.info(
+                f"📬 [IMAP] {stats.mensajes} correos no leídos en {self.user} ({stats.resumen()})"
+            )
         except Exception as e:
             logger.error(f"Error crítico en fetch_unread_emails: {e}")
-            return []
-        finally:
-            if self.imap:
-                try:
-                    self.imap.close()
-                    self.imap.logout()
-                except Exception:
-                    logger.debug("IMAP cleanup error (non-critical)", exc_info=True)
+        # Los ya marcados como leídos se retornan aunque el ciclo se haya interrumpido.
+        return processed_emails
 
     def _extract_attachments(self, msg):
         """Extrae los adjuntos del correo."""
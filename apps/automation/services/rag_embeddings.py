@@ -0,0 +1,327 @@
+"""
+Pipeline de embeddings por lotes para la indexación RAG.
+
+``EmbeddingPipeline.embed`` recibe todos los fragmentos de un documento y:
+
+1. Resuelve primero los que ya están en cache, por hash de contenido
+   (LRU local del proceso → cache Django/Redis). Re-indexar un manual sin
+   cambios no hace ninguna llamada de red.
+2. Agrupa los faltantes en lotes de ``RAG_EMBEDDING_BATCH_SIZE`` y los envía al
+   proveedor con un pool acotado de ``RAG_EMBEDDING_MAX_WORKERS`` hilos.
+3. Los lotes que fallan caen al vector hash determinístico; esos vectores NO se
+   cachean, para que la próxima indexación obtenga el embedding real.
+
+``FakeEmbeddingProvider`` permite medir el throughput sin red
+(``manage.py benchmark_rag_embeddings``).
+
+``hashing_embeddings`` es el embedder de respaldo (feature hashing) usado
+cuando Gemini no responde. Durante una caída del proveedor pasa a ser el
+camino caliente de toda la indexación, por eso trabaja por lotes con NumPy.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-004"
+MAX_CHARS_PER_CHUNK = 2048  # Límite seguro de caracteres por chunk
+CACHE_KEY = "rag:embedding:{model}:{digest}"
+CACHE_TIMEOUT = 60 * 60 * 24 * 30  # 30 días: el embedding de un texto no cambia
+DEFAULT_BATCH_SIZE = 100  # Máximo de `contents` por llamada embed_content de Gemini
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_LOCAL_CACHE_SIZE = 4096
+FALLBACK_DIM = 768
+WORD_RE = re.compile(r"\w+")
+BUCKET_TABLE_MAX_WORDS = 500_000
+
+
+def content_digest(text: str, model: str = EMBEDDING_MODEL) -> str:
+    """Hash de contenido usado como clave de cache del embedding."""
+    payload = f"{model}\x00{text[:MAX_CHARS_PER_CHUNK]}".encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _word_bucket(word: str, dim: int) -> int:
+    """
+    Bucket del feature hashing para una palabra.
+
+    Conserva el mapeo ``sha256(word) % dim`` de los vectores ya guardados en
+    ``KnowledgeChunk.embedding_vector``: un hash distinto reasignaría los
+    buckets y dejaría esos vectores incomparables con las consultas nuevas.
+    El costo del hash se amortiza con ``_bucket_table``, ya que el vocabulario
+    de los manuales se repite muchísimo.
+    """
+    return int.from_bytes(hashlib.sha256(word.encode("utf-8")).digest(), "big") % dim
+
+
+_bucket_tables: dict[int, dict[str, int]] = {}
+
+
+def _bucket_table(dim: int) -> dict[str, int]:
+    """Memo palabra → bucket por dimensión (se reinicia al superar el tope)."""
+    table = _bucket_tables.setdefault(dim, {})
+    if len(table) > BUCKET_TABLE_MAX_WORDS:
+        table.clear()
+    return table
+
+
+def hashing_embeddings(texts: list[str], dim: int = FALLBACK_DIM) -> np.ndarray:
+    """
+    Embeddings determinísticos por feature hashing, normalizados L2.
+
+    Retorna una matriz ``float32`` de ``(len(texts), dim)``; las filas de textos
+    sin palabras quedan en cero.
+    """
+    table = _bucket_table(dim)
+    lookup = table.__getitem__
+    buckets: list[int] = []
+    lengths = np.zeros(len(texts), dtype=np.int64)
+    for row, text in enumerate(texts):
+        words = WORD_RE.findall(text.lower()) if text else []
+        try:
+            indexes = list(map(lookup, words))
+        except KeyError:
+            for word in set(words).difference(table):
+                table[word] = _word_bucket(word, dim)
+            indexes = list(map(lookup, words))
+        buckets.extend(indexes)
+        lengths[row] = len(indexes)
+
+    flat = np.repeat(np.arange(len(texts), dtype=np.int64) * dim, lengths)
+    flat += np.asarray(buckets, dtype=np.int64)
+    counts = np.bincount(flat, minlength=len(texts) * dim).astype(np.float32)
+    matrix = counts.reshape(len(texts), dim)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class LocalLRUCache:
+    """LRU acotado y thread-safe para los embeddings más recientes del proceso."""
+
+    def __init__(self, maxsize: int = DEFAULT_LOCAL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> list[float] | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: list[float]) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class EmbeddingProvider:
+    """Interfaz mínima: un lote de textos → un embedding por texto (mismo orden)."""
+
+    model = EMBEDDING_MODEL
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        raise NotImplementedError
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    """Embeddings ``text-embedding-004`` vía Google GenAI, un cliente por API key."""
+
+    _clients: dict[str, object] = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def _client(self):
+        with self._clients_lock:
+            client = self._clients.get(self.api_key)
+            if client is None:
+                from apps.automation.services.ai_engine import _get_genai
+
+                client = self._clients[self.api_key] = _get_genai().Client(api_key=self.api_key)
+            return client
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        response = self._client().models.embed_content(model=self.model, contents=texts)
+        if hasattr(response, "embeddings") and response.embeddings:
+            vectors = [list(e.values) for e in response.embeddings]
+        elif isinstance(response, dict) and "embeddings" in response:
+            vectors = [e.get("values", []) for e in response["embeddings"]]
+        elif hasattr(response, "embedding") and hasattr(response.embedding, "values"):
+            vectors = [list(response.embedding.values)]
+        else:
+            vectors = []
+        if len(vectors) != len(texts):
+            raise ValueError(
+                f"Gemini devolvió {len(vectors)} embeddings para un lote de {len(texts)} textos"
+            )
+        return vectors
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """Proveedor offline para benchmarks/tests: latencia simulada por llamada."""
+
+    model = "fake-embedding"
+
+    def __init__(self, dim: int = 768, latency: float = 0.0, per_item_latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.calls = 0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        with self._lock:
+            self.calls += 1
+            self.items += len(texts)
+        time.sleep(self.latency + self.per_item_latency * len(texts))
+        vectors = []
+        for text in texts:
+            seed = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+            base = [b / 255.0 for b in seed]
+            vectors.append([base[i % len(base)] for i in range(self.dim)])
+        return vectors
+
+
+class EmbeddingPipeline:
+    """Generación de embeddings por lotes con cache de contenido en dos niveles."""
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider | None,
+        fallback: Callable[[list[str]], list[list[float]]],
+        batch_size: int | None = None,
+        max_workers: int | None = None,
+        local_cache: LocalLRUCache | None = None,
+    ):
+        self.provider = provider
+        self.fallback = fallback
+        self.batch_size = batch_size or getattr(
+            settings, "RAG_EMBEDDING_BATCH_SIZE", DEFAULT_BATCH_SIZE
+        )
+        self.max_workers = max_workers or getattr(
+            settings, "RAG_EMBEDDING_MAX_WORKERS", DEFAULT_MAX_WORKERS
+        )
+        self.local_cache = local_cache if local_cache is not None else embedding_local_cache
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """Retorna un embedding por texto, en el mismo orden (``[]`` para textos vacíos)."""
+        results: list[list[float]] = [[] for _ in texts]
+        model = self.provider.model if self.provider else EMBEDDING_MODEL
+
+        # 1. Deduplicar por hash de contenido y resolver desde cache.
+        pending: dict[str, list[int]] = {}
+        for pos, text in enumerate(texts):
+            if text and text.strip():
+                pending.setdefault(content_digest(text, model), []).append(pos)
+
+        for digest in list(pending):
+            vector = self.local_cache.get(digest)
+            if vector is not None:
+                self._assign(results, pending.pop(digest), vector)
+
+        if pending:
+            keys = {CACHE_KEY.format(model=model, digest=d): d for d in pending}
+            try:
+                found = cache.get_many(list(keys))
+            except Exception as e:
+                logger.warning(f"RAG: cache de embeddings no disponible: {e}")
+                found = {}
+            for key, vector in found.items():
+                digest = keys[key]
+                self.local_cache.set(digest, vector)
+                self._assign(results, pending.pop(digest), vector)
+
+        if not pending:
+            return results
+
+        # 2. Embeddings faltantes: lotes en paralelo contra el proveedor.
+        digests = list(pending)
+        unique_texts = [texts[pending[d][0]][:MAX_CHARS_PER_CHUNK] for d in digests]
+        vectors = self._embed_missing(unique_texts)
+
+        failed = [d for d, vector in zip(digests, vectors, strict=True) if vector is None]
+        fallback_vectors = dict(
+            zip(failed, self.fallback([texts[pending[d][0]] for d in failed]), strict=True)
+        )
+
+        to_cache = {}
+        for digest, vector in zip(digests, vectors, strict=True):
+            if vector is None:
+                vector = fallback_vectors[digest]
+            else:
+                self.local_cache.set(digest, vector)
+                to_cache[CACHE_KEY.format(model=model, digest=digest)] = vector
+            self._assign(results, pending[digest], vector)
+
+        if to_cache:
+            try:
+                cache.set_many(to_cache, timeout=CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"RAG: no se pudieron cachear embeddings: {e}")
+        return results
+
+    def _embed_missing(self, texts: list[str]) -> list[list[float] | None]:
+        """Embeddings del proveedor; ``None`` donde el lote falló."""
+        if self.provider is None:
+            return [None] * len(texts)
+
+        batches = [
+            (start, texts[start : start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        vectors: list[list[float] | None] = [None] * len(texts)
+
+        def run(batch):
+            start, chunk = batch
+            try:
+                return start, self.provider.embed_batch(chunk)
+            except Exception as e:
+                logger.warning(
+                    f"RAG: Error generando embeddings ({len(chunk)} chunks) con "
+                    f"{self.provider.model}: {e}"
+                )
+                return start, [None] * len(chunk)
+
+        if len(batches) == 1:
+            done = [run(batches[0])]
+        else:
+            workers = min(self.max_workers, len(batches))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-embed") as pool:
+                done = list(pool.map(run, batches))
+
+        for start, batch_vectors in done:
+            vectors[start : start + len(batch_vectors)] = batch_vectors
+        return vectors
+
+    @staticmethod
+    def _assign(results, positions, vector):
+        for pos in positions:
+            results[pos] = vector
+
+
+embedding_local_cache = LocalLRUCache()
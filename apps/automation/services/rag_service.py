@@ -6,11 +6,22 @@ from typing import Any
 from django.apps import apps
 from django.utils import timezone
 
-from apps.automation.services.ai_engine import _get_genai, get_gemini_api_key
+from apps.automation.services.ai_engine import get_gemini_api_key
+from apps.automation.services.rag_embeddings import (
+    FALLBACK_DIM,
+    EmbeddingPipeline,
+    GeminiEmbeddingProvider,
+    hashing_embeddings,
+)
+from apps.automation.services.rag_vector_index import VectorIndex, vector_index_registry
 from core.api import get_current_agency
 
 logger = logging.getLogger(__name__)
 
+# Candidatos por coseno que se re-puntúan con el boost de palabras clave.
+SEARCH_CANDIDATES_PER_RESULT = 10
+SEARCH_MIN_CANDIDATES = 50
+
 
 class RAGKnowledgeService:
     """
@@ -24,6 +35,44 @@ class RAGKnowledgeService:
         """Retorna dinámicamente el modelo KnowledgeChunk de la app CMS."""
         return apps.get_model("cms", "KnowledgeChunk")
 
+    @classmethod
+    def _delete_chunks(cls, agencia, **filters) -> None:
+        """Borra fragmentos previos y los retira del índice vectorial."""
+        qs = cls._get_chunk_model().objects.filter(**filters)
+        chunk_ids = list(qs.values_list("id", flat=True))
+        if chunk_ids:
+            qs.filter(id__in=chunk_ids).delete()
+            vector_index_registry.remove(agencia, chunk_ids)
+
+    @classmethod
+    def _register_chunks(cls, agencia, chunks: list[Any]) -> None:
+        """Agrega al índice vectorial los fragmentos recién creados."""
+        if chunks:
+            vector_index_registry.add(
+                agencia, [c.id for c in chunks], [c.embedding_vector for c in chunks]
+            )
+
+    @classmethod
+    def _embedding_pipeline(cls, agency=None) -> EmbeddingPipeline:
+        """Pipeline de embeddings con la API key de Gemini de la agencia (si existe)."""
+        api_key = None
+        try:
+            api_key = get_gemini_api_key(agency=agency)
+        except Exception as e:
+            logger.warning(f"RAG: No se pudo resolver la API key de Gemini: {e}")
+        provider = GeminiEmbeddingProvider(api_key) if api_key else None
+        return EmbeddingPipeline(provider, fallback=cls._fallback_vectors)
+
+    @classmethod
+    def generate_embeddings(cls, texts: list[str], agency=None) -> list[list[float]]:
+        """
+        Genera embeddings (text-embedding-004) para varios textos en lotes,
+        reutilizando los ya cacheados por hash de contenido. Ver ``rag_embeddings``.
+        """
+        if not texts:
+            return []
+        return cls._embedding_pipeline(agency).embed(texts)
+
     @classmethod
     def generate_embedding(cls, text: str, agency=None) -> list[float]:
         """
@@ -31,48 +80,17 @@ class RAGKnowledgeService:
         """
         if not text or not text.strip():
             return []
-
-        try:
-            api_key = get_gemini_api_key(agency=agency)
-            if api_key:
-                genai_mod = _get_genai()
-                client = genai_mod.Client(api_key=api_key)
-                response = client.models.embed_content(
-                    model="text-embedding-004",
-                    contents=text[:2048],  # Límite seguro de caracteres por chunk
-                )
-                if hasattr(response, "embedding") and hasattr(response.embedding, "values"):
-                    return list(response.embedding.values)
-                elif isinstance(response, dict) and "embedding" in response:
-                    return response["embedding"].get("values", [])
-                elif hasattr(response, "embeddings") and response.embeddings:
-                    return list(response.embeddings[0].values)
-        except Exception as e:
-            logger.warning(f"RAG: Error generando embedding Gemini para chunk: {e}")
-
-        # Fallback determinístico de embeddings si la API falla
-        return cls._fallback_vector(text)
+        return cls.generate_embeddings([text], agency=agency)[0]
 
     @classmethod
-    def _fallback_vector(cls, text: str, dim: int = 768) -> list[float]:
+    def _fallback_vector(cls, text: str, dim: int = FALLBACK_DIM) -> list[float]:
         """Genera un vector hash determinístico si no hay conexión con Gemini."""
-        import hashlib
-
-        vector = [0.0] * dim
-        words = re.findall(r"\w+", text.lower())
-        if not words:
-            return vector
+        return cls._fallback_vectors([text], dim=dim)[0]
 
-        for word in words:
-            h = int(hashlib.sha256(word.encode("utf-8")).hexdigest(), 16)
-            idx = h % dim
-            vector[idx] += 1.0
-
-        # Normalizar L2
-        norm = math.sqrt(sum(v * v for v in vector))
-        if norm > 0:
-            vector = [v / norm for v in vector]
-        return vector
+    @classmethod
+    def _fallback_vectors(cls, texts: list[str], dim: int = FALLBACK_DIM) -> list[list[float]]:
+        """Versión por lotes de ``_fallback_vector`` (feature hashing con NumPy)."""
+        return hashing_embeddings(texts, dim=dim).tolist()
 
     @classmethod
     def cosine_similarity(cls, vec_a: list[float], vec_b: list[float]) -> float:
@@ -119,16 +137,15 @@ class RAGKnowledgeService:
         KnowledgeChunk = cls._get_chunk_model()
 
         # Limpiar fragmentos previos de esta referencia
-        KnowledgeChunk.objects.filter(
-            source_type="WIKI", source_reference_id=str(article.id)
-        ).delete()
+        cls._delete_chunks(article.agencia, source_type="WIKI", source_reference_id=str(article.id))
 
         chunks = cls.chunk_text(f"{article.title}\n\n{article.content}")
         indexed_count = 0
+        created = []
 
-        for chunk in chunks:
-            vector = cls.generate_embedding(chunk, agency=article.agencia)
-            KnowledgeChunk.objects.create(
+        vectors = cls.generate_embeddings(chunks, agency=article.agencia)
+        for chunk, vector in zip(chunks, vectors, strict=True):
+            obj = KnowledgeChunk.objects.create(
                 agencia=article.agencia,
                 source_type="WIKI",
                 source_title=article.title,
@@ -136,8 +153,11 @@ class RAGKnowledgeService:
                 content_chunk=chunk,
                 embedding_vector=vector,
             )
+            created.append(obj)
             indexed_count += 1
 
+        cls._register_chunks(article.agencia, created)
+
         logger.info(f"RAG: Indexado KBArticle '{article.title}' ({indexed_count} chunks)")
         return indexed_count
 
@@ -167,18 +187,19 @@ class RAGKnowledgeService:
 
         KnowledgeChunk = cls._get_chunk_model()
 
-        KnowledgeChunk.objects.filter(
-            source_type="MANUAL_GDS", source_reference_id=str(document.id)
-        ).delete()
+        cls._delete_chunks(
+            document.agencia, source_type="MANUAL_GDS", source_reference_id=str(document.id)
+        )
 
         chunks = cls.chunk_text(
             f"Manual {document.get_gds_type_display()}: {document.title}\n\n{extracted_text}"
         )
         indexed_count = 0
+        created = []
 
-        for chunk in chunks:
-            vector = cls.generate_embedding(chunk, agency=document.agencia)
-            KnowledgeChunk.objects.create(
+        vectors = cls.generate_embeddings(chunks, agency=document.agencia)
+        for chunk, vector in zip(chunks, vectors, strict=True):
+            obj = KnowledgeChunk.objects.create(
                 agencia=document.agencia,
                 source_type="MANUAL_GDS",
                 source_title=f"{document.title} ({document.get_gds_type_display()})",
@@ -186,8 +207,11 @@ class RAGKnowledgeService:
                 content_chunk=chunk,
                 embedding_vector=vector,
             )
+            created.append(obj)
             indexed_count += 1
 
+        cls._register_chunks(document.agencia, created)
+
         document.is_indexed = True
         document.indexed_at = timezone.now()
         document.save(update_fields=["is_indexed", "indexed_at"])
@@ -207,10 +231,11 @@ class RAGKnowledgeService:
 
         chunks = cls.chunk_text(f"Comunicado / Correo: {subject}\n\n{body}")
         indexed_count = 0
+        created = []
 
-        for chunk in chunks:
-            vector = cls.generate_embedding(chunk, agency=agencia)
-            KnowledgeChunk.objects.create(
+        vectors = cls.generate_embeddings(chunks, agency=agencia)
+        for chunk, vector in zip(chunks, vectors, strict=True):
+            obj = KnowledgeChunk.objects.create(
                 agencia=agencia,
                 source_type="MAILBOT",
                 source_title=subject,
@@ -218,8 +243,11 @@ class RAGKnowledgeService:
                 content_chunk=chunk,
                 embedding_vector=vector,
             )
+            created.append(obj)
             indexed_count += 1
 
+        cls._register_chunks(agencia, created)
+
         logger.info(f"RAG: Indexado Correo Mailbot '{subject}' ({indexed_count} chunks)")
         return indexed_count
 
@@ -228,6 +256,10 @@ class RAGKnowledgeService:
         """
         Realiza una búsqueda semántica RAG sobre los fragmentos de conocimiento indexados.
         Retorna un texto estructurado listo para ser inyectado al contexto del Agente IA.
+
+        La preselección por coseno usa el índice vectorial de la agencia
+        (``rag_vector_index``); solo los mejores candidatos se cargan de BD y se
+        re-puntúan con el boost de palabras clave.
         """
         if not query or not query.strip():
             return "No se especificó ninguna consulta de búsqueda."
@@ -240,16 +272,27 @@ class RAGKnowledgeService:
         qs = KnowledgeChunk.objects.all()
         if target_agency:
             qs = qs.filter(agencia=target_agency)
-
-        all_chunks = list(qs[:500])
-        if not all_chunks:
+            index = vector_index_registry.get(target_agency)
+        else:
+            # Sin agencia (superuser / comandos): índice efímero sobre lo visible.
+            index = VectorIndex()
+            rows = list(qs.values_list("id", "embedding_vector"))
+            index.add([r[0] for r in rows], [r[1] or [] for r in rows])
+
+        if not len(index):
             return "No hay manuales ni artículos de conocimiento indexados en el sistema."
 
+        pool = max(limit * SEARCH_CANDIDATES_PER_RESULT, SEARCH_MIN_CANDIDATES)
+        candidates = index.search(query_vector, pool)
+        chunks_by_id = qs.in_bulk([chunk_id for chunk_id, _score in candidates])
+
+        query_words = set(re.findall(r"\w+", query.lower()))
         scored_chunks = []
-        for chunk in all_chunks:
-            score = cls.cosine_similarity(query_vector, chunk.embedding_vector or [])
+        for chunk_id, score in candidates:
+            chunk = chunks_by_id.get(chunk_id)
+            if chunk is None:
+                continue
             # También realizar boost si palabras clave de la query aparecen en el texto
-            query_words = set(re.findall(r"\w+", query.lower()))
             chunk_words = set(re.findall(r"\w+", chunk.content_chunk.lower()))
             common = query_words.intersection(chunk_words)
             if common:
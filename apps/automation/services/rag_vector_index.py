@@ -0,0 +1,274 @@
+"""
+Índice vectorial en memoria para la búsqueda RAG.
+
+Cada agencia mantiene una matriz NumPy ``float32`` con los embeddings
+normalizados de sus ``cms.KnowledgeChunk``. La búsqueda top-k es un único
+producto matriz-vector + ``argpartition`` (milisegundos sobre 100k+ fragmentos),
+en lugar de iterar fila a fila en Python.
+
+El índice se actualiza de forma incremental desde ``RAGKnowledgeService`` al
+indexar/borrar fragmentos. Como cada worker (gunicorn/celery) tiene su propia
+copia, cualquier escritura incrementa una versión en cache; al detectar un
+cambio de versión (o al vencer ``RAG_VECTOR_INDEX_SYNC_SECONDS``) el índice se
+re-sincroniza por diferencia de IDs contra la base de datos, cargando solo los
+vectores nuevos.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION_KEY = "rag:vector_index:version:{agency_key}"
+DEFAULT_SYNC_SECONDS = 300
+LOAD_BATCH_SIZE = 2000
+
+
+def _agency_key(agencia) -> str:
+    """Clave estable por agencia."""
+    return str(getattr(agencia, "pk", agencia))
+
+
+def as_matrix(vectors, dim: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convierte una lista de vectores a matriz ``float32`` normalizada (L2).
+
+    Retorna ``(matriz, mascara_validos)``: los vectores vacíos, de otra
+    dimensión o de norma cero quedan fuera de la matriz.
+    """
+    if dim is None:
+        dim = next((len(v) for v in vectors if v is not None and len(v)), 0)
+    valid = np.array([v is not None and len(v) == dim for v in vectors], dtype=bool)
+    if not dim or not valid.any():
+        return np.empty((0, dim), dtype=np.float32), np.zeros(len(vectors), dtype=bool)
+
+    matrix = np.asarray(
+        [v for v, ok in zip(vectors, valid, strict=True) if ok], dtype=np.float32
+    ).reshape(-1, dim)
+    norms = np.linalg.norm(matrix, axis=1)
+    nonzero = norms > 0
+    matrix = matrix[nonzero] / norms[nonzero, None]
+    valid[np.flatnonzero(valid)[~nonzero]] = False
+    return matrix, valid
+
+
+class VectorIndex:
+    """
+    Matriz densa de embeddings normalizados con actualización incremental.
+
+    Las filas se reservan con crecimiento geométrico para que ``add`` sea
+    amortizado O(1); los borrados marcan la fila como inactiva y se compacta
+    cuando los huecos superan un cuarto de la capacidad usada.
+    """
+
+    def __init__(self, dim: int | None = None):
+        self.dim = dim
+        self._matrix = np.empty((0, dim or 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._size = 0
+        self._positions: dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, chunk_id: int) -> bool:
+        return chunk_id in self._positions
+
+    @property
+    def ids(self) -> set[int]:
+        return set(self._positions)
+
+    def add(self, chunk_ids, vectors) -> int:
+        """Agrega (o reemplaza) vectores. Retorna cuántos quedaron indexados."""
+        if not len(chunk_ids):
+            return 0
+        with self._lock:
+            if self.dim is None:
+                self.dim = next((len(v) for v in vectors if v is not None and len(v)), None)
+                if self.dim is None:
+                    return 0
+                self._matrix = np.empty((0, self.dim), dtype=np.float32)
+
+            matrix, valid = as_matrix(vectors, self.dim)
+            ids = np.asarray(chunk_ids, dtype=np.int64)[valid]
+            self.remove(int(i) for i in ids if int(i) in self._positions)
+            if not len(ids):
+                return 0
+
+            self._reserve(self._size + len(ids))
+            start, end = self._size, self._size + len(ids)
+            self._matrix[start:end] = matrix
+            self._ids[start:end] = ids
+            self._alive[start:end] = True
+            self._positions.update(zip(ids.tolist(), range(start, end), strict=True))
+            self._size = end
+            return len(ids)
+
+    def remove(self, chunk_ids) -> int:
+        """Marca como inactivos los IDs indicados. Retorna cuántos se eliminaron."""
+        removed = 0
+        with self._lock:
+            for chunk_id in chunk_ids:
+                pos = self._positions.pop(chunk_id, None)
+                if pos is not None:
+                    self._alive[pos] = False
+                    removed += 1
+            if removed and self._size - len(self._positions) > self._size // 4:
+                self._compact()
+        return removed
+
+    def search(self, query_vector, k: int) -> list[tuple[int, float]]:
+        """Top-k por similitud de coseno. Retorna ``[(chunk_id, score), ...]``."""
+        if not self._positions or k <= 0 or query_vector is None or len(query_vector) != self.dim:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return []
+
+        with self._lock:
+            scores = self._matrix[: self._size] @ (query / norm)
+            if len(self._positions) < self._size:
+                scores[~self._alive[: self._size]] = -np.inf
+            k = min(k, len(self._positions))
+            top = np.argpartition(scores, -k)[-k:]
+            top = top[np.argsort(scores[top])[::-1]]
+            return [(int(self._ids[i]), float(scores[i])) for i in top]
+
+    def _reserve(self, needed: int) -> None:
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 64)
+        matrix = np.empty((new_capacity, self.dim), dtype=np.float32)
+        matrix[: self._size] = self._matrix[: self._size]
+        ids = np.empty(new_capacity, dtype=np.int64)
+        ids[: self._size] = self._ids[: self._size]
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[: self._size] = self._alive[: self._size]
+        self._matrix, self._ids, self._alive = matrix, ids, alive
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self._alive[: self._size])
+        self._matrix = self._matrix[keep].copy()
+        self._ids = self._ids[keep].copy()
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._size = len(keep)
+        self._positions = {int(cid): pos for pos, cid in enumerate(self._ids)}
+
+
+class AgencyVectorIndex(VectorIndex):
+    """
+    ``VectorIndex`` respaldado por los ``KnowledgeChunk`` de una agencia.
+
+    El índice vive a nivel de proceso (compartido entre requests), por eso
+    carga con ``all_objects`` + filtro explícito de agencia y no depende del
+    contexto de tenant del thread que dispare la sincronización.
+    """
+
+    def __init__(self, agencia):
+        super().__init__()
+        self.agencia_id = getattr(agencia, "pk", agencia)
+        self.agency_key = _agency_key(agencia)
+        self._synced_version = None
+        self._synced_at = 0.0
+
+    def _queryset(self):
+        KnowledgeChunk = apps.get_model("cms", "KnowledgeChunk")
+        return KnowledgeChunk.all_objects.filter(agencia_id=self.agencia_id)
+
+    def is_stale(self) -> bool:
+        sync_seconds = getattr(settings, "RAG_VECTOR_INDEX_SYNC_SECONDS", DEFAULT_SYNC_SECONDS)
+        if time.monotonic() - self._synced_at > sync_seconds:
+            return True
+        return (
+            cache.get(INDEX_VERSION_KEY.format(agency_key=self.agency_key)) != self._synced_version
+        )
+
+    def sync(self) -> None:
+        """Re-sincroniza contra la BD cargando solo los IDs nuevos y purgando los borrados."""
+        version = cache.get(INDEX_VERSION_KEY.format(agency_key=self.agency_key))
+        qs = self._queryset()
+        db_ids = set(qs.values_list("id", flat=True))
+        known = self.ids
+
+        self.remove(known - db_ids)
+        missing = sorted(db_ids - known)
+        for start in range(0, len(missing), LOAD_BATCH_SIZE):
+            batch = missing[start : start + LOAD_BATCH_SIZE]
+            rows = list(qs.filter(id__in=batch).values_list("id", "embedding_vector"))
+            self.add([r[0] for r in rows], [r[1] or [] for r in rows])
+
+        self._synced_version = version
+        self._synced_at = time.monotonic()
+        logger.debug(
+            f"RAG: índice vectorial '{self.agency_key}' sincronizado "
+            f"({len(self)} vectores, {len(missing)} nuevos)"
+        )
+
+
+class VectorIndexRegistry:
+    """Registro por proceso de índices vectoriales, uno por agencia."""
+
+    def __init__(self):
+        self._indexes: dict[str, AgencyVectorIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, agencia) -> AgencyVectorIndex:
+        """Retorna el índice de la agencia, sincronizándolo si está desactualizado."""
+        key = _agency_key(agencia)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = AgencyVectorIndex(agencia)
+        if index.is_stale():
+            with index._lock:
+                if index.is_stale():
+                    index.sync()
+        return index
+
+    def add(self, agencia, chunk_ids, vectors) -> None:
+        """Registra fragmentos recién creados y notifica a los demás procesos."""
+        if agencia is None:
+            return
+        index = self._indexes.get(_agency_key(agencia))
+        if index is not None:
+            index.add(chunk_ids, vectors)
+        self._bump_version(agencia)
+
+    def remove(self, agencia, chunk_ids) -> None:
+        """Elimina fragmentos borrados y notifica a los demás procesos."""
+        if agencia is None:
+            return
+        index = self._indexes.get(_agency_key(agencia))
+        if index is not None:
+            index.remove(list(chunk_ids))
+        self._bump_version(agencia)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+    def _bump_version(self, agencia) -> None:
+        key = _agency_key(agencia)
+        cache_key = INDEX_VERSION_KEY.format(agency_key=key)
+        try:
+            version = cache.incr(cache_key)
+        except ValueError:
+            version = 1
+            cache.set(cache_key, version, timeout=None)
+        index = self._indexes.get(key)
+        if index is not None and index._synced_version == version - 1:
+            # Este proceso ya aplicó el cambio y no se perdió ninguno ajeno.
+            index._synced_version = version
+
+
+vector_index_registry = VectorIndexRegistry()
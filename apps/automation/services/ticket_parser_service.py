@@ -1,7 +1,6 @@
 # 🔒 PADLOCK: CRITICAL INFRASTRUCTURE (REFACTORED)
 # Maintained by: Antigravity/Gemini
 # -----------------------------------------------------
-import hashlib
 import logging
 import time
 
@@ -273,323 +272,60 @@ class TicketParserService:
                 )
 
             # 🧠 INTELIGENCIA DE REUTILIZACIÓN: Si ya tenemos datos y no se forzó el re-parseo, los usamos.
+            datos_reutilizados = None
             if (
                 not ignore_manual
                 and boleto.datos_parseados
                 and isinstance(boleto.datos_parseados, dict)
             ):
-                has_basics = boleto.datos_parseados.get("pnr") or boleto.datos_parseados.get(
-                    "passenger_name"
-                )
-                if has_basics:
+                # Grupo ya parseado (p. ej. por la ingesta por lotes, que deja el boleto en
+                # PRO): no tiene pnr/passenger_name en la raíz, pero tampoco hay que
+                # re-parsearlo ni tomar el lock que el lote ya tiene.
+                if boleto.datos_parseados.get("is_multi_pax") and boleto.datos_parseados.get(
+                    "tickets"
+                ):
                     logger.info(
-                        f"♻️ Reutilizando datos existentes para Boleto {boleto_id} (Studio Mode)"
+                        f"♻️ Reutilizando grupo ya parseado para Boleto {boleto_id} (Studio Mode)"
                     )
+                    datos_reutilizados = boleto.datos_parseados
+                else:
+                    # Se normaliza antes de comprobar: la IA (CODIGO_RESERVA,
+                    # NOMBRE_DEL_PASAJERO) y el regex (codigo_reserva, nombre_pasajero)
+                    # no usan las claves pnr/passenger_name.
                     datos_norm = DataNormalizationService.normalize_ticket_data(
                         boleto.datos_parseados
                     )
-                    return self._process_single_ticket(boleto, datos_norm, forced_client_id)
-
-            # 1. Adquisición de Lock Atómico
-            # Evitamos que dos procesos (Signal vs View vs Celery) procesen lo mismo simultáneamente.
-            # Si es ignore_manual=True, forzamos la toma del lock aunque diga PRO
-            query = BoletoImportado.all_objects.filter(pk=boleto_id)
-            if not ignore_manual:
-                query = query.exclude(estado_parseo=BoletoImportado.EstadoParseo.EN_PROCESO)
-
-            updated_count = query.update(estado_parseo=BoletoImportado.EstadoParseo.EN_PROCESO)
-
-            if updated_count == 0:
-                logger.info(
-                    f"⏭️ Boleto {boleto_id} ya está siendo procesado por otro hilo. Esperando..."
-                )
-                boleto.refresh_from_db()
-                return boleto.venta_asociada or True
-
-            boleto.log_parseo = "Iniciando pipeline de extracción..."
-            boleto.save(update_fields=["log_parseo"])
+                    if datos_norm.get("pnr") or datos_norm.get("passenger_name"):
+                        logger.info(
+                            f"♻️ Reutilizando datos existentes para Boleto {boleto_id} (Studio Mode)"
+                        )
+                        return self._process_single_ticket(boleto, datos_norm, forced_client_id)
 
-            # 2. Extracción de Texto + HTML
-            raw_file = ExtractionService.get_open_file(boleto)
-            try:
-                texto = ExtractionService.extract_text(raw_file, boleto.archivo_boleto.name)
-            finally:
-                if raw_file:
-                    raw_file.close()
-
-            if not texto:
-                return self._finalize_error(boleto, "Archivo vacío o ilegible.")
-
-            html_text = ""
-            fname_lower = boleto.archivo_boleto.name.lower()
-            if fname_lower.endswith(".eml") or fname_lower.endswith(".html"):
-                raw_file_html = ExtractionService.get_open_file(boleto)
-                try:
-                    html_text = ExtractionService.extract_html(
-                        raw_file_html, boleto.archivo_boleto.name
-                    )
-                finally:
-                    if raw_file_html:
-                        raw_file_html.close()
-
-            if texto and texto.startswith("--- HEADERS START ---"):
-                headers_end = texto.find("--- HEADERS END ---")
-                if headers_end != -1:
-                    header_block = texto[: headers_end + len("--- HEADERS END ---")]
-                    if html_text and not html_text.startswith("--- HEADERS START ---"):
-                        html_text = f"{header_block}\n\n{html_text}"
-
-            # 3. 🔥 CACHÉ REDIS: Verificar si ya parseamos texto idéntico
-            texto_hash = hashlib.sha256(texto.encode("utf-8", errors="ignore")).hexdigest()
-            cache_key = f"parseo_result_{texto_hash}"
-            datos = None
-
-            if not bypass_cache:
-                cached_result = cache.get(cache_key)
-                if cached_result:
-                    logger.info(
-                        f"♻️ Resultado de parseo recuperado de caché Redis (Hash: {texto_hash[:8]}...)"
-                    )
-                    datos = cached_result
+            if datos_reutilizados is not None:
+                datos = datos_reutilizados
+            else:
+                # 1. Adquisición de Lock Atómico
+                # Evitamos que dos procesos (Signal vs View vs Celery) procesen lo mismo simultáneamente.
+                # Si es ignore_manual=True, forzamos la toma del lock aunque diga PRO
+                query = BoletoImportado.all_objects.filter(pk=boleto_id)
+                if not ignore_manual:
+                    query = query.exclude(estado_parseo=BoletoImportado.EstadoParseo.EN_PROCESO)
 
-            # 4. Motor de Parseo: Prioridad IA (Structured Outputs)
-            if datos is None:
-                path_pdf = None
-                try:
-                    path_pdf = boleto.archivo_boleto.path
-                except Exception as e:
-                    logger.warning(f"No se pudo obtener ruta fisica del archivo: {e}")
+                updated_count = query.update(estado_parseo=BoletoImportado.EstadoParseo.EN_PROCESO)
 
-                # ⚡ PASO 1: SI ES RE-EXTRACCIÓN IA (bypass_cache=True) -> IR DIRECTAMENTE A IA UNIVERSAL
-                if bypass_cache:
+                if updated_count == 0:
                     logger.info(
-                        f"🧠 [FORCED IA MODE] bypass_cache=True — Invocando directamente IA Universal (Gemini) para Boleto {boleto_id}..."
-                    )
-                    from apps.automation.parsers.ai_universal_parser import UniversalAIParser
-
-                    datos = UniversalAIParser().parse(texto, pdf_path=path_pdf, bypass_cache=True)
-                    boleto.log_parseo = (
-                        boleto.log_parseo or ""
-                    ) + " | 🔥 Re-extracción IA (Structured Outputs) completada."
-                    boleto.save(update_fields=["log_parseo"])
-
-                # ⚡ PASO 2: SI NO ES RE-EXTRACCIÓN FORZADA -> INTENTAR REGEX/GDS LOCAL PRIMERO
-                if datos is None:
-                    try:
-                        logger.info(f" Usando Motor Regex/GDS Local para Boleto {boleto_id}...")
-                        regex_start = time.time()
-                        datos_regex = extract_data_from_text(
-                            texto, html_text=html_text, pdf_path=path_pdf, bypass_cache=bypass_cache
-                        )
-                        regex_duration = time.time() - regex_start
-                        logger.info(f" [PROFILING] Regex parse duration: {regex_duration:.2f}s")
-
-                        # Validación de Contrato de Calidad Mínimo para evitar pasar a la IA
-                        if datos_regex and not datos_regex.get("error"):
-                            if datos_regex.get("is_multi_pax"):
-                                tickets_list = datos_regex.get("tickets", [])
-                                has_all_pax = len(tickets_list) > 0 and all(
-                                    t.get("NOMBRE_DEL_PASAJERO") or t.get("passenger_name")
-                                    for t in tickets_list
-                                )
-                                has_pnr = all(
-                                    t.get("CODIGO_RESERVA")
-                                    or t.get("pnr")
-                                    or t.get("codigo_reserva")
-                                    for t in tickets_list
-                                )
-                                has_flights = all(
-                                    len(
-                                        t.get("vuelos", [])
-                                        or t.get("flights", [])
-                                        or t.get("segmentos", [])
-                                    )
-                                    > 0
-                                    for t in tickets_list
-                                )
-                                has_times = all(
-                                    any(
-                                        f.get("hora_salida")
-                                        or f.get("hora_llegada")
-                                        or (
-                                            isinstance(f.get("departure"), dict)
-                                            and f.get("departure").get("time")
-                                        )
-                                        for f in (
-                                            t.get("vuelos", [])
-                                            or t.get("flights", [])
-                                            or t.get("segmentos", [])
-                                        )
-                                    )
-                                    for t in tickets_list
-                                )
-                                is_regex_reliable = (
-                                    has_all_pax and has_pnr and has_flights and has_times
-                                )
-                            else:
-                                has_pax = bool(
-                                    datos_regex.get("passenger_name")
-                                    or datos_regex.get("nombre_pasajero")
-                                )
-                                has_pnr = bool(
-                                    datos_regex.get("pnr")
-                                    or datos_regex.get("codigo_reserva")
-                                    or datos_regex.get("localizador")
-                                )
-                                flights_list = (
-                                    datos_regex.get("segments", [])
-                                    or datos_regex.get("segmentos", [])
-                                    or datos_regex.get("flights", [])
-                                    or datos_regex.get("vuelos", [])
-                                )
-                                has_flights = len(flights_list) > 0
-                                has_times = any(
-                                    f.get("hora_salida")
-                                    or f.get("hora_llegada")
-                                    or (
-                                        isinstance(f.get("departure"), dict)
-                                        and f.get("departure").get("time")
-                                    )
-                                    for f in flights_list
-                                )
-                                is_regex_reliable = (
-                                    has_pax and has_pnr and has_flights and has_times
-                                )
-
-                            if is_regex_reliable and not bypass_cache:
-                                datos = datos_regex
-                                logger.info(
-                                    "✅ Extracción exitosa y completa con motor Regex/GDS local."
-                                )
-                                boleto.log_parseo = "Regex/GDS local exitoso (completo)."
-                                boleto.save(update_fields=["log_parseo"])
-                            else:
-                                logger.info(
-                                    "⚠️ Forzando motor IA (bypass_cache=True) o Regex incompleto."
-                                )
-                        else:
-                            logger.info(
-                                "⚠️ Regex local no pudo parsear el archivo. Se requiere fallback a IA."
-                            )
-                    except Exception as e_reg:
-                        logger.error(f" Error en motor de Regex: {e_reg}")
-                        boleto.log_parseo = f"Error en Regex local: {str(e_reg)}. Intentando IA..."
-                        boleto.save(update_fields=["log_parseo"])
-
-                # 🧠 PASO 2: FALLBACK A IA (Solo si el regex no fue suficiente o confiable)
-                if datos is None:
-                    # Circuit breaker protege la llamada a IA
-                    from apps.common.services.circuit_breaker import (
-                        ai_circuit_breaker,
+                        f"⏭️ Boleto {boleto_id} ya está siendo procesado por otro hilo. Esperando..."
                     )
+                    boleto.refresh_from_db()
+                    return boleto.venta_asociada or True
 
-                    def _ai_fallback_call():
-                        from apps.automation.parsers.ai_universal_parser import (
-                            UniversalAIParser,
-                        )
+                boleto.log_parseo = "Iniciando pipeline de extracción..."
+                boleto.save(update_fields=["log_parseo"])
 
-                        logger.info(
-                            f"🧠 Usando IA Primaria (Structured Outputs) de Fallback para Boleto {boleto_id}..."
-                        )
-                        ai_start = time.time()
-                        datos_ia = UniversalAIParser().parse(
-                            texto, pdf_path=path_pdf, bypass_cache=bypass_cache
-                        )
-                        ai_duration = time.time() - ai_start
-                        logger.info(f"⏱️ [PROFILING] IA Engine parse duration: {ai_duration:.2f}s")
-                        return datos_ia
-
-                    try:
-                        ai_result = ai_circuit_breaker.call(_ai_fallback_call)
-                    except QuotaExhaustedException:
-                        logger.warning(
-                            f"🚨 Cuota de IA agotada para agencia {boleto.agencia.nombre}."
-                        )
-                        if (
-                            "datos_regex" in locals()
-                            and datos_regex
-                            and not datos_regex.get("error")
-                        ):
-                            datos = datos_regex
-                            datos["_requiere_revision"] = True
-                            boleto.log_parseo = (
-                                boleto.log_parseo or ""
-                            ) + " | Cuota IA agotada. Usando datos parciales de Regex."
-                            boleto.save(update_fields=["log_parseo"])
-                        else:
-                            return self._finalize_error(
-                                boleto, "Cuota de IA agotada y sin datos de Regex."
-                            )
-                    except Exception as e_ai:
-                        logger.error(f" Fallo crítico en motor de IA: {e_ai}")
-                        if (
-                            "datos_regex" in locals()
-                            and datos_regex
-                            and not datos_regex.get("error")
-                        ):
-                            datos = datos_regex
-                            datos["_requiere_revision"] = True
-                            boleto.log_parseo = (
-                                boleto.log_parseo or ""
-                            ) + f" | Error IA: {str(e_ai)}. Usando datos parciales de Regex."
-                            boleto.save(update_fields=["log_parseo"])
-                        else:
-                            return self._finalize_error(
-                                boleto, f"Error en motor de IA de Fallback: {str(e_ai)}"
-                            )
-                    else:
-                        if isinstance(ai_result, dict) and "error" in ai_result:
-                            if (
-                                "datos_regex" in locals()
-                                and datos_regex
-                                and not datos_regex.get("error")
-                            ):
-                                datos = datos_regex
-                                datos["_requiere_revision"] = True
-                                boleto.log_parseo = (
-                                    boleto.log_parseo or ""
-                                ) + f" | Circuit Breaker/IA: {ai_result['error']}. Usando Regex."
-                                boleto.save(update_fields=["log_parseo"])
-                            else:
-                                return self._finalize_error(
-                                    boleto, f"IA no disponible: {ai_result['error']}"
-                                )
-                        elif ai_result and "error" not in ai_result:
-                            datos = ai_result
-                            logger.info(" IA de Fallback procesó el boleto exitosamente.")
-                            boleto.log_parseo = (
-                                boleto.log_parseo or ""
-                            ) + " | IA de Fallback exitosa."
-                            boleto.save(update_fields=["log_parseo"])
-                        else:
-                            error_detail = (
-                                ai_result.get("status_detail") if ai_result else "Unknown Error"
-                            )
-                            logger.warning(f" IA devolvió error o datos vacíos: {error_detail}")
-                            if (
-                                "datos_regex" in locals()
-                                and datos_regex
-                                and not datos_regex.get("error")
-                            ):
-                                datos = datos_regex
-                                datos["_requiere_revision"] = True
-                                boleto.log_parseo = (
-                                    boleto.log_parseo or ""
-                                ) + f" | IA Falló: {error_detail}. Usando datos parciales de Regex."
-                                boleto.save(update_fields=["log_parseo"])
-                            else:
-                                msg_error = f"Parseo Inteligente falló: {error_detail}"
-                                return self._finalize_error(boleto, msg_error)
-
-                # 4c. Guardar en caché Redis el resultado final (sea IA o Regex)
-                if datos and "error" not in datos:
-                    try:
-                        cache.set(cache_key, datos, timeout=86400)
-                        logger.info(
-                            f"💾 Resultado guardado en caché Redis (Hash: {texto_hash[:8]}...)"
-                        )
-                    except Exception as e_cache:
-                        logger.warning(f" Error guardando en caché: {e_cache}")
+                datos, error = self._parse_boleto(boleto, bypass_cache)
+                if error:
+                    return self._finalize_error(boleto, error)
 
             # 5. Normalización y Procesamiento (Multi-Pax Aware)
             if isinstance(datos, dict) and datos.get("is_multi_pax"):
@@ -671,6 +407,263 @@ class TicketParserService:
             )
             return self._process_single_ticket(boleto, datos_norm, forced_client_id)
 
+    def _parse_boleto(self, boleto, bypass_cache=False, persist_log=True):
+        """
+        Extracción + motor de parseo (cache, Regex/GDS local, IA de respaldo) de un boleto.
+
+        Retorna ``(datos, None)`` o ``(None, mensaje_de_error)``. Las entradas de log se
+        acumulan en ``boleto.log_parseo``; con ``persist_log=False`` no se escriben en la
+        base de datos (el lote las persiste con ``bulk_update``).
+        """
+        boleto_id = boleto.pk
+
+        def save_log():
+            if persist_log:
+                boleto.save(update_fields=["log_parseo"])
+
+        # 2. Extracción de Texto + HTML (una sola lectura del storage, memoizada por boleto)
+        extraction = ExtractionService.extract_boleto(boleto)
+        texto = extraction.text
+
+        if not texto:
+            return None, "Archivo vacío o ilegible."
+
+        html_text = extraction.html
+
+        # 3. 🔥 CACHÉ REDIS: Verificar si ya parseamos texto idéntico
+        texto_hash = extraction.fingerprint
+        cache_key = f"parseo_result_{texto_hash}"
+        datos = None
+
+        if not bypass_cache:
+            cached_result = cache.get(cache_key)
+            if cached_result:
+                logger.info(
+                    f"♻️ Resultado de parseo recuperado de caché Redis (Hash: {texto_hash[:8]}...)"
+                )
+                datos = cached_result
+
+        # 4. Motor de Parseo: Prioridad IA (Structured Outputs)
+        if datos is None:
+            path_pdf = None
+            try:
+                path_pdf = boleto.archivo_boleto.path
+            except Exception as e:
+                logger.warning(f"No se pudo obtener ruta fisica del archivo: {e}")
+
+            # ⚡ PASO 1: SI ES RE-EXTRACCIÓN IA (bypass_cache=True) -> IR DIRECTAMENTE A IA UNIVERSAL
+            if bypass_cache:
+                logger.info(
+                    f"🧠 [FORCED IA MODE] bypass_cache=True — Invocando directamente IA Universal (Gemini) para Boleto {boleto_id}..."
+                )
+                from apps.automation.parsers.ai_universal_parser import UniversalAIParser
+
+                datos = UniversalAIParser().parse(texto, pdf_path=path_pdf, bypass_cache=True)
+                boleto.log_parseo = (
+                    boleto.log_parseo or ""
+                ) + " | 🔥 Re-extracción IA (Structured Outputs) completada."
+                save_log()
+
+            # ⚡ PASO 2: SI NO ES RE-EXTRACCIÓN FORZADA -> INTENTAR REGEX/GDS LOCAL PRIMERO
+            if datos is None:
+                try:
+                    logger.info(f" Usando Motor Regex/GDS Local para Boleto {boleto_id}...")
+                    regex_start = time.time()
+                    datos_regex = extract_data_from_text(
+                        texto,
+                        html_text=html_text,
+                        pdf_path=path_pdf,
+                        bypass_cache=bypass_cache,
+                        fingerprint=texto_hash,
+                    )
+                    regex_duration = time.time() - regex_start
+                    logger.info(f" [PROFILING] Regex parse duration: {regex_duration:.2f}s")
+
+                    # Validación de Contrato de Calidad Mínimo para evitar pasar a la IA
+                    if datos_regex and not datos_regex.get("error"):
+                        if datos_regex.get("is_multi_pax"):
+                            tickets_list = datos_regex.get("tickets", [])
+                            has_all_pax = len(tickets_list) > 0 and all(
+                                t.get("NOMBRE_DEL_PASAJERO") or t.get("passenger_name")
+                                for t in tickets_list
+                            )
+                            has_pnr = all(
+                                t.get("CODIGO_RESERVA") or t.get("pnr") or t.get("codigo_reserva")
+                                for t in tickets_list
+                            )
+                            has_flights = all(
+                                len(
+                                    t.get("vuelos", [])
+                                    or t.get("flights", [])
+                                    or t.get("segmentos", [])
+                                )
+                                > 0
+                                for t in tickets_list
+                            )
+                            has_times = all(
+                                any(
+                                    f.get("hora_salida")
+                                    or f.get("hora_llegada")
+                                    or (
+                                        isinstance(f.get("departure"), dict)
+                                        and f.get("departure").get("time")
+                                    )
+                                    for f in (
+                                        t.get("vuelos", [])
+                                        or t.get("flights", [])
+                                        or t.get("segmentos", [])
+                                    )
+                                )
+                                for t in tickets_list
+                            )
+                            is_regex_reliable = (
+                                has_all_pax and has_pnr and has_flights and has_times
+                            )
+                        else:
+                            has_pax = bool(
+                                datos_regex.get("passenger_name")
+                                or datos_regex.get("nombre_pasajero")
+                            )
+                            has_pnr = bool(
+                                datos_regex.get("pnr")
+                                or datos_regex.get("codigo_reserva")
+                                or datos_regex.get("localizador")
+                            )
+                            flights_list = (
+                                datos_regex.get("segments", [])
+                                or datos_regex.get("segmentos", [])
+                                or datos_regex.get("flights", [])
+                                or datos_regex.get("vuelos", [])
+                            )
+                            has_flights = len(flights_list) > 0
+                            has_times = any(
+                                f.get("hora_salida")
+                                or f.get("hora_llegada")
+                                or (
+                                    isinstance(f.get("departure"), dict)
+                                    and f.get("departure").get("time")
+                                )
+                                for f in flights_list
+                            )
+                            is_regex_reliable = has_pax and has_pnr and has_flights and has_times
+
+                        if is_regex_reliable and not bypass_cache:
+                            datos = datos_regex
+                            logger.info(
+                                "✅ Extracción exitosa y completa con motor Regex/GDS local."
+                            )
+                            boleto.log_parseo = "Regex/GDS local exitoso (completo)."
+                            save_log()
+                        else:
+                            logger.info(
+                                "⚠️ Forzando motor IA (bypass_cache=True) o Regex incompleto."
+                            )
+                    else:
+                        logger.info(
+                            "⚠️ Regex local no pudo parsear el archivo. Se requiere fallback a IA."
+                        )
+                except Exception as e_reg:
+                    logger.error(f" Error en motor de Regex: {e_reg}")
+                    boleto.log_parseo = f"Error en Regex local: {str(e_reg)}. Intentando IA..."
+                    save_log()
+
+            # 🧠 PASO 2: FALLBACK A IA (Solo si el regex no fue suficiente o confiable)
+            if datos is None:
+                # Circuit breaker protege la llamada a IA
+                from apps.common.services.circuit_breaker import (
+                    ai_circuit_breaker,
+                )
+
+                def _ai_fallback_call():
+                    from apps.automation.parsers.ai_universal_parser import (
+                        UniversalAIParser,
+                    )
+
+                    logger.info(
+                        f"🧠 Usando IA Primaria (Structured Outputs) de Fallback para Boleto {boleto_id}..."
+                    )
+                    ai_start = time.time()
+                    datos_ia = UniversalAIParser().parse(
+                        texto, pdf_path=path_pdf, bypass_cache=bypass_cache
+                    )
+                    ai_duration = time.time() - ai_start
+                    logger.info(f"⏱️ [PROFILING] IA Engine parse duration: {ai_duration:.2f}s")
+                    return datos_ia
+
+                try:
+                    ai_result = ai_circuit_breaker.call(_ai_fallback_call)
+                except QuotaExhaustedException:
+                    logger.warning(f"🚨 Cuota de IA agotada para agencia {boleto.agencia.nombre}.")
+                    if "datos_regex" in locals() and datos_regex and not datos_regex.get("error"):
+                        datos = datos_regex
+                        datos["_requiere_revision"] = True
+                        boleto.log_parseo = (
+                            boleto.log_parseo or ""
+                        ) + " | Cuota IA agotada. Usando datos parciales de Regex."
+                        save_log()
+                    else:
+                        return None, "Cuota de IA agotada y sin datos de Regex."
+                except Exception as e_ai:
+                    logger.error(f" Fallo crítico en motor de IA: {e_ai}")
+                    if "datos_regex" in locals() and datos_regex and not datos_regex.get("error"):
+                        datos = datos_regex
+                        datos["_requiere_revision"] = True
+                        boleto.log_parseo = (
+                            boleto.log_parseo or ""
+                        ) + f" | Error IA: {str(e_ai)}. Usando datos parciales de Regex."
+                        save_log()
+                    else:
+                        return None, f"Error en motor de IA de Fallback: {str(e_ai)}"
+                else:
+                    if isinstance(ai_result, dict) and "error" in ai_result:
+                        if (
+                            "datos_regex" in locals()
+                            and datos_regex
+                            and not datos_regex.get("error")
+                        ):
+                            datos = datos_regex
+                            datos["_requiere_revision"] = True
+                            boleto.log_parseo = (
+                                boleto.log_parseo or ""
+                            ) + f" | Circuit Breaker/IA: {ai_result['error']}. Usando Regex."
+                            save_log()
+                        else:
+                            return None, f"IA no disponible: {ai_result['error']}"
+                    elif ai_result and "error" not in ai_result:
+                        datos = ai_result
+                        logger.info(" IA de Fallback procesó el boleto exitosamente.")
+                        boleto.log_parseo = (boleto.log_parseo or "") + " | IA de Fallback exitosa."
+                        save_log()
+                    else:
+                        error_detail = (
+                            ai_result.get("status_detail") if ai_result else "Unknown Error"
+                        )
+                        logger.warning(f" IA devolvió error o datos vacíos: {error_detail}")
+                        if (
+                            "datos_regex" in locals()
+                            and datos_regex
+                            and not datos_regex.get("error")
+                        ):
+                            datos = datos_regex
+                            datos["_requiere_revision"] = True
+                            boleto.log_parseo = (
+                                boleto.log_parseo or ""
+                            ) + f" | IA Falló: {error_detail}. Usando datos parciales de Regex."
+                            save_log()
+                        else:
+                            msg_error = f"Parseo Inteligente falló: {error_detail}"
+                            return None, msg_error
+
+            # 4c. Guardar en caché Redis el resultado final (sea IA o Regex)
+            if datos and "error" not in datos:
+                try:
+                    cache.set(cache_key, datos, timeout=86400)
+                    logger.info(f"💾 Resultado guardado en caché Redis (Hash: {texto_hash[:8]}...)")
+                except Exception as e_cache:
+                    logger.warning(f" Error guardando en caché: {e_cache}")
+
+        return datos, None
+
     def _process_single_ticket(self, boleto, data, forced_client_id, manual_only: bool = False):
         """
         Versión Optimizada: Separa operaciones lentas (PDF, AI) de la transacción DB principal.
@@ -865,12 +858,7 @@ class TicketParserService:
 
     def _extraer_texto(self, boleto):
         """Bridge for legacy code (ReviewBoletoView)"""
-        raw_file = ExtractionService.get_open_file(boleto)
-        try:
-            return ExtractionService.extract_text(raw_file, boleto.archivo_boleto.name)
-        finally:
-            if raw_file:
-                raw_file.close()
+        return ExtractionService.extract_boleto(boleto).text
 
 
 # -----------------------------------------------------
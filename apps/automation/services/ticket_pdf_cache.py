@@ -0,0 +1,194 @@
+"""
+Cache direccionada por contenido de los PDFs de boletos.
+
+Reprocesar un boleto, reenviarlo por WhatsApp/email o abrirlo en el portal volvía a
+renderizar el PDF con WeasyPrint aunque nada hubiera cambiado. La clave de cada PDF
+es un hash de:
+
+- los datos normalizados del boleto (más los campos del ``BoletoImportado`` que la
+  plantilla usa como respaldo),
+- la versión de la plantilla: hash de su código fuente + ``TICKET_PDF_TEMPLATE_VERSION``
+  (para cambios de estilos o código que no tocan el archivo),
+- la versión del branding de la agencia: hash de los campos que aparecen en el PDF.
+
+Un cambio en cualquiera de los tres produce otra clave, así que no hay que invalidar
+entradas a mano: las huérfanas expiran (``TICKET_PDF_CACHE_TIMEOUT``) y
+``cleanup_temporary_storage_files`` borra sus archivos.
+
+El PDF se guarda en ``default_storage`` y el índice (ruta + nombre de archivo) en la
+cache de Django, junto con los contadores de hits/misses compartidos entre workers.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from apps.automation.parsers.pdf_generation import TICKET_TEMPLATE
+
+logger = logging.getLogger(__name__)
+
+STORAGE_PREFIX = "pdf_cache/tickets/"
+STATS_KEYS = ("hits", "misses", "stores", "errors")
+
+# Campos de la agencia (y su branding) que se imprimen en el boleto.
+BRANDING_FIELDS = (
+    "pk",
+    "nombre",
+    "nombre_comercial",
+    "iata",
+    "email_principal",
+    "telefono_principal",
+    "direccion",
+    "instagram",
+    "color_primario",
+)
+BRANDING_V2_FIELDS = (
+    "color_kiu",
+    "color_amadeus",
+    "eslogan",
+    "pie_pagina",
+    "logo",
+    "logo_light",
+    "logo_dark",
+    "logo_telegram_url",
+)
+
+# Campos del boleto que la plantilla usa cuando faltan en los datos parseados.
+BOLETO_FIELDS = (
+    "numero_boleto",
+    "nombre_pasajero_completo",
+    "foid_pasajero",
+    "venta_asociada_id",
+)
+
+
+def _digest(payload) -> str:
+    raw = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@functools.lru_cache(maxsize=8)
+def _template_source_digest(template_name: str) -> str:
+    from django.template.loader import get_template
+
+    template = get_template(template_name)
+    source = getattr(getattr(template, "template", None), "source", "")
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+class TicketPdfCache:
+    """Cache de PDFs de boletos por hash de (datos, plantilla, branding)."""
+
+    @staticmethod
+    def enabled() -> bool:
+        """Indica si la cache está activa (``TICKET_PDF_CACHE_ENABLED``)."""
+        return getattr(settings, "TICKET_PDF_CACHE_ENABLED", True)
+
+    @classmethod
+    def template_version(cls, template_name: str = TICKET_TEMPLATE) -> str:
+        """Versión de la plantilla: hash de su fuente + ``TICKET_PDF_TEMPLATE_VERSION``."""
+        manual = getattr(settings, "TICKET_PDF_TEMPLATE_VERSION", "1")
+        return f"{manual}:{_template_source_digest(template_name)}"
+
+    @classmethod
+    def branding_version(cls, agencia) -> str:
+        """Hash de los datos de marca de la agencia que aparecen en el PDF."""
+        if agencia is None:
+            return "sin-agencia"
+        values = {field: getattr(agencia, field, None) for field in BRANDING_FIELDS}
+        branding = agencia._safe_branding() if hasattr(agencia, "_safe_branding") else None
+        for field in BRANDING_V2_FIELDS:
+            value = getattr(branding, field, None) if branding else None
+            # Archivos de imagen: basta con el nombre (al reemplazar el logo cambia).
+            values[field] = getattr(value, "name", value)
+        return _digest(values)[:16]
+
+    @classmethod
+    def key_for(cls, data: dict, agencia=None, boleto=None) -> str:
+        """Clave de contenido del PDF de un boleto."""
+        boleto_values = (
+            {field: getattr(boleto, field, None) for field in BOLETO_FIELDS} if boleto else None
+        )
+        return _digest(
+            {
+                "data": data,
+                "boleto": boleto_values,
+                "template": cls.template_version(),
+                "branding": cls.branding_version(agencia),
+            }
+        )
+
+    @classmethod
+    def get(cls, key: str) -> tuple[bytes, str] | None:
+        """``(pdf_bytes, fname)`` guardado para la clave, o ``None`` (miss)."""
+        entry = cache.get(cls._index_key(key))
+        if entry:
+            try:
+                with default_storage.open(entry["path"], "rb") as f:
+                    pdf_bytes = f.read()
+                cls._incr("hits")
+                return pdf_bytes, entry["fname"]
+            except FileNotFoundError:
+                # El archivo expiró en el storage antes que el índice.
+                cache.delete(cls._index_key(key))
+            except Exception as e:
+                logger.warning(f"Error leyendo PDF cacheado {entry.get('path')}: {e}")
+                cls._incr("errors")
+        cls._incr("misses")
+        return None
+
+    @classmethod
+    def put(cls, key: str, pdf_bytes: bytes, fname: str) -> None:
+        """Guarda el PDF bajo su clave de contenido."""
+        path = f"{STORAGE_PREFIX}{key}.pdf"
+        try:
+            if default_storage.exists(path):
+                # save() renombra si el archivo existe; la clave ya es única por contenido.
+                default_storage.delete(path)
+            default_storage.save(path, ContentFile(pdf_bytes))
+            cache.set(
+                cls._index_key(key),
+                {"path": path, "fname": fname},
+                getattr(settings, "TICKET_PDF_CACHE_TIMEOUT", 7 * 24 * 3600),
+            )
+            cls._incr("stores")
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el PDF {fname} en la cache: {e}")
+            cls._incr("errors")
+
+    @classmethod
+    def get_stats(cls) -> dict[str, float]:
+        """Contadores compartidos ``hits``, ``misses``, ``stores``, ``errors`` y ``hit_rate``."""
+        values = cache.get_many([cls._stats_key(name) for name in STATS_KEYS])
+        stats = {name: int(values.get(cls._stats_key(name), 0)) for name in STATS_KEYS}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        """Reinicia los contadores de hits/misses."""
+        cache.delete_many([cls._stats_key(name) for name in STATS_KEYS])
+
+    @staticmethod
+    def _index_key(key: str) -> str:
+        return f"ticket_pdf_cache:{key}"
+
+    @staticmethod
+    def _stats_key(name: str) -> str:
+        return f"ticket_pdf_cache:stats:{name}"
+
+    @classmethod
+    def _incr(cls, name: str) -> None:
+        key = cls._stats_key(name)
+        try:
+            cache.add(key, 0, None)
+            cache.incr(key)
+        except Exception as e:
+            logger.debug(f"No se pudo actualizar la métrica {key}: {e}")
@@ -14,6 +14,7 @@ import logging
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
 
+from apps.automation.parsers.airline_utils import AirlineCodeResolver
 from apps.automation.services.ticket_parser_service import TicketParserService
 from apps.bookings.models import BoletoImportado, Venta
 
@@ -161,6 +162,8 @@ class TicketReviewService:
             boleto.numero_boleto = fd.ticket_no
         if fd.carrier:
             boleto.aerolinea_emisora = fd.carrier
+        if fd.carrier or fd.ticket_no:
+            boleto.aerolinea_codigo = AirlineCodeResolver.resolve_boleto(boleto) or ""
         if fd.issue_date:
             from django.utils.dateparse import parse_date
 
@@ -5,6 +5,7 @@ import logging
 from django.db import transaction
 from django.utils import timezone
 
+from apps.automation.parsers.airline_utils import AirlineCodeResolver
 from apps.automation.services.sales_intelligence_service import SalesIntelligenceService
 
 # Modelos del Core
@@ -166,6 +167,7 @@ class VentaAutomationService:
             boleto_obj.total_boleto = monto_total
             boleto_obj.comision_agencia = comision_monto
             boleto_obj.datos_parseados = data
+            boleto_obj.aerolinea_codigo = AirlineCodeResolver.resolve_boleto(boleto_obj) or ""
             boleto_obj.estado_parseo = BoletoImportado.EstadoParseo.COMPLETADO
             boleto_obj.save()
 
@@ -2,6 +2,8 @@ import logging
 
 from celery import shared_task
 
+from apps.common.utils.celery_utils import tenant_task
+
 logger = logging.getLogger(__name__)
 
 
@@ -144,3 +146,25 @@ def health_check_providers_task(self):
     except Exception as e:
         logger.error("HealthCheck task failed: %s", e)
         raise self.retry(exc=e, countdown=300) from e
+
+
+@tenant_task(
+    name="apps.automation.tasks.procesar_lote_boletos_task",
+    time_limit=900,
+    soft_time_limit=840,
+    acks_late=True,
+)
+def procesar_lote_boletos_task(boleto_ids=None, limit=None, **kwargs):
+    """Reclama, parsea y persiste un lote de boletos de la agencia del contexto."""
+    from apps.automation.services.batch_ingestion import BatchTicketIngestionService
+    from core.api import get_current_agency
+
+    agencia = get_current_agency()
+    if agencia is None:
+        return "Lote de boletos omitido: se requiere agencia_id."
+
+    report = BatchTicketIngestionService.ingest(agencia, limit=limit, boleto_ids=boleto_ids)
+    return (
+        f"Lote: {report.claimed} reclamados, {report.parsed} parseados, "
+        f"{report.failed} a revisión ({report.throughput:.1f} boletos/s)."
+    )
@@ -0,0 +1,66 @@
+"""
+Completa BoletoImportado.aerolinea_codigo en boletos existentes.
+Usa el mismo AirlineCodeResolver que el parseo; los no identificados quedan en "".
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.automation.parsers.airline_utils import AirlineCodeResolver
+from apps.bookings.models import BoletoImportado
+
+
+class Command(BaseCommand):
+    """Command."""
+
+    help = "Resuelve y guarda el código IATA de aerolínea de los boletos importados."
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument(
+            "--todos",
+            action="store_true",
+            help="Recalcular también los boletos que ya tienen código.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Boletos por lote.")
+
+    def handle(self, *args, **options):
+        """handle."""
+        qs = BoletoImportado.all_objects.all()
+        if not options["todos"]:
+            qs = qs.filter(aerolinea_codigo__isnull=True)
+
+        AirlineCodeResolver.invalidate()
+        chunk_size = options["chunk_size"]
+        ultimo_pk, procesados, actualizados = 0, 0, 0
+        while True:
+            lote = list(
+                qs.filter(pk__gt=ultimo_pk)
+                .order_by("pk")
+                .values_list(
+                    "pk",
+                    "numero_boleto",
+                    "aerolinea_emisora",
+                    "datos_parseados",
+                    "aerolinea_codigo",
+                )[:chunk_size]
+            )
+            if not lote:
+                break
+            ultimo_pk = lote[-1][0]
+            procesados += len(lote)
+
+            cambios = []
+            for pk, numero, aerolinea, datos, actual in lote:
+                codigo = AirlineCodeResolver.resolve(numero, aerolinea, datos) or ""
+                if codigo != actual:
+                    cambios.append(BoletoImportado(pk=pk, aerolinea_codigo=codigo))
+            # bulk_update no dispara save() ni señales (no re-versiona datos_parseados).
+            BoletoImportado.all_objects.bulk_update(cambios, ["aerolinea_codigo"])
+            actualizados += len(cambios)
+            self.stdout.write(f"  ... {procesados} boletos revisados")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfill finalizado: {actualizados}/{procesados} boletos actualizados."
+            )
+        )
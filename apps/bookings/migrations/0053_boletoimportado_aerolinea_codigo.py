@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bookings", "0052_boletoimportado_datos_parseados_actualizado_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="boletoimportado",
+            name="aerolinea_codigo",
+            field=models.CharField(
+                blank=True,
+                help_text="Resuelto al parsear (placa, nombre o vuelo). Vacío si no se identificó.",
+                max_length=3,
+                null=True,
+                verbose_name="Código IATA Aerolínea",
+            ),
+        ),
+    ]
@@ -114,6 +114,13 @@ class BoletoImportado(AgenciaMixin, SoftDeleteModel, models.Model):
     aerolinea_emisora = models.CharField(
         _("Aerolínea Emisora"), max_length=200, blank=True, null=True
     )
+    aerolinea_codigo = models.CharField(
+        _("Código IATA Aerolínea"),
+        max_length=3,
+        blank=True,
+        null=True,
+        help_text=_("Resuelto al parsear (placa, nombre o vuelo). Vacío si no se identificó."),
+    )
     direccion_aerolinea = models.TextField(_("Dirección Aerolínea"), blank=True, null=True)
     agente_emisor = models.CharField(_("Agente Emisor"), max_length=200, blank=True, null=True)
     foid_pasajero = models.CharField(
@@ -347,6 +354,12 @@ class BoletoImportado(AgenciaMixin, SoftDeleteModel, models.Model):
             except BoletoImportado.DoesNotExist:
                 pass
 
+        # Altas fuera del parseo (correo, carga manual): resolver el código IATA una vez.
+        if self.aerolinea_codigo is None and (self.numero_boleto or self.aerolinea_emisora):
+            from apps.automation.parsers.airline_utils import AirlineCodeResolver
+
+            self.aerolinea_codigo = AirlineCodeResolver.resolve_boleto(self) or ""
+
         from decimal import Decimal
 
         if self.tarifa_base is not None and not self.total_boleto:
@@ -0,0 +1,205 @@
+"""
+Coalescencia de recálculos financieros de ventas.
+
+Cada ``ItemVenta``/``FeeVenta``/``PagoVenta`` guardado o borrado marca su venta como
+"sucia" en vez de programar su propio recálculo. Las marcas de una misma transacción
+se acumulan en un lote con un único ``on_commit``: al confirmar, cada venta se
+recalcula una sola vez (``FinanceService.recalculate_sale_finances``, una consulta
+agregada) y se audita una sola vez. Armar una venta de 9 pasajeros con varios
+segmentos pasa de N recálculos + N auditorías a uno de cada uno.
+
+Con ``SALE_RECALC_DEBOUNCE_SECONDS`` > 0 el lote no se recalcula en línea: se
+programa ``recalcular_ventas_coalescidas_task`` por agencia con ese ``countdown``,
+y una venta que ya tiene un recálculo pendiente no se vuelve a encolar. Útil cuando
+las filas llegan en transacciones separadas (API, importaciones).
+
+Contadores compartidos en cache: ``recalc_requested``/``recalc_executed`` y
+``audit_requested``/``audit_executed``; ``get_stats()`` incluye ``avoided``.
+"""
+
+import logging
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+STATS_KEYS = ("recalc_requested", "recalc_executed", "audit_requested", "audit_executed")
+
+_local = threading.local()
+
+
+class _Lote:
+    """Ventas pendientes de una transacción."""
+
+    def __init__(self):
+        """__init__."""
+        self.recalc: dict[int, int | None] = {}  # venta_id -> agencia_id
+        self.audit: set[int] = set()
+        self.recalc_requested = 0
+        self.audit_requested = 0
+        self.flushed = False
+        self.callback = None
+
+
+class SaleRecalcCoalescer:
+    """Agrupa los recálculos y auditorías de ventas por transacción."""
+
+    @classmethod
+    def mark(
+        cls, venta_id: int, agencia_id: int | None = None, recalc: bool = True, audit: bool = False
+    ) -> None:
+        """Marca ``venta_id`` para recálculo (y/o auditoría) al confirmar la transacción."""
+        cls._add(venta_id, agencia_id, recalc=recalc, audit=audit, counted=True)
+
+    @classmethod
+    def run(cls, venta_ids, audit_ids=()) -> None:
+        """
+        Recalcula ``venta_ids`` y audita ``audit_ids``, cada venta una vez.
+
+        Los recálculos guardan la venta, y su ``post_save`` la marca para auditoría.
+        Todo se hace dentro de una transacción, de modo que esas marcas (y las
+        auditorías sin recálculo) forman un nuevo lote que se ejecuta al confirmar.
+        """
+        from apps.bookings.services.venta_service import VentaService
+
+        venta_ids = sorted(set(venta_ids))
+        audit_only = set(audit_ids) - set(venta_ids)
+        if venta_ids:
+            with transaction.atomic():
+                for venta_id in venta_ids:
+                    # Savepoint por venta: un error no aborta el resto del lote.
+                    with transaction.atomic():
+                        VentaService.recalculate_finances(venta_id)
+                for venta_id in audit_only:
+                    cls._add(venta_id, None, recalc=False, audit=True, counted=False)
+            cls._incr("recalc_executed", len(venta_ids))
+            return
+
+        from apps.bookings.signals import _auditar_venta_sync
+
+        for venta_id in sorted(audit_only):
+            _auditar_venta_sync(venta_id)
+        cls._incr("audit_executed", len(audit_only))
+
+    @classmethod
+    def run_deferred(cls, venta_ids) -> None:
+        """Punto de entrada de la tarea Celery: libera las marcas pendientes y recalcula."""
+        cache.delete_many([cls._pending_key(venta_id) for venta_id in venta_ids])
+        cls.run(venta_ids)
+
+    @classmethod
+    def get_stats(cls) -> dict[str, int]:
+        """Contadores compartidos y ``avoided`` (recálculos + auditorías evitados)."""
+        values = cache.get_many([cls._stats_key(name) for name in STATS_KEYS])
+        stats = {name: int(values.get(cls._stats_key(name), 0)) for name in STATS_KEYS}
+        stats["avoided"] = max(
+            0,
+            stats["recalc_requested"]
+            - stats["recalc_executed"]
+            + stats["audit_requested"]
+            - stats["audit_executed"],
+        )
+        return stats
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        """Reinicia los contadores."""
+        cache.delete_many([cls._stats_key(name) for name in STATS_KEYS])
+
+    @classmethod
+    def _add(cls, venta_id, agencia_id, recalc, audit, counted) -> None:
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            # Autocommit: no hay nada que agrupar, se ejecuta al momento.
+            lote = _Lote()
+            cls._put(lote, venta_id, agencia_id, recalc, audit, counted)
+            cls._flush(lote)
+            return
+
+        lote = getattr(_local, "lote", None)
+        if lote is None or not cls._pending(connection, lote):
+            lote = _Lote()
+            lote.callback = partial(cls._flush, lote)
+            _local.lote = lote
+            transaction.on_commit(lote.callback)
+        cls._put(lote, venta_id, agencia_id, recalc, audit, counted)
+
+    @staticmethod
+    def _put(lote, venta_id, agencia_id, recalc, audit, counted) -> None:
+        if recalc:
+            lote.recalc.setdefault(venta_id, agencia_id)
+            lote.recalc_requested += int(counted)
+        if audit:
+            lote.audit.add(venta_id)
+            lote.audit_requested += int(counted)
+
+    @staticmethod
+    def _pending(connection, lote) -> bool:
+        """El ``on_commit`` del lote sigue registrado (no se ejecutó ni se revirtió)."""
+        return not lote.flushed and any(
+            entry[1] is lote.callback for entry in connection.run_on_commit
+        )
+
+    @classmethod
+    def _flush(cls, lote) -> None:
+        lote.flushed = True
+        if getattr(_local, "lote", None) is lote:
+            _local.lote = None
+        cls._incr("recalc_requested", lote.recalc_requested)
+        cls._incr("audit_requested", lote.audit_requested)
+
+        debounce = getattr(settings, "SALE_RECALC_DEBOUNCE_SECONDS", 0)
+        if debounce and lote.recalc:
+            cls._defer(lote.recalc, debounce)
+            audit_only = lote.audit - set(lote.recalc)
+            if audit_only:
+                cls.run((), audit_only)
+            return
+        try:
+            cls.run(lote.recalc, lote.audit)
+        except Exception as e:
+            logger.error(f"Error recalculando ventas {sorted(lote.recalc)}: {e}", exc_info=True)
+
+    @classmethod
+    def _defer(cls, recalc: dict[int, int | None], countdown: int) -> None:
+        from apps.bookings.tasks import recalcular_ventas_coalescidas_task
+
+        por_agencia: dict[int | None, list[int]] = {}
+        for venta_id, agencia_id in recalc.items():
+            # Ya hay un recálculo programado para esta venta: se lo aprovecha.
+            if cache.add(cls._pending_key(venta_id), 1, countdown + 300):
+                por_agencia.setdefault(agencia_id, []).append(venta_id)
+        for agencia_id, venta_ids in por_agencia.items():
+            try:
+                recalcular_ventas_coalescidas_task.apply_async(
+                    args=[sorted(venta_ids)],
+                    kwargs={"agencia_id": agencia_id},
+                    countdown=countdown,
+                )
+            except Exception as e:
+                logger.error(f"No se pudo programar el recálculo de {venta_ids}: {e}")
+                cache.delete_many([cls._pending_key(venta_id) for venta_id in venta_ids])
+                cls.run(venta_ids)
+
+    @staticmethod
+    def _pending_key(venta_id: int) -> str:
+        return f"sale_recalc:pending:{venta_id}"
+
+    @staticmethod
+    def _stats_key(name: str) -> str:
+        return f"sale_recalc:stats:{name}"
+
+    @classmethod
+    def _incr(cls, name: str, delta: int) -> None:
+        if not delta:
+            return
+        key = cls._stats_key(name)
+        try:
+            cache.add(key, 0, None)
+            cache.incr(key, delta)
+        except Exception:
+            logger.debug("No se pudo incrementar %s", key)
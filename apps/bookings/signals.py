@@ -32,14 +32,14 @@ def signal_fee_post_save_delete(sender, instance, **kwargs):
         return
 
     if instance.venta_id:
-        _on_commit(_recalcular_sync, instance.venta_id)
+        _marcar_recalculo(instance)
 
 
-def _recalcular_sync(venta_id):
-    """_recalcular_sync."""
-    from apps.bookings.services.venta_service import VentaService
+def _marcar_recalculo(instance, audit=False):
+    """Marca la venta para un único recálculo (y auditoría) al confirmar la transacción."""
+    from apps.bookings.services.recalc_coalescer import SaleRecalcCoalescer
 
-    VentaService.recalculate_finances(venta_id)
+    SaleRecalcCoalescer.mark(instance.venta_id, instance.agencia_id, audit=audit)
 
 
 @receiver([post_save, post_delete], sender=ItemVenta)
@@ -52,8 +52,7 @@ def signal_item_post_save_delete(sender, instance, **kwargs):
         return
 
     if instance.venta_id:
-        _on_commit(_recalcular_sync, instance.venta_id)
-        _on_commit(_auditar_venta_sync, instance.venta_id)
+        _marcar_recalculo(instance, audit=True)
 
 
 @receiver(post_save, sender=BoletoImportado)
@@ -81,7 +80,7 @@ def signal_pago_post_save(sender, instance, created, **kwargs):
 
     if instance.venta_id:
         pago_id, agencia_id = instance.pk, instance.agencia_id
-        _on_commit(_recalcular_sync, instance.venta_id)
+        _marcar_recalculo(instance)
         _on_commit(_evaluar_loyalty_sync, instance.pk)
         _on_commit(_emitir_pago_evento, pago_id, "save", agencia_id)
         if created:
@@ -98,7 +97,7 @@ def signal_pago_post_delete(sender, instance, **kwargs):
         return
 
     if instance.venta_id:
-        _on_commit(_recalcular_sync, instance.venta_id)
+        _marcar_recalculo(instance)
         _on_commit(_evaluar_loyalty_sync, instance.pk)
         _on_commit(_emitir_pago_evento, instance.pk, "delete", instance.agencia_id)
 
@@ -137,7 +136,10 @@ def venta_post_save_dispatcher(sender, instance, created, **kwargs):
     estado_anterior = getattr(instance, "_estado_anterior", None)
 
     _on_commit(_disparar_post_save_actions, instance.pk, created, estado_anterior)
-    _on_commit(_auditar_venta_sync, instance.pk)
+
+    from apps.bookings.services.recalc_coalescer import SaleRecalcCoalescer
+
+    SaleRecalcCoalescer.mark(instance.pk, instance.agencia_id, recalc=False, audit=True)
 
 
 @receiver([post_save, post_delete], sender=CircuitoDia)
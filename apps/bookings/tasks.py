@@ -911,3 +911,12 @@ def dispatch_booking_message_task(
         except Exception as exc:
             logger.error(f"❌ Error despachando mensaje {message_id}: {exc}")
             raise self.retry(exc=exc) from exc
+
+
+@tenant_task(queue="celery", time_limit=300, soft_time_limit=270)
+def recalcular_ventas_coalescidas_task(venta_ids, **kwargs):
+    """Recálculo diferido de ventas agrupadas por ``SaleRecalcCoalescer``."""
+    from apps.bookings.services.recalc_coalescer import SaleRecalcCoalescer
+
+    SaleRecalcCoalescer.run_deferred(venta_ids)
+    return len(venta_ids)
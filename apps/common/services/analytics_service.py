@@ -1,8 +1,9 @@
-import io
+import csv
 import logging
+import tempfile
 from typing import TYPE_CHECKING
 
-import pandas as pd
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models import Count, Q, Sum
 from django.db.models.functions import TruncMonth
@@ -27,6 +28,43 @@ def __getattr__(name):
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+DETALLE_BOLETOS_COLUMNAS = [
+    "Fecha Emisión",
+    "Número Boleto",
+    "PNR",
+    "Pasajero",
+    "Aerolínea",
+    "Monto Neto",
+    "Comisión",
+    "Total",
+    "Estado",
+]
+
+_DETALLE_BOLETOS_CAMPOS = (
+    "fecha_emision_boleto",
+    "numero_boleto",
+    "localizador_pnr",
+    "nombre_pasajero_procesado",
+    "nombre_pasajero_completo",
+    "aerolinea_emisora",
+    "tarifa_base",
+    "comision_agencia",
+    "total_boleto",
+    "venta_asociada_id",
+)
+
+
+class _Echo:
+    """Pseudo-buffer para ``csv.writer``: devuelve la línea en vez de almacenarla."""
+
+    def write(self, value):
+        """write."""
+        return value
+
+
+def _como_registros(filas):
+    return [dict(zip(DETALLE_BOLETOS_COLUMNAS, fila, strict=True)) for fila in filas]
+
 
 class AnalyticsService:
     """AnalyticsService."""
@@ -160,10 +198,8 @@ class AnalyticsService:
         )
 
     @staticmethod
-    def get_reporte_comisiones_boletos(agencia, fecha_inicio=None, fecha_fin=None, aerolinea=None):
-        """
-        Genera un reporte detallado de producción y comisiones por boleto.
-        """
+    def _boletos_reporte_qs(agencia, fecha_inicio=None, fecha_fin=None, aerolinea=None):
+        """Boletos válidos del reporte (sin borrados ni errores de parseo) según los filtros."""
         from django.apps import apps
 
         BoletoImportado = apps.get_model("bookings", "BoletoImportado")
@@ -179,7 +215,11 @@ class AnalyticsService:
             qs = qs.filter(fecha_emision_boleto__lte=fecha_fin)
         if aerolinea:
             qs = qs.filter(aerolinea_emisora=aerolinea)
+        return qs
 
+    @staticmethod
+    def _resumen_boletos(qs):
+        """Totales generales y desglose por aerolínea (dos consultas agregadas)."""
         # Totales Generales
         totales = qs.aggregate(
             total_boletos=Count("id_boleto_importado"),
@@ -200,112 +240,6 @@ class AnalyticsService:
             .order_by("-total_comisiones")
         )
 
-        # Lista Detallada (últimos 100 para la tabla)
-        detalles = []
-        for b in qs.order_by("-fecha_emision_boleto")[:100]:
-            # Intentar extraer código de aerolínea para el logo
-            aero_codigo = None
-            if b.numero_boleto and len(b.numero_boleto) >= 3:
-                prefijos = {
-                    "782": "QL",
-                    "067": "ES",
-                    "052": "ES",
-                    "742": "9V",
-                    "765": "WW",
-                    "134": "AV",
-                    "230": "CM",
-                    "045": "LA",
-                    "001": "AA",
-                    "057": "AF",
-                    "074": "KL",
-                    "239": "AT",
-                    "075": "IB",
-                    "996": "UX",
-                    "967": "UX",
-                    "235": "TK",
-                    "020": "LH",
-                    "080": "TP",
-                    "850": "V0",
-                    "880": "T9",
-                    "840": "WW",
-                    "920": "5R",
-                    "921": "5R",
-                    "482": "DM",
-                }
-                aero_codigo = prefijos.get(str(b.numero_boleto)[:3])
-
-            if not aero_codigo and b.aerolinea_emisora:
-                name_upper = b.aerolinea_emisora.upper()
-                if "AVIOR" in name_upper or "AVIONES DE ORIENTE" in name_upper:
-                    aero_codigo = "9V"
-                elif (
-                    "RUTAS AEREAS DE VENEZUELA" in name_upper
-                    or "VENEZOLANA" in name_upper
-                    or "RAVSA" in name_upper
-                    or "RAV" in name_upper
-                ):
-                    aero_codigo = "WW"
-                elif "RUTACA" in name_upper or "RUTAS AEREAS C.A" in name_upper:
-                    aero_codigo = "5R"
-                elif "LASER" in name_upper:
-                    aero_codigo = "QL"
-                elif "ESTELAR" in name_upper:
-                    aero_codigo = "ES"
-                elif "TURPIAL" in name_upper:
-                    aero_codigo = "T9"
-                elif "AVIANCA" in name_upper or "AEROVIAS DEL CONTINENTE" in name_upper:
-                    aero_codigo = "AV"
-                elif "COPA" in name_upper:
-                    aero_codigo = "CM"
-                elif "IBERIA" in name_upper:
-                    aero_codigo = "IB"
-                elif "EUROPA" in name_upper:
-                    aero_codigo = "UX"
-                elif "AMERICAN" in name_upper:
-                    aero_codigo = "AA"
-                elif "LATAM" in name_upper or "LAN" in name_upper:
-                    aero_codigo = "LA"
-                elif "TURKISH" in name_upper:
-                    aero_codigo = "TK"
-                elif "CONVIASA" in name_upper:
-                    aero_codigo = "V0"
-                elif "GLOBAL AIR" in name_upper:
-                    aero_codigo = "DM"
-
-            if not aero_codigo and b.datos_parseados:
-                try:
-                    import json
-
-                    datos = b.datos_parseados
-                    if isinstance(datos, str):
-                        datos = json.loads(datos)
-                    segmentos = datos.get("segmentos", [])
-                    if segmentos and isinstance(segmentos, list) and "vuelo" in segmentos[0]:
-                        import re
-
-                        match = re.match(r"^([A-Z0-9]{2,3})", str(segmentos[0]["vuelo"]))
-                        if match:
-                            aero_codigo = match.group(1)
-                except Exception as e:
-                    logger.debug(
-                        f"No se pudo extraer codigo IATA desde segmentos para boleto {b.pk}: {e}"
-                    )
-
-            detalles.append(
-                {
-                    "fecha_emision": b.fecha_emision_boleto,
-                    "numero_boleto": b.numero_boleto,
-                    "pnr": b.localizador_pnr,
-                    "pasajero_nombre": b.nombre_pasajero_procesado or b.nombre_pasajero_completo,
-                    "aerolinea_nombre": b.aerolinea_emisora or "Sin Aerolínea",
-                    "aerolinea_codigo": aero_codigo or "XX",
-                    "monto_neto": float(b.tarifa_base or 0),
-                    "comision": float(b.comision_agencia or 0),
-                    "total": float(b.total_boleto or 0),
-                    "estado": "Auditado" if b.venta_asociada else "Pendiente",
-                }
-            )
-
         return {
             "totales": {
                 "total_boletos": totales["total_boletos"] or 0,
@@ -323,104 +257,187 @@ class AnalyticsService:
                 }
                 for item in por_aerolinea
             ],
+        }
+
+    @staticmethod
+    def get_reporte_comisiones_boletos(agencia, fecha_inicio=None, fecha_fin=None, aerolinea=None):
+        """
+        Genera un reporte detallado de producción y comisiones por boleto.
+        """
+        qs = AnalyticsService._boletos_reporte_qs(agencia, fecha_inicio, fecha_fin, aerolinea)
+        resumen = AnalyticsService._resumen_boletos(qs)
+
+        # Lista Detallada (últimos 100 para la tabla)
+        # aerolinea_codigo se resuelve al parsear (AirlineCodeResolver); "XX" si no se identificó.
+        detalles = [
+            {
+                "fecha_emision": b["fecha_emision_boleto"],
+                "numero_boleto": b["numero_boleto"],
+                "pnr": b["localizador_pnr"],
+                "pasajero_nombre": b["nombre_pasajero_procesado"] or b["nombre_pasajero_completo"],
+                "aerolinea_nombre": b["aerolinea_emisora"] or "Sin Aerolínea",
+                "aerolinea_codigo": b["aerolinea_codigo"] or "XX",
+                "monto_neto": float(b["tarifa_base"] or 0),
+                "comision": float(b["comision_agencia"] or 0),
+                "total": float(b["total_boleto"] or 0),
+                "estado": "Auditado" if b["venta_asociada_id"] else "Pendiente",
+            }
+            for b in qs.order_by("-fecha_emision_boleto").values(
+                *_DETALLE_BOLETOS_CAMPOS, "aerolinea_codigo"
+            )[:100]
+        ]
+
+        return {
+            **resumen,
             "boletos": detalles,
         }
 
+    @staticmethod
+    def iter_detalle_boletos(
+        agencia, fecha_inicio=None, fecha_fin=None, aerolinea=None, chunk_size=None
+    ):
+        """
+        Genera las filas de "Detalle Boletos" (en el orden de ``DETALLE_BOLETOS_COLUMNAS``).
+
+        Lee tuplas con ``values_list().iterator(chunk_size)``: no instancia modelos ni
+        acumula el listado, así que la memoria no crece con el número de boletos.
+        """
+        chunk_size = chunk_size or getattr(settings, "REPORT_EXPORT_CHUNK_SIZE", 2000)
+        qs = AnalyticsService._boletos_reporte_qs(agencia, fecha_inicio, fecha_fin, aerolinea)
+        filas = qs.order_by("-fecha_emision_boleto").values_list(*_DETALLE_BOLETOS_CAMPOS)
+
+        for (
+            fecha,
+            numero,
+            pnr,
+            pasajero_procesado,
+            pasajero_completo,
+            aerolinea_emisora,
+            neto,
+            comision,
+            total,
+            venta_id,
+        ) in filas.iterator(chunk_size=chunk_size):
+            yield (
+                fecha,
+                numero,
+                pnr,
+                pasajero_procesado or pasajero_completo,
+                aerolinea_emisora or "Sin Aerolínea",
+                float(neto or 0),
+                float(comision or 0),
+                float(total or 0),
+                "Auditado" if venta_id else "Pendiente",
+            )
+
     @staticmethod
     def exportar_reporte_boletos_excel(agencia, fecha_inicio=None, fecha_fin=None, aerolinea=None):
         """
         Exporta el reporte de boletos a un archivo Excel con múltiples pestañas.
+
+        Usa un libro ``write_only`` de openpyxl (las filas se vuelcan a disco a medida
+        que se agregan) sobre un ``SpooledTemporaryFile``: los reportes chicos quedan en
+        memoria y los grandes pasan a disco. Retorna el archivo posicionado al inicio.
         """
-        from django.apps import apps
+        from openpyxl import Workbook
+
+        qs = AnalyticsService._boletos_reporte_qs(agencia, fecha_inicio, fecha_fin, aerolinea)
+        reporte = AnalyticsService._resumen_boletos(qs)
+        totales = reporte["totales"]
+
+        wb = Workbook(write_only=True)
+
+        # 1. Resumen General
+        ws = wb.create_sheet("Resumen")
+        ws.append(["Métrica", "Valor"])
+        ws.append(["Total Boletos", totales["total_boletos"]])
+        ws.append(["Total Ventas", totales["total_ventas"]])
+        ws.append(["Total Neto", totales["total_neto"]])
+        ws.append(["Total Comisiones", totales["total_comisiones"]])
+        ws.append(["Total Pendiente", totales["total_pendiente"]])
+
+        # 2. Por Aerolínea
+        if reporte["por_aerolinea"]:
+            ws = wb.create_sheet("Por Aerolínea")
+            ws.append(list(reporte["por_aerolinea"][0]))
+            for item in reporte["por_aerolinea"]:
+                ws.append(list(item.values()))
+
+        # 3. Listado Detallado (todos los boletos, no solo los últimos 100)
+        ws = None
+        for fila in AnalyticsService.iter_detalle_boletos(
+            agencia, fecha_inicio, fecha_fin, aerolinea
+        ):
+            if ws is None:
+                ws = wb.create_sheet("Detalle Boletos")
+                ws.append(DETALLE_BOLETOS_COLUMNAS)
+            ws.append(fila)
+
+        output = AnalyticsService._archivo_exportacion()
+        wb.save(output)
+        output.seek(0)
+        return output
 
-        BoletoImportado = apps.get_model("bookings", "BoletoImportado")
-        reporte = AnalyticsService.get_reporte_comisiones_boletos(
+    @staticmethod
+    def exportar_reporte_boletos_csv(agencia, fecha_inicio=None, fecha_fin=None, aerolinea=None):
+        """
+        Genera el detalle de boletos como CSV línea por línea (para ``StreamingHttpResponse``).
+
+        Incluye BOM para que Excel reconozca UTF-8. El resumen y el desglose por
+        aerolínea sólo van en el Excel.
+        """
+        writer = csv.writer(_Echo())
+        yield "\ufeff"
+        yield writer.writerow(DETALLE_BOLETOS_COLUMNAS)
+        for fila in AnalyticsService.iter_detalle_boletos(
             agencia, fecha_inicio, fecha_fin, aerolinea
-        )
+        ):
+            yield writer.writerow(fila)
 
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            # 1. Resumen General
-            resumen_data = {
-                "Métrica": [
-                    "Total Boletos",
-                    "Total Ventas",
-                    "Total Neto",
-                    "Total Comisiones",
-                    "Total Pendiente",
-                ],
-                "Valor": [
-                    reporte["totales"]["total_boletos"],
-                    reporte["totales"]["total_ventas"],
-                    reporte["totales"]["total_neto"],
-                    reporte["totales"]["total_comisiones"],
-                    reporte["totales"]["total_pendiente"],
-                ],
-            }
-            pd.DataFrame(resumen_data).to_excel(writer, sheet_name="Resumen", index=False)
-
-            # 2. Por Aerolínea
-            if reporte["por_aerolinea"]:
-                pd.DataFrame(reporte["por_aerolinea"]).to_excel(
-                    writer, sheet_name="Por Aerolínea", index=False
-                )
-
-            # 3. Listado Detallado (Aquí exportamos todos, no solo los últimos 100)
-            # Re-calculamos el QS para tener todos los datos sin el slice de 100
-            qs = BoletoImportado.all_objects.filter(is_deleted=False).exclude(
-                estado_parseo=BoletoImportado.EstadoParseo.ERROR_PARSEO
-            )
-            if agencia is not None:
-                qs = qs.filter(agencia=agencia)
-            if fecha_inicio:
-                qs = qs.filter(fecha_emision_boleto__gte=fecha_inicio)
-            if fecha_fin:
-                qs = qs.filter(fecha_emision_boleto__lte=fecha_fin)
-            if aerolinea:
-                qs = qs.filter(aerolinea_emisora=aerolinea)
-
-            detalles_full = []
-            for b in qs.order_by("-fecha_emision_boleto"):
-                detalles_full.append(
-                    {
-                        "Fecha Emisión": b.fecha_emision_boleto,
-                        "Número Boleto": b.numero_boleto,
-                        "PNR": b.localizador_pnr,
-                        "Pasajero": b.nombre_pasajero_procesado or b.nombre_pasajero_completo,
-                        "Aerolínea": b.aerolinea_emisora or "Sin Aerolínea",
-                        "Monto Neto": float(b.tarifa_base or 0),
-                        "Comisión": float(b.comision_agencia or 0),
-                        "Total": float(b.total_boleto or 0),
-                        "Estado": "Auditado" if b.venta_asociada else "Pendiente",
-                    }
-                )
-
-            if detalles_full:
-                pd.DataFrame(detalles_full).to_excel(
-                    writer, sheet_name="Detalle Boletos", index=False
-                )
+    @staticmethod
+    def exportar_reporte_boletos_parquet(
+        agencia, fecha_inicio=None, fecha_fin=None, aerolinea=None
+    ):
+        """
+        Exporta el detalle de boletos a Parquet, un row group por lote de filas.
 
+        Requiere ``pyarrow`` (dependencia opcional): si no está instalado se propaga
+        ``ImportError`` para que el llamador ofrezca CSV.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        chunk_size = getattr(settings, "REPORT_EXPORT_CHUNK_SIZE", 2000)
+        tipos = [pa.date32()] + [pa.string()] * 4 + [pa.float64()] * 3 + [pa.string()]
+        schema = pa.schema(list(zip(DETALLE_BOLETOS_COLUMNAS, tipos, strict=True)))
+
+        output = AnalyticsService._archivo_exportacion()
+        with pq.ParquetWriter(output, schema) as writer:
+            lote = []
+            for fila in AnalyticsService.iter_detalle_boletos(
+                agencia, fecha_inicio, fecha_fin, aerolinea, chunk_size=chunk_size
+            ):
+                lote.append(fila)
+                if len(lote) >= chunk_size:
+                    writer.write_table(pa.Table.from_pylist(_como_registros(lote), schema))
+                    lote = []
+            if lote:
+                writer.write_table(pa.Table.from_pylist(_como_registros(lote), schema))
         output.seek(0)
         return output
 
+    @staticmethod
+    def _archivo_exportacion():
+        return tempfile.SpooledTemporaryFile(
+            max_size=getattr(settings, "REPORT_EXPORT_SPOOL_MAX_BYTES", 5 * 1024 * 1024)
+        )
+
     @staticmethod
     def get_stats_graficas_boletos(agencia, fecha_inicio=None, fecha_fin=None):
         """
         Retorna datos estructurados para visualización en gráficas.
         """
-        from django.apps import apps
-
-        BoletoImportado = apps.get_model("bookings", "BoletoImportado")
-        qs = BoletoImportado.all_objects.filter(is_deleted=False).exclude(
-            estado_parseo=BoletoImportado.EstadoParseo.ERROR_PARSEO
-        )
-        if agencia is not None:
-            qs = qs.filter(agencia=agencia)
-
-        if fecha_inicio:
-            qs = qs.filter(fecha_emision_boleto__gte=fecha_inicio)
-        if fecha_fin:
-            qs = qs.filter(fecha_emision_boleto__lte=fecha_fin)
+        qs = AnalyticsService._boletos_reporte_qs(agencia, fecha_inicio, fecha_fin)
 
         # 1. Top 5 Aerolíneas (Pie/Doughnut Chart)
         top_aero = (
@@ -1,23 +1,167 @@
+"""
+Renderizado HTML → PDF con WeasyPrint.
+
+Cada proceso mantiene un renderizador "caliente":
+
+- Una única ``FontConfiguration``: las fuentes ``@font-face`` se descargan, decodifican
+  y registran en Fontconfig una sola vez (WeasyPrint las deduplica por descriptor).
+- Un ``URLFetcher`` con cache en memoria para recursos http(s): la hoja de Google Fonts
+  de las plantillas y sus archivos de fuente ya no se piden por red en cada documento.
+- Las hojas compartidas de ``PDF_SHARED_STYLESHEETS`` se parsean una vez como ``CSS``.
+
+``render_many`` reparte lotes (facturación de fin de mes, emisiones multi-pasajero) en
+un pool de procesos persistente cuyos workers se calientan al arrancar, y reporta la
+latencia de cada documento.
+"""
+
+import atexit
+import functools
 import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# Recursos http(s) cacheados por proceso (hojas de fuentes, fuentes, imágenes remotas).
+URL_CACHE_MAX_ITEMS = 64
+
+
+@dataclass
+class RenderResult:
+    """PDF (o error) de un documento de ``render_many`` y su latencia de renderizado."""
+
+    pdf: bytes | None = None
+    elapsed_ms: float = 0.0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        """Indica si el documento se renderizó."""
+        return self.error is None and self.pdf is not None
+
+
+@functools.lru_cache(maxsize=1)
+def _url_fetcher():
+    """``URLFetcher`` del proceso, con cache en memoria de los recursos http(s)."""
+    from weasyprint.urls import URLFetcher, URLFetcherResponse
+
+    class CachingURLFetcher(URLFetcher):
+        """CachingURLFetcher."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._cache = OrderedDict()
+            self._cache_lock = threading.Lock()
+
+        def fetch(self, url, headers=None):
+            """fetch."""
+            if not url.lower().startswith(("http://", "https://")):
+                return super().fetch(url, headers)
+            with self._cache_lock:
+                cached = self._cache.get(url)
+                if cached is not None:
+                    self._cache.move_to_end(url)
+            if cached is None:
+                response = super().fetch(url, headers)
+                try:
+                    body = response.read()
+                finally:
+                    response.close()
+                cached = (response.url, body, dict(response.headers.items()), response.status)
+                with self._cache_lock:
+                    self._cache[url] = cached
+                    while len(self._cache) > URL_CACHE_MAX_ITEMS:
+                        self._cache.popitem(last=False)
+            final_url, body, response_headers, status = cached
+            return URLFetcherResponse(final_url, body, response_headers, status)
+
+    return CachingURLFetcher()
+
+
+@functools.lru_cache(maxsize=1)
+def _font_config():
+    """``FontConfiguration`` compartida por todos los documentos del proceso."""
+    from weasyprint.text.fonts import FontConfiguration
+
+    return FontConfiguration()
+
+
+@functools.lru_cache(maxsize=8)
+def _stylesheets(paths: tuple[str, ...]) -> tuple:
+    """Hojas de estilo compartidas, parseadas una vez por proceso."""
+    from weasyprint import CSS
+
+    return tuple(
+        CSS(filename=path, font_config=_font_config(), url_fetcher=_url_fetcher()) for path in paths
+    )
+
+
+def _shared_stylesheet_paths() -> tuple[str, ...]:
+    """Rutas de ``PDF_SHARED_STYLESHEETS`` (relativas a ``BASE_DIR``)."""
+    paths = getattr(settings, "PDF_SHARED_STYLESHEETS", ())
+    return tuple(os.path.join(str(settings.BASE_DIR), path) for path in paths)
 
-def _render_with_weasyprint(html_content: str) -> bytes:
+
+def _render_with_weasyprint(html_content: str, stylesheet_paths: tuple[str, ...] = ()) -> bytes:
     """_render_with_weasyprint."""
     from weasyprint import HTML
 
-    pdf_bytes = HTML(string=html_content, base_url=None).write_pdf()
+    font_config = _font_config()
+    pdf_bytes = HTML(string=html_content, base_url=None, url_fetcher=_url_fetcher()).write_pdf(
+        stylesheets=list(_stylesheets(stylesheet_paths)), font_config=font_config
+    )
     return pdf_bytes
 
 
+def _warm_worker(stylesheet_paths: tuple[str, ...]) -> None:
+    """Inicializador de los workers del pool: importa WeasyPrint y parsea fuentes/CSS."""
+    try:
+        _font_config()
+        _stylesheets(stylesheet_paths)
+    except Exception as e:
+        # El error se reporta por documento al renderizar.
+        logger.warning(f"No se pudo precalentar el worker de WeasyPrint: {e}")
+
+
+def _render_timed(html_content: str, stylesheet_paths: tuple[str, ...]) -> RenderResult:
+    """Renderiza un documento sin propagar excepciones (se ejecuta en el pool)."""
+    start = time.perf_counter()
+    try:
+        pdf_bytes = _render_with_weasyprint(html_content, stylesheet_paths)
+        return RenderResult(pdf=pdf_bytes, elapsed_ms=(time.perf_counter() - start) * 1000)
+    except Exception as e:
+        return RenderResult(
+            elapsed_ms=(time.perf_counter() - start) * 1000, error=f"{type(e).__name__}: {e}"
+        )
+
+
+def _pool_workers(max_workers: int | None) -> int:
+    """Workers disponibles para el pool (0 si no se puede usar un pool de procesos)."""
+    if multiprocessing.current_process().daemon:
+        # Los workers prefork de Celery son daemon y no pueden crear procesos hijos.
+        return 0
+    if max_workers is None:
+        max_workers = getattr(settings, "PDF_RENDER_MAX_WORKERS", min(4, os.cpu_count() or 1))
+    return max(0, int(max_workers))
+
+
 class PdfRendererService:
     """
     Servicio centralizado para renderizar HTML a PDF.
 
     ⚙️  ESTRATEGIA:
     Usa WeasyPrint local (no requiere servicio externo).
-    Tiempo típico: 1-3s. Sin dependencia de red.
+    Tiempo típico: 1-3s en frío; las fuentes, hojas compartidas y recursos remotos
+    quedan cacheados en el proceso para los documentos siguientes.
 
     ❌  Gotenberg eliminado en Fase 5 de optimización.
         WeasyPrint es más barato (sin servicio externo),
@@ -25,11 +169,19 @@ class PdfRendererService:
         mantener (sin Docker Compose extra).
     """
 
+    _pool: ProcessPoolExecutor | None = None
+    _pool_size = 0
+    _lock = threading.Lock()
+    _stats = {"documents": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0}
+
     @staticmethod
     def render_html_to_pdf(html_content: str, margins: float = 0.0) -> bytes:
+        start = time.perf_counter()
         try:
-            pdf_bytes = _render_with_weasyprint(html_content)
-            logger.info(f"WeasyPrint generó {len(pdf_bytes)} bytes")
+            pdf_bytes = _render_with_weasyprint(html_content, _shared_stylesheet_paths())
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            PdfRendererService._record(elapsed_ms, ok=True)
+            logger.info(f"WeasyPrint generó {len(pdf_bytes)} bytes en {elapsed_ms:.0f} ms")
             return pdf_bytes
         except ImportError:
             logger.error(
@@ -38,5 +190,108 @@ class PdfRendererService:
             )
             raise
         except Exception as e:
+            PdfRendererService._record((time.perf_counter() - start) * 1000, ok=False)
             logger.error(f"Error generando PDF con WeasyPrint: {e}")
             raise
+
+    @classmethod
+    def render_many(
+        cls, html_documents: Iterable[str], max_workers: int | None = None
+    ) -> list[RenderResult]:
+        """
+        Renderiza un lote de documentos HTML, en el orden recibido.
+
+        Con más de ``PDF_RENDER_POOL_MIN_DOCUMENTS`` documentos se usa el pool de
+        procesos persistente (``PDF_RENDER_MAX_WORKERS``); si no hay pool disponible
+        (worker daemon de Celery, ``max_workers`` 0/1) se renderiza en serie en el
+        proceso actual. Un documento que falla no interrumpe el lote: su resultado
+        trae ``error`` en lugar de ``pdf``.
+        """
+        documents = list(html_documents)
+        if not documents:
+            return []
+        paths = _shared_stylesheet_paths()
+        start = time.perf_counter()
+
+        results = None
+        workers = min(_pool_workers(max_workers), len(documents))
+        min_documents = getattr(settings, "PDF_RENDER_POOL_MIN_DOCUMENTS", 2)
+        if workers > 1 and len(documents) >= min_documents:
+            results = cls._render_in_pool(documents, paths, workers)
+        if results is None:
+            workers = 1
+            results = [_render_timed(html, paths) for html in documents]
+
+        for result in results:
+            cls._record(result.elapsed_ms, ok=result.ok)
+        failed = sum(1 for result in results if not result.ok)
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"🖨️ Lote de PDFs: {len(results)} documentos ({failed} con error) en {elapsed:.2f}s "
+            f"con {workers} proceso(s)"
+        )
+        return results
+
+    @classmethod
+    def _render_in_pool(cls, documents, paths, workers) -> list[RenderResult] | None:
+        try:
+            pool = cls._get_pool(paths, workers)
+            return list(pool.map(_render_timed, documents, [paths] * len(documents)))
+        except BrokenProcessPool as e:
+            logger.warning(f"Pool de WeasyPrint roto, renderizando en serie: {e}")
+            cls.shutdown_pool()
+        except Exception as e:
+            logger.warning(f"No se pudo usar el pool de WeasyPrint, renderizando en serie: {e}")
+        return None
+
+    @classmethod
+    def _get_pool(cls, paths, workers) -> ProcessPoolExecutor:
+        with cls._lock:
+            if cls._pool is None or cls._pool_size < workers:
+                if cls._pool is not None:
+                    cls._pool.shutdown(wait=False)
+                # spawn: no hereda conexiones de BD ni hilos del proceso padre.
+                cls._pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                    initargs=(paths,),
+                )
+                cls._pool_size = workers
+            return cls._pool
+
+    @classmethod
+    def shutdown_pool(cls) -> None:
+        """Cierra el pool de procesos (se vuelve a crear en el próximo ``render_many``)."""
+        with cls._lock:
+            pool, cls._pool, cls._pool_size = cls._pool, None, 0
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def get_render_stats(cls) -> dict[str, float]:
+        """
+        Métricas de renderizado acumuladas en el proceso: ``documents``, ``failed``,
+        ``total_ms``, ``max_ms`` y ``avg_ms`` (por documento, tiempo de WeasyPrint).
+        """
+        with cls._lock:
+            stats = dict(cls._stats)
+        stats["avg_ms"] = stats["total_ms"] / stats["documents"] if stats["documents"] else 0.0
+        return stats
+
+    @classmethod
+    def reset_render_stats(cls) -> None:
+        """Reinicia las métricas de renderizado acumuladas."""
+        with cls._lock:
+            cls._stats = {"documents": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+    @classmethod
+    def _record(cls, elapsed_ms: float, ok: bool) -> None:
+        with cls._lock:
+            cls._stats["documents"] += 1
+            cls._stats["failed"] += int(not ok)
+            cls._stats["total_ms"] += elapsed_ms
+            cls._stats["max_ms"] = max(cls._stats["max_ms"], elapsed_ms)
+
+
+atexit.register(PdfRendererService.shutdown_pool)
@@ -189,62 +189,14 @@ def fetch_evolution_qr_task(self, instance_name):
 def process_scheduled_whatsapp_messages():
     """Envía los mensajes de WhatsApp programados cuya hora ya llegó.
 
-    Se ejecuta cada minuto vía Celery Beat. Busca mensajes en estado
-    'scheduled' con programado_para <= ahora y los envía.
+    Se ejecuta cada minuto vía Celery Beat. Reclama los mensajes en estado
+    'scheduled' con programado_para <= ahora por lotes (SKIP LOCKED) y los
+    envía con ScheduledWhatsAppDispatcher; lo que no quepa en el presupuesto
+    de tiempo queda para la siguiente ejecución.
     """
-    from django.utils import timezone
+    from apps.communications.services.whatsapp_scheduled import ScheduledWhatsAppDispatcher
 
-    from apps.crm.models import WhatsAppScheduledMessage
-
-    now = timezone.now()
-    pendientes = WhatsAppScheduledMessage.objects.filter(
-        estado="scheduled", programado_para__lte=now
-    ).select_related("agencia", "cliente")
-
-    enviados = 0
-    for msg in pendientes:
-        msg.estado = "sending"
-        msg.save(update_fields=["estado"])
-
-        try:
-            instance_name = f"agencia_{msg.agencia_id}"
-            if msg.agencia and hasattr(msg.agencia, "configuracion"):
-                cfg = msg.agencia.configuracion
-                if cfg.evolution_instance_name:
-                    instance_name = cfg.evolution_instance_name
-
-            from apps.communications.services.evolution_api_service import EvolutionService
-
-            exito = EvolutionService.send_text(instance_name, msg.telefono, msg.texto)
-
-            if exito:
-                from apps.crm.models import MensajeWhatsApp
-
-                m = MensajeWhatsApp.objects.create(
-                    cliente=msg.cliente,
-                    direccion="OUT",
-                    texto=msg.texto,
-                    estado="sent",
-                    tipo_mensaje="text",
-                    agencia=msg.agencia,
-                )
-                msg.mensaje_resultante = m
-                msg.estado = "sent"
-                msg.save(update_fields=["estado", "mensaje_resultante"])
-                enviados += 1
-            else:
-                msg.estado = "failed"
-                msg.error_msg = "Error al enviar vía Evolution"
-                msg.save(update_fields=["estado", "error_msg"])
-        except Exception as e:
-            msg.estado = "failed"
-            msg.error_msg = str(e)[:500]
-            msg.save(update_fields=["estado", "error_msg"])
-            logger.error(f"Error enviando WA programado #{msg.pk}: {e}")
-
-    if pendientes:
-        logger.info(f"Mensajes WA programados procesados: {enviados}/{len(pendientes)} enviados")
-    return enviados
+    return ScheduledWhatsAppDispatcher.run().sent
 
 
 @shared_task(name="apps.common.tasks.monitor_whatsapp_health_task", queue="default", time_limit=60)
@@ -21,7 +21,8 @@ def cleanup_temporary_storage_files(days=7):
 
     logger.info(f" Iniciando limpieza de archivos temporales (Antigüedad > {days} días)...")
 
-    prefixes = ["temp/", "tmp/", "vouchers_tmp/"]
+    # pdf_cache/tickets/: PDFs de TicketPdfCache cuyo índice ya expiró.
+    prefixes = ["temp/", "tmp/", "vouchers_tmp/", "pdf_cache/tickets/"]
     count = 0
     deleted_size = 0
 
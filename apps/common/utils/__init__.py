@@ -179,50 +179,54 @@ def truncate_on_stop_tokens(upper_text: str) -> str:
 
 
 # --- Audit Hash Chain Utilities ---
-def verify_audit_chain(limit: int | None = None) -> tuple[bool, int | None, str | None]:
-    """Verifica la cadena de hashes de AuditLog.
+def verify_audit_chain(
+    limit: int | None = None, cadena: str | None = None
+) -> tuple[bool, int | None, str | None]:
+    """Verifica las cadenas de hashes de AuditLog.
 
     Retorna (ok, break_id, reason). Si ok es True, break_id y reason serán None.
     Si False, break_id es el id_audit_log donde se detectó ruptura y reason una breve explicación.
-    Param limit permite cortar la verificación a los N registros más antiguos recientes (útil para pruebas parciales).
+    Cada cadena (una por agencia más "global", ver AuditLog.cadena) se verifica por
+    separado en orden de id; los registros legados (cadena NULL) forman una cadena única
+    en orden de creación. Param cadena limita la verificación a esa cadena y limit corta
+    cada cadena a sus N registros más antiguos (útil para pruebas parciales).
     """
     try:
         from core.api import AuditLog
+        from core.models.audit import GENESIS_HASH, calcular_record_hash
+
+        if cadena:
+            cadenas = [cadena]
+        else:
+            cadenas = [None] + sorted(
+                AuditLog.objects.filter(cadena__isnull=False)
+                .order_by()
+                .values_list("cadena", flat=True)
+                .distinct()
+            )
 
-        qs = AuditLog.objects.all().order_by("creado", "id_audit_log")
-        if limit:
-            qs = qs[:limit]
-        prev_hash = None
-        import hashlib
-        import json
-
-        # El primer registro usa "0"*64 como previous_hash (bloque génesis).
-        # Aceptar también None para registros previos al cambio.
-        genesis = ("0" * 64, None)
-
-        for log in qs:
-            # Validar previous_hash coincide con la cadena esperada
-            if log.previous_hash != prev_hash:
-                if prev_hash is None and log.previous_hash in genesis:
-                    prev_hash = log.previous_hash  # primer registro: génesis válido
-                else:
-                    return False, log.id_audit_log, "previous_hash mismatch"
-            payload = {
-                "modelo": log.modelo,
-                "object_id": log.object_id,
-                "accion": log.accion,
-                "descripcion": log.descripcion or "",
-                "datos_previos": log.datos_previos,
-                "datos_nuevos": log.datos_nuevos,
-                "metadata_extra": log.metadata_extra,
-                "creado": log.creado.isoformat() if log.creado else "",
-            }
-            canon = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
-            base_str = (prev_hash or "") + "|" + canon
-            recalculated = hashlib.sha256(base_str.encode("utf-8")).hexdigest()
-            if recalculated != log.record_hash:
-                return False, log.id_audit_log, "record_hash mismatch"
-            prev_hash = log.record_hash
+        for nombre in cadenas:
+            if nombre is None:
+                qs = AuditLog.objects.filter(cadena__isnull=True).order_by("creado", "id_audit_log")
+                # Aceptar también None como génesis para registros previos al cambio.
+                genesis = (GENESIS_HASH, None)
+            else:
+                qs = AuditLog.objects.filter(cadena=nombre).order_by("id_audit_log")
+                genesis = (GENESIS_HASH,)
+            if limit:
+                qs = qs[:limit]
+
+            prev_hash = None
+            for log in qs.iterator(chunk_size=2000):
+                # Validar previous_hash coincide con la cadena esperada
+                if log.previous_hash != prev_hash:
+                    if prev_hash is None and log.previous_hash in genesis:
+                        prev_hash = log.previous_hash  # primer registro: génesis válido
+                    else:
+                        return False, log.id_audit_log, "previous_hash mismatch"
+                if calcular_record_hash(log, prev_hash) != log.record_hash:
+                    return False, log.id_audit_log, "record_hash mismatch"
+                prev_hash = log.record_hash
         return True, None, None
     except Exception as e:  # pragma: no cover - errores inesperados
         return False, None, f"exception: {e}"
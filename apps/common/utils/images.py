@@ -1,4 +1,5 @@
 import base64
+import hashlib
 import logging
 
 import requests
@@ -113,4 +114,21 @@ def get_agencia_logo_b64(agencia, is_dark_bg=True):
     if not logo_source:
         return None
 
-    return get_image_as_base64(logo_source)
+    # Cache por agencia y archivo: evita la descarga (R2/URL) y el base64 en cada PDF.
+    # El nombre del archivo forma parte de la clave, así que cambiar el logo la invalida.
+    source_name = getattr(logo_source, "name", None) or str(logo_source)
+    agencia_pk = getattr(agencia, "pk", None)
+    if agencia_pk is None:
+        return get_image_as_base64(logo_source)
+
+    from django.conf import settings
+    from django.core.cache import cache
+
+    digest = hashlib.md5(source_name.encode("utf-8"), usedforsecurity=False).hexdigest()
+    cache_key = f"pdf_assets:logo:{agencia_pk}:{int(bool(is_dark_bg))}:{digest}"
+    logo_b64 = cache.get(cache_key)
+    if logo_b64 is None:
+        logo_b64 = get_image_as_base64(logo_source)
+        if logo_b64:
+            cache.set(cache_key, logo_b64, getattr(settings, "PDF_ASSET_CACHE_TIMEOUT", 86400))
+    return logo_b64
@@ -0,0 +1,130 @@
+import imaplib
+import random
+import time
+from email.mime.application import MIMEApplication
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from django.core.management.base import BaseCommand
+
+from apps.communications.services.imap_ingestion import ImapIngestor, ImapSessionPool
+from apps.communications.services.imap_standin import ServidorImapLocal
+
+
+def _correo(rnd, i) -> bytes:
+    """Mezcla típica del buzón de emisiones: boletos PDF, circulares con adjuntos, avisos."""
+    mensaje = MIMEMultipart()
+    tipo = rnd.random()
+    if tipo < 0.3:
+        mensaje["Subject"] = f"E-TICKET ITINERARY RECEIPT {i}"
+        mensaje.attach(MIMEText("<html>Boleto adjunto</html>", "html"))
+        adjuntos = [
+            (MIMEApplication(b"%PDF-1.4 TICKET PNR " * rnd.randint(2000, 6000), "pdf"), "b.pdf"),
+            (MIMEImage(b"\x89PNG" + b"\x01" * rnd.randint(20_000, 60_000), "png"), "logo.png"),
+        ]
+    elif tipo < 0.7:
+        mensaje["Subject"] = f"Circular tarifas {i}"
+        mensaje.attach(MIMEText("Ver tarifas adjuntas. " * 50, "plain"))
+        adjuntos = [
+            (MIMEApplication(b"PK\x03\x04" + b"\x02" * rnd.randint(100_000, 400_000)), "t.xlsx"),
+        ]
+    else:
+        mensaje["Subject"] = f"Aviso {i}"
+        mensaje.attach(MIMEText("Aviso operativo. " * 20, "plain"))
+        adjuntos = []
+    mensaje["From"] = "emisiones@proveedor.com"
+    for parte, nombre in adjuntos:
+        parte.add_header("Content-Disposition", "attachment", filename=nombre)
+        mensaje.attach(parte)
+    return mensaje.as_bytes()
+
+
+class Command(BaseCommand):
+    """Compara la ingesta IMAP por ciclo (conexión nueva + RFC822) contra ImapIngestor."""
+
+    help = (
+        "Benchmark del monitor de correo contra un servidor IMAP local: por cada ciclo, "
+        "camino anterior (IMAP4 + LOGIN + SEARCH UNSEEN + FETCH RFC822 por mensaje) vs. "
+        "sesión persistente con checkpoint de UIDs y descarga selectiva de partes. "
+        "El servidor simula RTT y ancho de banda (no el handshake TLS, que solo paga el "
+        "camino anterior)."
+    )
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument("--mensajes", type=int, default=200)
+        parser.add_argument("--ciclos", type=int, default=10)
+        parser.add_argument("--nuevos", type=int, default=5, help="Correos nuevos por ciclo.")
+        parser.add_argument("--latencia-ms", type=float, default=40.0, help="RTT simulado.")
+        parser.add_argument("--ancho-banda-mbps", type=float, default=20.0)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        """handle."""
+        total = options["mensajes"] + options["ciclos"] * options["nuevos"]
+        rnd = random.Random(options["seed"])  # noqa: S311
+        correos = [_correo(rnd, i) for i in range(total)]
+
+        resultados = []
+        for nombre, ciclo in (("Anterior", self._ciclo_anterior), ("Ingestor", None)):
+            with ServidorImapLocal(
+                latencia=options["latencia_ms"] / 1000,
+                ancho_banda=int(options["ancho_banda_mbps"] * 125_000),
+            ) as servidor:
+                for raw in correos[: options["mensajes"]]:
+                    servidor.agregar(raw)
+                ingestor = ImapIngestor(
+                    servidor.host, servidor.port, servidor.usuario, servidor.password, ssl=False
+                )
+                ingestor.reiniciar_checkpoint()
+                mensajes, segundos = 0, 0.0
+                pendientes = iter(correos[options["mensajes"] :])
+                try:
+                    for _ in range(options["ciclos"] + 1):
+                        t0 = time.perf_counter()
+                        if ciclo:
+                            mensajes += ciclo(servidor)
+                        else:
+                            mensajes += ingestor.ciclo(lambda m, _s: True).mensajes
+                        segundos += time.perf_counter() - t0
+                        for _ in range(options["nuevos"]):
+                            raw = next(pendientes, None)
+                            if raw:
+                                servidor.agregar(raw)
+                finally:
+                    ImapSessionPool.cerrar_todas()
+                    ingestor.reiniciar_checkpoint()
+                resultados.append(
+                    (nombre, mensajes, segundos, servidor.bytes_enviados, servidor.logins)
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nBuzón con {options['mensajes']} correos no leídos, {options['ciclos']} ciclos "
+                f"con {options['nuevos']} nuevos cada uno (RTT {options['latencia_ms']:.0f} ms, "
+                f"{options['ancho_banda_mbps']:.0f} Mbps)"
+            )
+        )
+        for nombre, mensajes, segundos, enviados, logins in resultados:
+            self.stdout.write(
+                f" - {nombre:<9} {mensajes} mensajes en {segundos:.2f} s "
+                f"({mensajes / segundos:.0f} msg/s), {enviados / 1024 / 1024:.2f} MB transferidos, "
+                f"{logins} LOGIN"
+            )
+        anterior, nuevo = resultados[0][3], resultados[1][3]
+        self.stdout.write(f" - Bytes transferidos: {anterior / max(nuevo, 1):.1f}x menos")
+
+    @staticmethod
+    def _ciclo_anterior(servidor) -> int:
+        """Réplica del ciclo anterior de EmailMonitorService._procesar_correos."""
+        mail = imaplib.IMAP4(servidor.host, servidor.port)
+        mail.login(servidor.usuario, servidor.password)
+        mail.select("inbox")
+        _, messages = mail.search(None, "(UNSEEN)")
+        message_ids = messages[0].split()
+        for num in message_ids:
+            mail.fetch(num, "(RFC822)")
+        mail.close()
+        mail.logout()
+        return len(message_ids)
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from apps.communications.services.evolution_api_service import EvolutionService
+from apps.communications.services.whatsapp_scheduled import ScheduledWhatsAppDispatcher
+from apps.crm.models import MensajeWhatsApp, WhatsAppScheduledMessage
+from core.models import Agencia
+
+
+class Rollback(Exception):
+    """Revierte los datos sintéticos del benchmark."""
+
+
+class _EvolutionLocal(BaseHTTPRequestHandler):
+    """Evolution API mínima: estado de instancia y sendText con latencia fija."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _responder(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # noqa: N802
+        """do_GET."""
+        self.server.contar(self.path)
+        time.sleep(self.server.latencia)
+        self._responder(200, {"instance": {"state": "open"}})
+
+    def do_POST(self):  # noqa: N802
+        """do_POST."""
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.contar(self.path)
+        time.sleep(self.server.latencia)
+        self._responder(201, {"key": {"id": "BENCH"}})
+
+    def log_message(self, *args):
+        """Silencia el log de acceso."""
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latencia):
+        super().__init__(("127.0.0.1", 0), _EvolutionLocal)
+        self.latencia = latencia
+        self.peticiones = 0
+        self._lock = threading.Lock()
+
+    def contar(self, path):
+        with self._lock:
+            self.peticiones += 1
+
+
+class Command(BaseCommand):
+    """Compara el envío de WhatsApp programados mensaje a mensaje contra el despacho por lotes."""
+
+    help = (
+        "Benchmark de process_scheduled_whatsapp_messages contra una Evolution API local "
+        "con latencia simulada: bucle anterior (save + estado de instancia + sendText + "
+        "create + save por mensaje) vs ScheduledWhatsAppDispatcher (reclamo SKIP LOCKED, "
+        "envío concurrente por instancia y escrituras en bloque). Los datos se crean en "
+        "una transacción que se revierte."
+    )
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument("--mensajes", type=int, default=400)
+        parser.add_argument("--instancias", type=int, default=4)
+        parser.add_argument("--latencia-ms", type=float, default=30.0)
+        parser.add_argument(
+            "--ritmo", type=float, default=20.0, help="Mensajes/segundo por instancia."
+        )
+
+    def handle(self, *args, **options):
+        """handle."""
+        servidor = _Servidor(options["latencia_ms"] / 1000)
+        hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+        hilo.start()
+        ajustes = {
+            "WHATSAPP_MICROSERVICE_URL": f"http://127.0.0.1:{servidor.server_address[1]}",
+            "WHATSAPP_MICROSERVICE_TOKEN": "benchmark",
+            "EVOLUTION_MAX_MSG_PER_HOUR": 10**9,
+            "EVOLUTION_SCHEDULED_RATE_PER_INSTANCE": options["ritmo"],
+        }
+        resultados = []
+        try:
+            with override_settings(**ajustes), transaction.atomic():
+                agencias = [
+                    Agencia.objects.create(
+                        nombre=f"Benchmark WA {i}", email_principal=f"bench-wa{i}@example.com"
+                    )
+                    for i in range(options["instancias"])
+                ]
+                EvolutionService._cached_session = None
+                for nombre, ejecutar in (
+                    ("Anterior", self._run_anterior),
+                    ("Lotes", lambda: ScheduledWhatsAppDispatcher.run().sent),
+                ):
+                    self._programar(agencias, options["mensajes"])
+                    peticiones = servidor.peticiones
+                    with CaptureQueriesContext(connection) as queries:
+                        t0 = time.perf_counter()
+                        enviados = ejecutar()
+                        segundos = time.perf_counter() - t0
+                    resultados.append(
+                        (
+                            nombre,
+                            enviados,
+                            segundos,
+                            servidor.peticiones - peticiones,
+                            len(queries.captured_queries),
+                        )
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+            EvolutionService._cached_session = None
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n{options['mensajes']} mensajes en {options['instancias']} instancias "
+                f"(latencia {options['latencia_ms']:.0f} ms, {options['ritmo']:.0f} msg/s "
+                "por instancia en el despacho por lotes)"
+            )
+        )
+        for nombre, enviados, segundos, peticiones, consultas in resultados:
+            self.stdout.write(
+                f" - {nombre:<9} {enviados} enviados en {segundos:.2f} s "
+                f"({enviados / segundos:.1f} msg/s), {peticiones} peticiones HTTP, "
+                f"{consultas} consultas SQL"
+            )
+
+    @staticmethod
+    def _programar(agencias, total):
+        vencido = timezone.now() - timedelta(minutes=1)
+        WhatsAppScheduledMessage.all_objects.bulk_create(
+            WhatsAppScheduledMessage(
+                agencia=agencias[i % len(agencias)],
+                telefono=f"58414{i:07d}",
+                texto=f"Recordatorio de viaje {i}",
+                programado_para=vencido,
+            )
+            for i in range(total)
+        )
+
+    @staticmethod
+    def _run_anterior() -> int:
+        """Réplica del bucle anterior de process_scheduled_whatsapp_messages."""
+        pendientes = WhatsAppScheduledMessage.all_objects.filter(
+            estado="scheduled", programado_para__lte=timezone.now()
+        ).select_related("agencia", "cliente")
+        enviados = 0
+        for msg in pendientes:
+            msg.estado = "sending"
+            msg.save(update_fields=["estado"])
+            instance_name = f"agencia_{msg.agencia_id}"
+            if EvolutionService.send_text(instance_name, msg.telefono, msg.texto) is True:
+                msg.mensaje_resultante = MensajeWhatsApp.all_objects.create(
+                    cliente=msg.cliente,
+                    direccion="OUT",
+                    texto=msg.texto,
+                    estado="sent",
+                    tipo_mensaje="text",
+                    agencia=msg.agencia,
+                )
+                msg.estado = "sent"
+                msg.save(update_fields=["estado", "mensaje_resultante"])
+                enviados += 1
+        return enviados
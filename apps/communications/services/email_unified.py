@@ -7,7 +7,6 @@ Consolidated service for all email operations:
 - Email Monitor (IMAP polling for ticket capture)
 """
 
-import email
 import imaplib
 import logging
 import os
@@ -21,6 +20,8 @@ from django.core.mail import EmailMessage, EmailMultiAlternatives, send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+from apps.communications.services.imap_ingestion import ImapIngestor
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -544,7 +545,7 @@ class EmailMonitorService:
         return self._procesar_correos()
 
     def start(self):
-        """Inicia el monitoreo continuo"""
+        """Inicia el monitoreo continuo (con IMAP IDLE si EMAIL_MONITOR_IMAP_IDLE está activo)"""
         logger.info(f" Monitor iniciado -> {self.notification_type}: {self.destination}")
 
         while True:
@@ -553,7 +554,22 @@ class EmailMonitorService:
             except Exception as e:
                 logger.error(f" Error en ciclo: {e}")
 
-            time.sleep(self.interval)
+            if not self._esperar_correo():
+                time.sleep(self.interval)
+
+    def _esperar_correo(self):
+        """Espera con IDLE hasta ``interval`` segundos; False si no aplica (se duerme)."""
+        if not getattr(settings, "EMAIL_MONITOR_IMAP_IDLE", False):
+            return False
+        imap_host, imap_port, imap_user, imap_pass = self._credenciales_imap()
+        if not imap_user or not imap_pass:
+            return False
+        try:
+            ingestor = ImapIngestor(imap_host, imap_port, imap_user, imap_pass, mailbox="inbox")
+            return ingestor.esperar_cambios(timeout=self.interval)
+        except Exception as e:
+            logger.warning(f" IDLE no disponible, se usa polling: {e}")
+            return False
 
     def _actualizar_last_check(self):
         """Actualiza el timestamp del último chequeo exitoso en la configuración"""
@@ -567,8 +583,30 @@ class EmailMonitorService:
         except Exception as e:
             logger.warning(f" No se pudo actualizar email_monitor_last_check: {e}")
 
+    def _credenciales_imap(self):
+        """(host, port, usuario, password) del buzón monitoreado de la agencia."""
+        config = getattr(self.agencia, "configuracion", None)
+
+        imap_user = getattr(config, "email_monitor_user", None) or getattr(
+            self.agencia, "correo_emisiones", None
+        )
+        imap_pass = getattr(config, "email_monitor_password", None) or getattr(
+            self.agencia, "password_app_correo", None
+        )
+        imap_host = (
+            getattr(config, "email_monitor_host", "imap.gmail.com") if config else "imap.gmail.com"
+        )
+        imap_port = getattr(config, "email_monitor_port", 993) if config else 993
+        return imap_host or "imap.gmail.com", imap_port or 993, imap_user, imap_pass
+
     def _procesar_correos(self):
-        """Procesa correos no leídos, registra ejecución en EmailMonitorLog y retorna cantidad procesada"""
+        """
+        Procesa correos no leídos, registra ejecución en EmailMonitorLog y retorna cantidad procesada.
+
+        Usa una sesión IMAP persistente del pool y el checkpoint de UIDs del buzón; solo se
+        descargan cabeceras, BODYSTRUCTURE y las partes PDF/EML/texto de cada mensaje
+        (ver ``imap_ingestion``).
+        """
         inicio = time.time()
         imap_host = "imap.gmail.com"
         imap_port = 993
@@ -576,14 +614,7 @@ class EmailMonitorService:
         try:
             from apps.communications.models import EmailMonitorLog
 
-            config = getattr(self.agencia, "configuracion", None)
-
-            imap_user = getattr(config, "email_monitor_user", None) or getattr(
-                self.agencia, "correo_emisiones", None
-            )
-            imap_pass = getattr(config, "email_monitor_password", None) or getattr(
-                self.agencia, "password_app_correo", None
-            )
+            imap_host, imap_port, imap_user, imap_pass = self._credenciales_imap()
 
             if not imap_user or not imap_pass:
                 msg = f"Agencia {self.agencia.nombre} no tiene credenciales de correo configuradas."
@@ -598,38 +629,19 @@ class EmailMonitorService:
                 )
                 return 0
 
-            imap_host = (
-                getattr(config, "email_monitor_host", "imap.gmail.com")
-                if config
-                else "imap.gmail.com"
-            )
-            imap_port = getattr(config, "email_monitor_port", 993) if config else 993
-            if not imap_host:
-                imap_host = "imap.gmail.com"
-            if not imap_port:
-                imap_port = 993
-
-            try:
-                mail = imaplib.IMAP4_SSL(imap_host, imap_port)
-            except Exception as e_conn:
-                msg = f"Error conectando al servidor IMAP {imap_host}:{imap_port}: {e_conn}"
-                logger.error(f" {msg}")
-                EmailMonitorLog.objects.create(
-                    agencia=self.agencia,
-                    estado=EmailMonitorLog.Estado.ERROR,
-                    mensaje=msg,
-                    host_conectado=f"{imap_host}:{imap_port}",
-                    correos_procesados=0,
-                    tiempo_ejecucion=round(time.time() - inicio, 2),
-                )
-                return 0
+            if self.process_all:
+                logger.info(" Procesando TODOS los correos")
+            else:
+                logger.info(" Procesando solo correos NO LEÍDOS")
 
+            ingestor = ImapIngestor(imap_host, imap_port, imap_user, imap_pass, mailbox="inbox")
             try:
-                mail.login(imap_user, imap_pass)
-            except Exception as e:
-                msg = (
-                    f"Error de autenticación IMAP para {imap_user} en {imap_host}:{imap_port}: {e}"
+                stats = ingestor.ciclo(
+                    lambda m, sesion: self._procesar_mensaje(m.mensaje, m.uid, sesion),
+                    solo_no_leidos=not self.process_all,
                 )
+            except imaplib.IMAP4.error as e:
+                msg = f"Error IMAP para {imap_user} en {imap_host}:{imap_port}: {e}"
                 logger.error(f" {msg}")
                 EmailMonitorLog.objects.create(
                     agencia=self.agencia,
@@ -640,12 +652,9 @@ class EmailMonitorService:
                     tiempo_ejecucion=round(time.time() - inicio, 2),
                 )
                 return 0
-
-            select_status, _ = mail.select("inbox")
-            if select_status != "OK":
-                msg = f"No se pudo seleccionar inbox en {imap_host}:{imap_port}"
+            except OSError as e_conn:
+                msg = f"Error conectando al servidor IMAP {imap_host}:{imap_port}: {e_conn}"
                 logger.error(f" {msg}")
-                mail.logout()
                 EmailMonitorLog.objects.create(
                     agencia=self.agencia,
                     estado=EmailMonitorLog.Estado.ERROR,
@@ -656,73 +665,33 @@ class EmailMonitorService:
                 )
                 return 0
 
-            if self.process_all:
-                _, messages = mail.search(None, "ALL")
-                logger.info(" Procesando TODOS los correos")
-            else:
-                _, messages = mail.search(None, "(UNSEEN)")
-                logger.info(" Procesando solo correos NO LEÍDOS")
-
-            message_ids = messages[0].split()
-
-            if not message_ids:
+            if not stats.mensajes:
                 logger.info(" No hay correos nuevos")
-                mail.close()
-                mail.logout()
-                EmailMonitorLog.objects.create(
-                    agencia=self.agencia,
-                    estado=EmailMonitorLog.Estado.SUCCESS,
-                    mensaje="Ciclo completado. No se encontraron correos nuevos.",
-                    host_conectado=f"{imap_host}:{imap_port}",
-                    correos_procesados=0,
-                    tiempo_ejecucion=round(time.time() - inicio, 2),
+                mensaje = "Ciclo completado. No se encontraron correos nuevos."
+            else:
+                logger.info(
+                    f" {stats.mensajes} correos nuevos, {stats.candidatos} candidatos "
+                    f"({stats.resumen()})"
+                )
+                mensaje = (
+                    f"Ciclo completado. {stats.procesados} de {stats.mensajes} correos "
+                    f"procesados exitosamente ({stats.resumen()})."
                 )
-                self._actualizar_last_check()
-                return 0
-
-            logger.info(f" Encontrados {len(message_ids)} correos nuevos")
-            procesados = 0
-
-            for num in message_ids:
-                try:
-                    _, msg_data = mail.fetch(num, "(RFC822)")
-                    message = email.message_from_bytes(msg_data[0][1])
-
-                    if self._procesar_mensaje(message, num, mail):
-                        logger.info(f" Correo {num} procesado")
-                        procesados += 1
-                except Exception as e:
-                    logger.error(f" Error procesando {num}: {e}")
-
-            mail.close()
-            mail.logout()
 
             EmailMonitorLog.objects.create(
                 agencia=self.agencia,
                 estado=EmailMonitorLog.Estado.SUCCESS,
-                mensaje=f"Ciclo completado. {procesados} de {len(message_ids)} correos procesados exitosamente.",
+                mensaje=mensaje,
                 host_conectado=f"{imap_host}:{imap_port}",
-                correos_procesados=procesados,
+                correos_procesados=stats.procesados,
                 tiempo_ejecucion=round(time.time() - inicio, 2),
             )
             self._actualizar_last_check()
-            return procesados
+            return stats.procesados
 
         except Exception as e_global:
             msg = f"Error inesperado en el ciclo de monitoreo: {e_global}"
             logger.exception(f"❌ {msg}")
-            try:
-                if "mail" in locals() and mail is not None:
-                    try:
-                        mail.close()
-                    except Exception as e_close:
-                        logger.debug(f"Error closing IMAP connection: {e_close}")
-                    try:
-                        mail.logout()
-                    except Exception as e_logout:
-                        logger.debug(f"Error logging out IMAP connection: {e_logout}")
-            except Exception as e_cleanup:
-                logger.debug(f"Error during IMAP cleanup: {e_cleanup}")
             try:
                 from apps.communications.models import EmailMonitorLog
 
@@ -55,8 +55,14 @@ class EvolutionService:
                 status_forcelist=[500, 502, 503, 504],
                 raise_on_status=False,
             )
-            session.mount("http://", HTTPAdapter(max_retries=retries))
-            session.mount("https://", HTTPAdapter(max_retries=retries))
+            # El despacho de programados envía desde varios hilos con esta misma sesión:
+            # el pool debe cubrirlos para que las conexiones keep-alive no se descarten.
+            pool = getattr(settings, "EVOLUTION_HTTP_POOL_SIZE", 20)
+            for prefix in ("http://", "https://"):
+                session.mount(
+                    prefix,
+                    HTTPAdapter(max_retries=retries, pool_connections=pool, pool_maxsize=pool),
+                )
             cls._cached_session = session
         return cls._cached_session
 
@@ -296,31 +302,42 @@ class EvolutionService:
         limit = getattr(settings, "EVOLUTION_MAX_MSG_PER_HOUR", max_per_hour)
         key = f"evo_rate:{instance_name}"
         try:
-            count = cache.get(key, 0)
-            if count >= limit:
+            # add + incr es atómico en Redis: varios hilos/workers no superan el límite.
+            cache.add(key, 0, timeout=3600)
+            count = cache.incr(key)
+            if count > limit:
+                cache.decr(key)
                 logger.warning(
                     f"⚠️ [EvolutionRateLimit] Instancia '{instance_name}' superó el límite "
-                    f"de {limit} msgs/hora ({count}/{limit}). Mensaje bloqueado para prevenir ban."
+                    f"de {limit} msgs/hora ({count - 1}/{limit}). Mensaje bloqueado para prevenir ban."
                 )
                 return False
-            cache.set(key, count + 1, timeout=3600)
             return True
         except Exception as e:
             logger.warning(f"⚠️ [EvolutionRateLimit] Error consultando caché: {e}")
             return True
 
     @classmethod
-    def send_text(cls, instance_name: str, number: str, text: str):
-        """EnvÃ­a un mensaje de texto simple con auto-provisioning y circuit breaker."""
-        return whatsapp_circuit_breaker.call(cls._send_text_internal, instance_name, number, text)
+    def send_text(cls, instance_name: str, number: str, text: str, ensure_instance: bool = True):
+        """EnvÃ­a un mensaje de texto simple con auto-provisioning y circuit breaker.
+
+        ``ensure_instance=False`` omite la consulta de estado de la instancia; lo usa
+        el despacho por lotes, que la verifica una sola vez por instancia.
+        """
+        return whatsapp_circuit_breaker.call(
+            cls._send_text_internal, instance_name, number, text, ensure_instance
+        )
 
     @classmethod
-    def _send_text_internal(cls, instance_name: str, number: str, text: str):
+    def _send_text_internal(
+        cls, instance_name: str, number: str, text: str, ensure_instance: bool = True
+    ):
         """Internal send implementation protected by circuit breaker and rate limiter."""
         if not cls._check_and_increment_rate_limit(instance_name):
             return False
 
-        cls._ensure_instance(instance_name)
+        if ensure_instance:
+            cls._ensure_instance(instance_name)
 
         url = f"{cls._get_base_url()}/message/sendText/{instance_name}"
         clean_number = "".join(filter(str.isdigit, str(number)))
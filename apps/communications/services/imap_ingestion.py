@@ -0,0 +1,649 @@
+"""
+Ingesta IMAP con sesiones persistentes, checkpoints por UID y descarga selectiva.
+
+- ``ImapSessionPool`` mantiene, por proceso, un número acotado de sesiones autenticadas
+  por buzón. Cada ciclo del monitor reutiliza la sesión (un NOOP) en lugar de abrir TLS
+  y hacer LOGIN cada vez.
+- ``ImapIngestor.ciclo`` recuerda ``UIDVALIDITY`` y el último UID visto por buzón (en el
+  cache). Si ``UIDNEXT`` no avanzó no busca nada; si avanzó busca solo por encima del
+  checkpoint.
+- Los mensajes se inspeccionan primero con un FETCH por lotes de ``BODYSTRUCTURE`` y
+  cabeceras. Luego se descargan únicamente las partes que el pipeline usa: adjuntos
+  PDF/EML y cuerpos de texto/HTML, necesarios para KIU y PNR en texto plano. Imágenes,
+  hojas de cálculo o ZIP nunca se descargan. Todas las lecturas usan ``BODY.PEEK``, así
+  que solo se marca ``\\Seen`` lo que el consumidor marca explícitamente.
+- ``ImapIngestor.esperar_cambios`` (IMAP IDLE) es opcional: permite a un monitor continuo
+  despertar al llegar correo en lugar de dormir el intervalo completo.
+
+Settings:
+    EMAIL_MONITOR_IMAP_SSL: ``False`` usa IMAP sin TLS (servidores locales) (default ``True``).
+    EMAIL_MONITOR_IMAP_POOL_SIZE: sesiones abiertas por buzón y proceso (default 2).
+    EMAIL_MONITOR_IMAP_POOL_TIMEOUT: segundos de espera por una sesión libre (default 30).
+    EMAIL_MONITOR_IMAP_IDLE_TTL: segundos que una sesión ociosa se considera reutilizable
+        (default 600).
+    EMAIL_MONITOR_IMAP_FETCH_BATCH: UIDs por FETCH de cabeceras (default 50).
+    EMAIL_MONITOR_IMAP_IDLE: ``True`` habilita IDLE en ``EmailMonitorService.start``
+        (default ``False``).
+"""
+
+import base64
+import email
+import hashlib
+import imaplib
+import logging
+import quopri
+import re
+import select
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.message import Message
+from email.utils import decode_rfc2231
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CABECERAS = "SUBJECT FROM DATE"
+TIPOS_TEXTO = ("text/plain", "text/html")
+
+
+# ============================================================================
+# POOL DE SESIONES
+# ============================================================================
+
+
+class ImapSessionPool:
+    """Sesiones IMAP autenticadas reutilizables, acotadas por buzón (por proceso)."""
+
+    _cond = threading.Condition()
+    _libres: dict[tuple, list[tuple[imaplib.IMAP4, float]]] = {}
+    _abiertas: dict[tuple, int] = {}
+
+    @classmethod
+    @contextmanager
+    def sesion(cls, host, port, user, password, ssl=True):
+        """
+        Presta una sesión autenticada del buzón. Si el bloque falla la sesión se cierra
+        en lugar de devolverse, para no reutilizar una conexión en estado desconocido.
+        """
+        clave = (host, int(port), user, ssl)
+        imap = cls._tomar(clave, password)
+        try:
+            yield imap
+        except BaseException:
+            cls._descartar(clave, imap)
+            raise
+        with cls._cond:
+            cls._libres.setdefault(clave, []).append((imap, time.monotonic()))
+            cls._cond.notify()
+
+    @classmethod
+    def cerrar_todas(cls) -> None:
+        """Cierra las sesiones ociosas y reinicia los contadores del pool."""
+        with cls._cond:
+            libres = [imap for sesiones in cls._libres.values() for imap, _ in sesiones]
+            cls._libres.clear()
+            cls._abiertas.clear()
+            cls._cond.notify_all()
+        for imap in libres:
+            cls._cerrar(imap)
+
+    @classmethod
+    def _tomar(cls, clave, password):
+        limite = getattr(settings, "EMAIL_MONITOR_IMAP_POOL_SIZE", 2)
+        ttl = getattr(settings, "EMAIL_MONITOR_IMAP_IDLE_TTL", 600)
+        limite_espera = time.monotonic() + getattr(settings, "EMAIL_MONITOR_IMAP_POOL_TIMEOUT", 30)
+        while True:
+            with cls._cond:
+                libres = cls._libres.get(clave)
+                if libres:
+                    imap, desde = libres.pop()
+                elif cls._abiertas.get(clave, 0) < limite:
+                    cls._abiertas[clave] = cls._abiertas.get(clave, 0) + 1
+                    imap = desde = None
+                else:
+                    restante = limite_espera - time.monotonic()
+                    if restante <= 0:
+                        raise TimeoutError(
+                            f"Sin sesiones IMAP libres para {clave[2]} en {clave[0]}:{clave[1]}"
+                        )
+                    cls._cond.wait(restante)
+                    continue
+
+            if imap is None:
+                try:
+                    return cls._conectar(clave, password)
+                except BaseException:
+                    cls._liberar_cupo(clave)
+                    raise
+            if time.monotonic() - desde < ttl and cls._viva(imap):
+                return imap
+            cls._descartar(clave, imap)
+
+    @staticmethod
+    def _conectar(clave, password):
+        host, port, user, ssl = clave
+        imap = imaplib.IMAP4_SSL(host, port) if ssl else imaplib.IMAP4(host, port)
+        try:
+            imap.login(user, password)
+        except BaseException:
+            ImapSessionPool._cerrar(imap)
+            raise
+        logger.info(f"Sesión IMAP abierta para {user} en {host}:{port}")
+        return imap
+
+    @staticmethod
+    def _viva(imap) -> bool:
+        try:
+            status, _ = imap.noop()
+            return status == "OK"
+        except Exception:
+            return False
+
+    @classmethod
+    def _descartar(cls, clave, imap) -> None:
+        cls._cerrar(imap)
+        cls._liberar_cupo(clave)
+
+    @classmethod
+    def _liberar_cupo(cls, clave) -> None:
+        with cls._cond:
+            cls._abiertas[clave] = max(0, cls._abiertas.get(clave, 0) - 1)
+            cls._cond.notify()
+
+    @staticmethod
+    def _cerrar(imap) -> None:
+        try:
+            imap.logout()
+        except Exception as e:
+            logger.debug(f"Error cerrando sesión IMAP: {e}")
+
+
+# ============================================================================
+# RESPUESTAS IMAP: FETCH Y BODYSTRUCTURE
+# ============================================================================
+
+_LITERAL = re.compile(rb"\{(\d+)\}$")
+
+
+def _tokens(data):
+    """
+    Tokens de una respuesta de imaplib (bytes y tuplas ``(prefijo, literal)``).
+    Átomos como ``str`` (``NIL`` → ``None``), strings y literales como ``bytes``.
+    """
+    for item in data:
+        if item is None:
+            continue
+        texto, literal = item if isinstance(item, tuple) else (item, None)
+        i, n = 0, len(texto)
+        while i < n:
+            c = texto[i : i + 1]
+            if c in b" \r\n":
+                i += 1
+            elif c in b"()":
+                yield c.decode()
+                i += 1
+            elif c == b'"':
+                j, valor = i + 1, bytearray()
+                while j < n and texto[j : j + 1] != b'"':
+                    if texto[j : j + 1] == b"\\":
+                        j += 1
+                    valor += texto[j : j + 1]
+                    j += 1
+                yield bytes(valor)
+                i = j + 1
+            elif c == b"{" and literal is not None and _LITERAL.match(texto, i):
+                yield literal
+                i = n
+            else:
+                j, corchetes = i, 0
+                while j < n:
+                    d = texto[j : j + 1]
+                    if d == b"[":
+                        corchetes += 1
+                    elif d == b"]":
+                        corchetes -= 1
+                    elif not corchetes and d in b" ()":
+                        break
+                    j += 1
+                atomo = texto[i:j].decode("ascii", "replace")
+                yield None if atomo.upper() == "NIL" else atomo
+                i = j
+
+
+def _arbol(tokens):
+    """Agrupa los tokens en listas anidadas según los paréntesis."""
+    pila = [[]]
+    for simbolo in tokens:
+        if simbolo == "(":
+            pila.append([])
+        elif simbolo == ")":
+            if len(pila) > 1:
+                lista = pila.pop()
+                pila[-1].append(lista)
+        else:
+            pila[-1].append(simbolo)
+    return pila[0]
+
+
+def parsear_fetch(data) -> list[dict]:
+    """``{ITEM: valor}`` por mensaje de una respuesta FETCH (claves en mayúsculas)."""
+    mensajes = []
+    for valor in _arbol(_tokens(data)):
+        if isinstance(valor, list):
+            mensajes.append(
+                {str(k).upper(): v for k, v in zip(valor[::2], valor[1::2], strict=False)}
+            )
+    return mensajes
+
+
+def _txt(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, bytes):
+        return valor.decode("utf-8", "replace")
+    return str(valor)
+
+
+def _params(lista) -> dict[str, str]:
+    if not isinstance(lista, list):
+        return {}
+    return {_txt(k).lower(): _txt(v) for k, v in zip(lista[::2], lista[1::2], strict=False)}
+
+
+def _nombre_archivo(*grupos) -> str | None:
+    for params in grupos:
+        if params.get("filename*"):
+            charset, _idioma, valor = decode_rfc2231(params["filename*"])
+            return unquote(valor, encoding=charset or "utf-8", errors="replace")
+        for clave in ("filename", "name"):
+            if params.get(clave):
+                return params[clave]
+    return None
+
+
+@dataclass
+class ParteImap:
+    """Hoja de BODYSTRUCTURE con lo necesario para decidir si se descarga."""
+
+    seccion: str
+    tipo: str
+    encoding: str = "7bit"
+    tamano: int = 0
+    charset: str | None = None
+    disposicion: str | None = None
+    filename: str | None = None
+
+    @classmethod
+    def desde_estructura(cls, seccion, estructura) -> "ParteImap":
+        """desde_estructura."""
+        tipo = f"{_txt(estructura[0])}/{_txt(estructura[1])}".lower()
+        params = _params(estructura[2] if len(estructura) > 2 else None)
+        if tipo.startswith("text/"):
+            extension = 8
+        elif tipo == "message/rfc822":
+            extension = 10
+        else:
+            extension = 7
+        disposicion = estructura[extension + 1] if len(estructura) > extension + 1 else None
+        disp_tipo, disp_params = None, {}
+        if isinstance(disposicion, list) and disposicion:
+            disp_tipo = _txt(disposicion[0]).lower()
+            disp_params = _params(disposicion[1] if len(disposicion) > 1 else None)
+        try:
+            tamano = int(estructura[6])
+        except (IndexError, TypeError, ValueError):
+            tamano = 0
+        return cls(
+            seccion=seccion,
+            tipo=tipo,
+            encoding=(_txt(estructura[5]) if len(estructura) > 5 else "") or "7bit",
+            tamano=tamano,
+            charset=params.get("charset"),
+            disposicion=disp_tipo,
+            filename=_nombre_archivo(disp_params, params),
+        )
+
+    @property
+    def es_pdf(self) -> bool:
+        """Mismo criterio que EmailMonitorService._tiene_pdf_adjunto."""
+        return self.tipo == "application/pdf" or (self.filename or "").lower().endswith(".pdf")
+
+    @property
+    def es_eml(self) -> bool:
+        """es_eml."""
+        return self.tipo == "message/rfc822" or (self.filename or "").lower().endswith(".eml")
+
+    @property
+    def es_texto(self) -> bool:
+        """es_texto."""
+        return self.tipo in TIPOS_TEXTO
+
+    @property
+    def relevante(self) -> bool:
+        """La parte alimenta el pipeline de boletos (PDF/EML o cuerpo de texto)."""
+        return self.es_pdf or self.es_eml or self.es_texto
+
+
+def partes_de(estructura, seccion: str = "") -> list[ParteImap]:
+    """Hojas de un BODYSTRUCTURE con su número de sección IMAP (``1``, ``2.1``...)."""
+    if not isinstance(estructura, list) or not estructura:
+        return []
+    if isinstance(estructura[0], list):
+        partes, numero = [], 0
+        for sub in estructura:
+            if not isinstance(sub, list):
+                break
+            numero += 1
+            partes.extend(partes_de(sub, f"{seccion}.{numero}" if seccion else str(numero)))
+        return partes
+    return [ParteImap.desde_estructura(seccion or "1", estructura)]
+
+
+def _decodificar(contenido: bytes, encoding: str) -> bytes:
+    encoding = (encoding or "").lower()
+    if encoding == "base64":
+        return base64.b64decode(contenido)
+    if encoding == "quoted-printable":
+        return quopri.decodestring(contenido)
+    return contenido
+
+
+def reconstruir_mensaje(cabeceras: bytes, multipart: bool, partes) -> Message:
+    """
+    ``email.message.Message`` con las cabeceras y solo las partes descargadas, apto
+    para ``walk()``/``get_payload(decode=True)`` como si fuera el RFC822 completo.
+    ``partes`` son pares ``(ParteImap, contenido con su transfer-encoding)``.
+    """
+    mensaje = email.message_from_bytes(cabeceras or b"")
+    if not multipart:
+        parte, contenido = partes[0] if partes else (None, b"")
+        if parte is not None:
+            mensaje["Content-Type"] = parte.tipo
+            if parte.charset:
+                mensaje.set_param("charset", parte.charset)
+            mensaje["Content-Transfer-Encoding"] = parte.encoding
+        mensaje.set_payload(contenido.decode("ascii", "surrogateescape"))
+        return mensaje
+
+    mensaje["Content-Type"] = "multipart/mixed"
+    mensaje.set_payload([])
+    for parte, contenido in partes:
+        sub = Message()
+        if parte.es_eml:
+            sub["Content-Type"] = "message/rfc822"
+            sub.set_payload([email.message_from_bytes(_decodificar(contenido, parte.encoding))])
+        else:
+            sub["Content-Type"] = parte.tipo
+            if parte.charset:
+                sub.set_param("charset", parte.charset)
+            sub["Content-Transfer-Encoding"] = parte.encoding
+            sub.set_payload(contenido.decode("ascii", "surrogateescape"))
+        if parte.filename:
+            sub.add_header(
+                "Content-Disposition", parte.disposicion or "attachment", filename=parte.filename
+            )
+        mensaje.attach(sub)
+    return mensaje
+
+
+def _bytes_respuesta(data) -> int:
+    total = 0
+    for item in data or ():
+        if isinstance(item, tuple):
+            total += sum(len(x) for x in item if x)
+        elif item:
+            total += len(item)
+    return total
+
+
+# ============================================================================
+# INGESTOR
+# ============================================================================
+
+
+@dataclass
+class MensajeImap:
+    """Mensaje candidato con las partes relevantes ya descargadas."""
+
+    uid: int
+    tamano: int
+    mensaje: Message
+    partes: list[ParteImap] = field(default_factory=list)
+
+
+@dataclass
+class EstadisticasIngesta:
+    """Métricas de un ciclo de ingesta."""
+
+    mensajes: int = 0
+    candidatos: int = 0
+    procesados: int = 0
+    errores: int = 0
+    bytes_descargados: int = 0
+    bytes_omitidos: int = 0
+    segundos: float = 0.0
+
+    @property
+    def mensajes_por_segundo(self) -> float:
+        """mensajes_por_segundo."""
+        return self.mensajes / self.segundos if self.segundos else 0.0
+
+    def resumen(self) -> str:
+        """resumen."""
+        return (
+            f"{self.bytes_descargados / 1024:.1f} KB descargados, "
+            f"{self.bytes_omitidos / 1024:.1f} KB omitidos, "
+            f"{self.mensajes_por_segundo:.1f} msg/s"
+        )
+
+
+class SesionUid:
+    """
+    Adaptador para los consumidores que marcan mensajes con ``store(num, flags, valor)``:
+    el ingestor entrega UIDs, no números de secuencia.
+    """
+
+    def __init__(self, imap):
+        """__init__."""
+        self.imap = imap
+
+    def store(self, uid, flags, valor):
+        """store."""
+        return self.imap.uid("STORE", str(uid), flags, valor)
+
+
+class ImapIngestor:
+    """Ciclos de ingesta de un buzón sobre una sesión del pool."""
+
+    def __init__(self, host, port, user, password, mailbox: str = "INBOX", ssl=None):
+        """__init__."""
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.mailbox = mailbox
+        self.ssl = getattr(settings, "EMAIL_MONITOR_IMAP_SSL", True) if ssl is None else ssl
+
+    def sesion(self):
+        """sesion."""
+        return ImapSessionPool.sesion(self.host, self.port, self.user, self.password, self.ssl)
+
+    # --- checkpoints ---------------------------------------------------------
+
+    @property
+    def _checkpoint_key(self) -> str:
+        digest = hashlib.sha1(  # noqa: S324 - clave de cache, no seguridad
+            f"{self.host}:{self.port}:{self.user}:{self.mailbox}".encode()
+        ).hexdigest()
+        return f"imap_checkpoint:{digest}"
+
+    def checkpoint(self) -> dict | None:
+        """``{"uidvalidity": int, "last_uid": int}`` del buzón, si existe."""
+        return cache.get(self._checkpoint_key)
+
+    def guardar_checkpoint(self, uidvalidity, last_uid) -> None:
+        """guardar_checkpoint."""
+        cache.set(self._checkpoint_key, {"uidvalidity": uidvalidity, "last_uid": last_uid}, None)
+
+    def reiniciar_checkpoint(self) -> None:
+        """reiniciar_checkpoint."""
+        cache.delete(self._checkpoint_key)
+
+    # --- ciclo ---------------------------------------------------------------
+
+    def ciclo(self, procesar, solo_no_leidos: bool = True) -> EstadisticasIngesta:
+        """
+        Entrega a ``procesar(mensaje_imap, sesion_uid)`` cada mensaje nuevo con partes
+        relevantes; ``procesar`` retorna True si lo procesó. Los mensajes sin partes
+        relevantes no se descargan. El checkpoint avanza por lote, haya o no excepción
+        en ``procesar``, igual que antes un FETCH RFC822 los dejaba leídos.
+
+        Con ``solo_no_leidos=False`` (``--all``) se recorre el buzón completo: no se lee
+        ni se avanza el checkpoint, para no saltar correos leídos o anteriores.
+        """
+        stats = EstadisticasIngesta()
+        inicio = time.perf_counter()
+        with self.sesion() as imap:
+            status, _ = imap.select(self.mailbox)
+            if status != "OK":
+                raise imaplib.IMAP4.error(f"No se pudo seleccionar {self.mailbox}")
+            uidvalidity = self._respuesta_int(imap, "UIDVALIDITY")
+            uidnext = self._respuesta_int(imap, "UIDNEXT")
+
+            previo = self.checkpoint() if solo_no_leidos else None
+            ultimo = 0
+            if previo and uidvalidity and previo.get("uidvalidity") == uidvalidity:
+                ultimo = previo.get("last_uid") or 0
+            elif previo:
+                logger.warning(
+                    f"UIDVALIDITY de {self.user}/{self.mailbox} cambió; se reinicia el checkpoint."
+                )
+
+            if ultimo and uidnext and uidnext <= ultimo + 1:
+                stats.segundos = time.perf_counter() - inicio
+                return stats
+
+            uids = self._buscar(imap, ultimo, solo_no_leidos)
+            lote_size = getattr(settings, "EMAIL_MONITOR_IMAP_FETCH_BATCH", 50)
+            sesion_uid = SesionUid(imap)
+            for i in range(0, len(uids), lote_size):
+                lote = uids[i : i + lote_size]
+                for mensaje in self._descargar(imap, lote, stats):
+                    try:
+                        if procesar(mensaje, sesion_uid):
+                            stats.procesados += 1
+                    except Exception as e:
+                        stats.errores += 1
+                        logger.error(f"Error procesando UID {mensaje.uid}: {e}")
+                if uidvalidity and solo_no_leidos:
+                    self.guardar_checkpoint(uidvalidity, max(ultimo, lote[-1]))
+            if uidvalidity and uidnext and not uids and solo_no_leidos:
+                self.guardar_checkpoint(uidvalidity, max(ultimo, uidnext - 1))
+
+        stats.segundos = time.perf_counter() - inicio
+        return stats
+
+    def esperar_cambios(self, timeout: float) -> bool:
+        """
+        IMAP IDLE: bloquea hasta que el servidor notifique cambios en el buzón o venza
+        ``timeout``. Retorna False (sin esperar) si el servidor no soporta IDLE.
+        """
+        with self.sesion() as imap:
+            if "IDLE" not in imap.capabilities:
+                return False
+            imap.select(self.mailbox)
+            tag = imap._new_tag()
+            imap.send(tag + b" IDLE\r\n")
+            if not imap.readline().startswith(b"+"):
+                raise imaplib.IMAP4.error("El servidor rechazó IDLE")
+            try:
+                # Cualquier respuesta no etiquetada (EXISTS, EXPUNGE, FETCH) despierta.
+                select.select([imap.socket()], [], [], timeout)
+            finally:
+                imap.send(b"DONE\r\n")
+                while True:
+                    linea = imap.readline()
+                    if not linea:
+                        raise imaplib.IMAP4.abort("Conexión cerrada durante IDLE")
+                    if linea.startswith(tag):
+                        break
+        return True
+
+    # --- internos ------------------------------------------------------------
+
+    @staticmethod
+    def _respuesta_int(imap, codigo) -> int | None:
+        _, valores = imap.response(codigo)
+        try:
+            return int(valores[-1])
+        except (IndexError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _buscar(imap, ultimo, solo_no_leidos) -> list[int]:
+        criterios = []
+        if ultimo:
+            criterios += ["UID", f"{ultimo + 1}:*"]
+        criterios.append("UNSEEN" if solo_no_leidos else "ALL")
+        status, data = imap.uid("SEARCH", *criterios)
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"SEARCH falló: {data}")
+        # "n:*" siempre incluye el último mensaje aunque su UID sea <= n.
+        return sorted(int(uid) for uid in (data[0] or b"").split() if int(uid) > ultimo)
+
+    def _descargar(self, imap, uids, stats):
+        """
+        Cabeceras + BODYSTRUCTURE del lote; luego solo las partes relevantes, con un FETCH
+        por cada combinación de secciones (los boletos de un mismo emisor comparten forma).
+        """
+        status, data = imap.uid(
+            "FETCH",
+            ",".join(str(uid) for uid in uids),
+            f"(UID RFC822.SIZE BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({CABECERAS})])",
+        )
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"FETCH de cabeceras falló: {data}")
+        stats.bytes_descargados += _bytes_respuesta(data)
+
+        candidatos, grupos = [], {}
+        for item in sorted(parsear_fetch(data), key=lambda m: int(m.get("UID") or 0)):
+            if not item.get("UID"):
+                continue
+            uid, tamano = int(item["UID"]), int(item.get("RFC822.SIZE") or 0)
+            stats.mensajes += 1
+            partes = [p for p in partes_de(item.get("BODYSTRUCTURE")) if p.relevante]
+            if not partes:
+                stats.bytes_omitidos += tamano
+                continue
+            candidatos.append((uid, tamano, item, partes))
+            grupos.setdefault(tuple(p.seccion for p in partes), []).append(uid)
+
+        cuerpos: dict[int, dict] = {}
+        for secciones, miembros in grupos.items():
+            pedido = " ".join(f"BODY.PEEK[{seccion}]" for seccion in secciones)
+            status, data = imap.uid("FETCH", ",".join(map(str, miembros)), f"(UID {pedido})")
+            if status != "OK":
+                raise imaplib.IMAP4.error(f"FETCH de partes falló: {data}")
+            stats.bytes_descargados += _bytes_respuesta(data)
+            for respuesta in parsear_fetch(data):
+                if respuesta.get("UID"):
+                    cuerpos.setdefault(int(respuesta["UID"]), {}).update(respuesta)
+
+        for uid, tamano, item, partes in candidatos:
+            recibidos = cuerpos.get(uid, {})
+            contenido = [(p, recibidos.get(f"BODY[{p.seccion}]") or b"") for p in partes]
+            stats.bytes_omitidos += max(0, tamano - sum(len(c) for _, c in contenido))
+            stats.candidatos += 1
+            estructura = item.get("BODYSTRUCTURE")
+            cabeceras = next((v for k, v in item.items() if k.startswith("BODY[HEADER")), b"")
+            yield MensajeImap(
+                uid=uid,
+                tamano=tamano,
+                mensaje=reconstruir_mensaje(cabeceras, isinstance(estructura[0], list), contenido),
+                partes=partes,
+            )
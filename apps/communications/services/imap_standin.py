@@ -0,0 +1,357 @@
+"""
+Servidor IMAP4rev1 mínimo en memoria para pruebas y benchmarks de la ingesta de correo.
+
+Implementa el subconjunto que usan ``EmailMonitorService`` e ``ImapIngestor`` (LOGIN,
+SELECT, SEARCH/FETCH/STORE con y sin UID, BODYSTRUCTURE, secciones ``BODY[...]``, IDLE)
+sobre TCP sin TLS en 127.0.0.1, y cuenta los bytes enviados y los LOGIN recibidos.
+``latencia`` (segundos por comando) y ``ancho_banda`` (bytes/s) simulan un servidor
+remoto. No es un servidor de producción.
+"""
+
+import email
+import re
+import select
+import socketserver
+import threading
+import time
+from email import policy
+
+_ITEMS = re.compile(
+    r"BODY(?:\.PEEK)?\[[^\]]*\]|RFC822\.SIZE|RFC822|UID|FLAGS|BODYSTRUCTURE", re.IGNORECASE
+)
+_ARGS = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+
+
+def _q(valor) -> str:
+    if valor is None:
+        return "NIL"
+    return '"' + str(valor).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _lista_params(pares) -> str:
+    if not pares:
+        return "NIL"
+    return "(" + " ".join(f"{_q(k.upper())} {_q(v)}" for k, v in pares) + ")"
+
+
+def _cuerpo(parte) -> bytes:
+    """Cuerpo de la parte tal como viaja (con su Content-Transfer-Encoding)."""
+    if parte.get_content_type() == "message/rfc822":
+        return parte.get_payload(0).as_bytes(policy=policy.SMTP)
+    payload = parte.get_payload(decode=False)
+    if isinstance(payload, bytes):
+        return payload
+    return (payload or "").encode("utf-8", "surrogateescape")
+
+
+def _estructura(parte, secciones, seccion="") -> str:
+    """BODYSTRUCTURE de ``parte``; registra cada hoja en ``secciones``."""
+    if parte.get_content_maintype() == "multipart":
+        hijos = "".join(
+            _estructura(sub, secciones, f"{seccion}.{i}" if seccion else str(i))
+            for i, sub in enumerate(parte.get_payload(), 1)
+        )
+        return f"({hijos} {_q(parte.get_content_subtype().upper())})"
+
+    seccion = seccion or "1"
+    cuerpo = _cuerpo(parte)
+    secciones[seccion] = cuerpo
+    params = [(k, v) for k, v in parte.get_params(header="content-type") or []][1:]
+    basicos = (
+        f"{_q(parte.get_content_maintype().upper())} {_q(parte.get_content_subtype().upper())} "
+        f"{_lista_params(params)} NIL NIL "
+        f"{_q(parte.get('Content-Transfer-Encoding', '7BIT').upper())} {len(cuerpo)}"
+    )
+    if parte.get_content_maintype() == "text":
+        basicos += f" {cuerpo.count(b'\n')}"
+    elif parte.get_content_type() == "message/rfc822":
+        anidado = _estructura(parte.get_payload(0), {}, "")
+        envelope = "(" + " ".join(["NIL"] * 10) + ")"
+        basicos += f" {envelope} {anidado} {cuerpo.count(b'\n')}"
+
+    disposicion = "NIL"
+    if parte.get("Content-Disposition"):
+        disp_params = (parte.get_params(header="content-disposition") or [])[1:]
+        disposicion = (
+            f"({_q(parte.get_content_disposition().upper())} {_lista_params(disp_params)})"
+        )
+    return f"({basicos} NIL {disposicion} NIL NIL)"
+
+
+class _Mensaje:
+    def __init__(self, uid, raw, flags):
+        self.uid = uid
+        self.raw = raw
+        self.flags = set(flags)
+        self.parsed = email.message_from_bytes(raw)
+        self.secciones: dict[str, bytes] = {}
+        self.bodystructure = _estructura(self.parsed, self.secciones)
+
+    def cabeceras(self, campos) -> bytes:
+        nombres = {c.lower() for c in campos}
+        cabecera = self.raw.split(b"\r\n\r\n", 1)[0].split(b"\n\n", 1)[0]
+        lineas, incluir = [], False
+        for linea in cabecera.replace(b"\r\n", b"\n").split(b"\n"):
+            if linea[:1] in (b" ", b"\t"):
+                if incluir:
+                    lineas.append(linea)
+                continue
+            incluir = linea.split(b":", 1)[0].strip().lower().decode() in nombres
+            if incluir:
+                lineas.append(linea)
+        return b"".join(linea + b"\r\n" for linea in lineas) + b"\r\n"
+
+
+class ServidorImapLocal:
+    """Buzón INBOX en memoria servido por IMAP en ``host``/``port``."""
+
+    def __init__(
+        self,
+        usuario="monitor@example.com",
+        password="secreto",  # noqa: S107
+        uidvalidity=1,
+        latencia: float = 0.0,
+        ancho_banda: int | None = None,
+    ):
+        """__init__."""
+        self.usuario = usuario
+        self.password = password
+        self.uidvalidity = uidvalidity
+        self.latencia = latencia
+        self.ancho_banda = ancho_banda
+        self.mensajes: list[_Mensaje] = []
+        self.bytes_enviados = 0
+        self.logins = 0
+        self._uidnext = 1
+        self._lock = threading.Lock()
+        self._server = None
+
+    def agregar(self, raw: bytes, seen: bool = False) -> int:
+        """Agrega un mensaje RFC822 y retorna su UID."""
+        with self._lock:
+            uid = self._uidnext
+            self._uidnext += 1
+            self.mensajes.append(_Mensaje(uid, raw, {"\\Seen"} if seen else set()))
+        return uid
+
+    def flags(self, uid) -> set[str]:
+        """flags."""
+        return next(m.flags for m in self.mensajes if m.uid == uid)
+
+    @property
+    def host(self) -> str:
+        """host."""
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        """port."""
+        return self._server.server_address[1]
+
+    def iniciar(self) -> "ServidorImapLocal":
+        """iniciar."""
+        servidor = self
+
+        class Handler(_Sesion):
+            buzon = servidor
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self) -> None:
+        """detener."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        """__enter__."""
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        """__exit__."""
+        self.detener()
+
+
+class _Sesion(socketserver.StreamRequestHandler):
+    buzon: ServidorImapLocal
+    disable_nagle_algorithm = True
+
+    def enviar(self, data: bytes) -> None:
+        self.buzon.bytes_enviados += len(data)
+        if self.buzon.ancho_banda:
+            time.sleep(len(data) / self.buzon.ancho_banda)
+        self.wfile.write(data)
+
+    def linea(self, texto: str) -> None:
+        self.enviar(texto.encode() + b"\r\n")
+
+    def handle(self):
+        self.autenticado = False
+        time.sleep(self.buzon.latencia)
+        self.linea("* OK [CAPABILITY IMAP4rev1 IDLE UIDPLUS] Servidor IMAP local listo")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            partes = raw.decode("utf-8", "replace").rstrip("\r\n").split(" ", 2)
+            if len(partes) < 2:
+                continue
+            time.sleep(self.buzon.latencia)
+            tag, comando = partes[0], partes[1].upper()
+            resto = partes[2] if len(partes) > 2 else ""
+            if comando == "UID":
+                sub, _, resto = resto.partition(" ")
+                comando, por_uid = sub.upper(), True
+            else:
+                por_uid = False
+            metodo = getattr(self, f"cmd_{comando.lower()}", None)
+            if metodo is None:
+                self.linea(f"{tag} BAD comando desconocido")
+                continue
+            if metodo(tag, resto, por_uid) is False:
+                return
+
+    # --- comandos ----------------------------------------------------------
+
+    def cmd_capability(self, tag, resto, por_uid):
+        self.linea("* CAPABILITY IMAP4rev1 IDLE UIDPLUS")
+        self.linea(f"{tag} OK CAPABILITY completado")
+
+    def cmd_login(self, tag, resto, por_uid):
+        args = [a or b for a, b in _ARGS.findall(resto)]
+        if args[:2] == [self.buzon.usuario, self.buzon.password]:
+            self.autenticado = True
+            self.buzon.logins += 1
+            self.linea(f"{tag} OK [CAPABILITY IMAP4rev1 IDLE UIDPLUS] LOGIN completado")
+        else:
+            self.linea(f"{tag} NO [AUTHENTICATIONFAILED] credenciales inválidas")
+
+    def cmd_noop(self, tag, resto, por_uid):
+        self.linea(f"{tag} OK NOOP completado")
+
+    def cmd_select(self, tag, resto, por_uid):
+        self.linea(f"* {len(self.buzon.mensajes)} EXISTS")
+        self.linea("* 0 RECENT")
+        self.linea("* FLAGS (\\Seen \\Answered \\Flagged \\Deleted \\Draft)")
+        self.linea(f"* OK [UIDVALIDITY {self.buzon.uidvalidity}] UIDs válidos")
+        self.linea(f"* OK [UIDNEXT {self.buzon._uidnext}] Próximo UID")
+        self.linea(f"{tag} OK [READ-WRITE] SELECT completado")
+
+    cmd_examine = cmd_select
+
+    def cmd_close(self, tag, resto, por_uid):
+        self.linea(f"{tag} OK CLOSE completado")
+
+    def cmd_logout(self, tag, resto, por_uid):
+        self.linea("* BYE cerrando")
+        self.linea(f"{tag} OK LOGOUT completado")
+        return False
+
+    def cmd_search(self, tag, resto, por_uid):
+        tokens = resto.upper().replace("(", " ").replace(")", " ").split()
+        seleccion = list(enumerate(self.buzon.mensajes, 1))
+        i = 0
+        while i < len(tokens):
+            criterio = tokens[i]
+            if criterio == "UNSEEN":
+                seleccion = [(n, m) for n, m in seleccion if "\\Seen" not in m.flags]
+            elif criterio == "UID":
+                i += 1
+                uids = self._conjunto(tokens[i], [m.uid for m in self.buzon.mensajes])
+                seleccion = [(n, m) for n, m in seleccion if m.uid in uids]
+            i += 1
+        valores = " ".join(str(m.uid if por_uid else n) for n, m in seleccion)
+        self.linea(f"* SEARCH {valores}".rstrip())
+        self.linea(f"{tag} OK SEARCH completado")
+
+    def cmd_fetch(self, tag, resto, por_uid):
+        conjunto, _, items = resto.partition(" ")
+        items = [i.upper() for i in _ITEMS.findall(items)]
+        for n, mensaje in self._seleccion(conjunto, por_uid):
+            salida = [f"* {n} FETCH (".encode()]
+            partes = []
+            if por_uid and "UID" not in items:
+                items = ["UID", *items]
+            for item in items:
+                if item == "UID":
+                    partes.append(f"UID {mensaje.uid}".encode())
+                elif item == "FLAGS":
+                    partes.append(f"FLAGS ({' '.join(sorted(mensaje.flags))})".encode())
+                elif item == "RFC822.SIZE":
+                    partes.append(f"RFC822.SIZE {len(mensaje.raw)}".encode())
+                elif item == "BODYSTRUCTURE":
+                    partes.append(f"BODYSTRUCTURE {mensaje.bodystructure}".encode())
+                elif item == "RFC822":
+                    mensaje.flags.add("\\Seen")
+                    partes.append(self._literal("RFC822", mensaje.raw))
+                else:
+                    seccion = item[item.index("[") + 1 : -1]
+                    if not item.startswith("BODY.PEEK"):
+                        mensaje.flags.add("\\Seen")
+                    if seccion.startswith("HEADER.FIELDS"):
+                        campos = seccion[seccion.index("(") + 1 : seccion.rindex(")")].split()
+                        contenido = mensaje.cabeceras(campos)
+                    elif seccion == "":
+                        contenido = mensaje.raw
+                    else:
+                        contenido = mensaje.secciones.get(seccion, b"")
+                    partes.append(self._literal(f"BODY[{seccion}]", contenido))
+            salida.append(b" ".join(partes))
+            salida.append(b")\r\n")
+            self.enviar(b"".join(salida))
+        self.linea(f"{tag} OK FETCH completado")
+
+    def cmd_store(self, tag, resto, por_uid):
+        conjunto, modo, valores = (resto.split(" ", 2) + ["", ""])[:3]
+        flags = set(valores.strip("()").split())
+        for n, mensaje in self._seleccion(conjunto, por_uid):
+            if modo.upper().startswith("+"):
+                mensaje.flags |= flags
+            elif modo.upper().startswith("-"):
+                mensaje.flags -= flags
+            else:
+                mensaje.flags = flags
+            uid = f"UID {mensaje.uid} " if por_uid else ""
+            self.linea(f"* {n} FETCH ({uid}FLAGS ({' '.join(sorted(mensaje.flags))}))")
+        self.linea(f"{tag} OK STORE completado")
+
+    def cmd_idle(self, tag, resto, por_uid):
+        self.linea("+ idling")
+        vistos = len(self.buzon.mensajes)
+        while True:
+            if select.select([self.connection], [], [], 0.05)[0]:
+                self.rfile.readline()  # DONE
+                self.linea(f"{tag} OK IDLE terminado")
+                return
+            if len(self.buzon.mensajes) != vistos:
+                vistos = len(self.buzon.mensajes)
+                self.linea(f"* {vistos} EXISTS")
+
+    # --- utilidades --------------------------------------------------------
+
+    @staticmethod
+    def _literal(nombre, contenido: bytes) -> bytes:
+        return f"{nombre} {{{len(contenido)}}}\r\n".encode() + contenido
+
+    @staticmethod
+    def _conjunto(texto, existentes) -> set[int]:
+        maximo = max(existentes, default=0)
+        valores = set()
+        for rango in texto.split(","):
+            inicio, _, fin = rango.partition(":")
+            a = maximo if inicio == "*" else int(inicio)
+            b = a if not fin else (maximo if fin == "*" else int(fin))
+            valores.update(range(min(a, b), max(a, b) + 1))
+        return valores
+
+    def _seleccion(self, conjunto, por_uid):
+        mensajes = list(enumerate(self.buzon.mensajes, 1))
+        if por_uid:
+            uids = self._conjunto(conjunto, [m.uid for _, m in mensajes])
+            return [(n, m) for n, m in mensajes if m.uid in uids]
+        numeros = self._conjunto(conjunto, [n for n, _ in mensajes])
+        return [(n, m) for n, m in mensajes if n in numeros]
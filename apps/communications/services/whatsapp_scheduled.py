@@ -0,0 +1,281 @@
+"""
+Despacho por lotes de mensajes de WhatsApp programados.
+
+La tarea de Celery Beat recorría todos los ``WhatsAppScheduledMessage`` vencidos con
+un ``save()`` para marcarlo, un ``send_text`` síncrono (con su consulta de estado de
+instancia), un ``MensajeWhatsApp.objects.create`` y otro ``save()`` por mensaje. Una
+campaña de miles de mensajes superaba el ``soft_time_limit`` y dos ejecuciones de
+beat podían enviar las mismas filas. ``ScheduledWhatsAppDispatcher``:
+
+1. Marca como ``interrumpidos`` (fallidos) los mensajes que quedaron en ``sending``
+   por un worker muerto; nunca se reenvían para no duplicar el mensaje al cliente.
+2. Reclama lotes con ``SELECT ... FOR UPDATE SKIP LOCKED`` + un ``UPDATE``: varias
+   ejecuciones en paralelo drenan la cola sin pisarse.
+3. Envía en un pool de hilos sobre la sesión HTTP compartida de ``EvolutionService``,
+   con concurrencia y ritmo (mensajes/segundo) acotados por instancia Evolution. El
+   estado de cada instancia se verifica una vez por lote, no por mensaje.
+
+   El ritmo se mantiene durante toda la ejecución (los lotes comparten limitadores),
+   pero es por worker: dos ejecuciones en paralelo suman sus ritmos. El tope entre
+   procesos es el límite por hora de ``EvolutionService`` (contador en la caché).
+4. Persiste los ``MensajeWhatsApp`` con un ``bulk_create`` y los estados con un
+   ``bulk_update`` por lote.
+
+Si el circuit breaker de WhatsApp se abre, los mensajes no enviados vuelven a
+``scheduled`` y la ejecución termina; los toma la siguiente pasada de beat.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import chain, zip_longest
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.communications.services.evolution_api_service import EvolutionService
+from apps.crm.models import MensajeWhatsApp, WhatsAppScheduledMessage
+
+logger = logging.getLogger(__name__)
+
+SEND_ERROR = "Error al enviar vía Evolution"
+STALE_ERROR = "Envío interrumpido (worker detenido); revisar antes de reprogramar."
+
+
+@dataclass
+class ScheduledDispatchReport:
+    """Resultado y métricas de una ejecución del despacho."""
+
+    batches: int = 0
+    claimed: int = 0
+    sent: int = 0
+    failed: int = 0
+    released: int = 0
+    interrupted: int = 0
+    elapsed_s: float = 0.0
+    send_s: float = 0.0
+    lag_total_s: float = 0.0
+    lag_max_s: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Mensajes enviados por segundo de la ejecución completa."""
+        return self.sent / self.elapsed_s if self.elapsed_s else 0.0
+
+    @property
+    def lag_avg_s(self) -> float:
+        """Retraso medio entre ``programado_para`` y el envío efectivo."""
+        return self.lag_total_s / self.sent if self.sent else 0.0
+
+
+class _InstanceThrottle:
+    """Limita los envíos simultáneos y el ritmo de una instancia Evolution."""
+
+    def __init__(self, per_second: float, concurrency: int):
+        """__init__."""
+        self._interval = 1 / per_second if per_second > 0 else 0.0
+        self._slots = threading.BoundedSemaphore(max(concurrency, 1))
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    @contextmanager
+    def turn(self):
+        """Espera un hueco libre y el siguiente instante permitido por el ritmo."""
+        with self._slots:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._next - now
+                self._next = max(now, self._next) + self._interval
+            if wait > 0:
+                time.sleep(wait)
+            yield
+
+
+class ScheduledWhatsAppDispatcher:
+    """Despacho de mensajes programados por lotes (ver docstring del módulo)."""
+
+    @classmethod
+    def run(
+        cls,
+        batch_size: int | None = None,
+        time_budget: float | None = None,
+        max_workers: int | None = None,
+    ) -> ScheduledDispatchReport:
+        """
+        Drena los mensajes vencidos lote a lote hasta vaciar la cola o agotar
+        ``time_budget`` segundos (se comprueba entre lotes, dejar margen bajo el
+        ``soft_time_limit`` de la tarea).
+        """
+        batch_size = batch_size or getattr(settings, "EVOLUTION_SCHEDULED_BATCH_SIZE", 200)
+        if time_budget is None:
+            time_budget = getattr(settings, "EVOLUTION_SCHEDULED_TIME_BUDGET", 80)
+        report = ScheduledDispatchReport()
+        throttles: dict[str, _InstanceThrottle] = {}
+        start = time.perf_counter()
+
+        report.interrupted = cls.fail_stale()
+        while time.perf_counter() - start < time_budget:
+            ids = cls.claim(batch_size)
+            if not ids:
+                break
+            report.batches += 1
+            report.claimed += len(ids)
+            cls._process(ids, report, max_workers, throttles)
+            if report.released or len(ids) < batch_size:
+                break
+        report.elapsed_s = time.perf_counter() - start
+
+        if report.claimed or report.interrupted:
+            logger.info(
+                f"📤 WA programados: {report.sent}/{report.claimed} enviados, "
+                f"{report.failed} fallidos, {report.released} devueltos a la cola, "
+                f"{report.interrupted} interrumpidos en {report.batches} lotes "
+                f"({report.elapsed_s:.2f}s, {report.throughput:.1f} msg/s; "
+                f"retraso medio {report.lag_avg_s:.1f}s, máximo {report.lag_max_s:.1f}s)"
+            )
+        return report
+
+    @classmethod
+    def claim(cls, limit: int) -> list[int]:
+        """
+        Marca como ``sending`` hasta ``limit`` mensajes vencidos (los más antiguos
+        primero) y retorna sus IDs. Las filas bloqueadas por otro worker se saltan.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                WhatsAppScheduledMessage.all_objects.filter(
+                    estado="scheduled", programado_para__lte=now
+                )
+                .order_by("programado_para", "pk")
+                .select_for_update(skip_locked=True)
+                .values_list("pk", flat=True)[:limit]
+            )
+            WhatsAppScheduledMessage.all_objects.filter(pk__in=ids).update(
+                estado="sending", updated_at=now
+            )
+        return ids
+
+    @classmethod
+    def fail_stale(cls) -> int:
+        """Marca como fallidos los mensajes reclamados que nunca se confirmaron."""
+        stale_after = getattr(settings, "EVOLUTION_SCHEDULED_STALE_AFTER", 900)
+        now = timezone.now()
+        return WhatsAppScheduledMessage.all_objects.filter(
+            estado="sending", updated_at__lt=now - timedelta(seconds=stale_after)
+        ).update(estado="failed", error_msg=STALE_ERROR, updated_at=now)
+
+    @staticmethod
+    def instance_name(msg) -> str:
+        """Instancia Evolution de la agencia del mensaje."""
+        cfg = msg.agencia._safe_config() if msg.agencia else None
+        if cfg and cfg.evolution_instance_name:
+            return cfg.evolution_instance_name
+        return f"agencia_{msg.agencia_id}"
+
+    @classmethod
+    def _process(cls, ids, report, max_workers=None, throttles=None):
+        mensajes = list(
+            WhatsAppScheduledMessage.all_objects.select_related("agencia__configuracion")
+            .filter(pk__in=ids)
+            .order_by("programado_para", "pk")
+        )
+        t0 = time.perf_counter()
+        outcomes = cls._send_all(mensajes, max_workers, throttles)
+        report.send_s += time.perf_counter() - t0
+
+        now = timezone.now()
+        salientes = []
+        for msg, (estado, error, sent_at) in zip(mensajes, outcomes, strict=True):
+            msg.estado = estado
+            msg.updated_at = now
+            if estado == "sent":
+                msg.mensaje_resultante = MensajeWhatsApp(
+                    cliente_id=msg.cliente_id,
+                    direccion="OUT",
+                    texto=msg.texto,
+                    estado="sent",
+                    tipo_mensaje="text",
+                    agencia_id=msg.agencia_id,
+                )
+                salientes.append(msg.mensaje_resultante)
+                lag = max((sent_at - msg.programado_para).total_seconds(), 0.0)
+                report.lag_total_s += lag
+                report.lag_max_s = max(report.lag_max_s, lag)
+                report.sent += 1
+            elif estado == "failed":
+                msg.error_msg = error
+                report.failed += 1
+            else:
+                report.released += 1
+
+        with transaction.atomic():
+            MensajeWhatsApp.all_objects.bulk_create(salientes)
+            WhatsAppScheduledMessage.all_objects.bulk_update(
+                mensajes, ["estado", "error_msg", "mensaje_resultante", "updated_at"]
+            )
+
+    @classmethod
+    def _send_all(cls, mensajes, max_workers=None, throttles=None) -> list[tuple]:
+        """
+        Envía el lote; retorna ``(estado, error, enviado_en)`` por mensaje, en orden.
+        ``throttles`` (instancia -> limitador) se reutiliza entre lotes de una ejecución.
+        """
+        if max_workers is None:
+            max_workers = getattr(settings, "EVOLUTION_SCHEDULED_MAX_WORKERS", 16)
+        per_second = getattr(settings, "EVOLUTION_SCHEDULED_RATE_PER_INSTANCE", 5)
+        concurrency = getattr(settings, "EVOLUTION_SCHEDULED_CONCURRENCY_PER_INSTANCE", 2)
+
+        por_instancia = defaultdict(list)
+        for i, msg in enumerate(mensajes):
+            por_instancia[cls.instance_name(msg)].append(i)
+        throttles = {} if throttles is None else throttles
+        for name in por_instancia:
+            if name not in throttles:
+                throttles[name] = _InstanceThrottle(per_second, concurrency)
+        instancia_de = {i: name for name, indices in por_instancia.items() for i in indices}
+        # Round-robin entre instancias: la cola FIFO del pool las hace avanzar en paralelo.
+        orden = [
+            i for i in chain.from_iterable(zip_longest(*por_instancia.values())) if i is not None
+        ]
+
+        def ensure(name):
+            try:
+                EvolutionService._ensure_instance(name)
+            except Exception as e:
+                logger.warning(f"No se pudo verificar la instancia Evolution '{name}': {e}")
+
+        def send(i):
+            name = instancia_de[i]
+            with throttles[name].turn():
+                return cls._send_one(name, mensajes[i])
+
+        outcomes = [None] * len(mensajes)
+        workers = max(1, min(max_workers, len(por_instancia) * concurrency, len(mensajes)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(ensure, por_instancia))
+            for i, outcome in zip(orden, executor.map(send, orden), strict=True):
+                outcomes[i] = outcome
+        return outcomes
+
+    @staticmethod
+    def _send_one(name, msg) -> tuple:
+        try:
+            result = EvolutionService.send_text(
+                name, msg.telefono, msg.texto, ensure_instance=False
+            )
+        except Exception as e:
+            logger.error(f"Error enviando WA programado #{msg.pk}: {e}")
+            return "failed", str(e)[:500], None
+        if result is True:
+            return "sent", "", timezone.now()
+        if isinstance(result, dict):
+            # Circuit breaker abierto: no se intentó el envío, vuelve a la cola.
+            return "scheduled", "", None
+        return "failed", SEND_ERROR, None
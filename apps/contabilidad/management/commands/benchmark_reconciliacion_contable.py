@@ -0,0 +1,198 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.contabilidad.models import AsientoContable, CuentaContable, MovimientoContable
+from apps.contabilidad.reconciliation import (
+    CUENTA_CXC,
+    CUENTA_IGTF,
+    CUENTA_INGRESOS,
+    CUENTA_IVA,
+    ContabilidadReconciliationService,
+)
+from apps.finance.models import Factura, TasaCambioBCV
+from core.middleware import agency_context
+from core.models import Agencia
+from core.signals_bypass import disable_signals
+
+CUENTAS = (
+    ("1.1.1.01", "Caja", "ACT"),
+    ("1.1.2.01", "Cuentas por Cobrar Clientes", "ACT"),
+    ("2.1.4.01", "IVA por Pagar", "PAS"),
+    ("2.1.5.01", "IGTF por Pagar", "PAS"),
+    ("4.1.01", "Ingresos por Ventas", "ING"),
+)
+
+
+class _Contador:
+    """execute_wrapper que cuenta consultas."""
+
+    def __init__(self):
+        """__init__."""
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """__call__."""
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    """Compara la reconciliación contable documento a documento contra la reconciliación por conjuntos."""
+
+    help = (
+        "Benchmark de ContabilidadReconciliationService: réplica del camino documento a "
+        "documento (una consulta por asiento, cuenta y movimiento) vs. anti-join + bulk_create. "
+        "Crea facturas sintéticas dentro de una transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument("--facturas", type=int, default=2000)
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        """handle."""
+        with transaction.atomic():
+            agencia = Agencia.objects.create(
+                nombre="Benchmark Reconciliacion", email_principal="benchmark@example.com"
+            )
+            with agency_context(agencia), disable_signals():
+                factura_ids = self._crear_datos(agencia, options["facturas"])
+                asientos = AsientoContable.all_objects.filter(agencia=agencia)
+
+                por_documento_q, masivo_q = _Contador(), _Contador()
+                with connection.execute_wrapper(por_documento_q):
+                    t0 = time.perf_counter()
+                    self._por_documento(factura_ids)
+                    por_documento = time.perf_counter() - t0
+                esperado = self._firma(agencia)
+                asientos.delete()
+
+                with connection.execute_wrapper(masivo_q):
+                    t0 = time.perf_counter()
+                    resumen = ContabilidadReconciliationService.reconciliar(
+                        chunk_size=options["chunk_size"]
+                    )
+                    masivo = time.perf_counter() - t0
+                obtenido = self._firma(agencia)
+
+            transaction.set_rollback(True)
+
+        n = len(factura_ids)
+        self.stdout.write(self.style.SUCCESS(f"\nReconciliación de {n} facturas sin asiento"))
+        self.stdout.write(
+            f" - Por documento: {por_documento:.2f} s ({por_documento_q.total} consultas, "
+            f"{n / por_documento:.0f} facturas/s)"
+        )
+        self.stdout.write(
+            f" - Por conjuntos: {masivo:.2f} s ({masivo_q.total} consultas, "
+            f"{n / masivo:.0f} facturas/s, {resumen['lotes']} lotes, "
+            f"{resumen['movimientos']} movimientos)"
+        )
+        self.stdout.write(f" - Aceleración: {por_documento / masivo:.1f}x")
+        if obtenido == esperado:
+            self.stdout.write(self.style.SUCCESS(" - Asientos idénticos en ambos caminos."))
+        else:
+            self.stdout.write(self.style.ERROR(" - ¡Los asientos difieren entre caminos!"))
+
+    @staticmethod
+    def _crear_datos(agencia, total) -> list[int]:
+        """Plan de cuentas mínimo, tasas BCV de un mes y facturas emitidas sin asiento."""
+        CuentaContable.all_objects.bulk_create(
+            [
+                CuentaContable(agencia=agencia, codigo=codigo, nombre=nombre, tipo=tipo)
+                for codigo, nombre, tipo in CUENTAS
+            ]
+        )
+        inicio = date(2026, 3, 1)
+        existentes = set(
+            TasaCambioBCV.objects.filter(
+                fecha__range=(inicio, inicio + timedelta(days=30))
+            ).values_list("fecha", flat=True)
+        )
+        TasaCambioBCV.objects.bulk_create(
+            [
+                TasaCambioBCV(fecha=inicio + timedelta(days=d), tasa=Decimal("36.50") + d)
+                for d in range(0, 31, 2)
+                if inicio + timedelta(days=d) not in existentes
+            ]
+        )
+        facturas = Factura.all_objects.bulk_create(
+            [
+                Factura(
+                    agencia=agencia,
+                    numero_control=f"BENCH-{agencia.pk}-{i}",
+                    estado=Factura.EstadoFactura.EMITIDA,
+                    fecha_emision=inicio + timedelta(days=i % 31),
+                    subtotal_usd=Decimal("100.00") + i % 50,
+                    total_iva_usd=Decimal("16.00"),
+                    total_igtf_usd=Decimal("3.00") if i % 3 == 0 else Decimal("0.00"),
+                    gran_total_usd=Decimal("116.00") + i % 50 + (3 if i % 3 == 0 else 0),
+                )
+                for i in range(total)
+            ]
+        )
+        return [f.pk for f in facturas]
+
+    @staticmethod
+    def _por_documento(factura_ids):
+        """Réplica del camino anterior: existencia, cuentas, tasa y movimientos por factura."""
+        ct = ContentType.objects.get_for_model(Factura)
+        partidas = (
+            (CUENTA_CXC, MovimientoContable.TipoMovimiento.DEBITO, "gran_total_usd"),
+            (CUENTA_INGRESOS, MovimientoContable.TipoMovimiento.CREDITO, "subtotal_usd"),
+            (CUENTA_IVA, MovimientoContable.TipoMovimiento.CREDITO, "total_iva_usd"),
+            (CUENTA_IGTF, MovimientoContable.TipoMovimiento.CREDITO, "total_igtf_usd"),
+        )
+        for factura_id in factura_ids:
+            factura = Factura.all_objects.get(pk=factura_id)
+            if AsientoContable.all_objects.filter(content_type=ct, object_id=factura.pk).exists():
+                continue
+            with transaction.atomic():
+                tasa = TasaCambioBCV.objects.filter(fecha__lte=factura.fecha_emision).order_by(
+                    "-fecha"
+                ).values_list("tasa", flat=True).first() or Decimal("1.00")
+                asiento = AsientoContable.all_objects.create(
+                    agencia=factura.agencia,
+                    tipo_asiento=AsientoContable.TipoAsiento.VENTAS,
+                    fecha_contable=factura.fecha_emision,
+                    glosa=f"Factura {factura.numero_control} -",
+                    content_type=ct,
+                    object_id=factura.pk,
+                )
+                for prefijos, tipo, campo in partidas:
+                    monto = getattr(factura, campo)
+                    if monto <= 0 and campo != "gran_total_usd":
+                        continue
+                    cuenta = None
+                    for prefijo in prefijos:
+                        cuenta = CuentaContable.all_objects.filter(
+                            codigo__startswith=prefijo,
+                            acepta_movimientos=True,
+                            agencia=factura.agencia,
+                        ).first()
+                        if cuenta:
+                            break
+                    if cuenta:
+                        MovimientoContable.all_objects.create(
+                            agencia=factura.agencia,
+                            asiento=asiento,
+                            cuenta=cuenta,
+                            tipo=tipo,
+                            monto_usd=monto,
+                            monto_ves=(monto * tasa).quantize(Decimal("0.01")),
+                        )
+
+    @staticmethod
+    def _firma(agencia) -> list[tuple]:
+        """Movimientos generados, comparables entre caminos."""
+        return sorted(
+            MovimientoContable.all_objects.filter(agencia=agencia).values_list(
+                "asiento__object_id", "cuenta__codigo", "tipo", "monto_usd", "monto_ves"
+            )
+        )
@@ -1,14 +1,34 @@
 import logging
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date
+from decimal import Decimal
 
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
 
 from apps.bookings.models import PagoVenta
-from apps.contabilidad.models import AsientoContable
-from apps.contabilidad.services import ContabilidadService
-from apps.finance.models import Factura
+from apps.contabilidad.models import AsientoContable, CuentaContable, MovimientoContable
+from apps.finance.models import Factura, TasaCambioBCV
 
 logger = logging.getLogger(__name__)
 
+CENTAVO = Decimal("0.01")
+CERO = Decimal("0.00")
+
+# Prefijos de cuenta (de más a menos específico) usados por los asientos automáticos de
+# apps.finance.services.factura_contabilidad; la reconciliación genera el mismo asiento.
+CUENTA_CXC = ("1.1.2", "1")
+CUENTA_INGRESOS = ("4.1", "4")
+CUENTA_IVA = ("2.1.4", "2")
+CUENTA_IGTF = ("2.1.5", "2")
+CUENTA_CAJA = ("1.1.1", "1")
+CUENTA_BANCO = ("1.1.2", "1")
+CUENTA_COBRO = ("1.1.2.01", "1")
+
 
 # =========================================================================================
 # 🏢 EXPLICACIÓN PARA TODO PÚBLICO (Inversores y No Programadores)
@@ -25,12 +45,76 @@ logger = logging.getLogger(__name__)
 # 💻 EXPLICACIÓN PARA PROGRAMADORES (Technical Specs)
 # ContabilidadReconciliationService actúa como una red de seguridad (fail-safe) arquitectónica
 # ante el desacoplamiento de señales de base de datos o fallos del broker de mensajería (Celery/Redis).
-# Su función es:
-#   1. Buscar Facturas emitidas/pagadas que no tengan relación de llave foránea con un asiento contable.
-#   2. Buscar Pagos (`PagoVenta`) confirmados que no tengan su correspondiente asiento por diferencial cambiario.
-#   3. Reparar la inconsistencia vinculando el asiento existente (si ya se generó y solo faltaba asociar)
-#      o regenerando el asiento contable de forma atómica a través de `ContabilidadService`.
+# Trabaja por conjuntos, no documento a documento:
+#   1. Un anti-join (NOT EXISTS sobre content_type/object_id de AsientoContable) trae, en lotes
+#      paginados por pk, las Facturas emitidas y los Pagos (`PagoVenta`) confirmados sin asiento.
+#   2. El plan de cuentas de cada agencia se carga una vez por corrida (`PlanCuentas`) y las
+#      tasas BCV del rango de fechas de las facturas pendientes se precargan en memoria
+#      (`TasasBCV`). Los pagos, como en `generar_asiento_pago`, no llevan monto en VES.
+#   3. Los asientos y sus movimientos se insertan con `bulk_create` por lote, cada lote en su
+#      propia transacción; un lote fallido se registra y la corrida sigue con el siguiente.
 # =========================================================================================
+class PlanCuentas:
+    """
+    Cache en memoria del plan de cuentas de una corrida: una consulta por agencia, luego las
+    búsquedas por prefijo de código se resuelven con bisect sobre los códigos ordenados.
+    """
+
+    def __init__(self):
+        """__init__."""
+        self._codigos = {}
+        self._resueltas = {}
+
+    def _cargar(self, agencia_id):
+        """Códigos y pks de las cuentas que aceptan movimientos, ordenados por código."""
+        if agencia_id not in self._codigos:
+            filas = sorted(
+                CuentaContable.all_objects.filter(
+                    agencia_id=agencia_id, acepta_movimientos=True
+                ).values_list("codigo", "pk")
+            )
+            self._codigos[agencia_id] = ([c for c, _ in filas], [pk for _, pk in filas])
+        return self._codigos[agencia_id]
+
+    def cuenta(self, agencia_id, prefijos) -> int | None:
+        """pk de la primera cuenta cuyo código empieza por alguno de los prefijos, en orden."""
+        clave = (agencia_id, prefijos)
+        if clave not in self._resueltas:
+            codigos, pks = self._cargar(agencia_id)
+            encontrada = None
+            for prefijo in prefijos:
+                i = bisect_left(codigos, prefijo)
+                if i < len(codigos) and codigos[i].startswith(prefijo):
+                    encontrada = pks[i]
+                    break
+            self._resueltas[clave] = encontrada
+        return self._resueltas[clave]
+
+
+class TasasBCV:
+    """Tasas BCV precargadas; cada fecha usa la última tasa publicada en o antes de ella."""
+
+    def __init__(self, desde: date, hasta: date):
+        """__init__."""
+        anterior = (
+            TasaCambioBCV.objects.filter(fecha__lt=desde, tasa__isnull=False)
+            .order_by("-fecha")
+            .values_list("fecha", "tasa")[:1]
+        )
+        filas = list(anterior) + list(
+            TasaCambioBCV.objects.filter(fecha__range=(desde, hasta), tasa__isnull=False)
+            .order_by("fecha")
+            .values_list("fecha", "tasa")
+        )
+        self._fechas = [f for f, _ in filas]
+        self._tasas = [t for _, t in filas]
+
+    def en(self, fecha: date) -> Decimal | None:
+        """en."""
+        i = bisect_right(self._fechas, fecha)
+        return self._tasas[i - 1] if i else None
+
+
 class ContabilidadReconciliationService:
     """ContabilidadReconciliationService."""
 
@@ -39,61 +123,239 @@ class ContabilidadReconciliationService:
         """
         Escanea y repara inconsistencias entre Facturas/Pagos y sus asientos contables correspondientes.
         """
+        resumen = ContabilidadReconciliationService.reconciliar()
+        return resumen["facturas"], resumen["pagos"]
+
+    @classmethod
+    def reconciliar(cls, chunk_size: int | None = None) -> dict:
+        """
+        Genera los asientos faltantes de facturas y pagos y devuelve las métricas de la corrida:
+        documentos reconciliados, movimientos creados, omitidos sin cuentas, lotes y segundos.
+        """
+        chunk_size = chunk_size or getattr(settings, "CONTABILIDAD_RECONCILIATION_CHUNK_SIZE", 500)
         logger.info(" Iniciando auditoría y reconciliación contable automática...")
-        facturas_arregladas = 0
-        pagos_arreglados = 0
-
-        # 1. Reconciliar Facturas
-        facturas_inconsistentes = Factura.objects.filter(
-            estado__in=[
-                Factura.EstadoFactura.EMITIDA,
-                Factura.EstadoFactura.PAGADA,
-                Factura.EstadoFactura.PARCIAL,
-            ]
-        ).exclude(asiento_contable_factura__isnull=False)
-
-        for factura in facturas_inconsistentes:
-            try:
-                # Verificar si ya existe por referencia
-                asiento = AsientoContable.objects.filter(
-                    referencia_documento=factura.numero_factura, agencia=factura.agencia
-                ).first()
-
-                if asiento:
-                    # Si ya existía el asiento pero no estaba vinculado en la factura
-                    with transaction.atomic():
-                        factura.asiento_contable_factura = asiento
-                        factura.save(update_fields=["asiento_contable_factura"])
-                    logger.info(
-                        f"Factura {factura.numero_factura} vinculada a asiento existente {asiento.id}"
-                    )
-                else:
-                    # Generar nuevo asiento contable y vincularlo a la factura
-                    with transaction.atomic():
-                        asiento = ContabilidadService.generar_asiento_desde_factura(factura)
-                        factura.asiento_contable_factura = asiento
-                        factura.save(update_fields=["asiento_contable_factura"])
-                    facturas_arregladas += 1
-            except Exception as e:
-                logger.error(f"Error reconciliando factura {factura.numero_factura}: {e}")
-
-        # 2. Reconciliar Pagos
-        pagos_inconsistentes = PagoVenta.objects.filter(confirmado=True)
-        for pago in pagos_inconsistentes:
-            try:
-                ref = f"PAGO-{pago.id_pago_venta}"
-                asiento = AsientoContable.objects.filter(
-                    referencia_documento=ref, agencia=pago.agencia
-                ).first()
-
-                if not asiento:
-                    with transaction.atomic():
-                        ContabilidadService.registrar_pago_y_diferencial(pago)
-                    pagos_arreglados += 1
-            except Exception as e:
-                logger.error(f"Error reconciliando pago {pago.id_pago_venta}: {e}")
+        inicio = time.perf_counter()
+        resumen = {
+            "facturas": 0,
+            "pagos": 0,
+            "movimientos": 0,
+            "omitidos": 0,
+            "lotes": 0,
+            "lotes_fallidos": 0,
+        }
+        plan = PlanCuentas()
 
+        facturas = cls._facturas_sin_asiento()
+        tasas = cls._tasas_para(facturas, "fecha_emision")
+        for lote in cls._lotes(facturas, "pk", chunk_size):
+            cls._procesar_lote(
+                "facturas", lote, Factura, cls._asiento_factura, plan, tasas, resumen
+            )
+
+        pagos = cls._pagos_sin_asiento()
+        for lote in cls._lotes(pagos, "id_pago_venta", chunk_size):
+            cls._procesar_lote("pagos", lote, PagoVenta, cls._asiento_pago, plan, None, resumen)
+
+        resumen["segundos"] = round(time.perf_counter() - inicio, 3)
         logger.info(
-            f"✨ Reconciliación finalizada. Facturas corregidas: {facturas_arregladas}, Pagos corregidos: {pagos_arreglados}"
+            f"✨ Reconciliación finalizada en {resumen['segundos']}s. Facturas corregidas: "
+            f"{resumen['facturas']}, Pagos corregidos: {resumen['pagos']}, Movimientos: "
+            f"{resumen['movimientos']}, Omitidos sin cuentas: {resumen['omitidos']}, "
+            f"Lotes: {resumen['lotes']} ({resumen['lotes_fallidos']} fallidos)"
+        )
+        return resumen
+
+    @staticmethod
+    def _sin_asiento(modelo):
+        """Subconsulta NOT EXISTS: documentos del modelo sin asiento enlazado por GenericFK."""
+        ct = ContentType.objects.get_for_model(modelo)
+        return ~Exists(
+            AsientoContable.all_objects.filter(content_type=ct, object_id=OuterRef("pk"))
+        )
+
+    @classmethod
+    def _facturas_sin_asiento(cls):
+        """_facturas_sin_asiento."""
+        return (
+            Factura.all_objects.filter(estado=Factura.EstadoFactura.EMITIDA)
+            .filter(cls._sin_asiento(Factura))
+            .values(
+                "pk",
+                "agencia_id",
+                "numero_control",
+                "fecha_emision",
+                "tasa_bcv_aplicada",
+                "subtotal_usd",
+                "total_iva_usd",
+                "total_igtf_usd",
+                "gran_total_usd",
+                "cliente__nombres",
+                "cliente__apellidos",
+            )
+        )
+
+    @classmethod
+    def _pagos_sin_asiento(cls):
+        """_pagos_sin_asiento."""
+        return (
+            PagoVenta.all_objects.filter(confirmado=True)
+            .filter(cls._sin_asiento(PagoVenta))
+            .values(
+                "id_pago_venta",
+                "agencia_id",
+                "fecha_pago",
+                "monto",
+                "monto_igtf",
+                "metodo",
+                "referencia",
+            )
         )
-        return facturas_arregladas, pagos_arreglados
+
+    @staticmethod
+    def _tasas_para(pendientes, campo) -> TasasBCV | None:
+        """Precarga las tasas BCV del rango de fechas de los documentos pendientes."""
+        rango = pendientes.order_by().aggregate(desde=Min(campo), hasta=Max(campo))
+        if rango["desde"] is None:
+            return None
+        desde, hasta = rango["desde"], rango["hasta"]
+        if hasattr(desde, "date"):
+            desde, hasta = timezone.localdate(desde), timezone.localdate(hasta)
+        return TasasBCV(desde, hasta)
+
+    @staticmethod
+    def _lotes(pendientes, pk, chunk_size):
+        """Pagina el anti-join por pk (keyset) para no cargar todos los pendientes en memoria."""
+        ultimo = None
+        while True:
+            qs = pendientes.order_by(pk)
+            if ultimo is not None:
+                qs = qs.filter(**{f"{pk}__gt": ultimo})
+            lote = list(qs[:chunk_size])
+            if not lote:
+                return
+            ultimo = lote[-1][pk]
+            yield lote
+
+    @staticmethod
+    def _procesar_lote(tipo, lote, modelo, construir, plan, tasas, resumen):
+        """Construye los asientos del lote en memoria y los inserta con bulk_create."""
+        t0 = time.perf_counter()
+        ct = ContentType.objects.get_for_model(modelo)
+        asientos, lineas = [], []
+        for fila in lote:
+            asiento, movimientos = construir(fila, ct, plan, tasas)
+            if not movimientos:
+                resumen["omitidos"] += 1
+                continue
+            asientos.append(asiento)
+            lineas.append(movimientos)
+
+        resumen["lotes"] += 1
+        try:
+            with transaction.atomic():
+                AsientoContable.all_objects.bulk_create(asientos)
+                movimientos = []
+                for asiento, movs in zip(asientos, lineas, strict=True):
+                    for mov in movs:
+                        mov.asiento = asiento
+                        movimientos.append(mov)
+                MovimientoContable.all_objects.bulk_create(movimientos)
+        except Exception as e:
+            resumen["lotes_fallidos"] += 1
+            logger.error(f"Error reconciliando lote {resumen['lotes']} de {tipo}: {e}")
+            return
+
+        resumen[tipo] += len(asientos)
+        resumen["movimientos"] += len(movimientos)
+        logger.info(
+            f"Reconciliación contable: lote {resumen['lotes']} de {tipo}, {len(asientos)} asientos "
+            f"y {len(movimientos)} movimientos en {time.perf_counter() - t0:.2f}s "
+            f"(acumulado {tipo}: {resumen[tipo]})"
+        )
+
+    @staticmethod
+    def _movimiento(agencia_id, cuenta_id, tipo, monto_usd, monto_ves):
+        """_movimiento."""
+        return MovimientoContable(
+            agencia_id=agencia_id,
+            cuenta_id=cuenta_id,
+            tipo=tipo,
+            monto_usd=monto_usd,
+            monto_ves=monto_ves,
+        )
+
+    @classmethod
+    def _asiento_factura(cls, fila, ct, plan, tasas):
+        """
+        Asiento de generar_asiento_factura: CxC al debe; ingresos, IVA e IGTF al haber. A
+        diferencia de la vía en línea (tasa 1.00), sin ``tasa_bcv_aplicada`` se usa la tasa
+        BCV vigente a la fecha de emisión.
+        """
+        agencia_id = fila["agencia_id"]
+        fecha = fila["fecha_emision"] or timezone.localdate()
+        tasa = fila["tasa_bcv_aplicada"] or (tasas and tasas.en(fecha)) or Decimal("1.00")
+        cliente = f"{fila['cliente__nombres'] or ''} {fila['cliente__apellidos'] or ''}"
+        asiento = AsientoContable(
+            agencia_id=agencia_id,
+            tipo_asiento=AsientoContable.TipoAsiento.VENTAS,
+            estado=AsientoContable.EstadoAsiento.BORRADOR,
+            fecha_contable=fecha,
+            glosa=f"Factura {fila['numero_control']} - {cliente}".strip()[:255],
+            content_type=ct,
+            object_id=fila["pk"],
+        )
+
+        movimientos = []
+        partidas = (
+            # (prefijos, tipo, monto, se registra aunque el monto sea cero)
+            (CUENTA_CXC, MovimientoContable.TipoMovimiento.DEBITO, fila["gran_total_usd"], True),
+            (
+                CUENTA_INGRESOS,
+                MovimientoContable.TipoMovimiento.CREDITO,
+                fila["subtotal_usd"],
+                False,
+            ),
+            (CUENTA_IVA, MovimientoContable.TipoMovimiento.CREDITO, fila["total_iva_usd"], False),
+            (CUENTA_IGTF, MovimientoContable.TipoMovimiento.CREDITO, fila["total_igtf_usd"], False),
+        )
+        for prefijos, tipo, monto, siempre in partidas:
+            monto = monto or CERO
+            cuenta_id = plan.cuenta(agencia_id, prefijos)
+            if cuenta_id is None or (monto <= 0 and not siempre):
+                continue
+            movimientos.append(
+                cls._movimiento(
+                    agencia_id, cuenta_id, tipo, monto, (monto * tasa).quantize(CENTAVO)
+                )
+            )
+        return asiento, movimientos
+
+    @classmethod
+    def _asiento_pago(cls, fila, ct, plan, tasas):
+        """
+        Mismo asiento que generar_asiento_pago: caja/banco al debe, cuentas por cobrar al
+        haber, con ``monto_ves`` en cero como en la vía en línea.
+        """
+        agencia_id = fila["agencia_id"]
+        fecha = timezone.localdate(fila["fecha_pago"])
+        asiento = AsientoContable(
+            agencia_id=agencia_id,
+            tipo_asiento=AsientoContable.TipoAsiento.DIARIO,
+            estado=AsientoContable.EstadoAsiento.BORRADOR,
+            fecha_contable=fecha,
+            glosa=f"Cobro/Pago Recibido - Ref: {fila['referencia'] or 'S/R'}"[:255],
+            content_type=ct,
+            object_id=fila["id_pago_venta"],
+        )
+
+        monto = fila["monto"] + (fila["monto_igtf"] or CERO)
+        debe = CUENTA_CAJA if fila["metodo"] == PagoVenta.MetodoPago.EFECTIVO else CUENTA_BANCO
+        movimientos = [
+            cls._movimiento(agencia_id, cuenta_id, tipo, monto, CERO)
+            for prefijos, tipo in (
+                (debe, MovimientoContable.TipoMovimiento.DEBITO),
+                (CUENTA_COBRO, MovimientoContable.TipoMovimiento.CREDITO),
+            )
+            if (cuenta_id := plan.cuenta(agencia_id, prefijos)) is not None
+        ]
+        return asiento, movimientos
@@ -294,7 +294,6 @@ class TasasVenezuelaClient:
         """
         from datetime import date
 
-        from django.core.cache import cache
         from django.utils import timezone
 
         from apps.common.models import Moneda
@@ -361,12 +360,14 @@ class TasasVenezuelaClient:
             except Exception as e:
                 logger.error(f"Error guardando TasaCambio UI (P2P): {e}")
 
-        # Limpiar caché de la UI
+        # Publicar el snapshot de tasas de la UI (context processor sin consultas)
         try:
-            cache.delete("tasa_bcv_context")
-            logger.info("Caché tasa_bcv_context eliminado")
+            from apps.finance.services.rate_snapshot import RateSnapshotService
+
+            RateSnapshotService.refresh()
+            logger.info("Snapshot de tasas de la UI actualizado")
         except Exception as cache_err:
-            logger.warning(f"No se pudo limpiar caché tasa_bcv_context: {cache_err}")
+            logger.warning(f"No se pudo actualizar el snapshot de tasas: {cache_err}")
 
         # 2. Actualizar tabla central TipoCambio (USD y EUR)
         moneda_ves = Moneda.objects.filter(codigo_iso="VES").first()
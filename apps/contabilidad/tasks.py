@@ -51,8 +51,6 @@ def sync_bcv_rates():
     """sync_bcv_rates."""
     from datetime import date
 
-    from django.core.cache import cache
-
     from apps.common.models import Moneda
     from apps.contabilidad.tasas_venezuela_client import TasasVenezuelaClient
     from apps.finance.models import TasaCambioBCV
@@ -111,7 +109,9 @@ def sync_bcv_rates():
                     defaults={"tasa_conversion": valor_tasa},
                 )
 
-            cache.delete("tasa_bcv_context")
+            from apps.finance.services.rate_snapshot import RateSnapshotService
+
+            RateSnapshotService.refresh()
             logger.info(
                 f"🛡️ Fallback histórico aplicado exitosamente. Tasa: {valor_tasa} de la fecha: {ultima_tasa.fecha}"
             )
@@ -177,5 +177,13 @@ def ejecutar_reconciliacion_contable():
     """
     from apps.contabilidad.reconciliation import ContabilidadReconciliationService
 
-    facturas, pagos = ContabilidadReconciliationService.audit_and_reconcile()
-    return {"facturas_reconciliadas": facturas, "pagos_reconciliados": pagos}
+    resumen = ContabilidadReconciliationService.reconciliar()
+    return {
+        "facturas_reconciliadas": resumen["facturas"],
+        "pagos_reconciliados": resumen["pagos"],
+        "movimientos_creados": resumen["movimientos"],
+        "omitidos_sin_cuentas": resumen["omitidos"],
+        "lotes": resumen["lotes"],
+        "lotes_fallidos": resumen["lotes_fallidos"],
+        "segundos": resumen["segundos"],
+    }
@@ -0,0 +1,232 @@
+import math
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.finance.services.reconciliation_matcher import (
+    ReconciliationMatcher,
+    Registro,
+    normalizar_boleto,
+    normalizar_pnr,
+)
+from apps.finance.services.smart_reconciliation_service import SmartReconciliationService
+
+NOMBRES = (
+    "MANUEL",
+    "ANA",
+    "LUIS",
+    "CARLA",
+    "JOSE",
+    "MARIA",
+    "PEDRO",
+    "SOFIA",
+    "JUAN",
+    "ELENA",
+    "ANDRES",
+    "LUCIA",
+    "DIEGO",
+    "PAULA",
+    "MIGUEL",
+    "DANIELA",
+    "JORGE",
+    "VALERIA",
+    "RAFAEL",
+    "CAMILA",
+    "CARLOS",
+    "GABRIELA",
+    "RICARDO",
+    "ISABEL",
+    "FERNANDO",
+    "ANDREA",
+    "OSCAR",
+    "LAURA",
+)
+APELLIDOS = (
+    "NAVAS",
+    "PEREZ",
+    "GOMEZ",
+    "ROJAS",
+    "DIAZ",
+    "MORA",
+    "SILVA",
+    "TORRES",
+    "RUIZ",
+    "LEON",
+    "GARCIA",
+    "MARTINEZ",
+    "LOPEZ",
+    "GONZALEZ",
+    "RODRIGUEZ",
+    "HERNANDEZ",
+    "SANCHEZ",
+    "RAMIREZ",
+    "FLORES",
+    "RIVERA",
+    "MEDINA",
+    "CASTILLO",
+    "VARGAS",
+    "ROMERO",
+    "HERRERA",
+    "MENDOZA",
+    "AGUILAR",
+    "CHAVEZ",
+    "ORTIZ",
+    "GUZMAN",
+    "BRICENO",
+    "MARQUEZ",
+    "SALAZAR",
+    "CONTRERAS",
+    "PARRA",
+    "BLANCO",
+)
+
+
+class Command(BaseCommand):
+    """Mide el cruce de conciliación sobre un reporte BSP sintético (sin BD ni IA)."""
+
+    help = (
+        "Benchmark del cruce de SmartReconciliationService: índice de bloqueo + puntaje "
+        "determinístico vs. el cruce legado (boleto/PNR exactos y todo lo demás a la IA). "
+        "Reporta tiempo, líneas conciliadas y llamadas a la IA que haría cada camino."
+    )
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument("--lineas", type=int, default=50000)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        """handle."""
+        boletos, lineas = self._generar(options["lineas"], random.Random(options["seed"]))  # noqa: S311
+        lote_ia = 20
+
+        t0 = time.perf_counter()
+        pendientes_legado = self._cruce_legado(boletos, lineas)
+        legado = time.perf_counter() - t0
+        llamadas_legado = math.ceil(len(pendientes_legado) / lote_ia)
+
+        t0 = time.perf_counter()
+        matcher = ReconciliationMatcher(boletos)
+        residuos = []
+        for fila in lineas:
+            linea = Registro.desde_linea(fila)
+            if matcher.match(linea)[0] is None:
+                residuos.append(linea)
+        determinista = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        plausibles = sum(1 for linea in residuos if matcher.plausible(linea))
+        lotes = list(SmartReconciliationService._lotes_ia(residuos, matcher))
+        planificacion = time.perf_counter() - t0
+        candidatos_por_llamada = sum(len(c) for _, c in lotes) / len(lotes) if lotes else 0
+
+        n = len(lineas)
+        self.stdout.write(
+            self.style.SUCCESS(f"\nCruce de {n} líneas contra {len(boletos)} boletos")
+        )
+        self.stdout.write(
+            f" - Legado:  {legado:.2f} s, {n - len(pendientes_legado)} por boleto/PNR, "
+            f"{llamadas_legado} llamadas IA con ~{len(boletos) - n + len(pendientes_legado)} "
+            "boletos por prompt"
+        )
+        self.stdout.write(
+            f" - Bloques: {determinista:.2f} s, {n - len(residuos)} determinísticos, "
+            f"{len(residuos)} residuales ({plausibles} con candidatos), {len(lotes)} llamadas IA con "
+            f"~{candidatos_por_llamada:.0f} boletos por prompt (planificación {planificacion:.2f} s)"
+        )
+        if llamadas_legado:
+            self.stdout.write(
+                f" - Llamadas IA evitadas: {llamadas_legado - len(lotes)} "
+                f"({1 - len(lotes) / llamadas_legado:.0%})"
+            )
+
+    @staticmethod
+    def _cruce_legado(boletos, lineas) -> list[dict]:
+        """Réplica del match exacto anterior (boleto, luego PNR); devuelve las líneas sin par."""
+        por_boleto, por_pnr, asignados, pendientes = {}, {}, set(), []
+        for b in boletos:
+            if numero := normalizar_boleto(b["numero_boleto"]):
+                por_boleto.setdefault(numero, []).append(b)
+            if pnr := normalizar_pnr(b["localizador_pnr"]):
+                por_pnr.setdefault(pnr, []).append(b)
+        for fila in lineas:
+            candidatos = [
+                *por_boleto.get(normalizar_boleto(fila["numero_boleto_reportado"]), ()),
+                *por_pnr.get(normalizar_pnr(fila["raw_data"].get("pnr")), ()),
+            ]
+            match = next((b for b in candidatos if b["id_boleto_importado"] not in asignados), None)
+            if match is None:
+                pendientes.append(fila)
+            else:
+                asignados.add(match["id_boleto_importado"])
+        return pendientes
+
+    @staticmethod
+    def _generar(total, rnd):
+        """
+        Boletos y líneas con la mezcla típica de un BSP: 70% boleto exacto, 10% boleto con
+        un dígito errado, 10% sin boleto (nombre invertido, monto y fecha corridos),
+        5% cobros sin boleto local y 5% boletos que la IA tendría que resolver.
+        """
+        inicio = date(2026, 3, 1)
+        boletos, lineas = [], []
+        for i in range(total):
+            nombre = rnd.choice(NOMBRES)
+            apellido = f"{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+            total_boleto = Decimal(rnd.randint(8000, 150000)) / 100
+            fecha = inicio + timedelta(days=rnd.randint(0, 30))
+            numero = f"{rnd.randint(100, 999)}{rnd.randint(10**9, 10**10 - 1)}"
+            pnr = "".join(rnd.choices("ABCDEFGHJKLMNPQRSTUVWXYZ23456789", k=6))
+            tipo = rnd.random()
+            if tipo < 0.95:
+                boletos.append(
+                    {
+                        "id_boleto_importado": i + 1,
+                        "numero_boleto": numero,
+                        "localizador_pnr": pnr,
+                        "nombre_pasajero_completo": f"{apellido}/{nombre} MR",
+                        "total_boleto": total_boleto,
+                        "tarifa_base": total_boleto * Decimal("0.8"),
+                        "impuestos_total_calculado": total_boleto * Decimal("0.2"),
+                        "fecha_emision_boleto": fecha,
+                    }
+                )
+            linea = {
+                "numero": f"{numero[:3]}-{numero[3:]}",
+                "pnr": pnr,
+                "pasajero": f"{apellido}/{nombre}",
+                "total": total_boleto,
+                "fecha": fecha,
+            }
+            if 0.70 <= tipo < 0.80:
+                linea["numero"] = numero[:-1] + str((int(numero[-1]) + 1) % 10)
+                linea["pnr"] = ""
+            elif 0.80 <= tipo < 0.95:
+                linea.update(
+                    numero="",
+                    pnr="",
+                    pasajero=f"{nombre} {apellido}",
+                    total=total_boleto * Decimal(str(1 + rnd.uniform(-0.01, 0.01))),
+                    fecha=fecha + timedelta(days=rnd.randint(-1, 1)),
+                )
+                if tipo >= 0.90:
+                    linea["pasajero"] = f"{nombre[0]} {rnd.choice(APELLIDOS)}"
+            total_linea = linea["total"].quantize(Decimal("0.01"))
+            lineas.append(
+                {
+                    "id_linea": i + 1,
+                    "numero_boleto_reportado": linea["numero"],
+                    "tarifa_base_cobrada": total_linea * Decimal("0.8"),
+                    "impuestos_cobrados": total_linea * Decimal("0.2"),
+                    "total_cobrado": total_linea,
+                    "raw_data": {
+                        "pnr": linea["pnr"],
+                        "pasajero": linea["pasajero"],
+                        "fecha_emision": linea["fecha"].isoformat(),
+                    },
+                }
+            )
+        return boletos, lineas
@@ -0,0 +1,132 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.bookings.models import FeeVenta, ItemVenta, PagoVenta, Venta
+from apps.common.models import Moneda
+from apps.crm.models import Cliente
+from apps.finance.services.finance_service import FinanceService
+from core.middleware import agency_context
+from core.models import Agencia
+from core.signals_bypass import disable_signals
+
+
+class _Contador:
+    """execute_wrapper que cuenta consultas (sin el tope de 9000 de queries_log)."""
+
+    def __init__(self):
+        """__init__."""
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """__call__."""
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    """Compara el recálculo venta por venta contra el motor masivo."""
+
+    help = (
+        "Benchmark de re-totalización: FinanceService.recalculate_sale_finances por venta "
+        "vs bulk_recalculate_sale_finances. Crea ventas sintéticas dentro de una "
+        "transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ventas", type=int, default=500)
+        parser.add_argument("--items", type=int, default=6, help="Items por venta.")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            agencia = Agencia.objects.create(
+                nombre="Benchmark Recalculo", email_principal="benchmark@example.com"
+            )
+            with agency_context(agencia), disable_signals():
+                venta_ids = self._crear_ventas(agencia, options["ventas"], options["items"])
+                queryset = Venta.all_objects.filter(pk__in=venta_ids)
+
+                por_venta_q, masivo_q = _Contador(), _Contador()
+                self._descuadrar(queryset)
+                with connection.execute_wrapper(por_venta_q):
+                    t0 = time.perf_counter()
+                    for venta_id in venta_ids:
+                        FinanceService.recalculate_sale_finances(venta_id)
+                    por_venta = time.perf_counter() - t0
+                esperado = list(queryset.order_by("pk").values_list("total_venta", "estado"))
+
+                self._descuadrar(queryset)
+                with connection.execute_wrapper(masivo_q):
+                    t0 = time.perf_counter()
+                    stats = FinanceService.bulk_recalculate_sale_finances(
+                        queryset, chunk_size=options["chunk_size"]
+                    )
+                    masivo = time.perf_counter() - t0
+                obtenido = list(queryset.order_by("pk").values_list("total_venta", "estado"))
+
+            transaction.set_rollback(True)
+
+        n = len(venta_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"\nRecálculo de {n} ventas ({options['items']} items c/u)")
+        )
+        self.stdout.write(
+            f" - Por venta: {por_venta:.2f} s ({por_venta_q.total} consultas, "
+            f"{n / por_venta:.0f} ventas/s)"
+        )
+        self.stdout.write(
+            f" - Masivo:    {masivo:.2f} s ({masivo_q.total} consultas, {n / masivo:.0f} ventas/s, "
+            f"{stats['lotes']} lotes)"
+        )
+        self.stdout.write(f" - Aceleración: {por_venta / masivo:.1f}x")
+        if obtenido == esperado:
+            self.stdout.write(self.style.SUCCESS(" - Resultados idénticos en ambos caminos."))
+        else:
+            self.stdout.write(self.style.ERROR(" - ¡Los resultados difieren entre caminos!"))
+
+    @staticmethod
+    def _crear_ventas(agencia, total, items_por_venta) -> list[int]:
+        moneda, _ = Moneda.objects.get_or_create(
+            codigo_iso="USD", defaults={"nombre": "Dólar", "simbolo": "$"}
+        )
+        cliente = Cliente.objects.create(
+            nombres="Benchmark", apellidos="Recalculo", email="bench@example.com"
+        )
+        venta_ids = []
+        for i in range(total):
+            venta = Venta.objects.create(cliente=cliente, moneda=moneda, localizador=f"BENCH{i}")
+            venta_ids.append(venta.pk)
+            items = [
+                ItemVenta(
+                    venta=venta,
+                    agencia=agencia,
+                    descripcion_personalizada=f"Tramo {j}",
+                    precio_unitario_venta=Decimal("100.00") + j,
+                    impuestos_item_venta=Decimal("12.50"),
+                    subtotal_item_venta=Decimal("100.00") + j,
+                    total_item_venta=Decimal("112.50") + j,
+                )
+                for j in range(items_por_venta)
+            ]
+            ItemVenta.all_objects.bulk_create(items)
+            FeeVenta.all_objects.create(venta=venta, agencia=agencia, monto=Decimal("20.00"))
+            if i % 2:
+                PagoVenta.all_objects.create(
+                    venta=venta, agencia=agencia, moneda=moneda, monto=Decimal("150.00")
+                )
+        return venta_ids
+
+    @staticmethod
+    def _descuadrar(queryset) -> None:
+        """Deja totales desactualizados para que ambos caminos escriban todas las ventas."""
+        queryset.update(
+            subtotal=Decimal("0.00"),
+            impuestos=Decimal("0.00"),
+            total_venta=Decimal("0.00"),
+            monto_pagado=Decimal("0.00"),
+            saldo_pendiente=Decimal("0.00"),
+            estado="PEN",
+        )
@@ -0,0 +1,124 @@
+import random
+import time
+import uuid
+from unittest.mock import patch
+
+import pandas as pd
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from apps.finance.services.smart_reconciliation_service import SmartReconciliationService
+
+MAPEO = {
+    "TKT NUMBER": "numero_boleto",
+    "RECORD LOCATOR": "pnr",
+    "PAX NAME": "pasajero",
+    "FARE": "tarifa_neta",
+    "TAX": "impuestos",
+    "COMM": "comision_monto",
+    "NET PAY": "total_pagar",
+}
+
+
+class Command(BaseCommand):
+    """Mide la conversión de reportes de proveedor CSV/Excel y el cache de mapeo de columnas."""
+
+    help = (
+        "Benchmark del mapeo de reportes estructurados de SmartReconciliationService: "
+        "conversión fila a fila (iterrows) vs. por columnas (pd.to_numeric), y llamadas a "
+        "la IA de mapeo en subidas repetidas del mismo layout. La IA se sustituye por un "
+        "mapeo fijo que cuenta llamadas."
+    )
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument("--filas", type=int, default=100000)
+        parser.add_argument("--subidas", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        """handle."""
+        df = self._generar(options["filas"], random.Random(options["seed"]))  # noqa: S311
+        renombrado = df.rename(columns=MAPEO)
+
+        t0 = time.perf_counter()
+        legado = self._filas_legado(renombrado)
+        fila_a_fila = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        vectorizado = SmartReconciliationService._filas_a_items(renombrado)
+        por_columnas = time.perf_counter() - t0
+
+        proveedor = f"BENCHMARK-{uuid.uuid4().hex[:8]}"
+        llamadas = 0
+
+        def _ia(df, proveedor_hint):
+            nonlocal llamadas
+            llamadas += 1
+            return MAPEO
+
+        with patch.object(SmartReconciliationService, "_pedir_mapeo_ia", side_effect=_ia):
+            t0 = time.perf_counter()
+            for _ in range(options["subidas"]):
+                SmartReconciliationService._mapear_columnas_df_con_ia(df, proveedor)
+            subidas = time.perf_counter() - t0
+        cache.delete(SmartReconciliationService._mapeo_cache_key(proveedor, df.columns))
+
+        n = len(df)
+        self.stdout.write(self.style.SUCCESS(f"\nConversión de {n} filas de reporte de proveedor"))
+        self.stdout.write(f" - iterrows:     {fila_a_fila:.2f} s ({n / fila_a_fila:.0f} filas/s)")
+        self.stdout.write(
+            f" - por columnas: {por_columnas:.2f} s ({n / por_columnas:.0f} filas/s, "
+            f"{fila_a_fila / por_columnas:.1f}x)"
+        )
+        self.stdout.write(
+            f" - {options['subidas']} subidas del mismo layout: {llamadas} llamada(s) de mapeo "
+            f"a la IA, {subidas:.2f} s en total"
+        )
+        if [i["total_pagar"] for i in legado] == [i["total_pagar"] for i in vectorizado]:
+            self.stdout.write(self.style.SUCCESS(" - Montos idénticos en ambos caminos."))
+        else:
+            self.stdout.write(self.style.ERROR(" - ¡Los montos difieren entre caminos!"))
+
+    @staticmethod
+    def _filas_legado(df) -> list[dict]:
+        """Réplica de la conversión anterior: iterrows y float()/str() por celda."""
+        items = []
+        for _, row in df.iterrows():
+            items.append(
+                {
+                    "numero_boleto": str(row.get("numero_boleto", "")),
+                    "pnr": str(row.get("pnr", "")),
+                    "pasajero": str(row.get("pasajero", "")),
+                    "tarifa_neta": float(row.get("tarifa_neta", 0)),
+                    "impuestos": float(row.get("impuestos", 0)),
+                    "comision_monto": float(row.get("comision_monto", 0)),
+                    "total_pagar": float(row.get("total_pagar", 0)),
+                    "moneda": "USD",
+                }
+            )
+        return items
+
+    @staticmethod
+    def _generar(filas, rnd) -> pd.DataFrame:
+        """Reporte BSP sintético con cabeceras del proveedor (no estándar)."""
+        tarifas = [rnd.randint(8000, 150000) / 100 for _ in range(filas)]
+        impuestos = [round(t * 0.18, 2) for t in tarifas]
+        comisiones = [round(t * 0.01, 2) for t in tarifas]
+        return pd.DataFrame(
+            {
+                "TKT NUMBER": [rnd.randint(10**12, 10**13 - 1) for _ in range(filas)],
+                "RECORD LOCATOR": [
+                    "".join(rnd.choices("ABCDEFGHJKLMNPQRSTUVWXYZ23456789", k=6))
+                    for _ in range(filas)
+                ],
+                "PAX NAME": [f"PASAJERO/NUMERO {i} MR" for i in range(filas)],
+                "FARE": tarifas,
+                "TAX": impuestos,
+                "COMM": comisiones,
+                "NET PAY": [
+                    round(t + i - c, 2)
+                    for t, i, c in zip(tarifas, impuestos, comisiones, strict=True)
+                ],
+            }
+        )
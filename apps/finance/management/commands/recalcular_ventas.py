@@ -0,0 +1,69 @@
+"""
+Comando para re-totalizar ventas en bloque (corrección de tarifas o de tasa BCV).
+Usa FinanceService.bulk_recalculate_sale_finances agencia por agencia.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.finance.tasks import recalcular_ventas_masivo_task
+from core.models import Agencia
+
+
+class Command(BaseCommand):
+    """Command."""
+
+    help = (
+        "Recalcula subtotal, impuestos, fees, monto pagado, saldo y estado de ventas "
+        "con consultas agregadas y bulk_update por lotes."
+    )
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument(
+            "--agencia", type=int, action="append", help="ID de agencia (repetible)."
+        )
+        parser.add_argument("--ids", type=int, nargs="+", help="IDs de venta específicos.")
+        parser.add_argument("--desde", help="Fecha de venta inicial (AAAA-MM-DD).")
+        parser.add_argument("--hasta", help="Fecha de venta final (AAAA-MM-DD).")
+        parser.add_argument("--chunk-size", type=int, help="Ventas por lote.")
+        parser.add_argument(
+            "--async", dest="en_cola", action="store_true", help="Encolar una tarea por agencia."
+        )
+
+    def handle(self, *args, **options):
+        """handle."""
+        agencias = Agencia.objects.filter(activa=True).order_by("pk")
+        if options["agencia"]:
+            agencias = agencias.filter(pk__in=options["agencia"])
+        if not agencias.exists():
+            raise CommandError("No hay agencias activas que coincidan.")
+
+        parametros = {
+            "venta_ids": options["ids"],
+            "desde": options["desde"],
+            "hasta": options["hasta"],
+            "chunk_size": options["chunk_size"],
+        }
+        total = {"procesadas": 0, "actualizadas": 0}
+        for agencia in agencias:
+            if options["en_cola"]:
+                recalcular_ventas_masivo_task.delay(agencia_id=agencia.pk, **parametros)
+                self.stdout.write(f"Encolado recálculo para {agencia.nombre}")
+                continue
+
+            # La tarea invocada en línea fija el contexto de agencia (tenant_task).
+            stats = recalcular_ventas_masivo_task(agencia_id=agencia.pk, **parametros) or {}
+            for clave in total:
+                total[clave] += stats.get(clave, 0)
+            self.stdout.write(
+                f"{agencia.nombre}: {stats.get('actualizadas', 0)}/"
+                f"{stats.get('procesadas', 0)} ventas actualizadas"
+            )
+
+        if not options["en_cola"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Recálculo finalizado: {total['actualizadas']}/{total['procesadas']} "
+                    "ventas actualizadas."
+                )
+            )
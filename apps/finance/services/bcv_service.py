@@ -2,9 +2,8 @@ import logging
 from datetime import date
 from decimal import Decimal, InvalidOperation
 
-from django.core.cache import cache
-
 from apps.finance.models_stubs import TasaCambio
+from apps.finance.services.rate_snapshot import RateSnapshotService
 from core.tasks import send_telegram_task
 
 logger = logging.getLogger(__name__)
@@ -49,7 +48,7 @@ def obtener_tasa_bcv_resiliente(moneda: str = "USD") -> Decimal:
                 TasaCambio.objects.update_or_create(
                     fecha=hoy, moneda=moneda_iso, defaults={"monto": tasa_decimal}
                 )
-                cache.delete("tasa_bcv_context")
+                RateSnapshotService.refresh()
 
                 logger.info(f"Tasa BCV obtenida en vivo: {tasa_decimal} {moneda_iso}")
                 return tasa_decimal
@@ -70,7 +69,7 @@ def obtener_tasa_bcv_resiliente(moneda: str = "USD") -> Decimal:
                 TasaCambio.objects.update_or_create(
                     fecha=hoy, moneda=moneda_iso, defaults={"monto": tasa_decimal}
                 )
-                cache.delete("tasa_bcv_context")
+                RateSnapshotService.refresh()
                 logger.info(f"Tasa BCV obtenida via DolarApi: {tasa_decimal} {moneda_iso}")
                 return tasa_decimal
     except Exception as api_err:
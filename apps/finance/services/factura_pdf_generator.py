@@ -18,46 +18,7 @@ def generar_pdf_factura_consolidada(factura):
     Genera un PDF de la factura consolidada con formato legal venezolano.
     """
     try:
-        agencia = factura.agencia
-        from django.utils.module_loading import import_string
-
-        is_brand_color_dark = import_string(
-            "apps.automation.parsers.ticket_parser.is_brand_color_dark"
-        )
-        is_dark = is_brand_color_dark(agencia.color_primario) if agencia else True
-
-        plantilla = (
-            agencia.plantilla_facturas
-            if (agencia and hasattr(agencia, "plantilla_facturas"))
-            else "m1"
-        )
-        plantilla_mapping = {
-            "m1": "facturas/variations/v1_classic.html",
-            "m2": "facturas/variations/v2_editorial.html",
-            "m3": "facturas/variations/v3_executive.html",
-            "m4": "facturas/variations/v4_timeline.html",
-            "m5": "facturas/variations/v5_modern.html",
-        }
-        template_path = plantilla_mapping.get(plantilla, "facturas/variations/v1_classic.html")
-
-        from django.template.loader import get_template
-
-        try:
-            get_template(template_path)
-        except Exception as e:
-            logger.warning(f"No se pudo cargar la plantilla {template_path}, usando fallback: {e}")
-            template_path = "facturas/factura_consolidada_pdf.html"
-
-        # Renderizar template HTML
-        html_string = render_to_string(
-            template_path,
-            {
-                "factura": factura,
-                "agencia": agencia,
-                "agencia_logo_b64": get_agencia_logo_b64(agencia, is_dark_bg=is_dark),
-                "is_dark_color": is_dark,
-            },
-        )
+        html_string = _render_factura_html(factura)
 
         # Generar PDF con WeasyPrint
         pdf_file = PdfRendererService.render_html_to_pdf(html_string)
@@ -70,6 +31,75 @@ def generar_pdf_factura_consolidada(factura):
         raise
 
 
+def generar_pdfs_facturas_consolidadas(facturas):
+    """
+    Genera los PDFs de varias facturas (corridas de fin de mes) en un solo lote de
+    ``PdfRendererService.render_many``.
+
+    Returns:
+        dict: ``{factura.pk: bytes | None}``; ``None`` para las que fallaron.
+    """
+    resultados = {}
+    pendientes = []
+    for factura in facturas:
+        try:
+            pendientes.append((factura, _render_factura_html(factura)))
+        except Exception as e:
+            logger.error(f"Error renderizando HTML de factura {factura.numero_control}: {e}")
+            resultados[factura.pk] = None
+
+    renderizados = PdfRendererService.render_many(html for _, html in pendientes)
+    for (factura, _), resultado in zip(pendientes, renderizados, strict=True):
+        if resultado.ok:
+            resultados[factura.pk] = resultado.pdf
+        else:
+            logger.error(
+                f"Error generando PDF para factura {factura.numero_control}: {resultado.error}"
+            )
+            resultados[factura.pk] = None
+    return resultados
+
+
+def _render_factura_html(factura):
+    """HTML de la factura consolidada según la plantilla elegida por la agencia."""
+    agencia = factura.agencia
+    from django.utils.module_loading import import_string
+
+    is_brand_color_dark = import_string("apps.automation.parsers.ticket_parser.is_brand_color_dark")
+    is_dark = is_brand_color_dark(agencia.color_primario) if agencia else True
+
+    plantilla = (
+        agencia.plantilla_facturas if (agencia and hasattr(agencia, "plantilla_facturas")) else "m1"
+    )
+    plantilla_mapping = {
+        "m1": "facturas/variations/v1_classic.html",
+        "m2": "facturas/variations/v2_editorial.html",
+        "m3": "facturas/variations/v3_executive.html",
+        "m4": "facturas/variations/v4_timeline.html",
+        "m5": "facturas/variations/v5_modern.html",
+    }
+    template_path = plantilla_mapping.get(plantilla, "facturas/variations/v1_classic.html")
+
+    from django.template.loader import get_template
+
+    try:
+        get_template(template_path)
+    except Exception as e:
+        logger.warning(f"No se pudo cargar la plantilla {template_path}, usando fallback: {e}")
+        template_path = "facturas/factura_consolidada_pdf.html"
+
+    # Renderizar template HTML
+    return render_to_string(
+        template_path,
+        {
+            "factura": factura,
+            "agencia": agencia,
+            "agencia_logo_b64": get_agencia_logo_b64(agencia, is_dark_bg=is_dark),
+            "is_dark_color": is_dark,
+        },
+    )
+
+
 def guardar_pdf_factura(factura):
     """
     Genera el PDF de la factura y lo retorna como bytes.
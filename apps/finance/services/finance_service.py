@@ -1,16 +1,79 @@
 import logging
 from decimal import Decimal
 
-from django.db.models import Sum
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 
-from apps.bookings.models.venta import Venta
+from apps.bookings.models.pagos import FeeVenta, PagoVenta
+from apps.bookings.models.venta import ItemVenta, Venta
+from apps.reports.services.kpi_rollup import KpiRollupService
 
 logger = logging.getLogger(__name__)
 
+_DECIMAL = DecimalField(max_digits=14, decimal_places=2)
+
+CAMPOS_TOTALES = ("subtotal", "impuestos", "total_venta", "monto_pagado", "saldo_pendiente")
+_SIN_MOVIMIENTOS = dict.fromkeys(
+    ("calc_subtotal", "calc_impuestos", "calc_fees", "calc_pagado"), Decimal("0.00")
+)
+# Solo se deriva el estado de una venta que está en uno de los estados financieros base
+ESTADOS_FINANCIEROS_BASE = {"PEN", "PAR", "PAG"}
+
+
+def _suma_por_venta(queryset, expresion):
+    """Subquery escalar con la suma de ``expresion`` por venta (0 si no hay filas)."""
+    subquery = (
+        queryset.filter(venta=OuterRef("pk"))
+        .order_by()
+        .values("venta")
+        .annotate(total=Sum(expresion, output_field=_DECIMAL))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(subquery, output_field=_DECIMAL), Value(Decimal("0.00")), output_field=_DECIMAL
+    )
+
 
 class FinanceService:
     """FinanceService."""
 
+    @staticmethod
+    def annotate_totals(queryset):
+        """
+        Anota cada venta con ``calc_subtotal``, ``calc_impuestos``, ``calc_fees`` y
+        ``calc_pagado`` (pagos confirmados) en una sola consulta. Usa los managers
+        por defecto, igual que ``venta.items_venta``: excluye soft-deleted y respeta
+        el contexto de agencia.
+        """
+        return queryset.annotate(
+            calc_subtotal=_suma_por_venta(ItemVenta.objects.all(), F("subtotal_item_venta")),
+            calc_impuestos=_suma_por_venta(
+                ItemVenta.objects.all(),
+                ExpressionWrapper(F("impuestos_item_venta") * F("cantidad"), output_field=_DECIMAL),
+            ),
+            calc_fees=_suma_por_venta(FeeVenta.objects.all(), F("monto")),
+            calc_pagado=_suma_por_venta(PagoVenta.objects.filter(confirmado=True), F("monto")),
+        )
+
+    @staticmethod
+    def _aplicar_totales(venta) -> None:
+        """Asigna totales, saldo y estado derivado a partir de las anotaciones ``calc_*``."""
+        venta.subtotal = venta.calc_subtotal
+        venta.impuestos = venta.calc_impuestos
+        venta.total_venta = venta.calc_subtotal + venta.calc_impuestos + venta.calc_fees
+        venta.monto_pagado = venta.calc_pagado
+        venta.saldo_pendiente = venta.total_venta - venta.monto_pagado
+
+        if venta.estado in ESTADOS_FINANCIEROS_BASE and venta.total_venta > 0:
+            if venta.saldo_pendiente <= 0:
+                venta.estado = "PAG"  # Pagada Total
+            elif 0 < venta.saldo_pendiente < venta.total_venta:
+                venta.estado = "PAR"  # Pagada Parcial
+            else:
+                venta.estado = "PEN"  # Pendiente de Pago
+
     @staticmethod
     def recalculate_sale_finances(venta_id):
         """
@@ -18,53 +81,14 @@ class FinanceService:
         Esta lógica se extrae del modelo para evitar efectos secundarios en el .save()
         """
         try:
-            venta = Venta.all_objects.get(pk=venta_id)
-
-            # 1. Sumar items
-            subtotal_items = Decimal("0.00")
-            impuestos_items = Decimal("0.00")
-
-            items = venta.items_venta.all()
-            for item in items:
-                subtotal_items += item.subtotal_item_venta
-                impuestos_items += item.impuestos_item_venta * item.cantidad
-
-            # 2. Sumar fees
-            fees_total = venta.fees_venta.aggregate(s=Sum("monto"))["s"] or Decimal("0.00")
-
-            # 3. Sumar pagos confirmados
-            pagos_confirmados = venta.pagos_venta.filter(confirmado=True).aggregate(s=Sum("monto"))[
-                "s"
-            ] or Decimal("0.00")
-
-            # 4. Actualizar campos
-            venta.subtotal = subtotal_items
-            venta.impuestos = impuestos_items
-            venta.total_venta = subtotal_items + impuestos_items + fees_total
-            venta.monto_pagado = pagos_confirmados
-            venta.saldo_pendiente = venta.total_venta - venta.monto_pagado
-
-            # 5. Determinar estado según saldo
+            # 1-3. Items, fees y pagos confirmados en una sola consulta agregada
+            venta = FinanceService.annotate_totals(Venta.all_objects.filter(pk=venta_id)).get()
+            # 4-5. Totales, saldo y estado derivado
             estado_original = venta.estado
-            # Solo actualizamos el estado si es uno de los estados financieros base
-            estados_financieros_base = {"PEN", "PAR", "PAG"}  # Códigos de estado
-
-            if venta.estado in estados_financieros_base and venta.total_venta > 0:
-                if venta.saldo_pendiente <= 0:
-                    venta.estado = "PAG"  # Pagada Total
-                elif 0 < venta.saldo_pendiente < venta.total_venta:
-                    venta.estado = "PAR"  # Pagada Parcial
-                else:
-                    venta.estado = "PEN"  # Pendiente de Pago
+            FinanceService._aplicar_totales(venta)
 
             # 6. Guardado atómico de campos financieros
-            campos_update = [
-                "subtotal",
-                "impuestos",
-                "total_venta",
-                "monto_pagado",
-                "saldo_pendiente",
-            ]
+            campos_update = list(CAMPOS_TOTALES)
             if venta.estado != estado_original:
                 campos_update.append("estado")
 
@@ -84,3 +108,100 @@ class FinanceService:
         except Exception as e:
             logger.exception(f"Error recalculando finanzas de venta {venta_id}: {e}")
             return False
+
+    @staticmethod
+    def bulk_recalculate_sale_finances(queryset=None, chunk_size: int | None = None) -> dict:
+        """
+        Recalcula totales, saldo y estado de muchas ventas (corrección de tarifas o de
+        tasa BCV) sin recorrerlas una a una.
+
+        Por lote de ``chunk_size`` ventas: tres consultas agregadas con ``GROUP BY
+        venta`` (items, fees, pagos confirmados), una lectura de las ventas y un
+        ``bulk_update`` solo de las que cambiaron.
+        Como ``bulk_update`` no llama a ``save()`` ni dispara signals, no hay
+        auditoría por venta; los puntos de fidelidad se evalúan solo en las ventas
+        modificadas que quedaron pagadas.
+
+        Retorna ``{"procesadas", "actualizadas", "lotes"}``.
+        """
+        if queryset is None:
+            queryset = Venta.all_objects.all()
+        if chunk_size is None:
+            chunk_size = getattr(settings, "SALE_BULK_RECALC_CHUNK_SIZE", 500)
+
+        venta_ids = list(queryset.order_by("pk").values_list("pk", flat=True))
+        stats = {"procesadas": 0, "actualizadas": 0, "lotes": 0}
+        campos = [*CAMPOS_TOTALES, "estado"]
+
+        for inicio in range(0, len(venta_ids), chunk_size):
+            lote = venta_ids[inicio : inicio + chunk_size]
+            totales = FinanceService._totales_agrupados(lote)
+            ventas = Venta.all_objects.filter(pk__in=lote).only(
+                *campos, "cliente_id", "puntos_fidelidad_asignados", "agencia_id", "fecha_venta"
+            )
+
+            modificadas = []
+            for venta in ventas:
+                for nombre, valor in {**_SIN_MOVIMIENTOS, **totales.get(venta.pk, {})}.items():
+                    setattr(venta, nombre, valor)
+                antes = [getattr(venta, campo) for campo in campos]
+                FinanceService._aplicar_totales(venta)
+                if [getattr(venta, campo) for campo in campos] != antes:
+                    modificadas.append(venta)
+
+            with transaction.atomic():
+                Venta.all_objects.bulk_update(modificadas, campos)
+                # bulk_update no dispara señales: los rollups KPI se marcan aquí (un lote).
+                for venta in modificadas:
+                    KpiRollupService.mark(venta.agencia_id, venta.fecha_venta)
+
+            for venta in modificadas:
+                # Mismo criterio que _evaluar_otorgar_puntos, sin cargar el cliente antes.
+                elegible = venta.saldo_pendiente <= 0 or venta.estado in (
+                    Venta.EstadoVenta.COMPLETADA,
+                    Venta.EstadoVenta.PAGADA_TOTAL,
+                )
+                if elegible and venta.cliente_id and not venta.puntos_fidelidad_asignados:
+                    venta._evaluar_otorgar_puntos(contexto="bulk_recalculate")
+
+            stats["procesadas"] += len(lote)
+            stats["actualizadas"] += len(modificadas)
+            stats["lotes"] += 1
+            logger.info(
+                f"Recálculo masivo: lote {stats['lotes']} ({len(modificadas)}/{len(lote)} "
+                f"ventas actualizadas)"
+            )
+        return stats
+
+    @staticmethod
+    def _totales_agrupados(venta_ids) -> dict[int, dict[str, Decimal]]:
+        """Sumas ``calc_*`` por venta con una consulta agrupada por tabla hija."""
+        consultas = (
+            (
+                ItemVenta.objects.all(),
+                {
+                    "calc_subtotal": Sum("subtotal_item_venta"),
+                    "calc_impuestos": Sum(
+                        ExpressionWrapper(
+                            F("impuestos_item_venta") * F("cantidad"), output_field=_DECIMAL
+                        )
+                    ),
+                },
+            ),
+            (FeeVenta.objects.all(), {"calc_fees": Sum("monto")}),
+            (PagoVenta.objects.filter(confirmado=True), {"calc_pagado": Sum("monto")}),
+        )
+        totales: dict[int, dict[str, Decimal]] = {}
+        for queryset, agregados in consultas:
+            filas = (
+                queryset.filter(venta_id__in=venta_ids)
+                .order_by()
+                .values("venta_id")
+                .annotate(**agregados)
+            )
+            for fila in filas:
+                venta_id = fila.pop("venta_id")
+                totales.setdefault(venta_id, {}).update(
+                    {nombre: valor or Decimal("0.00") for nombre, valor in fila.items()}
+                )
+        return totales
@@ -0,0 +1,80 @@
+"""
+Snapshot de tasas de cambio (USD, EUR, P2P) para la UI.
+
+Una sola entrada de cache (``tasa_bcv_context``) con el último monto formateado y
+la fecha de cada moneda. La escribe la sincronización BCV al guardar las tasas
+(``RateSnapshotService.refresh``), así que un render con cache caliente no consulta
+la BD. La frescura se calcula al leer, comparando las fechas guardadas con hoy: el
+snapshot de ayer se marca obsoleto sin necesidad de expirar la entrada.
+
+Los puntos que aún hacen ``cache.delete("tasa_bcv_context")`` siguen funcionando:
+el siguiente render reconstruye el snapshot desde la BD.
+"""
+
+import logging
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "tasa_bcv_context"
+MONEDAS = ("USD", "EUR", "P2P")
+NO_DISPONIBLE = "N/D"
+
+
+class RateSnapshotService:
+    """Últimas tasas USD/EUR/P2P y su frescura, servidas desde una entrada de cache."""
+
+    @classmethod
+    def get(cls) -> dict:
+        """
+        Snapshot vigente: ``{"usd", "eur", "p2p", "fechas", "es_obsoleta"}``.
+
+        Solo consulta la BD si la entrada no existe (o tiene un formato anterior).
+        """
+        snapshot = None
+        try:
+            snapshot = cache.get(CACHE_KEY)
+        except Exception as e:
+            logger.warning(f"Error leyendo snapshot de tasas: {e}")
+        if not isinstance(snapshot, dict) or "fechas" not in snapshot:
+            snapshot = cls.refresh()
+        return {**snapshot, "es_obsoleta": cls.es_obsoleta(snapshot)}
+
+    @classmethod
+    def refresh(cls) -> dict:
+        """Reconstruye el snapshot desde ``TasaCambio`` y lo publica en cache."""
+        snapshot = cls._build()
+        try:
+            cache.set(CACHE_KEY, snapshot, getattr(settings, "RATE_SNAPSHOT_TIMEOUT", 3600))
+        except Exception as e:
+            logger.warning(f"Error guardando snapshot de tasas: {e}")
+        return snapshot
+
+    @staticmethod
+    def es_obsoleta(snapshot: dict, hoy: date | None = None) -> bool:
+        """True si falta alguna moneda o alguna tasa no es de hoy."""
+        hoy = hoy or date.today()
+        fechas = snapshot.get("fechas") or {}
+        return any(fechas.get(moneda) is None or fechas[moneda] < hoy for moneda in MONEDAS)
+
+    @staticmethod
+    def _build() -> dict:
+        from apps.finance.models_stubs import TasaCambio
+
+        snapshot = {"fechas": {}}
+        # Savepoint: si la tabla falla, no rompe la transacción de la solicitud.
+        with transaction.atomic():
+            for moneda in MONEDAS:
+                tasa = (
+                    TasaCambio.objects.filter(moneda=moneda)
+                    .order_by("-fecha")
+                    .only("fecha", "monto")
+                    .first()
+                )
+                snapshot[moneda.lower()] = f"{tasa.monto:,.2f}" if tasa else NO_DISPONIBLE
+                snapshot["fechas"][moneda] = tasa.fecha if tasa else None
+        return snapshot
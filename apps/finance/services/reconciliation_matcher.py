@@ -0,0 +1,366 @@
+"""
+Motor determinístico de cruce para la conciliación de reportes de proveedor.
+
+Los boletos locales se indexan una sola vez en tres bloques:
+
+- ``boleto``: últimos 10 dígitos del número de boleto.
+- ``pnr``: localizador de 6 caracteres.
+- ``pasajero``: cada token del nombre normalizado + banda de monto (logarítmica,
+  del ancho de ``RECONCILIATION_AMOUNT_TOLERANCE``) + ventana de fechas de
+  ``RECONCILIATION_DATE_WINDOW_DAYS`` días.
+
+Cada línea del reporte solo se compara contra los candidatos de sus bloques (y
+bandas/ventanas vecinas), nunca contra todo el universo local. El puntaje combina
+boleto, PNR, similitud de nombre, cercanía de monto y de fecha; el mejor candidato
+libre con puntaje >= ``RECONCILIATION_MATCH_THRESHOLD`` se asigna. Lo que queda es
+el residuo que se envía a la IA con una lista corta (``shortlist``) por monto.
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from datetime import date
+from decimal import Decimal
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.utils.dateparse import parse_date
+
+TITULOS = frozenset(
+    {"MR", "MRS", "MS", "MISS", "MSTR", "DR", "SR", "SRA", "SRTA", "CHD", "INF", "ADT"}
+)
+
+PESOS = {"boleto": 0.6, "pnr": 0.3, "pasajero": 0.4, "monto": 0.2, "fecha": 0.1}
+
+
+def normalizar_boleto(numero: str | None) -> str:
+    """Solo dígitos, últimos 10 (sin código de aerolínea ni guiones)."""
+    return re.sub(r"\D", "", str(numero or ""))[-10:]
+
+
+def normalizar_pnr(pnr: str | None) -> str:
+    """PNR en mayúsculas; vacío si no tiene el formato de 6 caracteres."""
+    valor = str(pnr or "").strip().upper()
+    return valor if len(valor) == 6 and valor.isalnum() else ""
+
+
+def tokens_pasajero(nombre: str | None) -> tuple[str, ...]:
+    """Tokens ordenados sin acentos ni títulos: 'NAVAS/MANUEL MR' -> ('MANUEL', 'NAVAS')."""
+    texto = unicodedata.normalize("NFKD", str(nombre or "")).encode("ascii", "ignore").decode()
+    tokens = {t for t in re.split(r"[^A-Z]+", texto.upper()) if len(t) > 1 and t not in TITULOS}
+    return tuple(sorted(tokens))
+
+
+def _a_fecha(valor) -> date | None:
+    if isinstance(valor, date):
+        return valor
+    if isinstance(valor, str):
+        try:
+            return parse_date(valor[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def _similitud_nombre(a: "Registro", b: "Registro") -> float:
+    if a.tokens == b.tokens:
+        return 1.0
+    comparador = SequenceMatcher(None, a.nombre, b.nombre)
+    # quick_ratio es una cota superior barata: descarta sin calcular ratio().
+    return comparador.ratio() if comparador.quick_ratio() >= 0.7 else 0.0
+
+
+class Registro:
+    """Boleto local o línea de reporte ya normalizado para el cruce."""
+
+    __slots__ = (
+        "id",
+        "numero",
+        "boleto",
+        "pnr",
+        "pasajero",
+        "tokens",
+        "nombre",
+        "total",
+        "tarifa",
+        "impuestos",
+        "fecha",
+    )
+
+    def __init__(self, id, numero, pnr, pasajero, total, tarifa, impuestos, fecha):
+        """__init__."""
+        self.id = id
+        self.numero = numero or ""
+        self.boleto = normalizar_boleto(numero)
+        self.pnr = normalizar_pnr(pnr)
+        self.pasajero = pasajero or ""
+        self.tokens = tokens_pasajero(pasajero)
+        self.nombre = " ".join(self.tokens)
+        self.total = Decimal(str(total or 0))
+        self.tarifa = Decimal(str(tarifa or 0))
+        self.impuestos = Decimal(str(impuestos or 0))
+        self.fecha = _a_fecha(fecha)
+
+    @classmethod
+    def desde_boleto(cls, fila: dict) -> "Registro":
+        """Desde ``BoletoImportado.values(*CAMPOS_BOLETO)``."""
+        return cls(
+            fila["id_boleto_importado"],
+            fila["numero_boleto"],
+            fila["localizador_pnr"],
+            fila["nombre_pasajero_completo"],
+            fila["total_boleto"],
+            fila["tarifa_base"],
+            fila["impuestos_total_calculado"],
+            fila["fecha_emision_boleto"],
+        )
+
+    @classmethod
+    def desde_linea(cls, fila: dict) -> "Registro":
+        """Desde ``LineaReporteReconciliacion.values(*CAMPOS_LINEA)``."""
+        raw = fila.get("raw_data") or {}
+        return cls(
+            fila["id_linea"],
+            fila["numero_boleto_reportado"],
+            raw.get("pnr"),
+            raw.get("pasajero"),
+            fila["total_cobrado"],
+            fila["tarifa_base_cobrada"],
+            fila["impuestos_cobrados"],
+            raw.get("fecha_emision") or raw.get("fecha"),
+        )
+
+
+CAMPOS_BOLETO = (
+    "id_boleto_importado",
+    "numero_boleto",
+    "localizador_pnr",
+    "nombre_pasajero_completo",
+    "total_boleto",
+    "tarifa_base",
+    "impuestos_total_calculado",
+    "fecha_emision_boleto",
+)
+
+CAMPOS_LINEA = (
+    "id_linea",
+    "numero_boleto_reportado",
+    "tarifa_base_cobrada",
+    "impuestos_cobrados",
+    "total_cobrado",
+    "raw_data",
+)
+
+
+class ReconciliationMatcher:
+    """Índice de bloqueo multi-clave + puntaje determinístico sobre boletos locales."""
+
+    def __init__(
+        self,
+        boletos: Iterable[dict],
+        umbral: float | None = None,
+        ventana_dias: int | None = None,
+        tolerancia_monto: float | None = None,
+    ):
+        """Indexa ``boletos`` (filas de ``CAMPOS_BOLETO``) en una sola pasada."""
+        self.umbral = (
+            umbral
+            if umbral is not None
+            else getattr(settings, "RECONCILIATION_MATCH_THRESHOLD", 0.6)
+        )
+        self.ventana_dias = max(
+            1,
+            ventana_dias
+            if ventana_dias is not None
+            else getattr(settings, "RECONCILIATION_DATE_WINDOW_DAYS", 3),
+        )
+        self.tolerancia = (
+            tolerancia_monto
+            if tolerancia_monto is not None
+            else getattr(settings, "RECONCILIATION_AMOUNT_TOLERANCE", 0.05)
+        )
+        self._registros: dict[int, Registro] = {}
+        self._asignados: set[int] = set()
+        self._por_boleto: dict[str, list[int]] = defaultdict(list)
+        self._por_pnr: dict[str, list[int]] = defaultdict(list)
+        # (token, banda) -> ventana de fecha (o None) -> ids
+        self._por_pasajero: dict[tuple, dict[int | None, list[int]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        self._por_banda: dict[int, list[int]] = defaultdict(list)
+
+        for fila in boletos:
+            self.agregar(Registro.desde_boleto(fila))
+
+    def __len__(self) -> int:
+        """Cantidad de boletos indexados."""
+        return len(self._registros)
+
+    def agregar(self, registro: Registro) -> None:
+        """Indexa un boleto local en todos sus bloques."""
+        self._registros[registro.id] = registro
+        if registro.boleto:
+            self._por_boleto[registro.boleto].append(registro.id)
+        if registro.pnr:
+            self._por_pnr[registro.pnr].append(registro.id)
+        banda = self._banda(registro.total)
+        self._por_banda[banda].append(registro.id)
+        ventana = self._ventana(registro.fecha)
+        for token in registro.tokens:
+            self._por_pasajero[(token, banda)][ventana].append(registro.id)
+
+    def candidatos(self, linea: Registro) -> list[Registro]:
+        """Boletos libres que comparten al menos un bloque con ``linea``."""
+        return self._libres([*self._ids_por_clave(linea), *self._ids_por_pasajero(linea)])
+
+    def puntaje(self, linea: Registro, boleto: Registro) -> float:
+        """Similitud 0..~1.5 entre una línea del reporte y un boleto local."""
+        total = 0.0
+        if linea.boleto and boleto.boleto:
+            if linea.boleto == boleto.boleto:
+                total += PESOS["boleto"]
+            elif len(linea.boleto) == len(boleto.boleto) and (
+                sum(a != b for a, b in zip(linea.boleto, boleto.boleto, strict=True)) == 1
+            ):
+                # Un dígito mal transcrito.
+                total += PESOS["boleto"] / 2
+        if linea.pnr and linea.pnr == boleto.pnr:
+            total += PESOS["pnr"]
+        if linea.nombre and boleto.nombre:
+            similitud = _similitud_nombre(linea, boleto)
+            if similitud >= 0.7:
+                total += PESOS["pasajero"] * similitud
+        base = max(abs(linea.total), abs(boleto.total), Decimal("1"))
+        desvio = float(abs(linea.total - boleto.total) / base)
+        if desvio <= self.tolerancia:
+            total += PESOS["monto"] * (1 - desvio / self.tolerancia if self.tolerancia else 1)
+        if linea.fecha and boleto.fecha:
+            dias = abs((linea.fecha - boleto.fecha).days)
+            if dias <= self.ventana_dias:
+                total += PESOS["fecha"] * (1 - dias / (self.ventana_dias + 1))
+        return total
+
+    def match(self, linea: Registro) -> tuple[Registro | None, float]:
+        """
+        Asigna el mejor boleto libre con puntaje >= umbral; ``(None, mejor)`` si no hay.
+
+        Primero se puntúan los bloques de boleto y PNR (pocos candidatos); el bloque de
+        pasajero, más poblado, solo se evalúa si ninguno de ellos alcanza el umbral.
+        """
+        mejor, mejor_puntaje = self._mejor(linea, self._libres(self._ids_por_clave(linea)))
+        if mejor_puntaje < self.umbral:
+            otro, puntaje = self._mejor(linea, self._libres(self._ids_por_pasajero(linea)))
+            if puntaje > mejor_puntaje:
+                mejor, mejor_puntaje = otro, puntaje
+        if mejor is None or mejor_puntaje < self.umbral:
+            return None, mejor_puntaje
+        self.asignar(mejor.id)
+        return mejor, mejor_puntaje
+
+    def shortlist(self, linea: Registro, limite: int = 10) -> list[Registro]:
+        """Boletos libres plausibles para la IA: sus bloques y luego monto cercano."""
+        elegidos = {b.id: b for b in self.candidatos(linea)[:limite]}
+        cercanos = heapq.nsmallest(
+            max(0, limite - len(elegidos)),
+            (
+                self._registros[registro_id]
+                for registro_id in self._ids_por_monto(linea)
+                if registro_id not in elegidos
+            ),
+            key=lambda b: (abs(b.total - linea.total), b.id),
+        )
+        return [*elegidos.values(), *cercanos]
+
+    def plausible(self, linea: Registro) -> bool:
+        """Hay al menos un boleto libre en los bloques o en la banda de monto de ``linea``."""
+        return bool(self.candidatos(linea)) or any(True for _ in self._ids_por_monto(linea))
+
+    def get(self, registro_id: int) -> Registro | None:
+        """Boleto indexado por id."""
+        return self._registros.get(registro_id)
+
+    def asignar(self, registro_id: int) -> None:
+        """Marca un boleto como conciliado."""
+        self._asignados.add(registro_id)
+
+    def asignado(self, registro_id: int) -> bool:
+        """El boleto ya tiene pareja."""
+        return registro_id in self._asignados
+
+    def pendientes(self) -> Iterable[Registro]:
+        """Boletos sin pareja, en orden de id."""
+        for registro_id in sorted(self._registros.keys() - self._asignados):
+            yield self._registros[registro_id]
+
+    def _banda(self, total: Decimal) -> int:
+        """Banda logarítmica: montos dentro de la tolerancia caen en bandas vecinas."""
+        valor = abs(float(total))
+        if valor < 1 or self.tolerancia <= 0:
+            return 0
+        banda = int(math.log(valor) / math.log1p(self.tolerancia)) + 1
+        return -banda if total < 0 else banda
+
+    def _mejor(self, linea: Registro, boletos: list[Registro]) -> tuple[Registro | None, float]:
+        mejor, mejor_puntaje = None, 0.0
+        for boleto in boletos:
+            puntaje = self.puntaje(linea, boleto)
+            if puntaje > mejor_puntaje or (
+                puntaje == mejor_puntaje and mejor is not None and boleto.id < mejor.id
+            ):
+                mejor, mejor_puntaje = boleto, puntaje
+        return mejor, mejor_puntaje
+
+    def _libres(self, ids) -> list[Registro]:
+        vistos = set()
+        resultado = []
+        for registro_id in ids:
+            if registro_id in vistos or registro_id in self._asignados:
+                continue
+            vistos.add(registro_id)
+            resultado.append(self._registros[registro_id])
+        return resultado
+
+    def _ids_por_clave(self, linea: Registro) -> list[int]:
+        ids = []
+        if linea.boleto:
+            ids.extend(self._por_boleto.get(linea.boleto, ()))
+        if linea.pnr:
+            ids.extend(self._por_pnr.get(linea.pnr, ()))
+        return ids
+
+    def _ids_por_pasajero(self, linea: Registro) -> list[int]:
+        """
+        Boletos del bloque de pasajero que comparten al menos dos tokens del nombre (uno
+        si la línea trae un solo token): un apellido común por sí solo no es candidato.
+        """
+        if not linea.tokens:
+            return []
+        banda = self._banda(linea.total)
+        ventana = self._ventana(linea.fecha)
+        compartidos: Counter[int] = Counter()
+        for token in linea.tokens:
+            for vecina in (banda - 1, banda, banda + 1):
+                por_ventana = self._por_pasajero.get((token, vecina))
+                if not por_ventana:
+                    continue
+                if ventana is None:
+                    for grupo in por_ventana.values():
+                        compartidos.update(grupo)
+                    continue
+                for clave in (ventana - 1, ventana, ventana + 1, None):
+                    compartidos.update(por_ventana.get(clave, ()))
+        minimo = min(2, len(linea.tokens))
+        return [registro_id for registro_id, n in compartidos.items() if n >= minimo]
+
+    def _ids_por_monto(self, linea: Registro):
+        banda = self._banda(linea.total)
+        for vecina in (banda - 1, banda, banda + 1):
+            for registro_id in self._por_banda.get(vecina, ()):
+                if registro_id not in self._asignados:
+                    yield registro_id
+
+    def _ventana(self, fecha: date | None) -> int | None:
+        return fecha.toordinal() // self.ventana_dias if fecha else None
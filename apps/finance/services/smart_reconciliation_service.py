@@ -1,3 +1,4 @@
+import hashlib
 import json
 import logging
 from datetime import timedelta
@@ -5,6 +6,8 @@ from decimal import Decimal
 from typing import Any
 
 import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.utils import timezone
 from pydantic import BaseModel, Field
@@ -15,9 +18,20 @@ from apps.finance.models_stubs import (
     LineaReporteReconciliacion,
     ReporteReconciliacion,
 )
+from apps.finance.services.reconciliation_matcher import (
+    CAMPOS_BOLETO,
+    CAMPOS_LINEA,
+    ReconciliationMatcher,
+    Registro,
+)
 
 logger = logging.getLogger(__name__)
 
+# Campos estándar del mapeo de columnas de reportes estructurados (CSV/Excel)
+CAMPOS_TEXTO = ("numero_boleto", "pnr", "pasajero")
+CAMPOS_MONTO = ("tarifa_neta", "impuestos", "comision_monto", "total_pagar")
+CAMPOS_ESTANDAR = frozenset(CAMPOS_TEXTO + CAMPOS_MONTO)
+
 # --- Pydantic Schemas para extracción de IA ---
 
 
@@ -110,14 +124,13 @@ class SmartReconciliationService:
 
             text = ""
             if file_path.lower().endswith(".pdf"):
-                import fitz
+                from apps.automation.parsers.text_extraction import TextExtractionService
 
                 try:
-                    with fitz.open(file_path) as pdf:
-                        for page in pdf:
-                            t = page.get_text()
-                            if t:
-                                text += t + "\n"
+                    # Streaming por página (pool de procesos en reportes BSP de cientos de páginas)
+                    text = "".join(
+                        t + "\n" for t in TextExtractionService.iter_pdf_pages(file_path) if t
+                    )
                 except Exception as e:
                     logger.error(f"Error extrayendo texto del PDF: {e}")
                     raise ValueError("No se pudo extraer texto del reporte PDF.") from e
@@ -159,8 +172,50 @@ class SmartReconciliationService:
     def _mapear_columnas_df_con_ia(cls, df: pd.DataFrame, proveedor_hint: str) -> dict[str, Any]:
         """
         Si el Excel no tiene las columnas estándar, le pedimos a Gemini que las identifique
-        basándose en una muestra de las primeras 5 filas.
+        basándose en una muestra de las primeras 5 filas. El mapeo se guarda en cache por
+        proveedor y firma de cabecera: un layout repetido no vuelve a llamar a la IA.
         """
+        try:
+            mapping = cls._mapeo_columnas(df, proveedor_hint)
+
+            # Renombrar columnas según el mapeo y convertir todas las filas por columna
+            df = df.rename(columns=mapping)
+            return {"proveedor_nombre": proveedor_hint, "items": cls._filas_a_items(df)}
+        except Exception as e:
+            logger.error(f"Fallo mapeando columnas con IA: {e}")
+            # Fallback: intentar match directo si los nombres ya coinciden
+            return {"proveedor_nombre": proveedor_hint, "items": df.to_dict(orient="records")}
+
+    @classmethod
+    def _mapeo_columnas(cls, df: pd.DataFrame, proveedor_hint: str) -> dict[str, str]:
+        """Mapeo columna original -> campo estándar: cache, cabecera estándar o IA."""
+        cache_key = cls._mapeo_cache_key(proveedor_hint, df.columns)
+        try:
+            mapping = cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Cache de mapeo de columnas no disponible: {e}")
+            mapping = None
+        if mapping is not None:
+            return mapping
+
+        if {"numero_boleto", "total_pagar"} <= {str(c) for c in df.columns}:
+            # Ya viene con los nombres estándar (exportación propia o plantilla).
+            return {}
+
+        mapping = cls._validar_mapeo(cls._pedir_mapeo_ia(df, proveedor_hint), df.columns)
+        if mapping:
+            try:
+                cache.set(
+                    cache_key,
+                    mapping,
+                    getattr(settings, "RECONCILIATION_COLUMN_MAP_TTL", 60 * 60 * 24 * 90),
+                )
+            except Exception as e:
+                logger.warning(f"No se pudo guardar el mapeo de columnas en cache: {e}")
+        return mapping
+
+    @staticmethod
+    def _pedir_mapeo_ia(df: pd.DataFrame, proveedor_hint: str) -> dict:
         from django.utils.module_loading import import_string
 
         ai_engine = import_string("apps.automation.services.ai_engine.ai_engine")
@@ -188,34 +243,75 @@ class SmartReconciliationService:
         Responde con un JSON que mapee el nombre de la columna original al campo estándar.
         Ejemplo: {{"COL_TICKET_ID": "numero_boleto", "BASE_FARE": "tarifa_neta", ...}}
         """
+        return ai_engine.call_gemini(prompt=prompt, temperature=0.0)
+
+    @staticmethod
+    def _validar_mapeo(mapping, columnas) -> dict[str, str]:
+        """Solo columnas existentes hacia campos estándar, un campo por columna."""
+        if not isinstance(mapping, dict):
+            raise ValueError(f"Mapeo de columnas inválido: {mapping!r}")
+        existentes = {str(c): c for c in columnas}
+        validado, destinos = {}, set()
+        for original, campo in mapping.items():
+            if str(original) in existentes and campo in CAMPOS_ESTANDAR and campo not in destinos:
+                validado[existentes[str(original)]] = campo
+                destinos.add(campo)
+        return validado
+
+    @staticmethod
+    def _mapeo_cache_key(proveedor_hint: str, columnas) -> str:
+        """Clave por proveedor y firma de cabecera (nombres normalizados, sin orden)."""
+        cabecera = sorted(" ".join(str(c).split()).upper() for c in columnas)
+        firma = hashlib.sha256("\x1f".join(cabecera).encode()).hexdigest()[:32]
+        proveedor = " ".join(str(proveedor_hint or "").split()).upper() or "DESCONOCIDO"
+        return f"recon:colmap:{proveedor}:{firma}"
 
-        try:
-            mapping = ai_engine.call_gemini(prompt=prompt, temperature=0.0)
-
-            # Renombrar columnas según el mapeo
-            df = df.rename(columns=mapping)
-
-            # Convertir a items
-            items = []
-            for _, row in df.iterrows():
-                items.append(
-                    {
-                        "numero_boleto": str(row.get("numero_boleto", "")),
-                        "pnr": str(row.get("pnr", "")),
-                        "pasajero": str(row.get("pasajero", "")),
-                        "tarifa_neta": float(row.get("tarifa_neta", 0)),
-                        "impuestos": float(row.get("impuestos", 0)),
-                        "comision_monto": float(row.get("comision_monto", 0)),
-                        "total_pagar": float(row.get("total_pagar", 0)),
-                        "moneda": "USD",  # Default
-                    }
-                )
-
-            return {"proveedor_nombre": proveedor_hint, "items": items}
-        except Exception as e:
-            logger.error(f"Fallo mapeando columnas con IA: {e}")
-            # Fallback: intentar match directo si los nombres ya coinciden
-            return {"proveedor_nombre": proveedor_hint, "items": df.to_dict(orient="records")}
+    @classmethod
+    def _filas_a_items(cls, df: pd.DataFrame) -> list[dict[str, Any]]:
+        """Convierte el DataFrame ya renombrado a items estándar, columna por columna."""
+        columnas = {}
+        for campo in CAMPOS_TEXTO:
+            columnas[campo] = (
+                cls._columna_texto(df[campo])
+                if campo in df
+                else pd.Series("", index=df.index, dtype="string")
+            )
+        for campo in CAMPOS_MONTO:
+            columnas[campo] = cls._columna_monto(df[campo]) if campo in df else 0.0
+        items = pd.DataFrame(columnas, index=df.index)
+        items["moneda"] = "USD"  # Default
+        return items.to_dict(orient="records")
+
+    @staticmethod
+    def _columna_texto(serie: pd.Series) -> pd.Series:
+        """Texto limpio; números enteros leídos como float (1347258019382.0) sin decimales."""
+        if pd.api.types.is_float_dtype(serie):
+            valores = serie.dropna()
+            if (valores % 1 == 0).all():
+                serie = serie.astype("Int64")
+        return serie.astype("string").fillna("").str.strip()
+
+    @staticmethod
+    def _columna_monto(serie: pd.Series) -> pd.Series:
+        """
+        Montos a float con las reglas de ``clean_currency``, vectorizadas: con punto y coma
+        el último separador es el decimal ('$1,234.50', '1.234,50'); con solo coma es
+        decimal si le siguen dos dígitos ('12,50') y de miles si no ('1,500'); varios puntos
+        son de miles ('1.200.000'). Lo no numérico queda en 0.
+        """
+        if not pd.api.types.is_numeric_dtype(serie):
+            texto = serie.astype("string").str.replace(r"[^\d,.\-]", "", regex=True)
+            ultimo_punto = texto.str.rfind(".").fillna(-1)
+            ultima_coma = texto.str.rfind(",").fillna(-1)
+            coma_decimal = (ultima_coma > ultimo_punto) & (
+                (ultimo_punto >= 0) | texto.str.contains(r",\d{2}$", regex=True).fillna(False)
+            )
+            punto_de_miles = coma_decimal | (texto.str.count(r"\.").fillna(0) > 1)
+            texto = texto.where(~punto_de_miles, texto.str.replace(".", "", regex=False))
+            serie = texto.where(coma_decimal, texto.str.replace(",", "", regex=False)).str.replace(
+                ",", ".", regex=False
+            )
+        return pd.to_numeric(serie, errors="coerce").fillna(0.0).astype("float64")
 
     @classmethod
     @transaction.atomic
@@ -242,7 +338,14 @@ class SmartReconciliationService:
     @classmethod
     @transaction.atomic
     def _ejecutar_cruce_conciliacion(cls, reporte: ReporteReconciliacion) -> dict[str, Any]:
-        """Cruzador Financiero Híbrido: Batch + IA Fuzzy"""
+        """
+        Cruzador Financiero Híbrido: índice de bloqueo + puntaje determinístico, IA solo
+        para el residuo.
+
+        Las líneas se recorren en streaming y las conciliaciones se escriben con
+        ``bulk_create`` cada ``RECONCILIATION_CHUNK_SIZE`` filas; en memoria solo quedan
+        el índice de boletos locales y las líneas residuales.
+        """
         reporte.conciliaciones.all().hard_delete()
 
         resumen = {
@@ -251,12 +354,83 @@ class SmartReconciliationService:
             "discrepancias": 0,
             "huerfanos_reporte": 0,
             "huerfanos_local": 0,
+            "match_deterministico": 0,
+            "match_ia": 0,
+            "llamadas_ia": 0,
         }
+        chunk_size = getattr(settings, "RECONCILIATION_CHUNK_SIZE", 2000)
 
-        lineas_reporte = list(reporte.lineas.all())
-        resumen["total_lineas"] = len(lineas_reporte)
+        # 1. Índice de candidatos locales (boletos de la agencia en el periodo ±15 días)
+        matcher = ReconciliationMatcher(
+            cls._boletos_candidatos(reporte).values(*CAMPOS_BOLETO).iterator(chunk_size=chunk_size)
+        )
 
-        # 1. Obtener candidatos locales (Ventas de la agencia en un rango de fecha similar ±15 días)
+        # 2. Match determinístico por bloques, línea por línea
+        pendientes: list[ConciliacionBoleto] = []
+        residuos: list[Registro] = []
+        lineas = (
+            reporte.lineas.order_by("id_linea")
+            .values(*CAMPOS_LINEA)
+            .iterator(chunk_size=chunk_size)
+        )
+        for fila in lineas:
+            resumen["total_lineas"] += 1
+            linea = Registro.desde_linea(fila)
+            boleto, _ = matcher.match(linea)
+            if boleto is None:
+                residuos.append(linea)
+                continue
+            pendientes.append(cls._crear_conciliacion(reporte, linea, boleto, resumen))
+            resumen["match_deterministico"] += 1
+            if len(pendientes) >= chunk_size:
+                cls._guardar_conciliaciones(pendientes)
+
+        # 3. Match Fuzzy con IA, solo para residuos con algún candidato plausible
+        if residuos:
+            conciliados = cls._cruce_residuos_ia(reporte, residuos, matcher, resumen)
+            pendientes.extend(conciliados.values())
+            residuos = [linea for linea in residuos if linea.id not in conciliados]
+
+        # 4. Huérfanos del reporte (cobrados sin boleto local)
+        for linea in residuos:
+            pendientes.append(
+                ConciliacionBoleto(
+                    agencia_id=reporte.agencia_id,
+                    reporte=reporte,
+                    linea_reporte_id=linea.id,
+                    estado=ConciliacionBoleto.EstadosCruce.NO_EN_LOCAL,
+                    diferencia_total=linea.total,
+                )
+            )
+            resumen["huerfanos_reporte"] += 1
+            if len(pendientes) >= chunk_size:
+                cls._guardar_conciliaciones(pendientes)
+
+        # 5. Huérfanos locales (boletos sin cobro - facturación pendiente)
+        for boleto in matcher.pendientes():
+            pendientes.append(
+                ConciliacionBoleto(
+                    agencia_id=reporte.agencia_id,
+                    reporte=reporte,
+                    boleto_local_id=boleto.id,
+                    estado=ConciliacionBoleto.EstadosCruce.NO_EN_REPORTE,
+                    diferencia_total=-boleto.total,
+                )
+            )
+            resumen["huerfanos_local"] += 1
+            if len(pendientes) >= chunk_size:
+                cls._guardar_conciliaciones(pendientes)
+
+        cls._guardar_conciliaciones(pendientes)
+        logger.info(
+            f"Cruce del reporte {reporte.pk}: {resumen['match_deterministico']} determinísticos, "
+            f"{resumen['match_ia']} por IA en {resumen['llamadas_ia']} llamadas"
+        )
+        return resumen
+
+    @staticmethod
+    def _boletos_candidatos(reporte: ReporteReconciliacion):
+        """Boletos de la agencia emitidos en el periodo del reporte ±15 días."""
         buffer_dias = 15
         query_local = BoletoImportado.objects.filter(agencia=reporte.agencia)
         if reporte.periodo_inicio:
@@ -267,110 +441,12 @@ class SmartReconciliationService:
             query_local = query_local.filter(
                 fecha_emision_boleto__lte=reporte.periodo_fin + timedelta(days=buffer_dias)
             )
-
-        from django.db.models import F
-
-        ventas_locales = list(
-            query_local.annotate(
-                id_boleto=F("id_boleto_importado"),
-                pnr=F("localizador_pnr"),
-                pasajero_nombre_completo=F("nombre_pasajero_completo"),
-            ).values(
-                "id_boleto",
-                "numero_boleto",
-                "pnr",
-                "pasajero_nombre_completo",
-                "total_boleto",
-                "tarifa_base",
-                "impuestos_total_calculado",
-            )
-        )
-
-        # 2. Match Determinístico Rápido (O(n) con diccionarios)
-        boletos_asignados = set()
-        lineas_procesadas = set()
-
-        # Pre-construir índices para búsqueda O(1)
-        ticket_index = {}
-        pnr_index = {}
-        for v in ventas_locales:
-            num_loc = (v["numero_boleto"] or "").replace("-", "").strip()[-10:]
-            if num_loc:
-                ticket_index.setdefault(num_loc, []).append(v)
-            pnr_val = (v["pnr"] or "").upper().strip()
-            if pnr_val and len(pnr_val) == 6:
-                pnr_index.setdefault(pnr_val, []).append(v)
-
-        for linea in lineas_reporte:
-            num_rep = linea.numero_boleto_reportado.replace("-", "").strip()[-10:]
-            pnr_rep = (linea.raw_data or {}).get("pnr", "").upper().strip()
-
-            match = None
-            # Prioridad 1: Número de boleto (10 dígitos finales)
-            if num_rep and num_rep in ticket_index:
-                for v in ticket_index[num_rep]:
-                    if v["id_boleto"] not in boletos_asignados:
-                        match = v
-                        break
-
-            # Prioridad 2: PNR (Si no hubo match por boleto)
-            if not match and pnr_rep and pnr_rep in pnr_index:
-                for v in pnr_index[pnr_rep]:
-                    if v["id_boleto"] not in boletos_asignados:
-                        match = v
-                        break
-
-            if match:
-                cls._crear_conciliacion(reporte, linea, match, resumen)
-                boletos_asignados.add(match["id_boleto"])
-                lineas_procesadas.add(linea.id_linea)
-
-        # 3. Match Fuzzy con IA (Para lo que no tuvo match exacto)
-        pendientes_reporte = lineas_reporte.exclude(id_linea__in=lineas_procesadas)
-        pendientes_local = [v for v in ventas_locales if v["id_boleto"] not in boletos_asignados]
-
-        if pendientes_reporte.exists() and pendientes_local:
-            logger.info(
-                f"🤖 Ejecutando Cruce Fuzzy IA para {pendientes_reporte.count()} líneas pendientes."
-            )
-            # Dividir en lotes de 20 para no saturar tokens/contexto
-            from apps.common.utils.lists import chunk_list
-
-            for chunk in chunk_list(list(pendientes_reporte), 20):
-                cls._procesar_lote_fuzzy_ia(
-                    reporte, chunk, pendientes_local, boletos_asignados, resumen
-                )
-
-        # 4. Detectar Huérfanos finales (Reporte sin Local)
-        huerfanos_reporte = lineas_reporte.exclude(id_linea__in=lineas_procesadas)
-        for hr in huerfanos_reporte:
-            if not hr.conciliacion:  # Si no se creó en el paso fuzzy
-                ConciliacionBoleto.objects.create(
-                    reporte=reporte,
-                    linea_reporte=hr,
-                    estado=ConciliacionBoleto.EstadosCruce.NO_EN_LOCAL,
-                    diferencia_total=hr.total_cobrado,
-                )
-                resumen["huerfanos_reporte"] += 1
-
-        # 5. Detectar Huérfanos locales (Local sin Reporte - Facturación pendiente)
-        for vl in ventas_locales:
-            if vl["id_boleto"] not in boletos_asignados:
-                ConciliacionBoleto.objects.create(
-                    reporte=reporte,
-                    boleto_local_id=vl["id_boleto"],
-                    estado=ConciliacionBoleto.EstadosCruce.NO_EN_REPORTE,
-                    diferencia_total=-Decimal(str(vl["total_boleto"] or 0)),
-                )
-                resumen["huerfanos_local"] += 1
-
-        return resumen
+        return query_local
 
     @classmethod
-    def _crear_conciliacion(cls, reporte, linea, match_data, resumen):
-        """Crea el registro de conciliación y calcula discrepancias"""
-        total_local = Decimal(str(match_data["total_boleto"] or 0))
-        dif_total = linea.total_cobrado - total_local
+    def _crear_conciliacion(cls, reporte, linea: Registro, boleto: Registro, resumen):
+        """Arma (sin guardar) la conciliación de un par y calcula discrepancias"""
+        dif_total = linea.total - boleto.total
 
         estado = ConciliacionBoleto.EstadosCruce.OK
         if abs(dif_total) > Decimal("0.05"):
@@ -379,25 +455,82 @@ class SmartReconciliationService:
         else:
             resumen["cuadrados_ok"] += 1
 
-        conciliacion = ConciliacionBoleto.objects.create(
+        return ConciliacionBoleto(
+            agencia_id=reporte.agencia_id,
             reporte=reporte,
-            linea_reporte=linea,
-            boleto_local_id=match_data["id_boleto"],
+            linea_reporte_id=linea.id,
+            boleto_local_id=boleto.id,
             estado=estado,
-            diferencia_tarifa=linea.tarifa_base_cobrada
-            - Decimal(str(match_data["tarifa_base"] or 0)),
-            diferencia_impuestos=linea.impuestos_cobrados
-            - Decimal(str(match_data["impuestos_total_calculado"] or 0)),
+            diferencia_tarifa=linea.tarifa - boleto.tarifa,
+            diferencia_impuestos=linea.impuestos - boleto.impuestos,
             diferencia_total=dif_total,
         )
 
-        if estado == ConciliacionBoleto.EstadosCruce.DISCREPANCIA:
-            cls.proponer_asiento_ajuste(conciliacion)
+    @classmethod
+    def _guardar_conciliaciones(cls, pendientes: list[ConciliacionBoleto]) -> None:
+        """Inserta el lote con ``bulk_create`` y propone asientos para las discrepancias."""
+        if not pendientes:
+            return
+        ConciliacionBoleto.objects.bulk_create(pendientes)
+        for conciliacion in pendientes:
+            if conciliacion.estado == ConciliacionBoleto.EstadosCruce.DISCREPANCIA:
+                cls.proponer_asiento_ajuste(conciliacion)
+        pendientes.clear()
+
+    @classmethod
+    def _cruce_residuos_ia(
+        cls, reporte, residuos: list[Registro], matcher: ReconciliationMatcher, resumen
+    ) -> dict[int, ConciliacionBoleto]:
+        """Pasa por la IA los lotes de ``_lotes_ia``. Devuelve ``{id_linea: conciliación}``."""
+        conciliados: dict[int, ConciliacionBoleto] = {}
+        for chunk, candidatos in cls._lotes_ia(residuos, matcher):
+            if resumen["llamadas_ia"] == 0:
+                logger.info(f"🤖 Ejecutando Cruce Fuzzy IA para el reporte {reporte.pk}.")
+            resumen["llamadas_ia"] += 1
+            conciliados.update(
+                cls._procesar_lote_fuzzy_ia(reporte, chunk, candidatos, matcher, resumen)
+            )
+        return conciliados
+
+    @staticmethod
+    def _lotes_ia(residuos: list[Registro], matcher: ReconciliationMatcher):
+        """
+        Lotes ``(líneas, {id_boleto: boleto})`` para la IA. Solo entran las líneas
+        residuales con algún boleto libre plausible (``matcher.shortlist``), y cada lote
+        lleva la unión de sus listas cortas en vez de todos los boletos pendientes.
+        Es un generador: los boletos que asigna un lote ya no aparecen en los siguientes.
+        """
+        from apps.common.utils.lists import chunk_list
+
+        lote_ia = getattr(settings, "RECONCILIATION_AI_BATCH_SIZE", 20)
+        max_lineas = getattr(settings, "RECONCILIATION_AI_MAX_LINES", 1000)
+        por_linea = getattr(settings, "RECONCILIATION_AI_CANDIDATES_PER_LINE", 10)
+
+        enviables = [linea for linea in residuos if matcher.plausible(linea)]
+        if len(enviables) > max_lineas:
+            logger.warning(
+                f"{len(enviables)} líneas residuales; solo las primeras {max_lineas} "
+                "pasan por IA (RECONCILIATION_AI_MAX_LINES)"
+            )
+            enviables = enviables[:max_lineas]
+
+        for chunk in chunk_list(enviables, lote_ia):
+            candidatos: dict[int, Registro] = {}
+            for linea in chunk:
+                for boleto in matcher.shortlist(linea, por_linea):
+                    candidatos.setdefault(boleto.id, boleto)
+            if candidatos:
+                yield chunk, candidatos
 
     @classmethod
     def _procesar_lote_fuzzy_ia(
-        cls, reporte, chunk_lineas, pendientes_local, boletos_asignados, resumen
-    ):
+        cls,
+        reporte,
+        chunk_lineas: list[Registro],
+        candidatos: dict[int, Registro],
+        matcher: ReconciliationMatcher,
+        resumen,
+    ) -> dict[int, ConciliacionBoleto]:
         """Usa Gemini para encontrar matches semánticos en un lote de registros"""
         from django.utils.module_loading import import_string
 
@@ -410,28 +543,30 @@ class SmartReconciliationService:
         # Preparar data compacta
         prov_data = [
             {
-                "id": item.id_linea,
-                "tkt": item.numero_boleto_reportado,
-                "psg": item.raw_data.get("pasajero", "") if item.raw_data else "",
-                "amt": float(item.total_cobrado),
+                "id": linea.id,
+                "tkt": linea.numero,
+                "psg": linea.pasajero,
+                "amt": float(linea.total),
             }
-            for item in chunk_lineas
+            for linea in chunk_lineas
         ]
 
         local_data = [
             {
-                "id": v["id_boleto"],
-                "tkt": v["numero_boleto"],
-                "psg": v["pasajero_nombre_completo"],
-                "amt": float(v["total_boleto"] or 0),
+                "id": boleto.id,
+                "tkt": boleto.numero,
+                "psg": boleto.pasajero,
+                "amt": float(boleto.total),
             }
-            for v in pendientes_local
+            for boleto in candidatos.values()
         ]
 
         prompt = (
             f"LISTA_PROVEEDOR:\n{json.dumps(prov_data)}\n\nLISTA_AGENCIA:\n{json.dumps(local_data)}"
         )
 
+        lineas_por_id = {linea.id: linea for linea in chunk_lineas}
+        conciliados: dict[int, ConciliacionBoleto] = {}
         try:
             resultado = ai_engine.call_gemini(
                 prompt=prompt,
@@ -447,25 +582,28 @@ class SmartReconciliationService:
                 if not linea_id or not venta_id:
                     continue
 
-                linea_obj = next(
-                    (item for item in chunk_lineas if item.id_linea == int(linea_id)), None
-                )
-                venta = next((v for v in pendientes_local if v["id_boleto"] == int(venta_id)), None)
-
-                if linea_obj and venta and venta["id_boleto"] not in boletos_asignados:
-                    cls._crear_conciliacion(reporte, linea_obj, venta, resumen)
-                    boletos_asignados.add(venta["id_boleto"])
-                    # Marcar razonamiento IA
-                    c = ConciliacionBoleto.objects.filter(
-                        reporte=reporte, linea_reporte=linea_obj
-                    ).last()
-                    if c:
-                        c.ia_razonamiento = match.get("comentario")
-                        c.save(update_fields=["ia_razonamiento"])
+                linea = lineas_por_id.get(int(linea_id))
+                boleto = candidatos.get(int(venta_id))
+                if (
+                    linea is None
+                    or boleto is None
+                    or linea.id in conciliados
+                    or matcher.asignado(boleto.id)
+                ):
+                    continue
+
+                conciliacion = cls._crear_conciliacion(reporte, linea, boleto, resumen)
+                # Marcar razonamiento IA
+                conciliacion.ia_razonamiento = match.get("comentario")
+                conciliados[linea.id] = conciliacion
+                matcher.asignar(boleto.id)
+                resumen["match_ia"] += 1
 
         except Exception as e:
             logger.error(f"Error en lote fuzzy IA: {e}")
 
+        return conciliados
+
     @classmethod
     def _get_cuenta_contable(
         cls, agencia, config_key: str, fallback_codigo: str, tipo_cuenta_fallback: str
@@ -273,3 +273,33 @@ def create_invoice_from_sale_task(venta_id):
     except Exception as e:
         logger.error(f" Error creando factura para Venta {venta_id}: {e}")
         raise
+
+
+@tenant_task(
+    name="apps.finance.tasks.recalcular_ventas_masivo_task",
+    queue="celery",
+    time_limit=3600,
+    soft_time_limit=3540,
+    acks_late=True,
+)
+def recalcular_ventas_masivo_task(
+    venta_ids=None, desde=None, hasta=None, chunk_size=None, **kwargs
+):
+    """
+    Re-totaliza las ventas de la agencia en contexto (todas, ``venta_ids`` o las de
+    ``fecha_venta`` entre ``desde`` y ``hasta``, en ISO) con el motor masivo.
+    """
+    from apps.bookings.models.venta import Venta
+    from apps.finance.services.finance_service import FinanceService
+
+    queryset = Venta.objects.all()
+    if venta_ids:
+        queryset = queryset.filter(pk__in=venta_ids)
+    if desde:
+        queryset = queryset.filter(fecha_venta__date__gte=desde)
+    if hasta:
+        queryset = queryset.filter(fecha_venta__date__lte=hasta)
+
+    stats = FinanceService.bulk_recalculate_sale_finances(queryset, chunk_size=chunk_size)
+    logger.info(f" Recálculo masivo de ventas completado: {stats}")
+    return stats
@@ -9,6 +9,7 @@ from django.db.models import Count, Sum
 from django.utils import timezone
 
 from apps.finance.models_stubs import ComisionVenta, LiquidacionAgente
+from apps.reports.services.kpi_rollup import KpiRollupService
 
 logger = logging.getLogger(__name__)
 
@@ -89,6 +90,10 @@ def generar_liquidaciones_mensuales_task(anio=None, mes=None, agencia_id=None):
                             liquidacion.cantidad_ventas += num_ventas
                             liquidacion.save()
 
+                        # update() no dispara señales: marcar los días para los rollups KPI.
+                        for fecha in comisiones_qs.values_list("fecha_calculo", flat=True):
+                            KpiRollupService.mark(agencia.pk, fecha)
+
                         comisiones_qs.update(
                             estado=ComisionVenta.EstadoComision.LIQUIDADO,
                             fecha_liquidacion=timezone.now(),
@@ -2,7 +2,7 @@ from django.contrib import admin
 
 from core.api import SaaSAdminMixin
 
-from .models import KpiSnapshot, ReporteKPI, ReporteProgramado
+from .models import KpiDiario, KpiSnapshot, ReporteKPI, ReporteProgramado
 
 
 @admin.register(ReporteKPI)
@@ -22,6 +22,15 @@ class KpiSnapshotAdmin(SaaSAdminMixin, admin.ModelAdmin):
     date_hierarchy = "fecha"
 
 
+@admin.register(KpiDiario)
+class KpiDiarioAdmin(SaaSAdminMixin, admin.ModelAdmin):
+    """KpiDiarioAdmin."""
+
+    list_display = ["fecha", "agencia", "ventas_cantidad", "ventas_total", "boletos_cantidad"]
+    list_filter = ["fecha"]
+    date_hierarchy = "fecha"
+
+
 @admin.register(ReporteProgramado)
 class ReporteProgramadoAdmin(SaaSAdminMixin, admin.ModelAdmin):
     """ReporteProgramadoAdmin."""
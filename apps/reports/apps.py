@@ -7,3 +7,7 @@ class ReportsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.reports"
     verbose_name = "Reportes KPI"
+
+    def ready(self):
+        """ready."""
+        import apps.reports.signals  # noqa: F401
@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.reports.services.kpi_rollup import KpiRollupService
+from core.models import Agencia
+
+
+class Command(BaseCommand):
+    """Command."""
+
+    help = (
+        "Reconstruye los rollups KPI diarios (KpiDiario / KpiDiarioAerolinea) desde las "
+        "tablas fuente. Sin fechas, reconstruye todo el historial de cada agencia."
+    )
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument(
+            "--agencia", type=int, action="append", help="ID de agencia (repetible)."
+        )
+        parser.add_argument("--desde", type=date.fromisoformat, help="Fecha inicial (AAAA-MM-DD).")
+        parser.add_argument("--hasta", type=date.fromisoformat, help="Fecha final (AAAA-MM-DD).")
+
+    def handle(self, *args, **options):
+        """handle."""
+        agencias = Agencia.objects.filter(activa=True).order_by("pk")
+        if options["agencia"]:
+            agencias = agencias.filter(pk__in=options["agencia"])
+        if not agencias.exists():
+            raise CommandError("No hay agencias activas que coincidan.")
+
+        for agencia in agencias:
+            dias = KpiRollupService.rebuild_all(agencia.pk, options["desde"], options["hasta"])
+            self.stdout.write(f"{agencia.nombre}: {dias} días con actividad")
+
+        self.stdout.write(self.style.SUCCESS("Rollups KPI reconstruidos."))
@@ -0,0 +1,89 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0056_agenciasetupprogress"),
+        ("reports", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KpiDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("fecha", models.DateField()),
+                ("ventas_cantidad", models.PositiveIntegerField(default=0)),
+                (
+                    "ventas_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("fees_total", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ("comisiones_pendientes_cantidad", models.PositiveIntegerField(default=0)),
+                (
+                    "comisiones_pendientes_monto",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("comisiones_liquidadas_cantidad", models.PositiveIntegerField(default=0)),
+                (
+                    "comisiones_liquidadas_monto",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("boletos_cantidad", models.PositiveIntegerField(default=0)),
+                ("clientes_nuevos", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "agencia",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="%(class)s_items",
+                        to="core.agencia",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "KPI Diario",
+                "verbose_name_plural": "KPIs Diarios",
+                "ordering": ["-fecha"],
+                "unique_together": {("agencia", "fecha")},
+            },
+        ),
+        migrations.CreateModel(
+            name="KpiDiarioAerolinea",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("fecha", models.DateField()),
+                ("aerolinea", models.CharField(blank=True, default="", max_length=200)),
+                ("boletos", models.PositiveIntegerField(default=0)),
+                (
+                    "agencia",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="%(class)s_items",
+                        to="core.agencia",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "KPI Diario por Aerolínea",
+                "verbose_name_plural": "KPIs Diarios por Aerolínea",
+                "ordering": ["-fecha"],
+                "unique_together": {("agencia", "fecha", "aerolinea")},
+            },
+        ),
+    ]
@@ -104,3 +104,53 @@ class ReporteProgramado(AgenciaMixin):
     def __str__(self):
         """__str__."""
         return f"{self.nombre} ({self.get_frecuencia_display()})"
+
+
+class KpiDiario(AgenciaMixin):
+    """
+    Agregados diarios por agencia (rollup) que alimentan ``KPIMetrics``.
+
+    Los mantiene ``KpiRollupService``: cada alta/cambio/baja de ventas, fees,
+    comisiones, boletos o clientes recalcula su día al confirmar la transacción,
+    y una pasada nocturna repara los últimos días.
+    """
+
+    fecha = models.DateField()
+    ventas_cantidad = models.PositiveIntegerField(default=0)
+    ventas_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fees_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    comisiones_pendientes_cantidad = models.PositiveIntegerField(default=0)
+    comisiones_pendientes_monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    comisiones_liquidadas_cantidad = models.PositiveIntegerField(default=0)
+    comisiones_liquidadas_monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    boletos_cantidad = models.PositiveIntegerField(default=0)
+    clientes_nuevos = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("KPI Diario")
+        verbose_name_plural = _("KPIs Diarios")
+        unique_together = [("agencia", "fecha")]
+        ordering = ["-fecha"]
+
+    def __str__(self):
+        """__str__."""
+        return f"KPI {self.fecha}: {self.ventas_cantidad} ventas"
+
+
+class KpiDiarioAerolinea(AgenciaMixin):
+    """Boletos importados por aerolínea y día (rollup)."""
+
+    fecha = models.DateField()
+    aerolinea = models.CharField(max_length=200, blank=True, default="")
+    boletos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("KPI Diario por Aerolínea")
+        verbose_name_plural = _("KPIs Diarios por Aerolínea")
+        unique_together = [("agencia", "fecha", "aerolinea")]
+        ordering = ["-fecha"]
+
+    def __str__(self):
+        """__str__."""
+        return f"{self.aerolinea or 'Sin aerolínea'} {self.fecha}: {self.boletos}"
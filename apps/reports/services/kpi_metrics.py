@@ -1,5 +1,4 @@
 import logging
-from collections import defaultdict
 from datetime import date, timedelta
 
 from dateutil.relativedelta import relativedelta
@@ -16,42 +15,54 @@ def _get_model(model_path):
 
 
 class KPIMetrics:
-    """Cálculo centralizado de todas las métricas KPI."""
+    """
+    Cálculo centralizado de todas las métricas KPI.
+
+    Las métricas de volumen se leen de los rollups diarios (``KpiDiario``,
+    ``KpiDiarioAerolinea``) que mantiene ``KpiRollupService``: el costo depende
+    de los días consultados, no de la cantidad de ventas o boletos.
+    """
 
     def __init__(self, agencia, hoy=None):
         """__init__."""
         self.agencia = agencia
         self.hoy = hoy or date.today()
 
+    def _diarios(self, desde=None):
+        KpiDiario = _get_model("reports.KpiDiario")
+        qs = KpiDiario.all_objects.filter(agencia=self.agencia)
+        if desde is not None:
+            qs = qs.filter(fecha__gte=desde)
+        return qs
+
+    def _sumar(self, *campos, desde=None):
+        """Suma de cada campo del rollup (0 si no hay filas), en una sola consulta."""
+        totales = self._diarios(desde).aggregate(**{campo: Sum(campo) for campo in campos})
+        return [totales[campo] or 0 for campo in campos]
+
     # ── Ventas ──────────────────────────────────────────
 
     def ventas_totales(self):
         """ventas_totales."""
-        Venta = _get_model("bookings.Venta")
-        return Venta.objects.filter(agencia=self.agencia).count()
+        return self._sumar("ventas_cantidad")[0]
 
     def ventas_diarias(self, dias=30):
         """ventas_diarias."""
-        Venta = _get_model("bookings.Venta")
-        desde = self.hoy - timedelta(days=dias)
-        return Venta.objects.filter(agencia=self.agencia, fecha_venta__date__gte=desde).count()
+        return self._sumar("ventas_cantidad", desde=self.hoy - timedelta(days=dias))[0]
 
     def ventas_mensuales(self):
         """ventas_mensuales."""
-        Venta = _get_model("bookings.Venta")
-        desde = self.hoy - relativedelta(months=1)
-        return Venta.objects.filter(agencia=self.agencia, fecha_venta__date__gte=desde).count()
+        return self._sumar("ventas_cantidad", desde=self.hoy - relativedelta(months=1))[0]
 
     def ventas_por_dia(self, dias=30):
         """ventas_por_dia."""
-        Venta = _get_model("bookings.Venta")
-        desde = self.hoy - timedelta(days=dias)
-        qs = Venta.objects.filter(agencia=self.agencia, fecha_venta__date__gte=desde)
-        counts = defaultdict(int)
-        for v in qs.iterator():
-            d = v.fecha_venta.date() if hasattr(v.fecha_venta, "date") else v.fecha_venta
-            counts[d.isoformat()] += 1
-        return dict(sorted(counts.items()))
+        filas = (
+            self._diarios(desde=self.hoy - timedelta(days=dias))
+            .filter(ventas_cantidad__gt=0)
+            .order_by("fecha")
+            .values_list("fecha", "ventas_cantidad")
+        )
+        return {fecha.isoformat(): cantidad for fecha, cantidad in filas}
 
     def ventas_por_vendedor(self):
         """ventas_por_vendedor."""
@@ -59,32 +70,22 @@ class KPIMetrics:
         qs = (
             Venta.objects.filter(agencia=self.agencia)
             .values("creado_por__email")
-            .annotate(total=Count("id"), monto=Sum("total_venta"))
+            .annotate(total=Count("pk"), monto=Sum("total_venta"))
         )
         return list(qs)
 
     def ticket_promedio(self):
         """ticket_promedio."""
-        Venta = _get_model("bookings.Venta")
-        qs = Venta.objects.filter(agencia=self.agencia)
-        total = qs.count()
+        total, suma = self._sumar("ventas_cantidad", "ventas_total")
         if total == 0:
             return 0
-        suma = sum(v.total_venta or 0 for v in qs.iterator())
         return suma / total
 
     # ── Rentabilidad ────────────────────────────────────
 
     def margen_bruto(self):
         """margen_bruto."""
-        Venta = _get_model("bookings.Venta")
-        FeeVenta = _get_model("bookings.FeeVenta")
-        total_ingresos = sum(
-            v.total_venta or 0 for v in Venta.objects.filter(agencia=self.agencia).iterator()
-        )
-        total_costos = sum(
-            f.monto or 0 for f in FeeVenta.objects.filter(agencia=self.agencia).iterator()
-        )
+        total_ingresos, total_costos = self._sumar("ventas_total", "fees_total")
         if total_ingresos == 0:
             return 0, 0
         utilidad = total_ingresos - total_costos
@@ -95,32 +96,27 @@ class KPIMetrics:
 
     def boletos_importados(self, dias=30):
         """boletos_importados."""
-        Boleto = _get_model("bookings.BoletoImportado")
-        desde = self.hoy - timedelta(days=dias)
-        return Boleto.objects.filter(agencia=self.agencia, created_at__date__gte=desde).count()
+        return self._sumar("boletos_cantidad", desde=self.hoy - timedelta(days=dias))[0]
 
     def boletos_por_aerolinea(self):
         """boletos_por_aerolinea."""
-        Boleto = _get_model("bookings.BoletoImportado")
+        KpiDiarioAerolinea = _get_model("reports.KpiDiarioAerolinea")
         qs = (
-            Boleto.objects.filter(agencia=self.agencia)
-            .values("aerolinea__nombre")
-            .annotate(total=Count("id"))
+            KpiDiarioAerolinea.all_objects.filter(agencia=self.agencia)
+            .values("aerolinea")
+            .annotate(total=Sum("boletos"))
         )
-        return {r["aerolinea__nombre"] or "Sin aerolínea": r["total"] for r in qs}
+        return {r["aerolinea"] or "Sin aerolínea": r["total"] for r in qs}
 
     # ── Clientes ─────────────────────────────────────────
 
     def clientes_nuevos(self, dias=30):
         """clientes_nuevos."""
-        Cliente = _get_model("crm.Cliente")
-        desde = self.hoy - timedelta(days=dias)
-        return Cliente.objects.filter(agencia=self.agencia, created_at__date__gte=desde).count()
+        return self._sumar("clientes_nuevos", desde=self.hoy - timedelta(days=dias))[0]
 
     def clientes_totales(self):
         """clientes_totales."""
-        Cliente = _get_model("crm.Cliente")
-        return Cliente.objects.filter(agencia=self.agencia).count()
+        return self._sumar("clientes_nuevos")[0]
 
     def clientes_por_vendedor(self):
         """clientes_por_vendedor."""
@@ -136,26 +132,36 @@ class KPIMetrics:
 
     def comisiones_pendientes(self):
         """comisiones_pendientes."""
-        Comision = _get_model("finance.ComisionVenta")
-        qs = Comision.objects.filter(agencia=self.agencia, estado="PEN")
-        return qs.count(), sum(c.monto_comision or 0 for c in qs.iterator())
+        return tuple(self._sumar("comisiones_pendientes_cantidad", "comisiones_pendientes_monto"))
 
     def comisiones_liquidadas(self):
         """comisiones_liquidadas."""
-        Comision = _get_model("finance.ComisionVenta")
-        qs = Comision.objects.filter(agencia=self.agencia, estado="LIQ")
-        return qs.count(), sum(c.monto_comision or 0 for c in qs.iterator())
+        return tuple(self._sumar("comisiones_liquidadas_cantidad", "comisiones_liquidadas_monto"))
 
     # ── Panorama general ─────────────────────────────────
 
     def resumen(self):
         """resumen."""
-        Venta = _get_model("bookings.Venta")
-        ventas_qs = Venta.objects.filter(agencia=self.agencia)
-        total_ventas = ventas_qs.count()
-        monto_total = ventas_qs.aggregate(total=Sum("total_venta"))["total"] or 0
+        (
+            total_ventas,
+            monto_total,
+            fees_total,
+            clientes,
+            boletos,
+            comisiones_pendientes,
+            comisiones_liquidadas,
+        ) = self._sumar(
+            "ventas_cantidad",
+            "ventas_total",
+            "fees_total",
+            "clientes_nuevos",
+            "boletos_cantidad",
+            "comisiones_pendientes_cantidad",
+            "comisiones_liquidadas_cantidad",
+        )
         ticket_prom = monto_total / total_ventas if total_ventas else 0
-        utilidad, margen = self.margen_bruto()
+        utilidad = monto_total - fees_total if monto_total else 0
+        margen = (utilidad / monto_total) * 100 if monto_total else 0
 
         return {
             "total_ventas": total_ventas,
@@ -163,8 +169,8 @@ class KPIMetrics:
             "ticket_promedio": ticket_prom,
             "utilidad": utilidad,
             "margen_bruto": margen,
-            "clientes": self.clientes_totales(),
-            "boletos": self.boletos_importados(dias=9999),
-            "comisiones_pendientes": self.comisiones_pendientes()[0],
-            "comisiones_liquidadas": self.comisiones_liquidadas()[0],
+            "clientes": clientes,
+            "boletos": boletos,
+            "comisiones_pendientes": comisiones_pendientes,
+            "comisiones_liquidadas": comisiones_liquidadas,
         }
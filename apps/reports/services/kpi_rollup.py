@@ -0,0 +1,349 @@
+"""
+Rollups diarios de KPIs por agencia (``KpiDiario`` / ``KpiDiarioAerolinea``).
+
+Las señales de ventas, fees, comisiones, boletos y clientes marcan el día
+afectado (``mark`` / ``mark_venta``). Las marcas de una transacción se agrupan en
+un lote con un único ``on_commit`` que recalcula esos días desde las tablas
+fuente con consultas agregadas (``rebuild``). Recalcular el día completo, en vez
+de sumar deltas, hace el mantenimiento idempotente: una señal repetida o perdida
+no descuadra el rollup, y la pasada nocturna (``repair_recent``) corrige lo que
+se escribió sin señales (``update()``, ``bulk_update``).
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Count, Min, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+CAMPOS_DIARIOS = (
+    "ventas_cantidad",
+    "ventas_total",
+    "fees_total",
+    "comisiones_pendientes_cantidad",
+    "comisiones_pendientes_monto",
+    "comisiones_liquidadas_cantidad",
+    "comisiones_liquidadas_monto",
+    "boletos_cantidad",
+    "clientes_nuevos",
+)
+
+# Días seguidos de una agencia que se recalculan con un solo rango.
+_MAX_RANGO_LOTE = 31
+
+
+def _get_model(model_path):
+    """_get_model."""
+    from django.apps import apps
+
+    return apps.get_model(model_path)
+
+
+def fecha_local(valor) -> date | None:
+    """Fecha (día local) de un ``datetime`` o ``date``."""
+    if isinstance(valor, datetime):
+        return timezone.localdate(valor) if timezone.is_aware(valor) else valor.date()
+    return valor
+
+
+class _Lote:
+    """Días pendientes de una transacción."""
+
+    def __init__(self):
+        """__init__."""
+        self.dias: set[tuple[int, date]] = set()
+        self.ventas: set[int] = set()
+        self.flushed = False
+        self.callback = None
+
+
+class KpiRollupService:
+    """Mantiene y reconstruye los rollups diarios de KPIs."""
+
+    @classmethod
+    def mark(cls, agencia_id, fecha) -> None:
+        """Marca el día ``fecha`` de la agencia para recálculo al confirmar."""
+        fecha = fecha_local(fecha)
+        if agencia_id and fecha and cls.enabled():
+            cls._lote_actual(lambda lote: lote.dias.add((agencia_id, fecha)))
+
+    @classmethod
+    def mark_venta(cls, venta_id) -> None:
+        """Marca el día de la venta (resuelto al confirmar, en una sola consulta)."""
+        if venta_id and cls.enabled():
+            cls._lote_actual(lambda lote: lote.ventas.add(venta_id))
+
+    @staticmethod
+    def enabled() -> bool:
+        """enabled."""
+        return getattr(settings, "KPI_ROLLUP_ENABLED", True)
+
+    @classmethod
+    def rebuild(cls, agencia_id: int, desde: date, hasta: date) -> int:
+        """
+        Recalcula los rollups de ``agencia_id`` entre ``desde`` y ``hasta`` (inclusive)
+        con una consulta agrupada por día por cada fuente. Los días sin actividad
+        no guardan fila. Retorna la cantidad de días con datos.
+        """
+        tz = timezone.get_current_timezone()
+        inicio = timezone.make_aware(datetime.combine(desde, time.min), tz)
+        fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min), tz)
+
+        Venta = _get_model("bookings.Venta")
+        FeeVenta = _get_model("bookings.FeeVenta")
+        BoletoImportado = _get_model("bookings.BoletoImportado")
+        Cliente = _get_model("crm.Cliente")
+
+        dias = defaultdict(lambda: dict.fromkeys(CAMPOS_DIARIOS, 0))
+        por_aerolinea = []
+
+        ventas = (
+            Venta.all_objects.filter(
+                agencia_id=agencia_id,
+                is_deleted=False,
+                fecha_venta__gte=inicio,
+                fecha_venta__lt=fin,
+            )
+            .annotate(dia=TruncDate("fecha_venta", tzinfo=tz))
+            .values("dia")
+            .annotate(cantidad=Count("pk"), total=Sum("total_venta"))
+        )
+        for fila in ventas:
+            dias[fila["dia"]]["ventas_cantidad"] = fila["cantidad"]
+            dias[fila["dia"]]["ventas_total"] = fila["total"] or Decimal("0")
+
+        fees = (
+            FeeVenta.all_objects.filter(
+                agencia_id=agencia_id,
+                is_deleted=False,
+                venta__is_deleted=False,
+                venta__fecha_venta__gte=inicio,
+                venta__fecha_venta__lt=fin,
+            )
+            .annotate(dia=TruncDate("venta__fecha_venta", tzinfo=tz))
+            .values("dia")
+            .annotate(total=Sum("monto"))
+        )
+        for fila in fees:
+            dias[fila["dia"]]["fees_total"] = fila["total"] or Decimal("0")
+
+        for fila in cls._comisiones(agencia_id, inicio, fin, tz):
+            estado = {"PEN": "pendientes", "LIQ": "liquidadas"}.get(fila["estado"])
+            if estado:
+                dias[fila["dia"]][f"comisiones_{estado}_cantidad"] = fila["cantidad"]
+                dias[fila["dia"]][f"comisiones_{estado}_monto"] = fila["total"] or Decimal("0")
+
+        boletos = (
+            BoletoImportado.all_objects.filter(
+                agencia_id=agencia_id,
+                is_deleted=False,
+                fecha_subida__gte=inicio,
+                fecha_subida__lt=fin,
+            )
+            # NULL y "" son la misma clave del rollup: se agrupan juntos en la consulta.
+            .annotate(
+                dia=TruncDate("fecha_subida", tzinfo=tz),
+                aerolinea=Coalesce("aerolinea_emisora", Value("")),
+            )
+            .values("dia", "aerolinea")
+            .annotate(cantidad=Count("pk"))
+        )
+        for fila in boletos:
+            dias[fila["dia"]]["boletos_cantidad"] += fila["cantidad"]
+            por_aerolinea.append((fila["dia"], fila["aerolinea"], fila["cantidad"]))
+
+        clientes = (
+            Cliente.all_objects.filter(
+                agencia_id=agencia_id,
+                is_deleted=False,
+                fecha_registro__gte=inicio,
+                fecha_registro__lt=fin,
+            )
+            .annotate(dia=TruncDate("fecha_registro", tzinfo=tz))
+            .values("dia")
+            .annotate(cantidad=Count("pk"))
+        )
+        for fila in clientes:
+            dias[fila["dia"]]["clientes_nuevos"] = fila["cantidad"]
+
+        cls._guardar(agencia_id, desde, hasta, dias, por_aerolinea)
+        return len(dias)
+
+    @classmethod
+    def rebuild_all(
+        cls, agencia_id: int, desde: date | None = None, hasta: date | None = None
+    ) -> int:
+        """Reconstruye el historial completo (o el rango dado) en tramos de 90 días."""
+        hasta = hasta or timezone.localdate()
+        desde = desde or cls._primera_fecha(agencia_id) or hasta
+        escritos = 0
+        while desde <= hasta:
+            tramo_fin = min(desde + timedelta(days=89), hasta)
+            escritos += cls.rebuild(agencia_id, desde, tramo_fin)
+            desde = tramo_fin + timedelta(days=1)
+        return escritos
+
+    @classmethod
+    def repair_recent(cls, dias: int | None = None) -> int:
+        """Pasada nocturna: recalcula los últimos ``KPI_ROLLUP_REPAIR_DAYS`` días de cada agencia."""
+        from core.models import Agencia
+
+        dias = dias or getattr(settings, "KPI_ROLLUP_REPAIR_DAYS", 3)
+        hasta = timezone.localdate()
+        desde = hasta - timedelta(days=dias - 1)
+        reparadas = 0
+        for agencia_id in Agencia.objects.filter(activa=True).values_list("pk", flat=True):
+            try:
+                cls.rebuild(agencia_id, desde, hasta)
+                reparadas += 1
+            except Exception as e:
+                logger.error(
+                    f"Error reparando rollups KPI de agencia {agencia_id}: {e}", exc_info=True
+                )
+        return reparadas
+
+    # ── Internos ─────────────────────────────────────────
+
+    @staticmethod
+    def _comisiones(agencia_id, inicio, fin, tz):
+        """Comisiones por día y estado (``ComisionVenta`` es un stub sobre tabla legacy)."""
+        from apps.finance.models_stubs import ComisionVenta
+
+        try:
+            with transaction.atomic():
+                return list(
+                    ComisionVenta.all_objects.filter(
+                        agencia_id=agencia_id,
+                        is_deleted=False,
+                        fecha_calculo__gte=inicio,
+                        fecha_calculo__lt=fin,
+                    )
+                    .annotate(dia=TruncDate("fecha_calculo", tzinfo=tz))
+                    .values("dia", "estado")
+                    .annotate(cantidad=Count("pk"), total=Sum("monto_comision"))
+                )
+        except DatabaseError as e:
+            logger.warning(f"Rollup KPI sin comisiones (tabla no disponible): {e}")
+            return []
+
+    @staticmethod
+    def _guardar(agencia_id, desde, hasta, dias, por_aerolinea) -> None:
+        from apps.reports.models import KpiDiario, KpiDiarioAerolinea
+
+        filas = [
+            KpiDiario(agencia_id=agencia_id, fecha=dia, **valores)
+            for dia, valores in dias.items()
+            if any(valores.values())
+        ]
+        with transaction.atomic():
+            KpiDiario.all_objects.filter(
+                agencia_id=agencia_id, fecha__range=(desde, hasta)
+            ).exclude(fecha__in=[f.fecha for f in filas]).delete()
+            KpiDiario.all_objects.bulk_create(
+                filas,
+                update_conflicts=True,
+                unique_fields=["agencia", "fecha"],
+                update_fields=[*CAMPOS_DIARIOS, "updated_at"],
+            )
+            KpiDiarioAerolinea.all_objects.filter(
+                agencia_id=agencia_id, fecha__range=(desde, hasta)
+            ).delete()
+            KpiDiarioAerolinea.all_objects.bulk_create(
+                [
+                    KpiDiarioAerolinea(
+                        agencia_id=agencia_id,
+                        fecha=dia,
+                        aerolinea=aerolinea,
+                        boletos=cantidad,
+                    )
+                    for dia, aerolinea, cantidad in por_aerolinea
+                ]
+            )
+
+    @staticmethod
+    def _primera_fecha(agencia_id) -> date | None:
+        """Día más antiguo con actividad en cualquiera de las fuentes del rollup."""
+        from apps.finance.models_stubs import ComisionVenta
+
+        fuentes = (
+            (_get_model("bookings.Venta"), "fecha_venta"),
+            (_get_model("crm.Cliente"), "fecha_registro"),
+            (_get_model("bookings.BoletoImportado"), "fecha_subida"),
+            (ComisionVenta, "fecha_calculo"),
+        )
+        fechas = []
+        for modelo, campo in fuentes:
+            try:
+                with transaction.atomic():
+                    fechas.append(
+                        modelo.all_objects.filter(agencia_id=agencia_id).aggregate(
+                            primera=Min(campo)
+                        )["primera"]
+                    )
+            except DatabaseError as e:
+                logger.warning(f"Rollup KPI sin {modelo.__name__} (tabla no disponible): {e}")
+        return min((fecha_local(f) for f in fechas if f), default=None)
+
+    @classmethod
+    def _lote_actual(cls, agregar) -> None:
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            lote = _Lote()
+            agregar(lote)
+            cls._flush(lote)
+            return
+
+        lote = getattr(_local, "lote", None)
+        if lote is None or not cls._pending(connection, lote):
+            lote = _Lote()
+            lote.callback = partial(cls._flush, lote)
+            _local.lote = lote
+            transaction.on_commit(lote.callback)
+        agregar(lote)
+
+    @staticmethod
+    def _pending(connection, lote) -> bool:
+        """El ``on_commit`` del lote sigue registrado (no se ejecutó ni se revirtió)."""
+        return not lote.flushed and any(
+            entry[1] is lote.callback for entry in connection.run_on_commit
+        )
+
+    @classmethod
+    def _flush(cls, lote) -> None:
+        lote.flushed = True
+        if getattr(_local, "lote", None) is lote:
+            _local.lote = None
+
+        dias = set(lote.dias)
+        try:
+            if lote.ventas:
+                Venta = _get_model("bookings.Venta")
+                for agencia_id, fecha in Venta.all_objects.filter(pk__in=lote.ventas).values_list(
+                    "agencia_id", "fecha_venta"
+                ):
+                    if agencia_id and fecha:
+                        dias.add((agencia_id, fecha_local(fecha)))
+
+            por_agencia = defaultdict(set)
+            for agencia_id, fecha in dias:
+                por_agencia[agencia_id].add(fecha)
+            for agencia_id, fechas in por_agencia.items():
+                desde, hasta = min(fechas), max(fechas)
+                if (hasta - desde).days < _MAX_RANGO_LOTE:
+                    cls.rebuild(agencia_id, desde, hasta)
+                else:
+                    for fecha in sorted(fechas):
+                        cls.rebuild(agencia_id, fecha, fecha)
+        except Exception as e:
+            logger.error(f"Error actualizando rollups KPI {sorted(dias)}: {e}", exc_info=True)
@@ -0,0 +1,60 @@
+"""
+Mantenimiento incremental de los rollups KPI (``KpiRollupService``).
+Cada receptor sólo marca el día afectado; el recálculo corre al confirmar.
+"""
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from apps.finance.models_stubs import ComisionVenta
+from core.api import are_signals_blocked
+
+from .services.kpi_rollup import KpiRollupService
+
+
+@receiver(post_init, sender="bookings.Venta")
+def kpi_venta_post_init(sender, instance, **kwargs):
+    """Recuerda la fecha cargada para recalcular también el día anterior si cambia."""
+    # Sin forzar la carga de campos diferidos (.only()/.defer()).
+    if "fecha_venta" in instance.__dict__:
+        instance._kpi_fecha_original = instance.fecha_venta
+
+
+@receiver([post_save, post_delete], sender="bookings.Venta")
+def kpi_venta_changed(sender, instance, **kwargs):
+    """kpi_venta_changed."""
+    if are_signals_blocked():
+        return
+    KpiRollupService.mark(instance.agencia_id, instance.fecha_venta)
+    original = getattr(instance, "_kpi_fecha_original", None)
+    if original and original != instance.fecha_venta:
+        KpiRollupService.mark(instance.agencia_id, original)
+    instance._kpi_fecha_original = instance.fecha_venta
+
+
+@receiver([post_save, post_delete], sender="bookings.FeeVenta")
+def kpi_fee_changed(sender, instance, **kwargs):
+    """kpi_fee_changed."""
+    if not are_signals_blocked():
+        KpiRollupService.mark_venta(instance.venta_id)
+
+
+@receiver([post_save, post_delete], sender=ComisionVenta)
+def kpi_comision_changed(sender, instance, **kwargs):
+    """kpi_comision_changed."""
+    if not are_signals_blocked():
+        KpiRollupService.mark(instance.agencia_id, instance.fecha_calculo)
+
+
+@receiver([post_save, post_delete], sender="bookings.BoletoImportado")
+def kpi_boleto_changed(sender, instance, **kwargs):
+    """kpi_boleto_changed."""
+    if not are_signals_blocked():
+        KpiRollupService.mark(instance.agencia_id, instance.fecha_subida)
+
+
+@receiver([post_save, post_delete], sender="crm.Cliente")
+def kpi_cliente_changed(sender, instance, **kwargs):
+    """kpi_cliente_changed."""
+    if not are_signals_blocked():
+        KpiRollupService.mark(instance.agencia_id, instance.fecha_registro)
@@ -52,6 +52,21 @@ def enviar_reportes_programados_task(self):
     return reportes_enviados
 
 
+@shared_task(
+    queue="celery",
+    max_retries=1,
+    time_limit=1800,
+    soft_time_limit=1700,
+)
+def reparar_kpi_rollups_task(dias=None):
+    """Pasada nocturna: recalcula los rollups KPI de los últimos días de cada agencia."""
+    from .services.kpi_rollup import KpiRollupService
+
+    reparadas = KpiRollupService.repair_recent(dias)
+    logger.info("Rollups KPI reparados para %d agencias", reparadas)
+    return reparadas
+
+
 def _debe_enviarse(reporte, hoy):
     """_debe_enviarse."""
     if not reporte.ultimo_envio:
@@ -54,3 +54,32 @@ class CoreConfig(AppConfig):
             sender=UsuarioAgencia,
             dispatch_uid="usuario_agencia_cache_invalidation",
         )
+
+        from django.db.models.signals import post_delete
+
+        post_delete.connect(
+            _on_usuario_agencia_save,
+            sender=UsuarioAgencia,
+            dispatch_uid="usuario_agencia_cache_invalidation_delete",
+        )
+
+        from core.models import AgenciaConfiguracion
+        from core.services.tenant_host_cache import _on_tenant_change
+
+        for signal in (post_save, post_delete):
+            for model in (Agencia, AgenciaConfiguracion):
+                signal.connect(
+                    _on_tenant_change,
+                    sender=model,
+                    dispatch_uid=f"tenant_host_cache_{signal is post_save}_{model.__name__}",
+                )
+
+        from apps.automation.parsers.airline_utils import AirlineCodeResolver
+        from apps.common.models import Aerolinea
+
+        for signal in (post_save, post_delete):
+            signal.connect(
+                AirlineCodeResolver.invalidate,
+                sender=Aerolinea,
+                dispatch_uid=f"airline_code_index_{signal is post_save}",
+            )
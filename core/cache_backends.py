@@ -0,0 +1,57 @@
+"""
+Backends de caché que registran aciertos/fallos en el perfil de la petición.
+
+Se configuran en ``CACHES`` en lugar de los backends originales; fuera de una
+petición perfilada (Celery, comandos) solo añaden una lectura de ``ContextVar``.
+"""
+
+from django.core.cache.backends.locmem import LocMemCache as DjangoLocMemCache
+from django_redis.cache import RedisCache as DjangoRedisCache
+
+from core.request_profiling import record_cache
+
+_MISSING = object()
+
+
+class ProfiledCacheMixin:
+    """Cuenta cada ``get`` como acierto o fallo (ver ``record_cache``).
+
+    ``BaseCache.get_many`` y ``get_or_set`` pasan por ``get``, así que quedan
+    contados sin más en los backends que no los redefinen.
+    """
+
+    # ``None`` también cuenta como fallo (ver ``RedisCache``).
+    _none_is_miss = False
+
+    def get(self, key, default=None, version=None, **kwargs):
+        """get."""
+        value = super().get(key, _MISSING, version=version, **kwargs)
+        if value is _MISSING or (value is None and self._none_is_miss):
+            record_cache(0, 1)
+            return default if value is _MISSING else value
+        record_cache(1, 0)
+        return value
+
+
+class RedisCache(ProfiledCacheMixin, DjangoRedisCache):
+    """
+    django_redis con conteo de aciertos/fallos por petición.
+
+    Con ``IGNORE_EXCEPTIONS``, según la versión, ``@omit_exception`` devuelve ``None``
+    en lugar del ``default`` cuando Redis no responde: ``None`` cuenta como fallo para
+    que una caída no aparezca como aciertos (un ``None`` guardado también se cuenta así).
+    """
+
+    _none_is_miss = True
+
+    def get_many(self, keys, version=None, **kwargs):
+        """``get_many`` nativo (MGET): no pasa por ``get``."""
+        keys = list(keys)
+        found = super().get_many(keys, version=version, **kwargs)
+        hits = len(found or ())
+        record_cache(hits, len(keys) - hits)
+        return found
+
+
+class LocMemCache(ProfiledCacheMixin, DjangoLocMemCache):
+    """LocMemCache con conteo de aciertos/fallos por petición."""
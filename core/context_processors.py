@@ -2,7 +2,6 @@ import logging
 import secrets
 
 from django.core.cache import cache
-from django.db import transaction
 
 logger = logging.getLogger(__name__)
 
@@ -16,14 +15,9 @@ def agency_context(request):
     if hasattr(request, "user") and request.user.is_authenticated:
         agencia = getattr(request, "agencia", None)
 
-        from core.models.agencia import UsuarioAgencia
+        from core.security import get_user_agencies
 
-        vinculos = (
-            UsuarioAgencia.objects.filter(usuario=request.user, activo=True, agencia__activa=True)
-            .select_related("agencia")
-            .order_by("agencia__nombre")
-        )
-        user_agencies = list(vinculos)
+        user_agencies = get_user_agencies(request.user)
 
         vinculo = next((v for v in user_agencies if agencia and v.agencia_id == agencia.id), None)
         if vinculo:
@@ -35,44 +29,20 @@ def agency_context(request):
     tasa_eur = "N/D"
     tasa_p2p = "N/D"
     try:
-        with transaction.atomic():
-            from datetime import date
-
-            from apps.finance.models_stubs import TasaCambio
-
-            tasa_usd_obj = TasaCambio.objects.filter(moneda="USD").order_by("-fecha").first()
-            tasa_eur_obj = TasaCambio.objects.filter(moneda="EUR").order_by("-fecha").first()
-            tasa_p2p_obj = TasaCambio.objects.filter(moneda="P2P").order_by("-fecha").first()
-
-            es_obsoleta = False
-            hoy = date.today()
-            if not tasa_usd_obj or tasa_usd_obj.fecha < hoy:
-                es_obsoleta = True
-            elif not tasa_eur_obj or tasa_eur_obj.fecha < hoy:
-                es_obsoleta = True
-            elif not tasa_p2p_obj or tasa_p2p_obj.fecha < hoy:
-                es_obsoleta = True
-
-            if es_obsoleta and not cache.get("bcv_sync_lock"):
-                cache.set("bcv_sync_lock", True, timeout=1800)
-                try:
-                    from apps.contabilidad.tasks import sync_bcv_rates
-
-                    sync_bcv_rates.delay()
-                except Exception as e:
-                    logger.debug("Ignored exception syncing BCV rates: %s", e)
-
-            tasas = cache.get("tasa_bcv_context")
-            if tasas is None:
-                tasas = {
-                    "usd": f"{tasa_usd_obj.monto:,.2f}" if tasa_usd_obj else "N/D",
-                    "eur": f"{tasa_eur_obj.monto:,.2f}" if tasa_eur_obj else "N/D",
-                    "p2p": f"{tasa_p2p_obj.monto:,.2f}" if tasa_p2p_obj else "N/D",
-                }
-                cache.set("tasa_bcv_context", tasas, timeout=300)
-            tasa_usd = tasas["usd"]
-            tasa_eur = tasas["eur"]
-            tasa_p2p = tasas["p2p"]
+        from apps.finance.services.rate_snapshot import RateSnapshotService
+
+        tasas = RateSnapshotService.get()
+        if tasas["es_obsoleta"] and cache.add("bcv_sync_lock", True, timeout=1800):
+            try:
+                from apps.contabilidad.tasks import sync_bcv_rates
+
+                sync_bcv_rates.delay()
+            except Exception as e:
+                logger.debug("Ignored exception syncing BCV rates: %s", e)
+
+        tasa_usd = tasas["usd"]
+        tasa_eur = tasas["eur"]
+        tasa_p2p = tasas["p2p"]
     except Exception:
         tasa_usd = "N/D"
         tasa_eur = "N/D"
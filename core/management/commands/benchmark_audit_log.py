@@ -0,0 +1,87 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from apps.common.utils import verify_audit_chain
+from apps.crm.models import Cliente
+from core.middleware import agency_context
+from core.models import Agencia, AgenciaBranding, AgenciaConfiguracion
+from core.models.audit import AuditLog, cadena_para
+from core.signals_bypass import disable_signals
+
+MODOS = (
+    ("Sin auditoría", {"AUDIT_LOG_ENABLED": False}),
+    ("Un INSERT por evento", {"AUDIT_LOG_ENABLED": True, "AUDIT_LOG_ON_COMMIT": False}),
+    ("Lote al confirmar", {"AUDIT_LOG_ENABLED": True, "AUDIT_LOG_ON_COMMIT": True}),
+)
+
+
+class Command(BaseCommand):
+    """Mide el throughput de escritura con la auditoría por señales activada y desactivada."""
+
+    help = (
+        "Benchmark de AuditPipeline: crea y actualiza clientes en transacciones reales sin "
+        "auditoría, escribiendo cada evento al momento y encolándolos para un bulk_create "
+        "al confirmar. Los datos creados se eliminan al final."
+    )
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument("--transacciones", type=int, default=200)
+        parser.add_argument("--operaciones", type=int, default=10)
+
+    def handle(self, *args, **options):
+        """handle."""
+        transacciones, operaciones = options["transacciones"], options["operaciones"]
+        agencia = Agencia.objects.create(
+            nombre="Benchmark Auditoria", email_principal="benchmark-audit@example.com"
+        )
+        cadena = cadena_para(agencia.pk)
+        resultados = []
+        try:
+            with agency_context(agencia):
+                for nombre, ajustes in MODOS:
+                    antes = AuditLog.objects.filter(cadena=cadena).count()
+                    with override_settings(**ajustes):
+                        t0 = time.perf_counter()
+                        self._carga(transacciones, operaciones)
+                        segundos = time.perf_counter() - t0
+                    eventos = AuditLog.objects.filter(cadena=cadena).count() - antes
+                    resultados.append((nombre, segundos, eventos))
+            ok, break_id, reason = verify_audit_chain(cadena=cadena)
+        finally:
+            with disable_signals():
+                AuditLog.objects.filter(cadena=cadena).delete()
+                Cliente._base_manager.filter(agencia=agencia).delete()
+                AgenciaBranding.objects.filter(agencia=agencia).delete()
+                AgenciaConfiguracion.objects.filter(agencia=agencia).delete()
+                agencia.delete()
+
+        total = transacciones * operaciones * 2
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n{transacciones} transacciones x {operaciones} clientes (alta + modificación)"
+            )
+        )
+        base = resultados[0][1]
+        for nombre, segundos, eventos in resultados:
+            self.stdout.write(
+                f" - {nombre:<22} {segundos:.2f} s, {total / segundos:.0f} escrituras/s, "
+                f"{eventos} eventos, {segundos / base:.2f}x"
+            )
+        if ok:
+            self.stdout.write(self.style.SUCCESS(f" - Cadena {cadena} verificada."))
+        else:
+            self.stdout.write(self.style.ERROR(f" - Cadena {cadena} rota en {break_id}: {reason}"))
+
+    @staticmethod
+    def _carga(transacciones, operaciones):
+        """Cada transacción crea ``operaciones`` clientes y modifica cada uno una vez."""
+        for t in range(transacciones):
+            with transaction.atomic():
+                for i in range(operaciones):
+                    cliente = Cliente.objects.create(nombres=f"Bench {t}-{i}")
+                    cliente.email = f"bench{t}-{i}@example.com"
+                    cliente.save()
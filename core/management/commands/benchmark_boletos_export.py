@@ -0,0 +1,131 @@
+import datetime
+import io
+import time
+import tracemalloc
+from decimal import Decimal
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.bookings.models import BoletoImportado
+from apps.common.services.analytics_service import AnalyticsService
+from core.middleware import agency_context
+from core.models import Agencia
+
+
+class Command(BaseCommand):
+    """Mide tiempo y pico de memoria de la exportación de boletos."""
+
+    help = (
+        "Benchmark de exportación del reporte de boletos: lista de dicts + pandas "
+        "(implementación anterior) vs openpyxl write_only y CSV en streaming. Crea "
+        "boletos sintéticos dentro de una transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--boletos", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            agencia = Agencia.objects.create(
+                nombre="Benchmark Export", email_principal="benchmark@example.com"
+            )
+            with agency_context(agencia):
+                self._crear_boletos(agencia, options["boletos"])
+                resultados = [
+                    ("Pandas (anterior)", *self._medir(lambda: self._exportar_legado(agencia))),
+                    (
+                        "XLSX write_only",
+                        *self._medir(
+                            lambda: AnalyticsService.exportar_reporte_boletos_excel(agencia)
+                        ),
+                    ),
+                    (
+                        "CSV streaming",
+                        *self._medir(
+                            lambda: sum(
+                                len(linea)
+                                for linea in AnalyticsService.exportar_reporte_boletos_csv(agencia)
+                            )
+                        ),
+                    ),
+                ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(f"\nExportación de {options['boletos']} boletos"))
+        for nombre, segundos, pico in resultados:
+            self.stdout.write(
+                f" - {nombre:<18} {segundos:6.2f} s   pico {pico / 1024 / 1024:7.1f} MiB"
+            )
+
+    @staticmethod
+    def _medir(funcion):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - t0
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if hasattr(resultado, "close"):
+            resultado.close()
+        return segundos, pico
+
+    @staticmethod
+    def _crear_boletos(agencia, total):
+        hoy = datetime.date.today()
+        aerolineas = ["AVIOR AIRLINES", "LASER", "ESTELAR", "CONVIASA", None]
+        lote = []
+        for i in range(total):
+            lote.append(
+                BoletoImportado(
+                    agencia=agencia,
+                    numero_boleto=f"742{i:010d}",
+                    localizador_pnr=f"PNR{i % 100000:05d}",
+                    nombre_pasajero_completo=f"PASAJERO/NUMERO {i}",
+                    fecha_emision_boleto=hoy - datetime.timedelta(days=i % 365),
+                    aerolinea_emisora=aerolineas[i % len(aerolineas)],
+                    tarifa_base=Decimal("100.00") + i % 50,
+                    comision_agencia=Decimal("5.00"),
+                    total_boleto=Decimal("130.50") + i % 50,
+                    estado_parseo=BoletoImportado.EstadoParseo.COMPLETADO,
+                )
+            )
+            if len(lote) == 2000:
+                BoletoImportado.all_objects.bulk_create(lote)
+                lote = []
+        BoletoImportado.all_objects.bulk_create(lote)
+
+    @staticmethod
+    def _exportar_legado(agencia):
+        """Réplica de la exportación anterior: instancias completas + DataFrame en memoria."""
+        reporte = AnalyticsService.get_reporte_comisiones_boletos(agencia)
+        qs = AnalyticsService._boletos_reporte_qs(agencia)
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine="openpyxl") as writer:
+            pd.DataFrame(
+                {
+                    "Métrica": list(reporte["totales"]),
+                    "Valor": list(reporte["totales"].values()),
+                }
+            ).to_excel(writer, sheet_name="Resumen", index=False)
+            pd.DataFrame(reporte["por_aerolinea"]).to_excel(
+                writer, sheet_name="Por Aerolínea", index=False
+            )
+            detalles = [
+                {
+                    "Fecha Emisión": b.fecha_emision_boleto,
+                    "Número Boleto": b.numero_boleto,
+                    "PNR": b.localizador_pnr,
+                    "Pasajero": b.nombre_pasajero_procesado or b.nombre_pasajero_completo,
+                    "Aerolínea": b.aerolinea_emisora or "Sin Aerolínea",
+                    "Monto Neto": float(b.tarifa_base or 0),
+                    "Comisión": float(b.comision_agencia or 0),
+                    "Total": float(b.total_boleto or 0),
+                    "Estado": "Auditado" if b.venta_asociada else "Pendiente",
+                }
+                for b in qs.order_by("-fecha_emision_boleto")
+            ]
+            pd.DataFrame(detalles).to_excel(writer, sheet_name="Detalle Boletos", index=False)
+        output.seek(0)
+        return output
@@ -0,0 +1,111 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve
+
+from core.middleware_performance import RequestProfilingMiddleware
+from core.models import Agencia
+from core.request_profiling import slow_requests
+
+RUTA = "/system/facturacion/1/"
+
+
+class Command(BaseCommand):
+    """Mide el overhead por petición del perfilado frente a la vista sin middleware."""
+
+    help = (
+        "Benchmark de RequestProfilingMiddleware: ejecuta una vista sintética (N consultas "
+        "+ M lecturas de caché) sin middleware, con el middleware anterior (DEBUG=True, "
+        "única forma en que contaba consultas) y con el perfilado por execute_wrapper."
+    )
+
+    def add_arguments(self, parser):
+        """add_arguments."""
+        parser.add_argument("--peticiones", type=int, default=1000)
+        parser.add_argument("--consultas", type=int, default=10)
+        parser.add_argument("--lecturas-cache", type=int, default=10)
+        parser.add_argument("--rondas", type=int, default=5)
+
+    def handle(self, *args, **options):
+        """handle."""
+        consultas, lecturas = options["consultas"], options["lecturas_cache"]
+        claves = [f"bench:perfil:{i}" for i in range(lecturas)]
+        cache.set_many({clave: i for i, clave in enumerate(claves[::2])})
+
+        def vista(request):
+            for _ in range(consultas):
+                Agencia.objects.filter(pk=0).exists()
+            for clave in claves:
+                cache.get(clave)
+            return HttpResponse("ok")
+
+        factory = RequestFactory()
+        match = resolve(RUTA)
+
+        def medir(handler):
+            t0 = time.perf_counter()
+            for _ in range(options["peticiones"]):
+                request = factory.get(RUTA)
+                request.resolver_match = match
+                handler(request)
+            return (time.perf_counter() - t0) / options["peticiones"]
+
+        variantes = (
+            ("Sin middleware", vista, {}),
+            ("Anterior (DEBUG)", self._anterior(vista), {"DEBUG": True}),
+            ("Perfilado", RequestProfilingMiddleware(vista), {}),
+            ("Perfilado + muestra", RequestProfilingMiddleware(vista), {"slow_ms": 0}),
+        )
+        mejores = {}
+        # Rondas intercaladas; se toma el mejor tiempo de cada variante (menos ruido).
+        for _ in range(options["rondas"]):
+            for nombre, handler, ajustes in variantes:
+                if "slow_ms" in ajustes:
+                    handler.slow_ms = ajustes["slow_ms"]
+                with override_settings(DEBUG=ajustes.get("DEBUG", False)):
+                    segundos = medir(handler)
+                mejores[nombre] = min(mejores.get(nombre, segundos), segundos)
+        resultados = [(nombre, mejores[nombre]) for nombre, _, _ in variantes]
+        slow_requests.clear()
+        cache.delete_many(claves)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n{options['peticiones']} peticiones, {consultas} consultas y {lecturas} "
+                f"lecturas de caché por petición ({connection.vendor})"
+            )
+        )
+        base = resultados[0][1]
+        for nombre, segundos in resultados:
+            self.stdout.write(
+                f" - {nombre:<20} {segundos * 1e6:8.1f} µs/petición "
+                f"({(segundos - base) * 1e6:+.1f} µs, {(segundos / base - 1) * 100:+.1f}%)"
+            )
+
+    @staticmethod
+    def _anterior(get_response):
+        """Réplica de QueryCountDebugMiddleware: connection.queries + etiqueta request.path."""
+        from prometheus_client import CollectorRegistry, Gauge, Histogram
+
+        registry = CollectorRegistry()
+        duracion = Histogram("d", "d", ["method", "path", "status"], registry=registry)
+        consultas = Gauge("q", "q", ["method", "path"], registry=registry)
+
+        def middleware(request):
+            reset_queries()
+            start = time.time()
+            response = get_response(request)
+            duration = time.time() - start
+            num_queries = len(connection.queries)
+            duracion.labels(
+                method=request.method, path=request.path, status=str(response.status_code)
+            ).observe(duration)
+            consultas.labels(method=request.method, path=request.path).set(num_queries)
+            return response
+
+        return middleware
@@ -1,33 +1,17 @@
 """Regenera la cadena de hashes de AuditLog (repara registros históricos)."""
 
-import hashlib
-import json
-
 from django.core.management.base import BaseCommand
 
 from core.api import AuditLog
-
-
-def _canon(log) -> str:
-    """Construye el canon EXACTO que usa AuditLog.save() y verify_audit_chain()."""
-    payload = {
-        "modelo": log.modelo,
-        "object_id": log.object_id,
-        "accion": log.accion,
-        "descripcion": log.descripcion or "",
-        "datos_previos": log.datos_previos,
-        "datos_nuevos": log.datos_nuevos,
-        "metadata_extra": log.metadata_extra,
-        "creado": log.creado.isoformat(),
-    }
-    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+from core.models.audit import GENESIS_HASH, calcular_record_hash
 
 
 class Command(BaseCommand):
     """Regenera la cadena de hashes de AuditLog."""
 
     help = (
-        "Regenera previous_hash/record_hash de TODOS los AuditLog en orden de creación. "
+        "Regenera previous_hash/record_hash de TODOS los AuditLog, cadena por cadena "
+        "(legada en orden de creación; por agencia en orden de id). "
         "Útil tras el fix de auto_now_add→default (los hashes históricos quedaron "
         "anclados a un timestamp que nunca se guardó). Requiere: python manage.py "
         "regen_audit_chain"
@@ -44,20 +28,13 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         """handle."""
         dry_run = options["dry_run"]
-        qs = AuditLog.objects.all().order_by("creado", "id_audit_log")
-        total = qs.count()
+        total = AuditLog.objects.count()
         self.stdout.write(f"AuditLog totales: {total}")
 
-        prev_hash: str | None = None
         corregidos = 0
         cambios = []
 
-        for log in qs.iterator():
-            nuevo_prev = prev_hash if prev_hash else "0" * 64
-            canon = _canon(log)
-            base = nuevo_prev + "|" + canon
-            nuevo_hash = hashlib.sha256(base.encode("utf-8")).hexdigest()
-
+        for log, nuevo_prev, nuevo_hash in self._encadenados():
             if log.previous_hash != nuevo_prev or log.record_hash != nuevo_hash:
                 cambios.append(
                     (log.id_audit_log, log.previous_hash, nuevo_prev, log.record_hash, nuevo_hash)
@@ -67,7 +44,6 @@ class Command(BaseCommand):
                     AuditLog.objects.filter(pk=log.pk).update(
                         previous_hash=nuevo_prev, record_hash=nuevo_hash
                     )
-            prev_hash = nuevo_hash
 
         self.stdout.write(f"Registros a corregir: {corregidos}")
         if dry_run and corregidos:
@@ -82,3 +58,23 @@ class Command(BaseCommand):
             )
         elif not dry_run:
             self.stdout.write(self.style.SUCCESS("✅ Cadena ya era válida, 0 cambios."))
+
+    @staticmethod
+    def _encadenados():
+        """(log, previous_hash, record_hash) esperados de cada cadena, en el orden que verifica verify_audit_chain()."""
+        cadenas = [None] + sorted(
+            AuditLog.objects.filter(cadena__isnull=False)
+            .order_by()
+            .values_list("cadena", flat=True)
+            .distinct()
+        )
+        for cadena in cadenas:
+            if cadena is None:
+                qs = AuditLog.objects.filter(cadena__isnull=True).order_by("creado", "id_audit_log")
+            else:
+                qs = AuditLog.objects.filter(cadena=cadena).order_by("id_audit_log")
+            prev_hash = GENESIS_HASH
+            for log in qs.iterator():
+                nuevo_hash = calcular_record_hash(log, prev_hash)
+                yield log, prev_hash, nuevo_hash
+                prev_hash = nuevo_hash
@@ -62,12 +62,12 @@ class Command(BaseCommand):
                 )
             )
 
-        # Limpiar caché de la UI
+        # Publicar el snapshot de tasas de la UI
         try:
-            from django.core.cache import cache
+            from apps.finance.services.rate_snapshot import RateSnapshotService
 
-            cache.delete("tasa_bcv_context")
-            self.stdout.write(self.style.SUCCESS("Caché tasa_bcv_context eliminado."))
+            RateSnapshotService.refresh()
+            self.stdout.write(self.style.SUCCESS("Snapshot de tasas de la UI actualizado."))
         except Exception as cache_err:
             self.stderr.write(self.style.WARNING(f"No se pudo limpiar caché: {cache_err}"))
 
@@ -15,11 +15,16 @@ class Command(BaseCommand):
             type=int,
             help="Limitar la verificación a los N registros más antiguos (para pruebas rápidas).",
         )
+        parser.add_argument(
+            "--cadena",
+            help='Verificar solo esa cadena (p. ej. "agencia:3" o "global").',
+        )
 
     def handle(self, *args, **options):
         """handle."""
         limit = options.get("limit")
-        ok, break_id, reason = verify_audit_chain(limit=limit)
+        extra = {"cadena": options["cadena"]} if options.get("cadena") else {}
+        ok, break_id, reason = verify_audit_chain(limit=limit, **extra)
         if ok:
             self.stdout.write(self.style.SUCCESS("AuditLog hash chain OK"))
         else:
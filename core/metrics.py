@@ -1,9 +1,11 @@
 import logging
 
 from django.db import connection
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from prometheus_client import REGISTRY, Gauge, generate_latest
 
+from core.request_profiling import slow_requests
+
 try:
     from django_redis import get_redis_connection
 except ImportError:
@@ -82,3 +84,10 @@ def health_metrics_view(request):
     update_db_connection_pool()
     metrics = generate_latest(REGISTRY)
     return HttpResponse(metrics, content_type="text/plain; version=0.0.4")
+
+
+def slow_requests_view(request):
+    """Peticiones lentas muestreadas por este proceso (solo superusuarios)."""
+    if not request.user.is_superuser:
+        return JsonResponse({"error": "Forbidden"}, status=403)
+    return JsonResponse({"slow_requests": slow_requests.snapshot()})
@@ -12,25 +12,43 @@ class MultiTenantDomainMiddleware:
     def __init__(self, get_response):
         """__init__."""
         self.get_response = get_response
+        # MAIN_DOMAIN no cambia en caliente: se lee una vez por proceso.
+        self.main_domain = os.getenv("MAIN_DOMAIN", "travelhub.cc").lower()
+        self.global_hosts = frozenset(
+            ["localhost", "127.0.0.1", "testserver", self.main_domain, f"www.{self.main_domain}"]
+        )
 
     def __call__(self, request):
         host = request.get_host().split(":")[0].lower()
-        main_domain = os.getenv("MAIN_DOMAIN", "travelhub.cc").lower()
 
-        global_hosts = ["localhost", "127.0.0.1", "testserver", main_domain, f"www.{main_domain}"]
-        if host in global_hosts:
+        if host in self.global_hosts:
             request.agencia = None
             request.agency = None
             return self.get_response(request)
 
+        from core.services.tenant_host_cache import tenant_host_cache
+
+        agencia = tenant_host_cache.resolve(host, self._lookup)
+
+        if agencia:
+            request.agencia = agencia
+            request.agency = agencia
+            return self.get_response(request)
+
+        raise Http404(
+            "La plataforma solicitada no existe, no está activa o tiene problemas de configuración."
+        )
+
+    def _lookup(self, host):
+        """Resolución en BD: dominio personalizado y, si no, subdominio de la plataforma."""
         from core.models.agencia import Agencia
 
         agencia = Agencia.objects.filter(dominio_personalizado=host, activa=True).first()
 
         if not agencia:
             subdomain = None
-            if host.endswith(f".{main_domain}"):
-                subdomain = host.replace(f".{main_domain}", "")
+            if host.endswith(f".{self.main_domain}"):
+                subdomain = host.replace(f".{self.main_domain}", "")
             elif host.endswith(".localhost"):
                 subdomain = host.replace(".localhost", "")
 
@@ -39,11 +57,4 @@ class MultiTenantDomainMiddleware:
                     configuracion_v2__subdominio_slug=subdomain, activa=True
                 ).first()
 
-        if agencia:
-            request.agencia = agencia
-            request.agency = agencia
-            return self.get_response(request)
-
-        raise Http404(
-            "La plataforma solicitada no existe, no está activa o tiene problemas de configuración."
-        )
+        return agencia
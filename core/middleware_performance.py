@@ -1,79 +1,162 @@
 import logging
 import time
 
-from django.db import connection
+from django.conf import settings
+from django.http import HttpResponseBase
+
+from core.request_profiling import profiling, slow_requests
 
 try:
-    from prometheus_client import Counter, Gauge, Histogram
+    from prometheus_client import Counter, Histogram
 
+    # Etiquetas por ruta resuelta (``view_name``), nunca por ``request.path``: cada
+    # ID de boleto/venta sería una serie temporal nueva.
     request_duration = Histogram(
         "travelhub_request_duration_seconds",
-        "Request duration by path and method",
-        ["method", "path", "status"],
+        "Request duration by route and method",
+        ["method", "route", "status"],
         buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
     )
-    query_count = Gauge(
+    request_db_duration = Histogram(
+        "travelhub_request_db_duration_seconds",
+        "DB time per request by route",
+        ["method", "route"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    )
+    query_count = Histogram(
         "travelhub_request_db_queries",
         "Number of DB queries per request",
-        ["method", "path"],
+        ["method", "route"],
+        buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+    )
+    cache_lookups = Counter(
+        "travelhub_request_cache_lookups_total",
+        "Cache reads during requests by result",
+        ["route", "result"],
     )
     n_plus_one_alert = Counter(
         "travelhub_nplus_one_alerts_total",
         "Requests with excessive DB queries",
-        ["method", "path"],
+        ["method", "route"],
     )
 except ImportError:
     request_duration = None
+    request_db_duration = None
     query_count = None
+    cache_lookups = None
     n_plus_one_alert = None
 
 logger = logging.getLogger(__name__)
 
 N_PLUS_ONE_THRESHOLD = 15
 N_PLUS_ONE_TIME_THRESHOLD = 1.0
+UNRESOLVED_ROUTE = "<unresolved>"
+KNOWN_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"})
+
 
+def route_label(request) -> str:
+    """Nombre de la ruta resuelta (o su patrón); 404 y similares comparten etiqueta."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNRESOLVED_ROUTE
+    return match.view_name or match.route or UNRESOLVED_ROUTE
 
-class QueryCountDebugMiddleware:
-    """Middleware que monitorea queries y exporta métricas Prometheus"""
+
+class RequestProfilingMiddleware:
+    """Perfila cada petición (ver ``core.request_profiling``) y exporta métricas Prometheus.
+
+    Con ``REQUEST_PROFILING_HEADERS`` (por defecto ``DEBUG``) añade las cabeceras
+    ``X-DB-Queries``, ``X-DB-Time-Ms`` y ``X-Cache-Hits``/``X-Cache-Misses``. Las
+    peticiones de más de ``REQUEST_PROFILING_SLOW_MS`` van a ``slow_requests``.
+    """
 
     def __init__(self, get_response):
         """__init__."""
         self.get_response = get_response
+        self.slow_ms = getattr(settings, "REQUEST_PROFILING_SLOW_MS", 1000)
+        self.headers = getattr(settings, "REQUEST_PROFILING_HEADERS", settings.DEBUG)
+        # Hijos ya etiquetados por (método, ruta, status): ``labels()`` cuesta más que
+        # ``observe()`` y el conjunto de claves está acotado por las rutas del proyecto.
+        self._series = {}
 
     def __call__(self, request):
-        connection.queries_log.clear()
-        start_time = time.time()
-
-        response = self.get_response(request)
+        start = time.perf_counter()
+        with profiling() as profile:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
 
-        duration = time.time() - start_time
-        num_queries = len(connection.queries)
-
-        path = request.path
-        method = request.method
-        status = response.status_code
+        route = route_label(request)
+        method = request.method if request.method in KNOWN_METHODS else "OTHER"
+        status = getattr(response, "status_code", 0)
 
         if request_duration is not None:
-            request_duration.labels(method=method, path=path, status=str(status)).observe(duration)
-        if query_count is not None:
-            query_count.labels(method=method, path=path).set(num_queries)
-
-        is_n_plus_one = num_queries > N_PLUS_ONE_THRESHOLD and duration > N_PLUS_ONE_TIME_THRESHOLD
+            total, db, queries, hits, misses = self._metrics(method, route, status)
+            total.observe(duration)
+            db.observe(profile.db_time)
+            queries.observe(profile.queries)
+            if profile.cache_hits:
+                hits.inc(profile.cache_hits)
+            if profile.cache_misses:
+                misses.inc(profile.cache_misses)
+
+        is_n_plus_one = (
+            profile.queries > N_PLUS_ONE_THRESHOLD and duration > N_PLUS_ONE_TIME_THRESHOLD
+        )
         if is_n_plus_one:
             if n_plus_one_alert is not None:
-                n_plus_one_alert.labels(method=method, path=path).inc()
+                n_plus_one_alert.labels(method=method, route=route).inc()
             logger.warning(
                 "N+1 alert: %s %s — %d queries en %.2fs",
                 method,
-                path,
-                num_queries,
+                route,
+                profile.queries,
                 duration,
             )
-        elif num_queries > 5:
-            logger.debug("%s %s — %d queries en %.2fs", method, path, num_queries, duration)
+        elif profile.queries > 5:
+            logger.debug("%s %s — %d queries en %.2fs", method, route, profile.queries, duration)
+
+        if duration * 1000 >= self.slow_ms:
+            slow_requests.add(
+                {
+                    "method": method,
+                    "route": route,
+                    "path": request.path,
+                    "status": status,
+                    "total_ms": round(duration * 1000, 2),
+                    "db_ms": round(profile.db_time * 1000, 2),
+                    "queries": profile.queries,
+                    "cache_hits": profile.cache_hits,
+                    "cache_misses": profile.cache_misses,
+                    "top_sql": profile.top_fingerprints(),
+                    "at": time.time(),
+                }
+            )
+
+        if self.headers and isinstance(response, HttpResponseBase):
+            response["X-DB-Queries"] = str(profile.queries)
+            response["X-DB-Time-Ms"] = f"{profile.db_time * 1000:.2f}"
+            response["X-Cache-Hits"] = str(profile.cache_hits)
+            response["X-Cache-Misses"] = str(profile.cache_misses)
 
         return response
 
+    def _metrics(self, method, route, status):
+        key = (method, route, status)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = (
+                request_duration.labels(method=method, route=route, status=str(status)),
+                request_db_duration.labels(method=method, route=route),
+                query_count.labels(method=method, route=route),
+                cache_lookups.labels(route=route, result="hit"),
+                cache_lookups.labels(route=route, result="miss"),
+            )
+        return series
+
+
+# Nombre anterior; se mantiene para configuraciones y tests que lo importan.
+QueryCountDebugMiddleware = RequestProfilingMiddleware
+
 
 class CacheHeaderMiddleware:
     """Middleware para agregar headers de caché"""
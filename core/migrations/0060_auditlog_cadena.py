@@ -0,0 +1,22 @@
+# Cadenas de hashes de AuditLog particionadas por agencia.
+# Los registros existentes quedan con cadena NULL (cadena única legada) y se siguen
+# verificando en su orden original.
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0059_alter_auditlog_creado_default"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="auditlog",
+            name="cadena",
+            field=models.CharField(blank=True, max_length=40, null=True, verbose_name="Cadena"),
+        ),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(fields=["cadena", "id_audit_log"], name="idx_audit_cadena_id"),
+        ),
+    ]
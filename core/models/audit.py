@@ -1,3 +1,4 @@
+import copy as _copy
 import hashlib
 import json as _json
 import logging
@@ -77,6 +78,9 @@ class AuditLog(models.Model):
     # DOCTRINA ANTIGRAVITY: Encadenamiento de integridad (Blockchain-style)
     previous_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
     record_hash = models.CharField(max_length=64, blank=True, null=True, unique=True, db_index=True)
+    # Cadena (shard) a la que pertenece el registro: una por agencia más "global".
+    # NULL = cadena única legada, anterior al encadenamiento por agencia.
+    cadena = models.CharField(_("Cadena"), max_length=40, blank=True, null=True)
 
     class Meta:
         verbose_name = _("Log de Auditoría")
@@ -86,6 +90,7 @@ class AuditLog(models.Model):
             models.Index(fields=["descripcion"]),
             models.Index(fields=["modelo", "object_id"], name="idx_audit_modelo_object"),
             models.Index(fields=["agencia", "creado"], name="idx_audit_agencia_creado"),
+            models.Index(fields=["cadena", "id_audit_log"], name="idx_audit_cadena_id"),
             # GinIndex para búsquedas de texto completo (FTS) o Trigramas (LIKE)
             GinIndex(fields=["descripcion"], name="idx_audit_desc_gin", opclasses=["gin_trgm_ops"]),
             models.Index(fields=["descripcion"], name="idx_audit_desc_simple"),
@@ -106,38 +111,82 @@ class AuditLog(models.Model):
             self.creado = _tz.now()
 
         if es_creacion and not self.previous_hash:
+            self.cadena = self.cadena or cadena_para(self.agencia_id)
             with transaction.atomic():
-                ultimo = AuditLog.objects.order_by("-id_audit_log").first()
-                self.previous_hash = ultimo.record_hash if ultimo else "0" * 64
-
+                bloquear_cadena(self.cadena)
+                self.previous_hash = ultimo_hash(self.cadena)
                 if not self.record_hash:
-                    # Construir payload para el hash - DEBE coincidir con verify_audit_chain()
-                    payload = {
-                        "modelo": self.modelo,
-                        "object_id": self.object_id,
-                        "accion": self.accion,
-                        "descripcion": self.descripcion or "",
-                        "datos_previos": self.datos_previos,
-                        "datos_nuevos": self.datos_nuevos,
-                        "metadata_extra": self.metadata_extra,
-                        "creado": self.creado.isoformat(),
-                    }
-                    try:
-                        canon = _json.dumps(
-                            payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
-                        )
-                    except Exception:
-                        canon = str(payload)
-
-                    base_str = (self.previous_hash or "") + "|" + canon
-                    self.record_hash = hashlib.sha256(base_str.encode("utf-8")).hexdigest()
-
+                    self.record_hash = calcular_record_hash(self, self.previous_hash)
                 super().save(*args, **kwargs)
         else:
             super().save(*args, **kwargs)
 
 
-def crear_audit_log(
+GENESIS_HASH = "0" * 64
+
+
+def cadena_para(agencia_id) -> str:
+    """Cadena de hashes de una agencia (``"global"`` para acciones sin agencia)."""
+    return f"agencia:{agencia_id}" if agencia_id else "global"
+
+
+def bloquear_cadena(cadena: str) -> None:
+    """
+    Serializa las escrituras de una cadena (no de toda la tabla); quien espera el lock
+    relee el hash con ``ultimo_hash``. Debe llamarse dentro de una transacción.
+
+    En PostgreSQL es un ``pg_advisory_xact_lock`` por cadena, que también serializa a
+    los primeros escritores de una cadena vacía (bloquear su último registro no
+    bloquea nada si aún no existe). SQLite no admite escritores concurrentes; en otros
+    motores se bloquea el último registro de la cadena.
+    """
+    from django.db import connection
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f"audit:{cadena}"])
+        return
+    list(
+        AuditLog.objects.select_for_update()
+        .filter(cadena=cadena)
+        .order_by("-id_audit_log")
+        .values_list("pk", flat=True)[:1]
+    )
+
+
+def ultimo_hash(cadena: str) -> str:
+    """record_hash del último registro de la cadena, o el bloque génesis."""
+    ultimo = (
+        AuditLog.objects.filter(cadena=cadena)
+        .order_by("-id_audit_log")
+        .values_list("record_hash", flat=True)
+        .first()
+    )
+    return ultimo or GENESIS_HASH
+
+
+def calcular_record_hash(log, previous_hash) -> str:
+    """Hash del registro encadenado a ``previous_hash`` - DEBE coincidir con verify_audit_chain()."""
+    payload = {
+        "modelo": log.modelo,
+        "object_id": log.object_id,
+        "accion": log.accion,
+        "descripcion": log.descripcion or "",
+        "datos_previos": log.datos_previos,
+        "datos_nuevos": log.datos_nuevos,
+        "metadata_extra": log.metadata_extra,
+        "creado": log.creado.isoformat() if log.creado else "",
+    }
+    try:
+        canon = _json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except Exception:
+        canon = str(payload)
+
+    base_str = (previous_hash or "") + "|" + canon
+    return hashlib.sha256(base_str.encode("utf-8")).hexdigest()
+
+
+def construir_audit_log(
     *,
     modelo,
     object_id,
@@ -151,54 +200,88 @@ def crear_audit_log(
     agencia=None,
 ):
     """
-    Función utilitaria centralizada para crear logs de auditoría capturando el contexto.
+    AuditLog sin guardar con el contexto de la solicitud (usuario, agencia, IP,
+    impersonación) capturado en el momento de la acción.
     """
-    try:
-        from core.middleware import (
-            get_current_agency,
-            get_current_user,
-            get_impersonator,
-            is_impersonating,
+    from core.middleware import (
+        get_current_agency,
+        get_current_user,
+        get_impersonator,
+        is_impersonating,
+    )
+
+    req_meta = get_current_request_meta()
+    merged_meta = metadata_extra.copy() if metadata_extra else {}
+    user_obj = user or get_current_user()
+    agency_obj = agencia or get_current_agency()
+    impersonator_obj = get_impersonator()
+    impersonating = is_impersonating()
+
+    if req_meta:
+        merged_meta.setdefault("ip", req_meta.get("ip"))
+        merged_meta.setdefault("user_agent", req_meta.get("user_agent"))
+
+    # Registrar si es impersonación (God Mode)
+    if impersonating and impersonator_obj and agency_obj:
+        merged_meta["is_impersonated"] = True
+        merged_meta["impersonator_id"] = impersonator_obj.id
+        merged_meta["impersonator_username"] = impersonator_obj.username
+        merged_meta["target_agency_name"] = agency_obj.nombre
+
+        impersonation_msg = (
+            f" [REALIZADO POR {impersonator_obj.username} ACTUANDO COMO {agency_obj.nombre}]"
         )
+        if descripcion:
+            descripcion += impersonation_msg
+        else:
+            descripcion = impersonation_msg
+
+    return AuditLog(
+        modelo=modelo,
+        object_id=str(object_id),
+        accion=accion,
+        venta=venta,
+        user=user_obj,
+        agencia=agency_obj,
+        descripcion=descripcion,
+        datos_previos=datos_previos,
+        datos_nuevos=datos_nuevos,
+        metadata_extra=merged_meta or None,
+        creado=_tz.now(),
+    )
 
-        req_meta = get_current_request_meta()
-        merged_meta = metadata_extra.copy() if metadata_extra else {}
-        user_obj = user or get_current_user()
-        agency_obj = agencia or get_current_agency()
-        impersonator_obj = get_impersonator()
-        impersonating = is_impersonating()
-
-        if req_meta:
-            merged_meta.setdefault("ip", req_meta.get("ip"))
-            merged_meta.setdefault("user_agent", req_meta.get("user_agent"))
-
-        # Registrar si es impersonación (God Mode)
-        if impersonating and impersonator_obj and agency_obj:
-            merged_meta["is_impersonated"] = True
-            merged_meta["impersonator_id"] = impersonator_obj.id
-            merged_meta["impersonator_username"] = impersonator_obj.username
-            merged_meta["target_agency_name"] = agency_obj.nombre
-
-            impersonation_msg = (
-                f" [REALIZADO POR {impersonator_obj.username} ACTUANDO COMO {agency_obj.nombre}]"
-            )
-            if descripcion:
-                descripcion += impersonation_msg
-            else:
-                descripcion = impersonation_msg
 
-        return AuditLog.objects.create(
+def crear_audit_log(
+    *,
+    modelo,
+    object_id,
+    accion,
+    venta=None,
+    descripcion=None,
+    datos_previos=None,
+    datos_nuevos=None,
+    metadata_extra=None,
+    user=None,
+    agencia=None,
+):
+    """
+    Función utilitaria centralizada para crear logs de auditoría capturando el contexto.
+    """
+    try:
+        log = construir_audit_log(
             modelo=modelo,
-            object_id=str(object_id),
+            object_id=object_id,
             accion=accion,
             venta=venta,
-            user=user_obj,
-            agencia=agency_obj,
             descripcion=descripcion,
             datos_previos=datos_previos,
             datos_nuevos=datos_nuevos,
-            metadata_extra=merged_meta or None,
+            metadata_extra=metadata_extra,
+            user=user,
+            agencia=agencia,
         )
+        log.save()
+        return log
     except Exception as e:
         logger.exception(f"Fallo creando AuditLog para {modelo} {object_id}")
         raise RuntimeError(
@@ -257,3 +340,45 @@ def _calcular_diff(prev, current, exclude_fields=None):
             logger.debug("Ignored exception computing field diff: %s", e)
             continue
     return diff
+
+
+def snapshot_campos(instance) -> dict:
+    """Estado de los campos concretos ya cargados en la instancia (sin consultar la BD)."""
+    valores = instance.__dict__
+    snapshot = {}
+    for field in instance._meta.concrete_fields:
+        if field.attname in valores:
+            valor = valores[field.attname]
+            # JSONField: copia para detectar mutaciones in situ del dict/lista.
+            snapshot[field.attname] = (
+                _copy.deepcopy(valor) if isinstance(valor, dict | list) else valor
+            )
+    return snapshot
+
+
+def _diff_snapshot(snapshot, current, exclude_fields=None):
+    """
+    Igual que ``_calcular_diff`` pero contra un snapshot de ``snapshot_campos``: las FKs
+    se comparan por id y los campos diferidos (ausentes del snapshot) se omiten.
+    """
+    if exclude_fields is None:
+        exclude_fields = [
+            "creado",
+            "actualizado",
+            "creado_por",
+            "id_audit_log",
+            "fecha_actualizacion",
+            "id_venta",
+            "id_item_venta",
+        ]
+
+    diff = {}
+    for field in current._meta.concrete_fields:
+        name = field.name
+        if name in exclude_fields or name.startswith("_") or field.attname not in snapshot:
+            continue
+        val_prev = snapshot[field.attname]
+        val_curr = current.__dict__.get(field.attname, val_prev)
+        if val_prev != val_curr:
+            diff[name] = {"old": _sanitize_value(val_prev), "new": _sanitize_value(val_curr)}
+    return diff
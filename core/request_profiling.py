@@ -0,0 +1,131 @@
+"""
+Perfilado de peticiones apto para producción.
+
+``RequestProfilingMiddleware`` abre un ``RequestProfile`` por petición:
+
+- Las consultas se cuentan y cronometran con ``connection.execute_wrapper``, sin
+  depender de ``connection.queries`` (que solo se llena con ``DEBUG``).
+- Los backends de ``core.cache_backends`` suman aciertos/fallos de caché al perfil
+  activo (un ``ContextVar``: no se mezcla entre hilos ni corrutinas).
+- El SQL se agrupa por texto literal durante la petición (Django ya parametriza los
+  valores); solo al muestrear una petición lenta se normaliza a huellas
+  (``fingerprint``) y se guarda en ``slow_requests``, un buffer circular por proceso.
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+_current: ContextVar["RequestProfile | None"] = ContextVar("request_profile", default=None)
+
+# Lista de columnas del ORM ("tabla"."col", ...): no aporta y ocultaría el WHERE al truncar.
+_COLUMNS = re.compile(r'^SELECT (DISTINCT )?"\w+"\."\w+"(?:, "\w+"\."\w+")+ FROM ')
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """Normaliza un SQL: listas ``IN``, literales y espacios no distinguen consultas."""
+    sql = _COLUMNS.sub(r"SELECT \1... FROM ", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _SPACES.sub(" ", sql).strip()[:500]
+
+
+class RequestProfile:
+    """Contadores de una petición; también actúa como ``execute_wrapper``."""
+
+    __slots__ = ("queries", "db_time", "cache_hits", "cache_misses", "sql")
+
+    def __init__(self):
+        """__init__."""
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.sql = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """__call__."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            stats = self.sql.get(sql)
+            if stats is None:
+                self.sql[sql] = [1, elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+
+    def top_fingerprints(self, limit: int = 5) -> list[dict]:
+        """Huellas SQL con más tiempo acumulado en la petición."""
+        grouped = {}
+        for sql, (count, elapsed) in self.sql.items():
+            stats = grouped.setdefault(fingerprint(sql), [0, 0.0])
+            stats[0] += count
+            stats[1] += elapsed
+        top = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {"sql": sql, "count": count, "ms": round(elapsed * 1000, 2)}
+            for sql, (count, elapsed) in top
+        ]
+
+
+@contextmanager
+def profiling():
+    """Activa un ``RequestProfile`` para el bloque (consultas de la conexión por defecto)."""
+    profile = RequestProfile()
+    token = _current.set(profile)
+    try:
+        with connection.execute_wrapper(profile):
+            yield profile
+    finally:
+        _current.reset(token)
+
+
+def record_cache(hits: int, misses: int) -> None:
+    """Suma lecturas de caché al perfil activo (no hace nada fuera de una petición)."""
+    profile = _current.get()
+    if profile is not None:
+        profile.cache_hits += hits
+        profile.cache_misses += misses
+
+
+class SlowRequestBuffer:
+    """Últimas N peticiones lentas del proceso (``deque`` con ``maxlen``)."""
+
+    def __init__(self, size: int):
+        """__init__."""
+        self._items = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, sample: dict) -> None:
+        """add."""
+        with self._lock:
+            self._items.append(sample)
+
+    def snapshot(self) -> list[dict]:
+        """Muestras de la más reciente a la más antigua."""
+        with self._lock:
+            return list(reversed(self._items))
+
+    def clear(self) -> None:
+        """clear."""
+        with self._lock:
+            self._items.clear()
+
+
+slow_requests = SlowRequestBuffer(getattr(settings, "REQUEST_PROFILING_RING_SIZE", 100))
@@ -24,6 +24,7 @@ USO EN CLASS-BASED VIEWS:
 import sys
 from functools import wraps
 
+from django.conf import settings
 from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
@@ -41,6 +42,7 @@ _IS_MANAGEMENT_COMMAND = bool(
 # Constantes de cache para sesiones de agencia
 _USER_AGENCIA_CACHE_PREFIX = "th:user_agencia:"
 _USER_AGENCIA_CACHE_TIMEOUT = 30  # 30 segundos — reducido de 120s (P1-004 fix)
+_USER_AGENCIES_CACHE_PREFIX = "th:user_agencies:"
 
 
 def get_user_active_agency(user):
@@ -92,10 +94,33 @@ def get_user_active_agency(user):
         return None
 
 
+def get_user_agencies(user):
+    """
+    Vínculos activos del usuario (selector de agencias), ordenados por nombre.
+
+    Se cachean por usuario hasta ``USER_AGENCIES_CACHE_TIMEOUT`` segundos; los signals
+    de ``UsuarioAgencia`` y ``Agencia`` los invalidan vía
+    ``invalidate_user_agencia_cache``.
+    """
+    from core.models.agencia import UsuarioAgencia
+
+    cache_key = f"{_USER_AGENCIES_CACHE_PREFIX}{user.pk}"
+    vinculos = cache.get(cache_key)
+    if vinculos is None:
+        vinculos = list(
+            UsuarioAgencia.objects.filter(usuario=user, activo=True, agencia__activa=True)
+            .select_related("agencia")
+            .order_by("agencia__nombre")
+        )
+        cache.set(cache_key, vinculos, getattr(settings, "USER_AGENCIES_CACHE_TIMEOUT", 600))
+    return vinculos
+
+
 def invalidate_user_agencia_cache(user_id):
-    """Invalida el cache de agencia de un usuario."""
-    cache_key = f"{_USER_AGENCIA_CACHE_PREFIX}{user_id}"
-    cache.delete(cache_key)
+    """Invalida el cache de agencia (y de vínculos) de un usuario."""
+    cache.delete_many(
+        [f"{_USER_AGENCIA_CACHE_PREFIX}{user_id}", f"{_USER_AGENCIES_CACHE_PREFIX}{user_id}"]
+    )
 
 
 def invalidate_all_agency_caches(agencia_id):
@@ -0,0 +1,125 @@
+"""
+Pipeline de auditoría por lotes.
+
+Las señales de auditoría (``core/signals_audit.py``) ya no escriben un ``AuditLog`` por
+cambio dentro de la transacción de la solicitud: construyen el registro en memoria
+(con el contexto de usuario/agencia/IP capturado en ese momento) y lo acumulan en un
+lote por transacción con un único ``on_commit``. Al confirmar, ``AuditPipeline.escribir``
+encadena los hashes y los inserta con ``bulk_create``.
+
+Los eventos dentro de un ``atomic()`` anidado van a un lote propio, registrado con
+``on_commit`` en ese savepoint: si el savepoint se revierte, Django descarta el
+callback y sus eventos no se escriben (igual que el ``AuditLog`` síncrono anterior).
+
+Las cadenas de hashes están particionadas por agencia (``AuditLog.cadena``): cada
+escritor bloquea solo el último registro de su cadena, de modo que agencias distintas no se
+serializan entre sí. ``verify_audit_chain`` verifica cada cadena por separado.
+
+Settings:
+    AUDIT_LOG_ENABLED: ``False`` desactiva la auditoría por señales (default ``True``).
+    AUDIT_LOG_ON_COMMIT: ``False`` escribe cada evento al momento (default ``True``).
+    AUDIT_LOG_BATCH_SIZE: filas por INSERT del ``bulk_create`` (default 500).
+"""
+
+import logging
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from core.models.audit import (
+    AuditLog,
+    bloquear_cadena,
+    cadena_para,
+    calcular_record_hash,
+    construir_audit_log,
+    ultimo_hash,
+)
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class _Lote:
+    """Registros pendientes de una transacción (o de un savepoint dentro de ella)."""
+
+    def __init__(self, savepoint_ids):
+        """__init__."""
+        self.savepoint_ids = list(savepoint_ids)
+        self.logs: list[AuditLog] = []
+        self.flushed = False
+        self.callback = None
+
+
+class AuditPipeline:
+    """Acumula los eventos de auditoría por transacción y los escribe al confirmar."""
+
+    @classmethod
+    def registrar(cls, **kwargs) -> None:
+        """Encola un evento con los mismos argumentos que ``crear_audit_log``."""
+        if not getattr(settings, "AUDIT_LOG_ENABLED", True):
+            return
+        log = construir_audit_log(**kwargs)
+
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block or not getattr(settings, "AUDIT_LOG_ON_COMMIT", True):
+            cls.escribir([log])
+            return
+
+        lote = getattr(_local, "lote", None)
+        if (
+            lote is None
+            or lote.savepoint_ids != connection.savepoint_ids
+            or not cls._pending(connection, lote)
+        ):
+            lote = _Lote(connection.savepoint_ids)
+            lote.callback = partial(cls._flush, lote)
+            _local.lote = lote
+            transaction.on_commit(lote.callback)
+        lote.logs.append(log)
+
+    @staticmethod
+    def escribir(logs, batch_size: int | None = None) -> int:
+        """
+        Encadena e inserta ``logs`` (en orden) con un ``bulk_create`` por cadena.
+        Retorna la cantidad de registros escritos.
+        """
+        batch_size = batch_size or getattr(settings, "AUDIT_LOG_BATCH_SIZE", 500)
+        por_cadena: dict[str, list[AuditLog]] = {}
+        for log in logs:
+            log.cadena = log.cadena or cadena_para(log.agencia_id)
+            por_cadena.setdefault(log.cadena, []).append(log)
+
+        for cadena, grupo in por_cadena.items():
+            with transaction.atomic():
+                bloquear_cadena(cadena)
+                previo = ultimo_hash(cadena)
+                for log in grupo:
+                    log.previous_hash = previo
+                    log.record_hash = calcular_record_hash(log, previo)
+                    previo = log.record_hash
+                AuditLog.objects.bulk_create(grupo, batch_size=batch_size)
+        return len(logs)
+
+    @staticmethod
+    def _pending(connection, lote) -> bool:
+        """El ``on_commit`` del lote sigue registrado (no se ejecutó ni se revirtió)."""
+        return not lote.flushed and any(
+            entry[1] is lote.callback for entry in connection.run_on_commit
+        )
+
+    @classmethod
+    def _flush(cls, lote) -> None:
+        lote.flushed = True
+        if getattr(_local, "lote", None) is lote:
+            _local.lote = None
+        try:
+            cls.escribir(lote.logs)
+        except Exception:
+            logger.critical(
+                f"Fallo escribiendo {len(lote.logs)} registros de auditoría: "
+                f"{[(log.modelo, log.object_id, log.accion) for log in lote.logs[:20]]}",
+                exc_info=True,
+            )
@@ -0,0 +1,165 @@
+"""
+Cache de resolución host → agencia para ``MultiTenantDomainMiddleware``.
+
+Dos niveles:
+
+1. LRU en proceso con TTL: la mayoría de las solicitudes de portales white-label se
+   resuelven sin salir del proceso.
+2. Cache compartida (Redis) bajo una clave versionada ``tenant_host:v{N}:{host}``.
+
+Invalidación por versión: guardar o borrar una ``Agencia`` o su
+``AgenciaConfiguracion`` incrementa ``tenant_host:version`` (signals conectados en
+``core.apps``), lo que deja huérfanas todas las entradas compartidas. Cada
+proceso relee la versión como máximo cada ``TENANT_HOST_VERSION_CHECK_SECONDS``, así
+que un cambio de dominio/subdominio se ve en todos los workers en ese plazo (y al
+instante en el proceso que guardó).
+
+Los hosts desconocidos también se cachean (con ``TENANT_HOST_NEGATIVE_TTL``) para
+rechazarlos sin consultar la BD.
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "tenant_host:version"
+NEGATIVE = "__sin_agencia__"
+
+
+class TenantHostCache:
+    """LRU en proceso + cache compartida versionada de host → agencia."""
+
+    def __init__(self):
+        """__init__."""
+        self._entries: OrderedDict[str, tuple[int, float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._version_checked = 0.0
+        self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "negative_hits": 0}
+
+    def resolve(self, host: str, loader):
+        """
+        Agencia para ``host`` o ``None``. ``loader(host)`` consulta la BD solo cuando
+        el host no está en ninguno de los dos niveles.
+
+        Retorna una copia de la instancia cacheada: las vistas pueden modificar
+        ``request.agencia`` sin afectar a otras solicitudes.
+        """
+        now = time.monotonic()
+        version = self._current_version(now)
+
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[0] == version and entry[1] > now:
+                self._entries.move_to_end(host)
+                self._count("local_hits", entry[2])
+                return self._materialize(entry[2])
+
+        shared_key = f"tenant_host:v{version}:{host}"
+        value = None
+        try:
+            value = cache.get(shared_key)
+        except Exception as e:
+            logger.warning(f"Error leyendo cache de tenants para {host}: {e}")
+
+        if value is not None:
+            with self._lock:
+                self._count("shared_hits", value)
+        else:
+            agencia = loader(host)
+            value = agencia if agencia is not None else NEGATIVE
+            with self._lock:
+                self._stats["misses"] += 1
+            try:
+                cache.set(shared_key, value, self._ttl(value))
+            except Exception as e:
+                logger.warning(f"Error guardando cache de tenants para {host}: {e}")
+
+        with self._lock:
+            self._entries[host] = (version, now + self._ttl(value), value)
+            self._entries.move_to_end(host)
+            while len(self._entries) > getattr(settings, "TENANT_HOST_CACHE_SIZE", 1024):
+                self._entries.popitem(last=False)
+        return self._materialize(value)
+
+    def invalidate(self) -> None:
+        """Invalida todas las resoluciones (todos los procesos, vía versión compartida)."""
+        try:
+            cache.add(VERSION_KEY, 1, None)
+            self._version = cache.incr(VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Error incrementando versión de cache de tenants: {e}")
+            self._version = None
+        with self._lock:
+            self._entries.clear()
+            self._version_checked = time.monotonic()
+
+    def get_stats(self) -> dict[str, float]:
+        """
+        Métricas del proceso: ``local_hits``, ``shared_hits``, ``misses`` (consultas a
+        BD), ``negative_hits`` (hosts desconocidos rechazados desde cache),
+        ``entries`` y ``hit_ratio``.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_ratio"] = (
+            (stats["local_hits"] + stats["shared_hits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+    def reset_stats(self) -> None:
+        """Reinicia las métricas."""
+        with self._lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def clear_local(self) -> None:
+        """Vacía solo el LRU del proceso (tests)."""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def _current_version(self, now: float) -> int:
+        interval = getattr(settings, "TENANT_HOST_VERSION_CHECK_SECONDS", 5)
+        if self._version is not None and now - self._version_checked < interval:
+            return self._version
+        try:
+            cache.add(VERSION_KEY, 1, None)
+            version = int(cache.get(VERSION_KEY) or 1)
+        except Exception as e:
+            logger.warning(f"Error leyendo versión de cache de tenants: {e}")
+            version = self._version or 1
+        self._version, self._version_checked = version, now
+        return version
+
+    @staticmethod
+    def _ttl(value) -> int:
+        if value == NEGATIVE:
+            return getattr(settings, "TENANT_HOST_NEGATIVE_TTL", 60)
+        return getattr(settings, "TENANT_HOST_CACHE_TTL", 300)
+
+    def _count(self, level: str, value) -> None:
+        self._stats[level] += 1
+        if value == NEGATIVE:
+            self._stats["negative_hits"] += 1
+
+    @staticmethod
+    def _materialize(value):
+        return None if value == NEGATIVE else copy.copy(value)
+
+
+tenant_host_cache = TenantHostCache()
+
+
+def _on_tenant_change(sender, instance, **kwargs):
+    """Signal: dominio, subdominio o estado de una agencia pueden haber cambiado."""
+    tenant_host_cache.invalidate()
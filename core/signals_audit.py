@@ -1,13 +1,64 @@
 import logging
 
-from django.db.models.signals import post_delete, post_save, pre_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
 
-from core.models.audit import AuditLog, _calcular_diff, crear_audit_log
+from core.models.audit import AuditLog, _diff_snapshot, snapshot_campos
+from core.services.audit_pipeline import AuditPipeline
 from core.signals_bypass import are_signals_blocked
 
 logger = logging.getLogger(__name__)
 
+# Los diffs de UPDATE comparan contra un snapshot de los campos tomado al cargar la
+# instancia (post_init) y renovado en cada post_save, sin re-consultar la fila. Los
+# eventos se encolan en AuditPipeline y se escriben en lote al confirmar la transacción.
+MODELOS_AUDITADOS = (
+    "bookings.Venta",
+    "bookings.ItemVenta",
+    "crm.Pasajero",
+    "finance.Factura",
+    "bookings.PagoVenta",
+    "bookings.FeeVenta",
+    "crm.Cliente",
+    "bookings.Proveedor",
+)
+
+
+def audit_snapshot_post_init(sender, instance, **kwargs):
+    """audit_snapshot_post_init."""
+    instance._audit_snapshot = snapshot_campos(instance)
+
+
+def audit_snapshot_pre_save(sender, instance, **kwargs):
+    """
+    Instancia con pk que no viene de la BD (``Modelo(pk=...)`` + save): su snapshot no
+    refleja la fila, así que solo en ese caso se lee el estado previo.
+    """
+    if are_signals_blocked() or not instance.pk or not instance._state.adding:
+        return
+    try:
+        instance._audit_snapshot = snapshot_campos(sender._base_manager.get(pk=instance.pk))
+    except sender.DoesNotExist:
+        instance._audit_snapshot = None
+
+
+for _modelo in MODELOS_AUDITADOS:
+    post_init.connect(
+        audit_snapshot_post_init, sender=_modelo, dispatch_uid=f"audit_snapshot_{_modelo}"
+    )
+    pre_save.connect(
+        audit_snapshot_pre_save, sender=_modelo, dispatch_uid=f"audit_pre_save_{_modelo}"
+    )
+
+
+def _cambios(instance, created) -> dict:
+    """Diff contra el snapshot previo; deja el snapshot en el estado recién guardado."""
+    previo = getattr(instance, "_audit_snapshot", None)
+    instance._audit_snapshot = snapshot_campos(instance)
+    if created or previo is None:
+        return {}
+    return _diff_snapshot(previo, instance)
+
 
 # --- AUDIT SIGNALS FOR VENTA ---
 @receiver(post_delete, sender="bookings.Venta")
@@ -15,7 +66,7 @@ def audit_delete_venta(sender, instance, **kwargs):
     """audit_delete_venta."""
     if are_signals_blocked():
         return
-    crear_audit_log(
+    AuditPipeline.registrar(
         modelo="Venta",
         object_id=instance.pk,
         accion=AuditLog.Accion.DELETE,
@@ -24,25 +75,14 @@ def audit_delete_venta(sender, instance, **kwargs):
     )
 
 
-@receiver(pre_save, sender="bookings.Venta")
-def audit_pre_save_venta(sender, instance, **kwargs):
-    """audit_pre_save_venta."""
-    if are_signals_blocked():
-        return
-    if instance.pk:
-        try:
-            instance._pre_save_instance = sender.objects.get(pk=instance.pk)
-        except sender.DoesNotExist:
-            instance._pre_save_instance = None
-
-
 @receiver(post_save, sender="bookings.Venta")
 def audit_post_save_venta(sender, instance, created, **kwargs):
     """audit_post_save_venta."""
+    diff = _cambios(instance, created)
     if are_signals_blocked():
         return
     if created:
-        crear_audit_log(
+        AuditPipeline.registrar(
             modelo="Venta",
             object_id=instance.pk,
             accion=AuditLog.Accion.CREATE,
@@ -50,18 +90,16 @@ def audit_post_save_venta(sender, instance, created, **kwargs):
             descripcion=f"Creacion de Venta {instance.localizador}",
             datos_nuevos={"id": instance.pk, "localizador": instance.localizador},
         )
-    elif hasattr(instance, "_pre_save_instance") and instance._pre_save_instance:
-        diff = _calcular_diff(instance._pre_save_instance, instance)
-        if diff:
-            crear_audit_log(
-                modelo="Venta",
-                object_id=instance.pk,
-                accion=AuditLog.Accion.UPDATE,
-                venta=instance,
-                descripcion=f"Actualizacion de Venta {instance.localizador}",
-                datos_previos={k: v["old"] for k, v in diff.items()},
-                datos_nuevos={k: v["new"] for k, v in diff.items()},
-            )
+    elif diff:
+        AuditPipeline.registrar(
+            modelo="Venta",
+            object_id=instance.pk,
+            accion=AuditLog.Accion.UPDATE,
+            venta=instance,
+            descripcion=f"Actualizacion de Venta {instance.localizador}",
+            datos_previos={k: v["old"] for k, v in diff.items()},
+            datos_nuevos={k: v["new"] for k, v in diff.items()},
+        )
 
 
 # --- AUDIT SIGNALS FOR ITEMVENTA ---
@@ -75,7 +113,7 @@ def audit_delete_itemventa(sender, instance, **kwargs):
         v = instance.venta
     except Exception as e:
         logger.debug("Venta no disponible para audit_delete_itemventa: %s", e)
-    crear_audit_log(
+    AuditPipeline.registrar(
         modelo="ItemVenta",
         object_id=instance.pk,
         accion=AuditLog.Accion.DELETE,
@@ -84,25 +122,14 @@ def audit_delete_itemventa(sender, instance, **kwargs):
     )
 
 
-@receiver(pre_save, sender="bookings.ItemVenta")
-def audit_pre_save_itemventa(sender, instance, **kwargs):
-    """audit_pre_save_itemventa."""
-    if are_signals_blocked():
-        return
-    if instance.pk:
-        try:
-            instance._pre_save_instance = sender.objects.get(pk=instance.pk)
-        except sender.DoesNotExist:
-            instance._pre_save_instance = None
-
-
 @receiver(post_save, sender="bookings.ItemVenta")
 def audit_post_save_itemventa(sender, instance, created, **kwargs):
     """audit_post_save_itemventa."""
+    diff = _cambios(instance, created)
     if are_signals_blocked():
         return
     if created:
-        crear_audit_log(
+        AuditPipeline.registrar(
             modelo="ItemVenta",
             object_id=instance.pk,
             accion=AuditLog.Accion.CREATE,
@@ -110,18 +137,16 @@ def audit_post_save_itemventa(sender, instance, created, **kwargs):
             descripcion=f"Creacion de ItemVenta {instance.pk}",
             datos_nuevos={"id": instance.pk, "venta_id": instance.venta_id},
         )
-    elif hasattr(instance, "_pre_save_instance") and instance._pre_save_instance:
-        diff = _calcular_diff(instance._pre_save_instance, instance)
-        if diff:
-            crear_audit_log(
-                modelo="ItemVenta",
-                object_id=instance.pk,
-                accion=AuditLog.Accion.UPDATE,
-                venta=instance.venta,
-                descripcion=f"Actualizacion de ItemVenta {instance.pk}",
-                datos_previos={k: v["old"] for k, v in diff.items()},
-                datos_nuevos={k: v["new"] for k, v in diff.items()},
-            )
+    elif diff:
+        AuditPipeline.registrar(
+            modelo="ItemVenta",
+            object_id=instance.pk,
+            accion=AuditLog.Accion.UPDATE,
+            venta=instance.venta,
+            descripcion=f"Actualizacion de ItemVenta {instance.pk}",
+            datos_previos={k: v["old"] for k, v in diff.items()},
+            datos_nuevos={k: v["new"] for k, v in diff.items()},
+        )
 
 
 # --- AUDIT SIGNALS FOR PASAJERO (CRM) ---
@@ -130,7 +155,7 @@ def audit_delete_pasajero(sender, instance, **kwargs):
     """audit_delete_pasajero."""
     if are_signals_blocked():
         return
-    crear_audit_log(
+    AuditPipeline.registrar(
         modelo="Pasajero",
         object_id=instance.pk,
         accion=AuditLog.Accion.DELETE,
@@ -139,42 +164,29 @@ def audit_delete_pasajero(sender, instance, **kwargs):
     )
 
 
-@receiver(pre_save, sender="crm.Pasajero")
-def audit_pre_save_pasajero(sender, instance, **kwargs):
-    """audit_pre_save_pasajero."""
-    if are_signals_blocked():
-        return
-    if instance.pk:
-        try:
-            instance._pre_save_instance = sender.objects.get(pk=instance.pk)
-        except sender.DoesNotExist:
-            instance._pre_save_instance = None
-
-
 @receiver(post_save, sender="crm.Pasajero")
 def audit_post_save_pasajero(sender, instance, created, **kwargs):
     """audit_post_save_pasajero."""
+    diff = _cambios(instance, created)
     if are_signals_blocked():
         return
     if created:
-        crear_audit_log(
+        AuditPipeline.registrar(
             modelo="Pasajero",
             object_id=instance.pk,
             accion=AuditLog.Accion.CREATE,
             descripcion=f"Creacion de Pasajero {instance.get_nombre_completo()}",
             datos_nuevos={"id": instance.pk, "nombre": instance.get_nombre_completo()},
         )
-    elif hasattr(instance, "_pre_save_instance") and instance._pre_save_instance:
-        diff = _calcular_diff(instance._pre_save_instance, instance)
-        if diff:
-            crear_audit_log(
-                modelo="Pasajero",
-                object_id=instance.pk,
-                accion=AuditLog.Accion.UPDATE,
-                descripcion=f"Actualizacion de Pasajero {instance.get_nombre_completo()}",
-                datos_previos={k: v["old"] for k, v in diff.items()},
-                datos_nuevos={k: v["new"] for k, v in diff.items()},
-            )
+    elif diff:
+        AuditPipeline.registrar(
+            modelo="Pasajero",
+            object_id=instance.pk,
+            accion=AuditLog.Accion.UPDATE,
+            descripcion=f"Actualizacion de Pasajero {instance.get_nombre_completo()}",
+            datos_previos={k: v["old"] for k, v in diff.items()},
+            datos_nuevos={k: v["new"] for k, v in diff.items()},
+        )
 
 
 # --- AUDIT SIGNALS FOR FACTURA (FINANCE) ---
@@ -185,7 +197,7 @@ def audit_delete_factura(sender, instance, **kwargs):
         return
     venta = getattr(instance, "venta_asociada", None) or getattr(instance, "venta", None)
     numero = getattr(instance, "numero_factura", None) or getattr(instance, "numero_control", None)
-    crear_audit_log(
+    AuditPipeline.registrar(
         modelo="Factura",
         object_id=instance.pk,
         accion=AuditLog.Accion.DELETE,
@@ -194,27 +206,16 @@ def audit_delete_factura(sender, instance, **kwargs):
     )
 
 
-@receiver(pre_save, sender="finance.Factura")
-def audit_pre_save_factura(sender, instance, **kwargs):
-    """audit_pre_save_factura."""
-    if are_signals_blocked():
-        return
-    if instance.pk:
-        try:
-            instance._pre_save_instance = sender.objects.get(pk=instance.pk)
-        except sender.DoesNotExist:
-            instance._pre_save_instance = None
-
-
 @receiver(post_save, sender="finance.Factura")
 def audit_post_save_factura(sender, instance, created, **kwargs):
     """audit_post_save_factura."""
+    diff = _cambios(instance, created)
     if are_signals_blocked():
         return
     venta = getattr(instance, "venta_asociada", None) or getattr(instance, "venta", None)
     numero = getattr(instance, "numero_factura", None) or getattr(instance, "numero_control", None)
     if created:
-        crear_audit_log(
+        AuditPipeline.registrar(
             modelo="Factura",
             object_id=instance.pk,
             accion=AuditLog.Accion.CREATE,
@@ -222,18 +223,16 @@ def audit_post_save_factura(sender, instance, created, **kwargs):
             descripcion=f"Creacion de Factura {numero}",
             datos_nuevos={"id": instance.pk, "numero": str(numero)},
         )
-    elif hasattr(instance, "_pre_save_instance") and instance._pre_save_instance:
-        diff = _calcular_diff(instance._pre_save_instance, instance)
-        if diff:
-            crear_audit_log(
-                modelo="Factura",
-                object_id=instance.pk,
-                accion=AuditLog.Accion.UPDATE,
-                venta=venta,
-                descripcion=f"Actualizacion de Factura {numero}",
-                datos_previos={k: v["old"] for k, v in diff.items()},
-                datos_nuevos={k: v["new"] for k, v in diff.items()},
-            )
+    elif diff:
+        AuditPipeline.registrar(
+            modelo="Factura",
+            object_id=instance.pk,
+            accion=AuditLog.Accion.UPDATE,
+            venta=venta,
+            descripcion=f"Actualizacion de Factura {numero}",
+            datos_previos={k: v["old"] for k, v in diff.items()},
+            datos_nuevos={k: v["new"] for k, v in diff.items()},
+        )
 
 
 # --- AUDIT SIGNALS FOR PAGOVENTA ---
@@ -242,7 +241,7 @@ def audit_delete_pagovanta(sender, instance, **kwargs):
     """audit_delete_pagovanta."""
     if are_signals_blocked():
         return
-    crear_audit_log(
+    AuditPipeline.registrar(
         modelo="PagoVenta",
         object_id=instance.pk,
         accion=AuditLog.Accion.DELETE,
@@ -251,25 +250,14 @@ def audit_delete_pagovanta(sender, instance, **kwargs):
     )
 
 
-@receiver(pre_save, sender="bookings.PagoVenta")
-def audit_pre_save_pagovanta(sender, instance, **kwargs):
-    """audit_pre_save_pagovanta."""
-    if are_signals_blocked():
-        return
-    if instance.pk:
-        try:
-            instance._pre_save_instance = sender.objects.get(pk=instance.pk)
-        except sender.DoesNotExist:
-            instance._pre_save_instance = None
-
-
 @receiver(post_save, sender="bookings.PagoVenta")
 def audit_post_save_pagovanta(sender, instance, created, **kwargs):
     """audit_post_save_pagovanta."""
+    diff = _cambios(instance, created)
     if are_signals_blocked():
         return
     if created:
-        crear_audit_log(
+        AuditPipeline.registrar(
             modelo="PagoVenta",
             object_id=instance.pk,
             accion=AuditLog.Accion.CREATE,
@@ -281,18 +269,16 @@ def audit_post_save_pagovanta(sender, instance, created, **kwargs):
                 "metodo": instance.metodo,
             },
         )
-    elif hasattr(instance, "_pre_save_instance") and instance._pre_save_instance:
-        diff = _calcular_diff(instance._pre_save_instance, instance)
-        if diff:
-            crear_audit_log(
-                modelo="PagoVenta",
-                object_id=instance.pk,
-                accion=AuditLog.Accion.UPDATE,
-                venta=instance.venta,
-                descripcion=f"Actualizacion de PagoVenta {instance.pk}",
-                datos_previos={k: v["old"] for k, v in diff.items()},
-                datos_nuevos={k: v["new"] for k, v in diff.items()},
-            )
+    elif diff:
+        AuditPipeline.registrar(
+            modelo="PagoVenta",
+            object_id=instance.pk,
+            accion=AuditLog.Accion.UPDATE,
+            venta=instance.venta,
+            descripcion=f"Actualizacion de PagoVenta {instance.pk}",
+            datos_previos={k: v["old"] for k, v in diff.items()},
+            datos_nuevos={k: v["new"] for k, v in diff.items()},
+        )
 
 
 # --- AUDIT SIGNALS FOR FEEVENTA ---
@@ -301,7 +287,7 @@ def audit_delete_feeventa(sender, instance, **kwargs):
     """audit_delete_feeventa."""
     if are_signals_blocked():
         return
-    crear_audit_log(
+    AuditPipeline.registrar(
         modelo="FeeVenta",
         object_id=instance.pk,
         accion=AuditLog.Accion.DELETE,
@@ -310,25 +296,14 @@ def audit_delete_feeventa(sender, instance, **kwargs):
     )
 
 
-@receiver(pre_save, sender="bookings.FeeVenta")
-def audit_pre_save_feeventa(sender, instance, **kwargs):
-    """audit_pre_save_feeventa."""
-    if are_signals_blocked():
-        return
-    if instance.pk:
-        try:
-            instance._pre_save_instance = sender.objects.get(pk=instance.pk)
-        except sender.DoesNotExist:
-            instance._pre_save_instance = None
-
-
 @receiver(post_save, sender="bookings.FeeVenta")
 def audit_post_save_feeventa(sender, instance, created, **kwargs):
     """audit_post_save_feeventa."""
+    diff = _cambios(instance, created)
     if are_signals_blocked():
         return
     if created:
-        crear_audit_log(
+        AuditPipeline.registrar(
             modelo="FeeVenta",
             object_id=instance.pk,
             accion=AuditLog.Accion.CREATE,
@@ -340,18 +315,16 @@ def audit_post_save_feeventa(sender, instance, created, **kwargs):
                 "tipo_fee": instance.tipo_fee,
             },
         )
-    elif hasattr(instance, "_pre_save_instance") and instance._pre_save_instance:
-        diff = _calcular_diff(instance._pre_save_instance, instance)
-        if diff:
-            crear_audit_log(
-                modelo="FeeVenta",
-                object_id=instance.pk,
-                accion=AuditLog.Accion.UPDATE,
-                venta=instance.venta,
-                descripcion=f"Actualizacion de FeeVenta {instance.pk}",
-                datos_previos={k: v["old"] for k, v in diff.items()},
-                datos_nuevos={k: v["new"] for k, v in diff.items()},
-            )
+    elif diff:
+        AuditPipeline.registrar(
+            modelo="FeeVenta",
+            object_id=instance.pk,
+            accion=AuditLog.Accion.UPDATE,
+            venta=instance.venta,
+            descripcion=f"Actualizacion de FeeVenta {instance.pk}",
+            datos_previos={k: v["old"] for k, v in diff.items()},
+            datos_nuevos={k: v["new"] for k, v in diff.items()},
+        )
 
 
 # --- AUDIT SIGNALS FOR CLIENTE (CRM) ---
@@ -360,7 +333,7 @@ def audit_delete_cliente(sender, instance, **kwargs):
     """audit_delete_cliente."""
     if are_signals_blocked():
         return
-    crear_audit_log(
+    AuditPipeline.registrar(
         modelo="Cliente",
         object_id=instance.pk,
         accion=AuditLog.Accion.DELETE,
@@ -369,42 +342,29 @@ def audit_delete_cliente(sender, instance, **kwargs):
     )
 
 
-@receiver(pre_save, sender="crm.Cliente")
-def audit_pre_save_cliente(sender, instance, **kwargs):
-    """audit_pre_save_cliente."""
-    if are_signals_blocked():
-        return
-    if instance.pk:
-        try:
-            instance._pre_save_instance = sender.objects.get(pk=instance.pk)
-        except sender.DoesNotExist:
-            instance._pre_save_instance = None
-
-
 @receiver(post_save, sender="crm.Cliente")
 def audit_post_save_cliente(sender, instance, created, **kwargs):
     """audit_post_save_cliente."""
+    diff = _cambios(instance, created)
     if are_signals_blocked():
         return
     if created:
-        crear_audit_log(
+        AuditPipeline.registrar(
             modelo="Cliente",
             object_id=instance.pk,
             accion=AuditLog.Accion.CREATE,
             descripcion=f"Creacion de Cliente {instance.get_nombre_completo()}",
             datos_nuevos={"id": instance.pk, "nombre": instance.get_nombre_completo()},
         )
-    elif hasattr(instance, "_pre_save_instance") and instance._pre_save_instance:
-        diff = _calcular_diff(instance._pre_save_instance, instance)
-        if diff:
-            crear_audit_log(
-                modelo="Cliente",
-                object_id=instance.pk,
-                accion=AuditLog.Accion.UPDATE,
-                descripcion=f"Actualizacion de Cliente {instance.get_nombre_completo()}",
-                datos_previos={k: v["old"] for k, v in diff.items()},
-                datos_nuevos={k: v["new"] for k, v in diff.items()},
-            )
+    elif diff:
+        AuditPipeline.registrar(
+            modelo="Cliente",
+            object_id=instance.pk,
+            accion=AuditLog.Accion.UPDATE,
+            descripcion=f"Actualizacion de Cliente {instance.get_nombre_completo()}",
+            datos_previos={k: v["old"] for k, v in diff.items()},
+            datos_nuevos={k: v["new"] for k, v in diff.items()},
+        )
 
 
 # --- AUDIT SIGNALS FOR PROVEEDOR (BOOKINGS) ---
@@ -413,7 +373,7 @@ def audit_delete_proveedor(sender, instance, **kwargs):
     """audit_delete_proveedor."""
     if are_signals_blocked():
         return
-    crear_audit_log(
+    AuditPipeline.registrar(
         modelo="Proveedor",
         object_id=instance.pk,
         accion=AuditLog.Accion.DELETE,
@@ -422,39 +382,26 @@ def audit_delete_proveedor(sender, instance, **kwargs):
     )
 
 
-@receiver(pre_save, sender="bookings.Proveedor")
-def audit_pre_save_proveedor(sender, instance, **kwargs):
-    """audit_pre_save_proveedor."""
-    if are_signals_blocked():
-        return
-    if instance.pk:
-        try:
-            instance._pre_save_instance = sender.objects.get(pk=instance.pk)
-        except sender.DoesNotExist:
-            instance._pre_save_instance = None
-
-
 @receiver(post_save, sender="bookings.Proveedor")
 def audit_post_save_proveedor(sender, instance, created, **kwargs):
     """audit_post_save_proveedor."""
+    diff = _cambios(instance, created)
     if are_signals_blocked():
         return
     if created:
-        crear_audit_log(
+        AuditPipeline.registrar(
             modelo="Proveedor",
             object_id=instance.pk,
             accion=AuditLog.Accion.CREATE,
             descripcion=f"Creacion de Proveedor {instance.nombre}",
             datos_nuevos={"id": instance.pk, "nombre": instance.nombre},
         )
-    elif hasattr(instance, "_pre_save_instance") and instance._pre_save_instance:
-        diff = _calcular_diff(instance._pre_save_instance, instance)
-        if diff:
-            crear_audit_log(
-                modelo="Proveedor",
-                object_id=instance.pk,
-                accion=AuditLog.Accion.UPDATE,
-                descripcion=f"Actualizacion de Proveedor {instance.nombre}",
-                datos_previos={k: v["old"] for k, v in diff.items()},
-                datos_nuevos={k: v["new"] for k, v in diff.items()},
-            )
+    elif diff:
+        AuditPipeline.registrar(
+            modelo="Proveedor",
+            object_id=instance.pk,
+            accion=AuditLog.Accion.UPDATE,
+            descripcion=f"Actualizacion de Proveedor {instance.nombre}",
+            datos_previos={k: v["old"] for k, v in diff.items()},
+            datos_nuevos={k: v["new"] for k, v in diff.items()},
+        )
@@ -79,3 +79,69 @@ def test_multitenant_domain_middleware_unregistered_domain():
     with pytest.raises(Http404):
         request = factory.get("/", HTTP_HOST="dominio-no-registrado.com")
         middleware(request)
+
+
+@pytest.fixture
+def tenant_cache():
+    """tenant_cache."""
+    from django.core.cache import cache
+
+    from core.services.tenant_host_cache import tenant_host_cache
+
+    cache.clear()
+    tenant_host_cache.clear_local()
+    tenant_host_cache.reset_stats()
+    yield tenant_host_cache
+    cache.clear()
+    tenant_host_cache.clear_local()
+
+
+@pytest.mark.django_db
+@override_settings(ALLOWED_HOSTS=["*"])
+def test_multitenant_domain_middleware_cachea_resolucion(
+    agencia, tenant_cache, django_assert_num_queries
+):
+    """test_multitenant_domain_middleware_cachea_resolucion."""
+    agencia.dominio_personalizado = "viajes.humboldt.com"
+    agencia.save()
+    factory = RequestFactory()
+    middleware = MultiTenantDomainMiddleware(mock_get_response)
+
+    middleware(factory.get("/", HTTP_HOST="viajes.humboldt.com"))
+    with django_assert_num_queries(0):
+        request = factory.get("/", HTTP_HOST="viajes.humboldt.com")
+        middleware(request)
+    assert request.agencia == agencia
+
+    # Hosts desconocidos: se rechazan desde cache en la segunda solicitud.
+    for _ in range(2):
+        with pytest.raises(Http404):
+            middleware(factory.get("/", HTTP_HOST="desconocido.com"))
+
+    stats = tenant_cache.get_stats()
+    assert stats["misses"] == 2
+    assert stats["local_hits"] == 2
+    assert stats["negative_hits"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+@pytest.mark.django_db
+@override_settings(ALLOWED_HOSTS=["*"])
+def test_multitenant_domain_middleware_invalida_al_guardar(agencia, tenant_cache):
+    """test_multitenant_domain_middleware_invalida_al_guardar."""
+    agencia.dominio_personalizado = "viajes.humboldt.com"
+    agencia.save()
+    factory = RequestFactory()
+    middleware = MultiTenantDomainMiddleware(mock_get_response)
+    middleware(factory.get("/", HTTP_HOST="viajes.humboldt.com"))
+
+    agencia.activa = False
+    agencia.save()
+    with pytest.raises(Http404):
+        middleware(factory.get("/", HTTP_HOST="viajes.humboldt.com"))
+
+    # Otro proceso: solo ve la nueva versión compartida (su LRU local quedó vieja).
+    from core.services.tenant_host_cache import TenantHostCache
+
+    other = TenantHostCache()
+    assert other.resolve("viajes.humboldt.com", lambda host: None) is None
@@ -26,7 +26,7 @@ from apps.finance.views.facturacion_views import (
 from apps.marketing.views.marketing_views import MarketingHubView
 from core.api.hotel_api import HotelQuoteAPI
 from core.dashboard_stats import get_dashboard_stats as dashboard_stats_api
-from core.metrics import health_metrics_view
+from core.metrics import health_metrics_view, slow_requests_view
 from core.middleware import csp_report_view
 from core.views import reportes_views
 from core.views.analytics import dashboard_views, finance_analytics, ops_analytics, sales_analytics
@@ -252,6 +252,7 @@ urlpatterns = [
     # --- INFRAESTRUCTURA Y SALUD ---
     path("health/", health_views.health_check, name="health_check"),
     path("health/metrics/", health_metrics_view, name="health_metrics"),
+    path("health/slow-requests/", slow_requests_view, name="health_slow_requests"),
     path("csp-report/", csp_report_view, name="csp_report"),
     # --- DOCUMENTACIÓN API ---
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
@@ -1,6 +1,6 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Count, Q
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.utils.decorators import method_decorator
@@ -313,14 +313,40 @@ class ExportarBoletosExcelView(SaaSMixin, LoginRequiredMixin, View):
         fecha_fin = request.GET.get("fecha_fin")
         aerolinea = request.GET.get("aerolinea")
 
-        excel_file = AnalyticsService.exportar_reporte_boletos_excel(
-            agencia=agencia, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, aerolinea=aerolinea
-        )
-
-        filename = f"reporte_boletos_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        response = HttpResponse(
-            excel_file.getvalue(),
+        filtros = {
+            "agencia": agencia,
+            "fecha_inicio": fecha_inicio,
+            "fecha_fin": fecha_fin,
+            "aerolinea": aerolinea,
+        }
+        nombre = f"reporte_boletos_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
+        formato = request.GET.get("formato", "xlsx").lower()
+
+        if formato == "parquet":
+            try:
+                archivo = AnalyticsService.exportar_reporte_boletos_parquet(**filtros)
+                return FileResponse(
+                    archivo,
+                    as_attachment=True,
+                    filename=f"{nombre}.parquet",
+                    content_type="application/vnd.apache.parquet",
+                )
+            except ImportError:
+                # Fallback a CSV si pyarrow no está instalado
+                formato = "csv"
+
+        if formato == "csv":
+            response = StreamingHttpResponse(
+                AnalyticsService.exportar_reporte_boletos_csv(**filtros),
+                content_type="text/csv; charset=utf-8",
+            )
+            response["Content-Disposition"] = f'attachment; filename="{nombre}.csv"'
+            return response
+
+        archivo = AnalyticsService.exportar_reporte_boletos_excel(**filtros)
+        return FileResponse(
+            archivo,
+            as_attachment=True,
+            filename=f"{nombre}.xlsx",
             content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        return response
@@ -0,0 +1,88 @@
+import hashlib
+import io
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+
+from apps.automation.parsers.extraction import ExtractionResult, ExtractionService
+
+pytestmark = [pytest.mark.unit]
+
+EML = (
+    b"Subject: Boleto KIU\r\n"
+    b"From: tickets@kiusys.com\r\n"
+    b"To: agencia@example.com\r\n"
+    b"MIME-Version: 1.0\r\n"
+    b"Content-Type: text/html; charset=utf-8\r\n"
+    b"\r\n"
+    b"<html><body><p>PASSENGER ITINERARY RECEIPT</p><p>NAME/NOMBRE: PEREZ/JUAN</p></body></html>"
+)
+
+
+class FakeFieldFile:
+    """Simula ``boleto.archivo_boleto`` y cuenta las aperturas del storage."""
+
+    def __init__(self, name, content):
+        self.name = name
+        self.content = content
+        self.opens = 0
+
+    def __bool__(self):
+        return bool(self.name)
+
+    def open(self, mode="rb"):
+        """open."""
+        self.opens += 1
+        return io.BytesIO(self.content)
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class TestExtractionService:
+    """TestExtractionService."""
+
+    def test_una_lectura_produce_texto_html_cabeceras_y_huella(self):
+        """test_una_lectura_produce_texto_html_cabeceras_y_huella."""
+        result = ExtractionService.extract(io.BytesIO(EML), "boleto.eml")
+
+        assert "PASSENGER ITINERARY RECEIPT" in result.text
+        assert result.headers["Subject"] == "Boleto KIU"
+        assert result.headers["From"] == "tickets@kiusys.com"
+        assert result.html.startswith("--- HEADERS START ---")
+        assert "<p>NAME/NOMBRE: PEREZ/JUAN</p>" in result.html
+        assert result.page_count == 0
+        assert result.fingerprint == hashlib.sha256(result.text.encode("utf-8")).hexdigest()
+
+    def test_texto_plano_sin_html(self):
+        """test_texto_plano_sin_html."""
+        result = ExtractionService.extract(io.BytesIO(b"KIUSYS ticket"), "boleto.txt")
+        assert result.text == "KIUSYS ticket"
+        assert result.html == "" and result.headers == {}
+
+    def test_archivo_vacio(self):
+        """test_archivo_vacio."""
+        result = ExtractionService.extract(None, "")
+        assert isinstance(result, ExtractionResult)
+        assert not result.text and result.fingerprint == ""
+
+    def test_extract_boleto_memoiza_por_boleto(self):
+        """test_extract_boleto_memoiza_por_boleto."""
+        archivo = FakeFieldFile("boletos/kiu_123.eml", EML)
+        boleto = SimpleNamespace(pk=123, archivo_boleto=archivo)
+
+        first = ExtractionService.extract_boleto(boleto)
+        second = ExtractionService.extract_boleto(boleto)
+
+        assert archivo.opens == 1
+        assert second == first
+
+        # Un archivo nuevo (nombre distinto) invalida la memoización.
+        boleto.archivo_boleto = FakeFieldFile("boletos/kiu_123_v2.eml", EML)
+        ExtractionService.extract_boleto(boleto)
+        assert boleto.archivo_boleto.opens == 1
@@ -1,8 +1,33 @@
 from apps.automation.parsers.amadeus_parser import AmadeusParser
+from apps.automation.parsers.base_parser import BaseTicketParser
 from apps.automation.parsers.kiu_parser import KIUParser
 from apps.automation.parsers.registry import ParserRegistry
 
 
+class CatchAllParser(BaseTicketParser):
+    """Parser sin firmas de detección (como GeminiParser)."""
+
+    def can_parse(self, text):
+        """can_parse."""
+        return bool(text)
+
+    def parse(self, text, html_text=""):
+        """parse."""
+        return None
+
+
+def _spy_can_parse(monkeypatch, parser):
+    calls = []
+    original = parser.can_parse
+
+    def spy(text):
+        calls.append(text)
+        return original(text)
+
+    monkeypatch.setattr(parser, "can_parse", spy)
+    return calls
+
+
 class TestParserRegistry:
     """Tests para registro de parsers"""
 
@@ -51,3 +76,73 @@ class TestParserRegistry:
 
         registry.clear()
         assert len(registry.get_all_parsers()) == 0
+
+
+class TestSignatureIndex:
+    """Detección por índice de firmas: mismo resultado que recorrer can_parse() en orden."""
+
+    TEXTS = [
+        "KIUSYS.COM ITINERARY RECEIPT",
+        "<b>PASSENGER</b>&nbsp;ITINERARY\nRECEIPT",
+        "ISSUE AGENT/AGENTE EMISOR: X  FROM/TO CCS MIA",
+        "ISSUE AGENT/AGENTE EMISOR: X",
+        "Recibo de boleto electrónico AVIANCA",
+        "Recibo de boleto electrónico COPA",
+        "ELECTRONIC TICKET RECEIPT\nBOOKING REF: XYZ789",
+        "booking reference :   abc123 checkmytrip",
+        "Random text without markers",
+        "",
+    ]
+
+    def _registry(self):
+        registry = ParserRegistry()
+        for parser in (KIUParser(), AmadeusParser(), CatchAllParser()):
+            registry.register(parser)
+        return registry
+
+    def test_equivale_al_recorrido_secuencial(self):
+        """test_equivale_al_recorrido_secuencial."""
+        registry = self._registry()
+        parsers = registry.get_all_parsers()
+        for text in self.TEXTS:
+            expected = next((p for p in parsers if p.can_parse(text)), None)
+            assert registry.find_parser(text) is expected, text
+
+    def test_firma_suficiente_no_llama_can_parse(self, monkeypatch):
+        """test_firma_suficiente_no_llama_can_parse."""
+        registry = self._registry()
+        kiu, amadeus, catch_all = registry.get_all_parsers()
+        calls = [_spy_can_parse(monkeypatch, p) for p in (kiu, amadeus, catch_all)]
+
+        assert registry.find_parser("Checkmytrip BOOKING REF: XYZ789") is amadeus
+        assert calls == [[], [], []]
+
+    def test_hint_confirma_con_can_parse(self, monkeypatch):
+        """test_hint_confirma_con_can_parse."""
+        registry = self._registry()
+        kiu, _amadeus, catch_all = registry.get_all_parsers()
+        kiu_calls = _spy_can_parse(monkeypatch, kiu)
+
+        assert registry.find_parser("ISSUE AGENT/AGENTE EMISOR: X") is catch_all
+        assert len(kiu_calls) == 1
+
+    def test_candidatos_y_metricas(self):
+        """test_candidatos_y_metricas."""
+        registry = self._registry()
+        kiu, amadeus, catch_all = registry.get_all_parsers()
+        text = "KIU ... BOOKING REF: XYZ789"
+
+        assert registry.rank_candidates(text) == [kiu, amadeus, catch_all]
+        assert registry.rank_candidates("sin firmas") == [catch_all]
+
+        registry.find_parser(text)
+        registry.find_parser("sin firmas")
+        stats = registry.get_detection_stats()
+        assert stats["_index"]["checks"] == 2
+        assert stats["KIUParser"]["index_matches"] == 1
+        assert stats["KIUParser"]["checks"] == 0
+        assert stats["CatchAllParser"]["checks"] == 1
+        assert "AmadeusParser" not in stats
+
+        registry.reset_detection_stats()
+        assert registry.get_detection_stats() == {}
@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+from apps.automation.management.commands.benchmark_pdf_extraction import (
+    build_report_pdf,
+    legacy_extract_from_pdf,
+)
+from apps.automation.parsers.text_extraction import TextExtractionService
+
+pytestmark = [pytest.mark.unit]
+
+fitz = pytest.importorskip("fitz")
+
+
+@pytest.fixture
+def report_pdf(tmp_path):
+    path = tmp_path / "reporte.pdf"
+    build_report_pdf(str(path), pages=20, lines=5)
+    return path
+
+
+class TestTextExtractionService:
+    """TestTextExtractionService."""
+
+    def test_streaming_equivale_a_la_extraccion_anterior(self, report_pdf):
+        """test_streaming_equivale_a_la_extraccion_anterior."""
+        with open(report_pdf, "rb") as f:
+            expected = legacy_extract_from_pdf(f)
+
+        pages = list(TextExtractionService.iter_pdf_pages(report_pdf, parallel_min_pages=1000))
+        assert len(pages) == 20
+        assert "PAG 1\n" in pages[0] and "PAG 20\n" in pages[19]
+
+        # Archivo sin ruta local (storage remoto): se copia a un temporal.
+        remote = io.BytesIO(report_pdf.read_bytes())
+        assert TextExtractionService.extract_from_pdf(remote) == expected
+
+    def test_pool_de_procesos_preserva_el_orden(self, report_pdf):
+        """test_pool_de_procesos_preserva_el_orden."""
+        serial = list(TextExtractionService.iter_pdf_pages(report_pdf, parallel_min_pages=1000))
+        parallel = list(
+            TextExtractionService.iter_pdf_pages(report_pdf, parallel_min_pages=1, max_workers=2)
+        )
+        assert parallel == serial
+
+    def test_corte_temprano(self, report_pdf):
+        """test_corte_temprano."""
+        seen = []
+
+        def until(page_text):
+            seen.append(page_text)
+            return "PAG 3\n" in page_text
+
+        with open(report_pdf, "rb") as f:
+            text = TextExtractionService.extract_from_pdf(f, until=until)
+
+        assert len(seen) == 3
+        assert "PAG 3\n" in text and "PAG 4\n" not in text
+
+    def test_pdf_corrupto_retorna_vacio(self):
+        """test_pdf_corrupto_retorna_vacio."""
+        assert TextExtractionService.extract_from_pdf(io.BytesIO(b"no es un pdf")) == ""
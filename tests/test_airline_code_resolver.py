@@ -0,0 +1,100 @@
+import pytest
+from django.core.management import call_command
+
+from apps.automation.parsers.airline_utils import AirlineCodeResolver, normalizar_nombre_aerolinea
+from apps.bookings.models import BoletoImportado
+from apps.common.models import Aerolinea
+from apps.common.services.analytics_service import AnalyticsService
+from core.middleware import agency_context
+from core.models import Agencia
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+@pytest.fixture(autouse=True)
+def _aislamiento():
+    AirlineCodeResolver.invalidate()
+    # Otros tests pueden dejar agency_var asignado.
+    with agency_context(None):
+        yield
+    AirlineCodeResolver.invalidate()
+
+
+@pytest.fixture
+def agencia():
+    return Agencia.objects.create(nombre="Agencia IATA", email_principal="iata@example.com")
+
+
+class TestAirlineCodeResolver:
+    """TestAirlineCodeResolver."""
+
+    @pytest.mark.parametrize(
+        ("numero", "nombre", "datos", "esperado"),
+        [
+            ("742-2101234567", "CUALQUIERA", None, "9V"),
+            (None, "Aviones de Oriente, C.A.", None, "9V"),
+            (None, "Rutas Aéreas de Venezuela RAVSA", None, "WW"),
+            (None, "SKY ATLANTIC TRAVEL", None, "T7"),
+            (None, "ATLANTIC ISLAND TRAVEL", None, None),
+            (None, None, {"segmentos": [{"vuelo": "5R300"}]}, "5R"),
+            (None, None, '{"segmentos": [{"vuelo": "CM 221"}]}', "CM"),
+            ("999", "", {}, None),
+        ],
+    )
+    def test_fuentes_sin_catalogo(self, numero, nombre, datos, esperado):
+        """test_fuentes_sin_catalogo."""
+        assert AirlineCodeResolver.resolve(numero, nombre, datos) == esperado
+
+    def test_catalogo_placa_y_nombre(self, django_assert_num_queries):
+        """test_catalogo_placa_y_nombre."""
+        Aerolinea.objects.create(nombre="Sky Blue Airways", codigo_iata="SB", codigo_numerico="555")
+
+        with django_assert_num_queries(1):
+            assert AirlineCodeResolver.resolve("5551234567890") == "SB"
+            assert AirlineCodeResolver.resolve(None, "SKY BLUE AIRWAYS") == "SB"
+            # Las placas curadas prevalecen sobre el catálogo.
+            assert AirlineCodeResolver.resolve("7420000000000") == "9V"
+
+        Aerolinea.objects.filter(codigo_iata="SB").update(codigo_numerico="556")
+        Aerolinea.objects.get(codigo_iata="SB").save()  # post_save invalida el índice
+        assert AirlineCodeResolver.resolve("5561234567890") == "SB"
+
+    def test_normalizacion(self):
+        """test_normalizacion."""
+        assert (
+            normalizar_nombre_aerolinea(" Aerolíneas  Estelar, C.A. ") == "AEROLINEAS ESTELAR C A"
+        )
+
+
+class TestAerolineaCodigoPersistido:
+    """TestAerolineaCodigoPersistido."""
+
+    def test_save_resuelve_y_reporte_lo_usa(self, agencia):
+        """test_save_resuelve_y_reporte_lo_usa."""
+        boleto = BoletoImportado.objects.create(
+            agencia=agencia, numero_boleto="1342101234567", aerolinea_emisora="AVIANCA"
+        )
+        assert boleto.aerolinea_codigo == "AV"
+
+        reporte = AnalyticsService.get_reporte_comisiones_boletos(agencia)
+        assert reporte["boletos"][0]["aerolinea_codigo"] == "AV"
+
+    def test_backfill(self, agencia):
+        """test_backfill."""
+        BoletoImportado.all_objects.bulk_create(
+            [
+                BoletoImportado(agencia=agencia, numero_boleto="2352101234567"),
+                BoletoImportado(agencia=agencia, aerolinea_emisora="DESCONOCIDA"),
+                BoletoImportado(agencia=agencia, aerolinea_emisora="LASER", aerolinea_codigo="XX"),
+            ]
+        )
+
+        call_command("backfill_aerolinea_codigo", chunk_size=1)
+
+        codigos = list(
+            BoletoImportado.all_objects.order_by("pk").values_list("aerolinea_codigo", flat=True)
+        )
+        assert codigos == ["TK", "", "XX"]
+
+        call_command("backfill_aerolinea_codigo", todos=True)
+        assert BoletoImportado.all_objects.order_by("pk").last().aerolinea_codigo == "QL"
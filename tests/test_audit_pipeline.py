@@ -0,0 +1,139 @@
+from unittest.mock import patch
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.common.utils import verify_audit_chain
+from apps.crm.models import Cliente
+from core.middleware import agency_context
+from core.models import Agencia
+from core.models.audit import GENESIS_HASH, AuditLog, bloquear_cadena
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+def _logs(**filtros):
+    return list(AuditLog.objects.filter(modelo="Cliente", **filtros).order_by("id_audit_log"))
+
+
+class TestAuditPipeline:
+    """TestAuditPipeline."""
+
+    def test_eventos_se_escriben_en_lote_al_confirmar(self, django_capture_on_commit_callbacks):
+        """test_eventos_se_escriben_en_lote_al_confirmar."""
+        agencia = Agencia.objects.create(nombre="Agencia Audit", email_principal="a@example.com")
+        with agency_context(agencia):
+            with django_capture_on_commit_callbacks() as callbacks:
+                with transaction.atomic():
+                    clientes = [Cliente.objects.create(nombres=f"Cliente {i}") for i in range(3)]
+                    assert not _logs()
+            # Un único on_commit por transacción, sin importar cuántos eventos.
+            assert len(callbacks) == 1
+            callbacks[0]()
+
+        logs = _logs()
+        assert [log.object_id for log in logs] == [str(c.pk) for c in clientes]
+        assert {log.cadena for log in logs} == {f"agencia:{agencia.pk}"}
+        assert logs[0].previous_hash == GENESIS_HASH
+        assert [log.previous_hash for log in logs[1:]] == [log.record_hash for log in logs[:-1]]
+
+    def test_update_usa_snapshot_sin_releer_la_fila(self, django_capture_on_commit_callbacks):
+        """test_update_usa_snapshot_sin_releer_la_fila."""
+        with django_capture_on_commit_callbacks(execute=True):
+            cliente = Cliente.objects.create(nombres="Ana", email="ana@example.com")
+        cliente.email = "ana@nuevo.com"
+
+        with CaptureQueriesContext(connection) as ctx:
+            with django_capture_on_commit_callbacks(execute=True):
+                cliente.save()
+        assert not [
+            q for q in ctx.captured_queries if "SELECT" in q["sql"] and "crm_cliente" in q["sql"]
+        ]
+
+        update = _logs(accion=AuditLog.Accion.UPDATE)
+        assert len(update) == 1
+        assert update[0].datos_previos == {"email": "ana@example.com"}
+        assert update[0].datos_nuevos == {"email": "ana@nuevo.com"}
+
+        # Guardar sin cambios no genera evento: el snapshot se renovó tras el save.
+        with django_capture_on_commit_callbacks(execute=True):
+            cliente.save()
+        assert len(_logs(accion=AuditLog.Accion.UPDATE)) == 1
+
+    def test_rollback_descarta_eventos(self, django_capture_on_commit_callbacks):
+        """test_rollback_descarta_eventos."""
+        with django_capture_on_commit_callbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Cliente.objects.create(nombres="Fantasma")
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+        assert not _logs()
+
+    def test_savepoint_revertido_descarta_solo_sus_eventos(
+        self, django_capture_on_commit_callbacks
+    ):
+        """test_savepoint_revertido_descarta_solo_sus_eventos."""
+        with django_capture_on_commit_callbacks(execute=True):
+            with transaction.atomic():
+                antes = Cliente.objects.create(nombres="Antes")
+                try:
+                    with transaction.atomic():
+                        Cliente.objects.create(nombres="Fantasma")
+                        raise RuntimeError("rollback del savepoint")
+                except RuntimeError:
+                    pass
+                despues = Cliente.objects.create(nombres="Después")
+
+        logs = _logs(accion=AuditLog.Accion.CREATE)
+        assert [log.object_id for log in logs] == [str(antes.pk), str(despues.pk)]
+        assert logs[1].previous_hash == logs[0].record_hash
+        assert verify_audit_chain() == (True, None, None)
+
+    def test_cadenas_por_agencia_se_verifican_por_separado(
+        self, django_capture_on_commit_callbacks
+    ):
+        """test_cadenas_por_agencia_se_verifican_por_separado."""
+        agencias = [
+            Agencia.objects.create(nombre=f"Agencia {i}", email_principal=f"ag{i}@example.com")
+            for i in range(2)
+        ]
+        for agencia in agencias + agencias:
+            with agency_context(agencia), django_capture_on_commit_callbacks(execute=True):
+                Cliente.objects.create(nombres=f"Cliente {agencia.pk}")
+
+        assert verify_audit_chain() == (True, None, None)
+        primera, segunda = (_logs(cadena=f"agencia:{a.pk}") for a in agencias)
+        assert len(primera) == len(segunda) == 2
+        assert primera[0].previous_hash == segunda[0].previous_hash == GENESIS_HASH
+
+        AuditLog.objects.filter(pk=segunda[1].pk).update(descripcion="alterado")
+        assert verify_audit_chain(cadena=f"agencia:{agencias[0].pk}") == (True, None, None)
+        assert verify_audit_chain() == (False, segunda[1].pk, "record_hash mismatch")
+
+    def test_cadena_vacia_se_serializa_con_advisory_lock(self):
+        """test_cadena_vacia_se_serializa_con_advisory_lock."""
+        cadena = "agencia:999999"
+        assert not AuditLog.objects.filter(cadena=cadena).exists()
+        bloqueos = []
+
+        def interceptar(execute, sql, params, many, context):
+            # El motor de pruebas no es PostgreSQL: se registra el lock sin ejecutarlo.
+            if "pg_advisory_xact_lock" in sql:
+                bloqueos.append(params)
+                return None
+            return execute(sql, params, many, context)
+
+        with (
+            transaction.atomic(),
+            patch.object(connection, "vendor", "postgresql"),
+            connection.execute_wrapper(interceptar),
+        ):
+            bloquear_cadena(cadena)
+            bloquear_cadena("global")
+
+        # Se bloquea la cadena aunque no tenga registros todavía: dos primeros
+        # escritores concurrentes se serializan en lugar de partir ambos del génesis.
+        assert bloqueos == [["audit:agencia:999999"], ["audit:global"]]
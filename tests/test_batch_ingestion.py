@@ -0,0 +1,153 @@
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.automation.services.batch_ingestion import BatchTicketIngestionService
+from apps.automation.services.ticket_parser_service import TicketParserService
+from apps.bookings.models import BoletoImportado
+from core.models import Agencia
+
+
+def _boleto(agencia, estado="PEN", archivo="boletos/kiu.eml", **kwargs):
+    boleto = BoletoImportado(
+        archivo_boleto=archivo, agencia=agencia, estado_parseo=estado, **kwargs
+    )
+    boleto._skip_auto_parse = True
+    boleto.save()
+    return boleto
+
+
+def _fake_parse(self, boleto, bypass_cache=False, persist_log=True):
+    assert persist_log is False
+    if "roto" in boleto.archivo_boleto.name:
+        return None, "Archivo vacío o ilegible."
+    boleto.log_parseo = f"{boleto.log_parseo} | Regex/GDS local exitoso (completo)."
+    return {"pnr": f"PNR{boleto.pk}", "passenger_name": "PEREZ/JUAN"}, None
+
+
+@pytest.fixture
+def agencia(db):
+    return Agencia.objects.create(nombre="Agencia Lote", email_principal="lote@agency.com")
+
+
+@pytest.mark.django_db
+class TestBatchTicketIngestion:
+    """TestBatchTicketIngestion."""
+
+    def test_claim_reclama_solo_pendientes_y_respeta_limite(self, agencia):
+        """test_claim_reclama_solo_pendientes_y_respeta_limite."""
+        pendientes = [_boleto(agencia) for _ in range(3)] + [_boleto(agencia, estado="QUE")]
+        _boleto(agencia, estado="COM")
+        _boleto(agencia, archivo="")
+        _boleto(agencia, is_deleted=True)
+
+        first = BatchTicketIngestionService.claim(agencia, limit=3)
+        second = BatchTicketIngestionService.claim(agencia, limit=3)
+
+        assert len(first) == 3 and len(second) == 1
+        assert set(first + second) == {b.pk for b in pendientes}
+        assert BatchTicketIngestionService.claim(agencia, limit=3) == []
+        estados = set(
+            BoletoImportado.all_objects.filter(pk__in=first + second).values_list(
+                "estado_parseo", flat=True
+            )
+        )
+        assert estados == {"PRO"}
+
+    def test_ingest_persiste_el_lote_con_escrituras_constantes(self, agencia):
+        """test_ingest_persiste_el_lote_con_escrituras_constantes."""
+        ok = [_boleto(agencia) for _ in range(5)]
+        roto = _boleto(agencia, archivo="boletos/roto.eml")
+
+        with (
+            patch.object(TicketParserService, "_parse_boleto", _fake_parse),
+            CaptureQueriesContext(connection) as queries,
+        ):
+            report = BatchTicketIngestionService.ingest(agencia, max_workers=1, dispatch=False)
+
+        updates = [q for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        assert len(updates) == 2  # reclamo + bulk_update, independiente del tamaño del lote
+        assert (report.claimed, report.parsed, report.failed) == (6, 5, 1)
+        assert report.throughput > 0
+
+        boleto = BoletoImportado.all_objects.get(pk=ok[0].pk)
+        assert boleto.datos_parseados["pnr"] == f"PNR{boleto.pk}"
+        assert boleto.estado_parseo == "PRO"
+        assert "Regex/GDS local exitoso" in boleto.log_parseo
+        roto.refresh_from_db()
+        assert roto.estado_parseo == "REV"
+        assert "Archivo vacío o ilegible." in roto.log_parseo
+
+    def test_dispatch_en_linea_reutiliza_datos_parseados(self, agencia):
+        """test_dispatch_en_linea_reutiliza_datos_parseados."""
+        boleto = _boleto(agencia)
+
+        with (
+            patch.object(TicketParserService, "_parse_boleto", _fake_parse),
+            patch("apps.common.utils.celery_utils._is_celery_available", return_value=False),
+            patch.object(TicketParserService, "procesar_boleto") as procesar,
+        ):
+            report = BatchTicketIngestionService.ingest(agencia, max_workers=1)
+
+        assert report.dispatched == 1
+        procesar.assert_called_once_with(boleto.pk, ignore_manual=False)
+
+    def test_dispatch_en_linea_procesa_grupos_multi_pax_sin_quedar_en_pro(self, agencia):
+        """test_dispatch_en_linea_procesa_grupos_multi_pax_sin_quedar_en_pro."""
+        boleto = _boleto(agencia)
+        tickets = [
+            {"pnr": "GRUPO1", "passenger_name": "PEREZ/JUAN", "ticket_number": "111"},
+            {"pnr": "GRUPO1", "passenger_name": "PEREZ/ANA", "ticket_number": "222"},
+        ]
+
+        def fake_parse(self, boleto, bypass_cache=False, persist_log=True):
+            assert persist_log is False  # el pipeline no vuelve a parsear
+            return {"is_multi_pax": True, "tickets": tickets}, None
+
+        def fake_single(self, boleto, datos, forced_client_id=None, manual_only=False):
+            procesados.append((boleto.pk, datos["passenger_name"]))
+            BoletoImportado.all_objects.filter(pk=boleto.pk).update(estado_parseo="COM")
+            return f"venta-{boleto.pk}"
+
+        procesados = []
+        with (
+            patch.object(TicketParserService, "_parse_boleto", fake_parse),
+            patch.object(TicketParserService, "_process_single_ticket", fake_single),
+            patch("apps.common.utils.celery_utils._is_celery_available", return_value=False),
+        ):
+            report = BatchTicketIngestionService.ingest(agencia, max_workers=1)
+
+        assert (report.parsed, report.dispatched) == (1, 1)
+        assert len(procesados) == 2
+        assert procesados[0] == (boleto.pk, "JUAN PEREZ")
+        assert procesados[1][1] == "ANA PEREZ"
+        boleto.refresh_from_db()
+        assert boleto.estado_parseo == "COM"
+        assert boleto.splits_transito.filter(procesado=True).count() == 2
+
+    def test_dispatch_en_linea_reutiliza_salida_de_la_ia(self, agencia):
+        """test_dispatch_en_linea_reutiliza_salida_de_la_ia."""
+        boleto = _boleto(agencia)
+
+        def fake_parse(self, boleto, bypass_cache=False, persist_log=True):
+            assert persist_log is False  # el pipeline no vuelve a parsear
+            return {"CODIGO_RESERVA": "IAPNR1", "NOMBRE_DEL_PASAJERO": "PEREZ/JUAN"}, None
+
+        def fake_single(self, boleto, datos, forced_client_id=None, manual_only=False):
+            procesados.append((boleto.pk, datos["pnr"]))
+            BoletoImportado.all_objects.filter(pk=boleto.pk).update(estado_parseo="COM")
+            return f"venta-{boleto.pk}"
+
+        procesados = []
+        with (
+            patch.object(TicketParserService, "_parse_boleto", fake_parse),
+            patch.object(TicketParserService, "_process_single_ticket", fake_single),
+            patch("apps.common.utils.celery_utils._is_celery_available", return_value=False),
+        ):
+            BatchTicketIngestionService.ingest(agencia, max_workers=1)
+
+        assert procesados == [(boleto.pk, "IAPNR1")]
+        boleto.refresh_from_db()
+        assert boleto.estado_parseo == "COM"
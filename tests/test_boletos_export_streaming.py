@@ -0,0 +1,92 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from openpyxl import load_workbook
+
+from apps.bookings.models import BoletoImportado
+from apps.common.services.analytics_service import DETALLE_BOLETOS_COLUMNAS, AnalyticsService
+from core.middleware import agency_context
+from core.models import Agencia
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+@pytest.fixture(autouse=True)
+def _sin_agencia():
+    # Otros tests pueden dejar agency_var asignado.
+    with agency_context(None):
+        yield
+
+
+@pytest.fixture
+def agencia():
+    agencia = Agencia.objects.create(nombre="Agencia Export", email_principal="export@example.com")
+    otra = Agencia.objects.create(nombre="Otra Agencia", email_principal="otra@example.com")
+
+    def boleto(numero, dia, **extra):
+        campos = {
+            "agencia": agencia,
+            "numero_boleto": numero,
+            "localizador_pnr": "ABC123",
+            "nombre_pasajero_completo": f"PASAJERO/{numero}",
+            "fecha_emision_boleto": datetime.date(2026, 3, dia),
+            "aerolinea_emisora": "AVIOR AIRLINES",
+            "tarifa_base": Decimal("100.00"),
+            "comision_agencia": Decimal("5.00"),
+            "total_boleto": Decimal("130.50"),
+            "estado_parseo": BoletoImportado.EstadoParseo.COMPLETADO,
+        }
+        return BoletoImportado(**{**campos, **extra})
+
+    BoletoImportado.all_objects.bulk_create(
+        [
+            boleto("7421111111111", 1),
+            boleto("7422222222222", 2, nombre_pasajero_procesado="Maria Perez"),
+            boleto("7423333333333", 3, aerolinea_emisora=None),
+            boleto("7424444444444", 4, estado_parseo=BoletoImportado.EstadoParseo.ERROR_PARSEO),
+            boleto("7425555555555", 5, agencia=otra),
+        ]
+    )
+    return agencia
+
+
+class TestExportacionBoletos:
+    """TestExportacionBoletos."""
+
+    def test_excel_write_only(self, agencia):
+        """test_excel_write_only."""
+        archivo = AnalyticsService.exportar_reporte_boletos_excel(agencia)
+        wb = load_workbook(archivo, read_only=True)
+
+        assert wb.sheetnames == ["Resumen", "Por Aerolínea", "Detalle Boletos"]
+        resumen = dict(wb["Resumen"].iter_rows(min_row=2, values_only=True))
+        assert resumen["Total Boletos"] == 3
+        assert resumen["Total Ventas"] == pytest.approx(391.5)
+
+        filas = list(wb["Detalle Boletos"].iter_rows(values_only=True))
+        assert list(filas[0]) == DETALLE_BOLETOS_COLUMNAS
+        assert [f[1] for f in filas[1:]] == ["7423333333333", "7422222222222", "7421111111111"]
+        assert filas[1][4] == "Sin Aerolínea"
+        assert filas[2][3] == "Maria Perez"
+        assert filas[3][8] == "Pendiente"
+
+    def test_csv_en_streaming(self, agencia):
+        """test_csv_en_streaming."""
+        lineas = AnalyticsService.exportar_reporte_boletos_csv(
+            agencia, fecha_inicio="2026-03-02", aerolinea="AVIOR AIRLINES"
+        )
+        contenido = "".join(lineas)
+
+        assert contenido.startswith("\ufeffFecha Emisión,Número Boleto")
+        filas = contenido.strip().splitlines()[1:]
+        assert filas == [
+            "2026-03-02,7422222222222,ABC123,Maria Perez,AVIOR AIRLINES,100.0,5.0,130.5,Pendiente"
+        ]
+
+    def test_parquet(self, agencia):
+        """test_parquet."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        tabla = pq.read_table(AnalyticsService.exportar_reporte_boletos_parquet(agencia))
+        assert tabla.num_rows == 3
+        assert tabla.column_names == DETALLE_BOLETOS_COLUMNAS
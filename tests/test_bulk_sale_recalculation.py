@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+
+from apps.bookings.models import FeeVenta, ItemVenta, PagoVenta, Venta
+from apps.common.models import Moneda
+from apps.crm.models import Cliente
+from apps.finance.services.finance_service import FinanceService
+from core.middleware import agency_context
+from core.models import Agencia
+from core.signals_bypass import disable_signals
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+TOTALES = ("subtotal", "impuestos", "total_venta", "monto_pagado", "saldo_pendiente", "estado")
+
+
+@pytest.fixture
+def agencia():
+    return Agencia.objects.create(nombre="Agencia Bulk", email_principal="bulk@example.com")
+
+
+@pytest.fixture
+def ventas(agencia):
+    """Tres ventas: sin pagos, pagada parcial y pagada total; totales en cero."""
+    moneda, _ = Moneda.objects.get_or_create(
+        codigo_iso="USD", defaults={"nombre": "Dólar", "simbolo": "$"}
+    )
+    cliente = Cliente.objects.create(nombres="Luis", apellidos="Mora", email="luis@example.com")
+    with agency_context(agencia), disable_signals():
+        creadas = []
+        for pago in (None, Decimal("100.00"), Decimal("250.00")):
+            venta = Venta.objects.create(agencia=agencia, cliente=cliente, moneda=moneda)
+            for precio in (Decimal("100.00"), Decimal("80.00")):
+                ItemVenta.objects.create(
+                    agencia=agencia,
+                    venta=venta,
+                    descripcion_personalizada="Tramo",
+                    precio_unitario_venta=precio,
+                    impuestos_item_venta=Decimal("10.00"),
+                    cantidad=1,
+                )
+            FeeVenta.objects.create(agencia=agencia, venta=venta, monto=Decimal("30.00"))
+            if pago:
+                PagoVenta.objects.create(agencia=agencia, venta=venta, monto=pago, moneda=moneda)
+            creadas.append(venta)
+        Venta.all_objects.filter(pk__in=[v.pk for v in creadas]).update(
+            subtotal=0, impuestos=0, total_venta=0, monto_pagado=0, saldo_pendiente=0
+        )
+    return creadas
+
+
+def _totales(ventas):
+    return list(
+        Venta.all_objects.filter(pk__in=[v.pk for v in ventas]).order_by("pk").values(*TOTALES)
+    )
+
+
+class TestBulkRecalculateSaleFinances:
+    """TestBulkRecalculateSaleFinances."""
+
+    def test_coincide_con_el_recalculo_por_venta(self, agencia, ventas):
+        """test_coincide_con_el_recalculo_por_venta."""
+        with agency_context(agencia), disable_signals():
+            for venta in ventas:
+                FinanceService.recalculate_sale_finances(venta.pk)
+            esperado = _totales(ventas)
+            Venta.all_objects.filter(pk__in=[v.pk for v in ventas]).update(total_venta=0)
+
+            stats = FinanceService.bulk_recalculate_sale_finances(
+                Venta.objects.filter(pk__in=[v.pk for v in ventas]), chunk_size=2
+            )
+
+        assert _totales(ventas) == esperado
+        assert [t["estado"] for t in esperado] == ["PEN", "PAR", "PAG"]
+        assert esperado[0]["total_venta"] == Decimal("230.00")
+        assert stats == {"procesadas": 3, "actualizadas": 3, "lotes": 2}
+
+    def test_solo_escribe_las_ventas_que_cambian(self, agencia, ventas):
+        """test_solo_escribe_las_ventas_que_cambian."""
+        with agency_context(agencia), disable_signals():
+            FinanceService.bulk_recalculate_sale_finances(Venta.objects.all())
+            stats = FinanceService.bulk_recalculate_sale_finances(Venta.objects.all())
+        assert stats["actualizadas"] == 0
+
+    def test_comando_por_agencia(self, agencia, ventas):
+        """test_comando_por_agencia."""
+        with agency_context(None), disable_signals():
+            call_command("recalcular_ventas", agencia=[agencia.pk], ids=[ventas[2].pk])
+
+        totales = _totales(ventas)
+        assert totales[2]["saldo_pendiente"] == Decimal("-20.00")
+        assert totales[2]["estado"] == "PAG"
+        assert totales[0]["total_venta"] == Decimal("0.00")
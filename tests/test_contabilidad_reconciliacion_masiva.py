@@ -0,0 +1,123 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+
+from apps.bookings.models import PagoVenta
+from apps.contabilidad.models import AsientoContable, CuentaContable, MovimientoContable
+from apps.contabilidad.reconciliation import ContabilidadReconciliationService
+from apps.finance.models import Factura, TasaCambioBCV
+from core.middleware import agency_context
+from core.models import Agencia
+from core.signals_bypass import disable_signals
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+@pytest.fixture(autouse=True)
+def _sin_agencia():
+    with agency_context(None), disable_signals():
+        yield
+
+
+@pytest.fixture
+def agencia():
+    agencia = Agencia.objects.create(nombre="Agencia Conta", email_principal="conta@example.com")
+    for codigo, tipo in (
+        ("1.1.1.01", "ACT"),
+        ("1.1.2.01", "ACT"),
+        ("2.1.4.01", "PAS"),
+        ("4.1.01", "ING"),
+    ):
+        CuentaContable.all_objects.create(agencia=agencia, codigo=codigo, nombre=codigo, tipo=tipo)
+    TasaCambioBCV.objects.create(fecha=date(2026, 3, 1), tasa=Decimal("40.00"))
+    TasaCambioBCV.objects.create(fecha=date(2026, 3, 5), tasa=Decimal("41.00"))
+    return agencia
+
+
+def _factura(agencia, numero, **kwargs):
+    datos = {
+        "estado": Factura.EstadoFactura.EMITIDA,
+        "fecha_emision": date(2026, 3, 3),
+        "subtotal_usd": Decimal("100.00"),
+        "total_iva_usd": Decimal("16.00"),
+        "gran_total_usd": Decimal("116.00"),
+    }
+    datos.update(kwargs)
+    return Factura.all_objects.create(agencia=agencia, numero_control=numero, **datos)
+
+
+def _pago(agencia, **kwargs):
+    datos = {
+        "monto": Decimal("50.00"),
+        "metodo": PagoVenta.MetodoPago.EFECTIVO,
+        "fecha_pago": timezone.make_aware(datetime(2026, 3, 6, 10)),
+    }
+    datos.update(kwargs)
+    return PagoVenta.all_objects.create(agencia=agencia, **datos)
+
+
+def _movimientos(documento):
+    ct = ContentType.objects.get_for_model(documento)
+    return list(
+        MovimientoContable.all_objects.filter(
+            asiento__content_type=ct, asiento__object_id=documento.pk
+        )
+        .order_by("pk")
+        .values_list("cuenta__codigo", "tipo", "monto_usd", "monto_ves")
+    )
+
+
+class TestReconciliacionContableMasiva:
+    """TestReconciliacionContableMasiva."""
+
+    def test_genera_asientos_faltantes_por_lotes(self, agencia):
+        """test_genera_asientos_faltantes_por_lotes."""
+        sin_asiento = _factura(agencia, "F-1")
+        con_tasa = _factura(agencia, "F-2", tasa_bcv_aplicada=Decimal("39.00"))
+        _factura(agencia, "F-3", estado=Factura.EstadoFactura.BORRADOR)
+        ya_contabilizada = _factura(agencia, "F-4")
+        AsientoContable.all_objects.create(
+            agencia=agencia,
+            content_type=ContentType.objects.get_for_model(Factura),
+            object_id=ya_contabilizada.pk,
+        )
+        pago = _pago(agencia, referencia="REF-9")
+        _pago(agencia, confirmado=False)
+
+        resumen = ContabilidadReconciliationService.reconciliar(chunk_size=1)
+
+        assert (resumen["facturas"], resumen["pagos"], resumen["lotes"]) == (2, 1, 3)
+        assert resumen["movimientos"] == 8
+        # Sin tasa en la factura se usa la BCV vigente a su fecha (01/03).
+        assert _movimientos(sin_asiento) == [
+            ("1.1.2.01", "DEBITO", Decimal("116.00"), Decimal("4640.00")),
+            ("4.1.01", "CREDITO", Decimal("100.00"), Decimal("4000.00")),
+            ("2.1.4.01", "CREDITO", Decimal("16.00"), Decimal("640.00")),
+        ]
+        assert _movimientos(con_tasa)[0][3] == Decimal("4524.00")
+        # Igual que generar_asiento_pago: sin monto en VES.
+        assert _movimientos(pago) == [
+            ("1.1.1.01", "DEBITO", Decimal("50.00"), Decimal("0.00")),
+            ("1.1.2.01", "CREDITO", Decimal("50.00"), Decimal("0.00")),
+        ]
+        asiento = AsientoContable.all_objects.get(object_id=pago.pk, tipo_asiento="DIARIO")
+        assert (asiento.agencia_id, asiento.glosa) == (
+            agencia.pk,
+            "Cobro/Pago Recibido - Ref: REF-9",
+        )
+
+        # Una segunda corrida no encuentra nada pendiente.
+        assert ContabilidadReconciliationService.audit_and_reconcile() == (0, 0)
+
+    def test_documento_sin_cuentas_se_omite(self):
+        """test_documento_sin_cuentas_se_omite."""
+        vacia = Agencia.objects.create(nombre="Sin Plan", email_principal="vacia@example.com")
+        _factura(vacia, "F-SIN-PLAN")
+
+        resumen = ContabilidadReconciliationService.reconciliar()
+
+        assert (resumen["facturas"], resumen["omitidos"]) == (0, 1)
+        assert not AsientoContable.all_objects.filter(agencia=vacia).exists()
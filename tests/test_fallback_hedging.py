@@ -0,0 +1,141 @@
+import time
+
+import pytest
+from django.core.cache import cache
+
+from apps.automation.providerchain.base import AbstractBaseProvider, ProviderResult
+from apps.automation.providerchain.fallback_router import FallbackRouter, HedgeBudget
+from apps.automation.providerchain.registry import ProviderRegistry
+from apps.automation.providerchain.tracing import (
+    get_hourly_metrics,
+    get_latency_percentile,
+    record_call_simple,
+)
+from core.middleware.tenant import agency_var
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+class DelayedProvider(AbstractBaseProvider):
+    """DelayedProvider."""
+
+    supports_structured_output = True
+
+    def __init__(self, name, delay=0.0, text='{"ok": true}', success=True):
+        """__init__."""
+        self.provider_name = name
+        self.delay = delay
+        self.text = text
+        self.success = success
+        self.calls = 0
+        self.seen_agency = None
+
+    def test_connection(self):
+        """test_connection."""
+        return True
+
+    def generate(self, prompt, **kw):
+        """generate."""
+        self.calls += 1
+        self.seen_agency = agency_var.get()
+        time.sleep(self.delay)
+        if not self.success:
+            return ProviderResult(success=False, error="boom", provider=self.provider_name)
+        return ProviderResult(text=self.text, provider=self.provider_name, success=True)
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _router(*providers, ratio=1.0, delay=0.05):
+    registry = ProviderRegistry()
+    for provider in providers:
+        registry.register(provider)
+    # Presupuesto con historia: el primer hedge necesita requests > 1 / ratio.
+    budget = HedgeBudget(ratio=ratio)
+    budget.register_request()
+    return FallbackRouter(registry=registry, hedge_delay=lambda name: delay, budget=budget)
+
+
+class TestHedgedFallbackRouter:
+    """TestHedgedFallbackRouter."""
+
+    def test_primario_lento_gana_el_hedge(self):
+        """test_primario_lento_gana_el_hedge."""
+        gemini = DelayedProvider("gemini", delay=0.6)
+        openai = DelayedProvider("openai", delay=0.0)
+        router = _router(gemini, openai)
+
+        start = time.monotonic()
+        result = router.generate("prompt", schema=dict, hedged=True)
+
+        assert result.provider == "openai"
+        assert time.monotonic() - start < 0.5
+        assert gemini.calls == openai.calls == 1
+        metrics = get_hourly_metrics(hours=1)
+        assert (metrics["hedges"], metrics["hedge_wins"]) == (1, 1)
+
+    def test_primario_rapido_no_duplica(self):
+        """test_primario_rapido_no_duplica."""
+        gemini = DelayedProvider("gemini")
+        openai = DelayedProvider("openai")
+
+        result = _router(gemini, openai).generate("prompt", hedged=True)
+
+        assert result.provider == "gemini"
+        assert openai.calls == 0
+
+    def test_sin_presupuesto_espera_al_primario(self):
+        """test_sin_presupuesto_espera_al_primario."""
+        gemini = DelayedProvider("gemini", delay=0.2)
+        openai = DelayedProvider("openai")
+
+        result = _router(gemini, openai, ratio=0.0).generate("prompt", hedged=True)
+
+        assert result.provider == "gemini"
+        assert openai.calls == 0
+
+    def test_json_invalido_cae_al_siguiente_y_abre_circuito(self):
+        """test_json_invalido_cae_al_siguiente_y_abre_circuito."""
+        gemini = DelayedProvider("gemini", text="no es json")
+        openai = DelayedProvider("openai")
+        router = _router(gemini, openai)
+
+        result = router.generate("prompt", schema=dict, hedged=True)
+
+        assert result.provider == "openai"
+        assert router.registry._circuit_open("gemini") is True
+
+    def test_todos_fallan(self):
+        """test_todos_fallan."""
+        router = _router(
+            DelayedProvider("gemini", success=False), DelayedProvider("openai", success=False)
+        )
+        result = router.generate("prompt", hedged=True)
+        assert result.success is False
+        assert "Todos los proveedores fallaron" in result.error
+
+    def test_propaga_contexto_de_agencia(self):
+        """test_propaga_contexto_de_agencia."""
+        gemini = DelayedProvider("gemini")
+        token = agency_var.set("agencia-7")
+        try:
+            _router(gemini, DelayedProvider("openai")).generate("prompt", hedged=True)
+        finally:
+            agency_var.reset(token)
+        assert gemini.seen_agency == "agencia-7"
+
+
+class TestLatencyPercentile:
+    """TestLatencyPercentile."""
+
+    def test_p90_de_muestras(self):
+        """test_p90_de_muestras."""
+        for ms in range(1, 101):
+            record_call_simple("gemini", ms)
+        assert get_latency_percentile("gemini", 0.9) == 91.0
+        assert get_latency_percentile("gemini", 0.9, min_samples=500) is None
@@ -0,0 +1,217 @@
+import threading
+import time
+from email.mime.application import MIMEApplication
+from email.mime.image import MIMEImage
+from email.mime.message import MIMEMessage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import pytest
+from django.core.cache import cache
+
+from apps.communications.services.imap_ingestion import ImapIngestor, ImapSessionPool
+from apps.communications.services.imap_standin import ServidorImapLocal
+
+pytestmark = [pytest.mark.unit]
+
+PDF = b"%PDF-1.4 E-TICKET PASSENGER PNR ABC123 " * 20
+IMAGEN = b"\x89PNG\r\n\x1a\n" + b"\x00" * 40_000
+
+
+def _correo(asunto, *adjuntos, texto="Hola"):
+    mensaje = MIMEMultipart()
+    mensaje["Subject"] = asunto
+    mensaje["From"] = "emisiones@aerolinea.com"
+    mensaje.attach(MIMEText(texto, "plain", "utf-8"))
+    for adjunto in adjuntos:
+        mensaje.attach(adjunto)
+    return mensaje.as_bytes()
+
+
+def _adjunto(parte, nombre):
+    parte.add_header("Content-Disposition", "attachment", filename=nombre)
+    return parte
+
+
+@pytest.fixture(autouse=True)
+def _limpio(settings):
+    settings.EMAIL_MONITOR_IMAP_SSL = False
+    cache.clear()
+    yield
+    ImapSessionPool.cerrar_todas()
+
+
+@pytest.fixture
+def servidor():
+    with ServidorImapLocal() as servidor:
+        yield servidor
+
+
+def _ingestor(servidor):
+    return ImapIngestor(servidor.host, servidor.port, servidor.usuario, servidor.password)
+
+
+class TestImapIngestor:
+    """TestImapIngestor."""
+
+    def test_descarga_solo_partes_relevantes(self, servidor):
+        """test_descarga_solo_partes_relevantes."""
+        boleto = servidor.agregar(
+            _correo(
+                "E-TICKET ITINERARY RECEIPT",
+                _adjunto(MIMEApplication(PDF, "pdf"), "boleto.pdf"),
+                _adjunto(MIMEImage(IMAGEN, "png"), "logo.png"),
+            )
+        )
+        reenviado = MIMEMessage(
+            MIMEMultipart(_subparts=[_adjunto(MIMEApplication(PDF, "pdf"), "interno.pdf")])
+        )
+        eml = servidor.agregar(_correo("Fwd: boleto", reenviado))
+        solo_imagen = MIMEMultipart(_subparts=[_adjunto(MIMEImage(IMAGEN, "png"), "foto.png")])
+        solo_imagen["Subject"] = "Foto"
+        servidor.agregar(solo_imagen.as_bytes())
+
+        vistos = {}
+        stats = _ingestor(servidor).ciclo(lambda m, _s: vistos.setdefault(m.uid, m.mensaje))
+
+        assert (stats.mensajes, stats.candidatos, stats.procesados) == (3, 2, 2)
+        assert set(vistos) == {boleto, eml}
+        pdfs = [
+            (p.get_filename(), p.get_payload(decode=True))
+            for p in vistos[boleto].walk()
+            if p.get_content_type() == "application/pdf"
+        ]
+        assert pdfs == [("boleto.pdf", PDF)]
+        assert vistos[boleto]["Subject"] == "E-TICKET ITINERARY RECEIPT"
+        assert not any(p.get_content_maintype() == "image" for p in vistos[boleto].walk())
+        assert [p.get_filename() for p in vistos[eml].walk()].count("interno.pdf") == 1
+        # Las imágenes (dos de ~53 KB en base64) nunca cruzan la red.
+        assert stats.bytes_omitidos > 100_000 > stats.bytes_descargados
+        # BODY.PEEK: nada queda marcado como leído sin pedirlo.
+        assert all(not m.flags for m in servidor.mensajes)
+
+    def test_checkpoint_y_sesion_persistente(self, servidor):
+        """test_checkpoint_y_sesion_persistente."""
+        servidor.agregar(_correo("Uno"))
+        ingestor = _ingestor(servidor)
+
+        def marcar(mensaje, sesion):
+            sesion.store(mensaje.uid, "+FLAGS", "\\Seen")
+            return True
+
+        assert ingestor.ciclo(marcar).procesados == 1
+        enviados = servidor.bytes_enviados
+        assert ingestor.ciclo(marcar).mensajes == 0
+        # Sin correo nuevo el ciclo se resuelve con NOOP + SELECT (UIDNEXT sin cambios).
+        assert servidor.bytes_enviados - enviados < 400
+
+        nuevo = servidor.agregar(_correo("Dos"))
+        procesados = []
+        ingestor.ciclo(lambda m, _s: procesados.append(m.uid))
+        assert procesados == [nuevo]
+        assert servidor.flags(1) == {"\\Seen"}
+        assert servidor.logins == 1
+
+    def test_uidvalidity_distinta_reinicia_checkpoint(self, servidor):
+        """test_uidvalidity_distinta_reinicia_checkpoint."""
+        servidor.agregar(_correo("Uno"))
+        ingestor = _ingestor(servidor)
+        ingestor.ciclo(lambda m, _s: True)
+        assert ingestor.checkpoint() == {"uidvalidity": 1, "last_uid": 1}
+
+        servidor.uidvalidity = 2
+        assert ingestor.ciclo(lambda m, _s: True).mensajes == 1
+        assert ingestor.checkpoint() == {"uidvalidity": 2, "last_uid": 1}
+
+    def test_todos_ignora_el_checkpoint(self, servidor):
+        """test_todos_ignora_el_checkpoint."""
+        for asunto in ("Uno", "Dos"):
+            servidor.agregar(_correo(asunto))
+        ingestor = _ingestor(servidor)
+
+        def marcar(mensaje, sesion):
+            sesion.store(mensaje.uid, "+FLAGS", "\\Seen")
+            return True
+
+        assert ingestor.ciclo(marcar).procesados == 2
+        checkpoint = ingestor.checkpoint()
+
+        # --all reprocesa los correos ya leídos y anteriores al checkpoint, sin moverlo.
+        assert ingestor.ciclo(lambda m, _s: True, solo_no_leidos=False).procesados == 2
+        assert ingestor.checkpoint() == checkpoint
+        assert ingestor.ciclo(lambda m, _s: True).mensajes == 0
+
+    def test_idle_despierta_al_llegar_correo(self, servidor):
+        """test_idle_despierta_al_llegar_correo."""
+        ingestor = _ingestor(servidor)
+        threading.Timer(0.2, servidor.agregar, args=(_correo("Nuevo"),)).start()
+
+        inicio = time.monotonic()
+        assert ingestor.esperar_cambios(timeout=5) is True
+        assert time.monotonic() - inicio < 3
+        assert ingestor.ciclo(lambda m, _s: True).procesados == 1
+
+
+@pytest.mark.django_db
+class TestEmailMonitorImap:
+    """TestEmailMonitorImap."""
+
+    def test_monitor_procesa_y_marca_por_uid(self, servidor, monkeypatch):
+        """test_monitor_procesa_y_marca_por_uid."""
+        from apps.communications.models import EmailMonitorLog
+        from apps.communications.services.email_unified import EmailMonitorService
+        from core.models import Agencia
+
+        agencia = Agencia.objects.create(nombre="Agencia IMAP", email_principal="imap@example.com")
+        config = agencia.configuracion
+        config.email_monitor_host = servidor.host
+        config.email_monitor_port = servidor.port
+        config.email_monitor_user = servidor.usuario
+        config.email_monitor_password = servidor.password
+        config.save()
+        servidor.agregar(_correo("Boleto", _adjunto(MIMEApplication(PDF, "pdf"), "b.pdf")))
+        servidor.agregar(_correo("Otro"))
+
+        def procesar(self, message, msg_num, mail_connection):
+            if not self._tiene_pdf_adjunto(message):
+                return False
+            mail_connection.store(msg_num, "+FLAGS", "\\Seen")
+            return True
+
+        monkeypatch.setattr(EmailMonitorService, "_procesar_mensaje", procesar)
+        monitor = EmailMonitorService(agencia, mark_as_read=True)
+
+        assert monitor.procesar_una_vez() == 1
+        assert monitor.procesar_una_vez() == 0
+        assert [servidor.flags(1), servidor.flags(2)] == [{"\\Seen"}, set()]
+        assert servidor.logins == 1
+        logs = list(
+            EmailMonitorLog.objects.order_by("pk").values_list("correos_procesados", "mensaje")
+        )
+        assert logs[0][0] == 1 and "1 de 2 correos" in logs[0][1]
+        assert "No se encontraron correos nuevos" in logs[1][1]
+
+    def test_email_ingestion_service_usa_el_ingestor(self, servidor):
+        """test_email_ingestion_service_usa_el_ingestor."""
+        from apps.automation.services.email_ingestion import EmailIngestionService
+
+        uid = servidor.agregar(
+            _correo(
+                "Factura proveedor",
+                _adjunto(MIMEApplication(PDF, "pdf"), "factura.pdf"),
+                _adjunto(MIMEImage(IMAGEN, "png"), "firma.png"),
+                texto="Adjunto factura",
+            )
+        )
+        servicio = EmailIngestionService(
+            servidor.host, servidor.usuario, servidor.password, servidor.port
+        )
+
+        correos = servicio.fetch_unread_emails()
+
+        assert [(c["uid"], c["body"], c["is_invoice"]) for c in correos] == [
+            (str(uid), "Adjunto factura", True)
+        ]
+        assert [a["filename"] for a in correos[0]["attachments"]] == ["factura.pdf"]
+        assert servidor.flags(uid) == {"\\Seen"}
+        assert servicio.fetch_unread_emails() == []
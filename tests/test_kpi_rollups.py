@@ -0,0 +1,167 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.bookings.models import BoletoImportado, FeeVenta, ItemVenta, Venta
+from apps.common.models import Moneda
+from apps.crm.models import Cliente
+from apps.reports.models import KpiDiario, KpiDiarioAerolinea
+from apps.reports.services.kpi_metrics import KPIMetrics
+from apps.reports.services.kpi_rollup import KpiRollupService
+from core.middleware import agency_context
+from core.models import Agencia
+from core.signals_bypass import disable_signals
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+@pytest.fixture(autouse=True)
+def _sin_agencia():
+    # Otros tests pueden dejar agency_var asignado.
+    with agency_context(None):
+        yield
+
+
+@pytest.fixture
+def agencia():
+    return Agencia.objects.create(nombre="Agencia KPI", email_principal="kpi@example.com")
+
+
+@pytest.fixture
+def moneda():
+    return Moneda.objects.get_or_create(
+        codigo_iso="USD", defaults={"nombre": "Dólar", "simbolo": "$"}
+    )[0]
+
+
+def _venta(agencia, moneda, cliente, total, cuando):
+    with disable_signals():
+        venta = Venta.objects.create(
+            agencia=agencia, cliente=cliente, moneda=moneda, fecha_venta=cuando
+        )
+        Venta.all_objects.filter(pk=venta.pk).update(total_venta=Decimal(total))
+    venta.refresh_from_db()
+    return venta
+
+
+class TestKpiRollups:
+    """TestKpiRollups."""
+
+    def test_senales_mantienen_el_dia(self, agencia, moneda, django_capture_on_commit_callbacks):
+        """test_senales_mantienen_el_dia."""
+        ahora = timezone.now()
+        with django_capture_on_commit_callbacks(execute=True):
+            cliente = Cliente.objects.create(
+                agencia=agencia, nombres="Eva", apellidos="Lara", email="eva@example.com"
+            )
+            venta = _venta(agencia, moneda, cliente, "0.00", ahora)
+            ItemVenta.objects.create(
+                agencia=agencia,
+                venta=venta,
+                descripcion_personalizada="Tramo",
+                precio_unitario_venta=Decimal("300.00"),
+            )
+            FeeVenta.all_objects.create(agencia=agencia, venta=venta, monto=Decimal("45.00"))
+            BoletoImportado.objects.create(agencia=agencia, aerolinea_emisora="LASER AIRLINES")
+
+        dia = KpiDiario.all_objects.get(agencia=agencia, fecha=timezone.localdate(ahora))
+        assert (dia.ventas_cantidad, dia.ventas_total, dia.fees_total) == (
+            1,
+            Decimal("345.00"),
+            Decimal("45.00"),
+        )
+        assert (dia.boletos_cantidad, dia.clientes_nuevos) == (1, 1)
+
+        metrics = KPIMetrics(agencia, hoy=timezone.localdate())
+        assert metrics.ticket_promedio() == Decimal("345.00")
+        assert metrics.margen_bruto()[0] == Decimal("300.00")
+        assert metrics.boletos_por_aerolinea() == {"LASER AIRLINES": 1}
+
+        # Mover la venta a otro día recalcula ambos días.
+        ayer = ahora - timedelta(days=1)
+        with django_capture_on_commit_callbacks(execute=True):
+            venta = Venta.all_objects.get(pk=venta.pk)
+            venta.fecha_venta = ayer
+            venta.save()
+
+        por_dia = metrics.ventas_por_dia(30)
+        assert por_dia == {timezone.localdate(ayer).isoformat(): 1}
+        assert metrics.ventas_totales() == 1
+
+    def test_rebuild_repara_y_lecturas_son_o_dias(self, agencia, moneda, django_assert_num_queries):
+        """test_rebuild_repara_y_lecturas_son_o_dias."""
+        cliente = Cliente.objects.create(
+            agencia=agencia, nombres="Leo", apellidos="Paz", email="leo@example.com"
+        )
+        ahora = timezone.now()
+        for i in range(6):
+            _venta(agencia, moneda, cliente, "100.00", ahora - timedelta(days=i % 3))
+
+        hoy = timezone.localdate()
+        assert KpiRollupService.rebuild(agencia.pk, hoy - timedelta(days=2), hoy) == 3
+
+        metrics = KPIMetrics(agencia, hoy=hoy)
+        with django_assert_num_queries(1):
+            assert sum(metrics.ventas_por_dia(30).values()) == 6
+        with django_assert_num_queries(1):
+            resumen = metrics.resumen()
+        assert resumen["total_ventas"] == 6
+        assert resumen["monto_total"] == Decimal("600.00")
+
+        # Un borrado sin señales se corrige con la reconstrucción.
+        Venta.all_objects.filter(agencia=agencia).update(is_deleted=True)
+        call_command("reconstruir_kpi_rollups", agencia=[agencia.pk])
+        assert list(
+            KpiDiario.all_objects.filter(agencia=agencia).values_list(
+                "ventas_cantidad", "clientes_nuevos"
+            )
+        ) == [(0, 1)]
+        assert KPIMetrics(agencia, hoy=hoy).ventas_totales() == 0
+
+    def test_boletos_por_aerolinea_por_dia(self, agencia):
+        """test_boletos_por_aerolinea_por_dia."""
+        with disable_signals():
+            for nombre in ("AVIOR AIRLINES", "AVIOR AIRLINES", None):
+                BoletoImportado.objects.create(agencia=agencia, aerolinea_emisora=nombre)
+
+        hoy = timezone.localdate()
+        KpiRollupService.rebuild(agencia.pk, hoy, hoy)
+        KpiRollupService.rebuild(agencia.pk, hoy, hoy)  # idempotente
+
+        assert KpiDiarioAerolinea.all_objects.filter(agencia=agencia).count() == 2
+        assert KPIMetrics(agencia, hoy=hoy).boletos_por_aerolinea() == {
+            "AVIOR AIRLINES": 2,
+            "Sin aerolínea": 1,
+        }
+
+    def test_aerolinea_nula_y_vacia_son_la_misma_clave(self, agencia):
+        """test_aerolinea_nula_y_vacia_son_la_misma_clave."""
+        with disable_signals():
+            for nombre in (None, "", None, "AVIOR AIRLINES"):
+                BoletoImportado.objects.create(agencia=agencia, aerolinea_emisora=nombre)
+
+        hoy = timezone.localdate()
+        KpiRollupService.rebuild(agencia.pk, hoy, hoy)
+
+        filas = KpiDiarioAerolinea.all_objects.filter(agencia=agencia)
+        assert dict(filas.values_list("aerolinea", "boletos")) == {"": 3, "AVIOR AIRLINES": 1}
+        assert KpiDiario.all_objects.get(agencia=agencia, fecha=hoy).boletos_cantidad == 4
+
+    def test_rebuild_all_empieza_en_la_actividad_mas_antigua(self, agencia, moneda):
+        """test_rebuild_all_empieza_en_la_actividad_mas_antigua."""
+        hace_diez = timezone.now() - timedelta(days=10)
+        with disable_signals():
+            cliente = Cliente.objects.create(
+                agencia=agencia, nombres="Ivo", apellidos="Paz", fecha_registro=hace_diez
+            )
+        _venta(agencia, moneda, cliente, "100.00", timezone.now())
+        KpiDiario.all_objects.filter(agencia=agencia).delete()
+
+        KpiRollupService.rebuild_all(agencia.pk)
+
+        dia = KpiDiario.all_objects.get(agencia=agencia, fecha=timezone.localdate(hace_diez))
+        assert dia.clientes_nuevos == 1
+        assert KPIMetrics(agencia, hoy=timezone.localdate()).clientes_totales() == 1
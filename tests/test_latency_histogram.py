@@ -0,0 +1,67 @@
+import random
+
+import pytest
+from django.core.cache import cache
+
+from apps.automation.providerchain.latency_histogram import (
+    LatencyHistogram,
+    bucket_for,
+    bucket_value,
+)
+from apps.automation.providerchain.tracing import (
+    get_hourly_metrics,
+    get_latency_percentile,
+    record_call_simple,
+)
+
+pytestmark = [pytest.mark.unit]
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class TestLatencyHistogram:
+    """TestLatencyHistogram."""
+
+    def test_error_relativo_acotado(self):
+        """test_error_relativo_acotado."""
+        assert [bucket_value(bucket_for(ms)) for ms in (0, 1, 127)] == [0.0, 1.0, 127.0]
+        for ms in (128, 999, 4_321, 65_537, 600_000):
+            assert abs(bucket_value(bucket_for(ms)) - ms) / ms < 0.008
+        assert bucket_for(-5) == 0
+
+    def test_fusion_equivale_a_un_solo_histograma(self):
+        """test_fusion_equivale_a_un_solo_histograma."""
+        rnd = random.Random(3)  # noqa: S311
+        samples = [int(rnd.lognormvariate(7, 0.6)) for _ in range(5000)]
+        a, b, todo = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i, ms in enumerate(samples):
+            (a if i % 2 else b).add(ms)
+            todo.add(ms)
+
+        assert a.merge(b).counts == todo.counts
+        exacto = sorted(samples)[int(len(samples) * 0.95)]
+        assert todo.percentile(0.95) == pytest.approx(exacto, rel=0.01)
+        assert LatencyHistogram().percentiles() == {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+
+class TestLatencyTracing:
+    """TestLatencyTracing."""
+
+    def test_sin_tope_de_muestras_por_hora(self):
+        """test_sin_tope_de_muestras_por_hora."""
+        for _ in range(1500):
+            record_call_simple("openai", 100)
+        for _ in range(500):
+            record_call_simple("openai", 3000)
+
+        assert get_latency_percentile("openai", 0.9) == pytest.approx(3000, rel=0.01)
+        metrics = get_hourly_metrics(hours=24)
+        assert metrics["total_calls"] == 2000
+        assert metrics["latency_percentiles"]["openai"]["p50"] == 100.0
+        assert metrics["latency_percentiles"]["all"] == metrics["latency_percentiles"]["openai"]
+        assert metrics["latency_percentiles"]["gemini"] == {"p50": 0.0, "p95": 0.0, "p99": 0.0}
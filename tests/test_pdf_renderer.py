@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from apps.automation.parsers.pdf_generation import PdfGenerationService
+from apps.common.services import pdf_renderer
+from apps.common.services.pdf_renderer import PdfRendererService
+from apps.common.utils.images import get_agencia_logo_b64
+
+
+def _fake_render(html_content, stylesheet_paths=()):
+    if "ROTO" in html_content:
+        raise ValueError("plantilla rota")
+    return f"%PDF {len(html_content)}".encode()
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    cache.clear()
+    PdfRendererService.reset_render_stats()
+    with patch.object(pdf_renderer, "_render_with_weasyprint", side_effect=_fake_render):
+        yield
+    cache.clear()
+
+
+class TestRenderMany:
+    """TestRenderMany."""
+
+    pytestmark = [pytest.mark.unit]
+
+    def test_preserva_orden_y_aisla_errores(self):
+        """test_preserva_orden_y_aisla_errores."""
+        results = PdfRendererService.render_many(["<p>a</p>", "ROTO", "<p>abc</p>"], max_workers=1)
+
+        assert [r.ok for r in results] == [True, False, True]
+        assert results[0].pdf == b"%PDF 8"
+        assert results[2].pdf == b"%PDF 10"
+        assert "plantilla rota" in results[1].error
+        assert all(r.elapsed_ms >= 0 for r in results)
+
+        stats = PdfRendererService.get_render_stats()
+        assert stats["documents"] == 3
+        assert stats["failed"] == 1
+        assert stats["avg_ms"] == pytest.approx(stats["total_ms"] / 3)
+
+    def test_sin_pool_en_procesos_daemon(self):
+        """test_sin_pool_en_procesos_daemon."""
+        daemon = SimpleNamespace(daemon=True)
+        with (
+            patch.object(pdf_renderer.multiprocessing, "current_process", return_value=daemon),
+            patch.object(PdfRendererService, "_get_pool") as get_pool,
+        ):
+            results = PdfRendererService.render_many(["<p>a</p>"] * 3, max_workers=4)
+
+        get_pool.assert_not_called()
+        assert all(r.ok for r in results)
+
+    def test_pool_roto_cae_a_serie(self):
+        """test_pool_roto_cae_a_serie."""
+        with patch.object(
+            PdfRendererService,
+            "_get_pool",
+            side_effect=pdf_renderer.BrokenProcessPool("worker muerto"),
+        ):
+            results = PdfRendererService.render_many(["<p>a</p>", "<p>b</p>"], max_workers=2)
+
+        assert [r.pdf for r in results] == [b"%PDF 8", b"%PDF 8"]
+
+    def test_lote_vacio(self):
+        """test_lote_vacio."""
+        assert PdfRendererService.render_many([]) == []
+
+
+@pytest.mark.django_db
+def test_generate_tickets_por_lote():
+    """test_generate_tickets_por_lote."""
+    tickets = [
+        {"NOMBRE_DEL_PASAJERO": "PEREZ/JUAN", "NUMERO_DE_BOLETO": "111"},
+        {"NOMBRE_DEL_PASAJERO": "GOMEZ/ANA", "NUMERO_DE_BOLETO": "222"},
+    ]
+    with override_settings(PDF_RENDER_MAX_WORKERS=1):
+        results = PdfGenerationService.generate_tickets(tickets)
+
+    assert [fname for _, fname in results] == [
+        "Boleto_111_PEREZ_JUAN.pdf",
+        "Boleto_222_GOMEZ_ANA.pdf",
+    ]
+    assert all(pdf.startswith(b"%PDF") for pdf, _ in results)
+
+
+class TestLogoCache:
+    """TestLogoCache."""
+
+    pytestmark = [pytest.mark.unit]
+
+    def test_logo_se_cachea_por_agencia_y_archivo(self):
+        """test_logo_se_cachea_por_agencia_y_archivo."""
+        agencia = SimpleNamespace(pk=7, logo_dark=SimpleNamespace(name="logos/a.png"))
+        with patch(
+            "apps.common.utils.images.get_image_as_base64", return_value="data:image/png;base64,A"
+        ) as fetch:
+            assert get_agencia_logo_b64(agencia) == "data:image/png;base64,A"
+            assert get_agencia_logo_b64(agencia) == "data:image/png;base64,A"
+            assert fetch.call_count == 1
+
+            agencia.logo_dark = SimpleNamespace(name="logos/b.png")
+            get_agencia_logo_b64(agencia)
+            assert fetch.call_count == 2
+
+    def test_logo_fallido_no_se_cachea(self):
+        """test_logo_fallido_no_se_cachea."""
+        agencia = SimpleNamespace(pk=8, logo_dark="https://cdn.example.com/logo.png")
+        with patch("apps.common.utils.images.get_image_as_base64", return_value=None) as fetch:
+            assert get_agencia_logo_b64(agencia) is None
+            assert get_agencia_logo_b64(agencia) is None
+            assert fetch.call_count == 2
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+from django.core.cache import cache
+
+from apps.automation.management.commands.benchmark_rag_fallback import legacy_fallback_vector
+from apps.automation.services.rag_embeddings import (
+    EmbeddingPipeline,
+    FakeEmbeddingProvider,
+    LocalLRUCache,
+    hashing_embeddings,
+)
+from apps.automation.services.rag_service import RAGKnowledgeService
+
+pytestmark = [pytest.mark.unit]
+
+
+class FailingProvider(FakeEmbeddingProvider):
+    """FailingProvider."""
+
+    def embed_batch(self, texts):
+        """embed_batch."""
+        super().embed_batch(texts)
+        raise RuntimeError("429 quota exceeded")
+
+
+def _fallback(texts):
+    return [[0.5, 0.5] for _ in texts]
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _pipeline(provider, batch_size=3, local_cache=None):
+    return EmbeddingPipeline(
+        provider,
+        fallback=_fallback,
+        batch_size=batch_size,
+        max_workers=2,
+        local_cache=local_cache or LocalLRUCache(maxsize=100),
+    )
+
+
+class TestEmbeddingPipeline:
+    """TestEmbeddingPipeline."""
+
+    def test_lotes_preservan_orden_y_deduplican(self):
+        """test_lotes_preservan_orden_y_deduplican."""
+        provider = FakeEmbeddingProvider(dim=4)
+        texts = [f"chunk {i}" for i in range(7)] + ["chunk 0", "", "   "]
+
+        vectors = _pipeline(provider).embed(texts)
+
+        assert provider.calls == 3  # 7 textos únicos en lotes de 3
+        assert provider.items == 7
+        assert vectors[0] == vectors[7] == provider.embed_batch(["chunk 0"])[0]
+        assert vectors[8] == [] and vectors[9] == []
+
+    def test_reindexar_sin_cambios_no_llama_al_proveedor(self):
+        """test_reindexar_sin_cambios_no_llama_al_proveedor."""
+        texts = ["Sabre 0SPLIT", "Amadeus SP"]
+        first = _pipeline(FakeEmbeddingProvider(dim=4)).embed(texts)
+
+        # Nuevo proceso (LRU vacío): resuelve desde la cache compartida.
+        provider = FakeEmbeddingProvider(dim=4)
+        second = _pipeline(provider).embed(texts)
+
+        assert provider.calls == 0
+        assert second == first
+
+    def test_lote_fallido_usa_fallback_sin_cachear(self):
+        """test_lote_fallido_usa_fallback_sin_cachear."""
+        vectors = _pipeline(FailingProvider(dim=4)).embed(["KIU manual"])
+        assert vectors == [[0.5, 0.5]]
+
+        provider = FakeEmbeddingProvider(dim=4)
+        _pipeline(provider).embed(["KIU manual"])
+        assert provider.calls == 1
+
+    def test_sin_proveedor_usa_fallback(self):
+        """test_sin_proveedor_usa_fallback."""
+        assert _pipeline(None).embed(["texto"]) == [[0.5, 0.5]]
+
+
+class TestLocalLRUCache:
+    """TestLocalLRUCache."""
+
+    def test_descarta_el_menos_reciente(self):
+        """test_descarta_el_menos_reciente."""
+        lru = LocalLRUCache(maxsize=2)
+        lru.set("a", [1.0])
+        lru.set("b", [2.0])
+        lru.get("a")
+        lru.set("c", [3.0])
+        assert lru.get("b") is None
+        assert lru.get("a") == [1.0]
+        assert len(lru) == 2
+
+
+class TestHashingEmbeddings:
+    """TestHashingEmbeddings."""
+
+    def test_compatible_con_vectores_guardados(self):
+        """test_compatible_con_vectores_guardados."""
+        texts = [
+            "Para dividir un PNR en Sabre se utiliza el comando 0SPLIT.",
+            "Equipaje de mano: 10 kg en clase ejecutiva (Avianca) — ÑANDÚ ñandú",
+            "",
+            "!!!",
+        ]
+        matrix = hashing_embeddings(texts)
+
+        assert matrix.dtype == np.float32
+        assert matrix.shape == (4, 768)
+        expected = np.asarray([legacy_fallback_vector(t) for t in texts], dtype=np.float32)
+        np.testing.assert_allclose(matrix, expected, atol=1e-6)
+
+    def test_fallback_vector_del_servicio(self):
+        """test_fallback_vector_del_servicio."""
+        vector = RAGKnowledgeService._fallback_vector("comando 0SPLIT", dim=32)
+        assert isinstance(vector, list) and len(vector) == 32
+        assert vector == pytest.approx(legacy_fallback_vector("comando 0SPLIT", dim=32), abs=1e-6)
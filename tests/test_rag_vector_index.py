@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from apps.automation.services.rag_service import RAGKnowledgeService
+from apps.automation.services.rag_vector_index import VectorIndex, as_matrix
+
+pytestmark = [pytest.mark.unit]
+
+
+class TestAsMatrix:
+    """TestAsMatrix."""
+
+    def test_normaliza_y_descarta_invalidos(self):
+        """test_normaliza_y_descarta_invalidos."""
+        matrix, valid = as_matrix([[3.0, 4.0], [], [1.0], [0.0, 0.0], [0.0, 2.0]])
+        assert valid.tolist() == [True, False, False, False, True]
+        assert matrix.dtype == np.float32
+        np.testing.assert_allclose(matrix, [[0.6, 0.8], [0.0, 1.0]], rtol=1e-6)
+
+
+class TestVectorIndex:
+    """TestVectorIndex."""
+
+    def test_search_coincide_con_fuerza_bruta(self):
+        """test_search_coincide_con_fuerza_bruta."""
+        rng = np.random.default_rng(7)
+        vectors = rng.standard_normal((300, 32)).tolist()
+        index = VectorIndex()
+        index.add(list(range(300)), vectors)
+
+        query = rng.standard_normal(32).tolist()
+        expected = sorted(
+            range(300),
+            key=lambda i: RAGKnowledgeService.cosine_similarity(query, vectors[i]),
+            reverse=True,
+        )[:5]
+        result = index.search(query, 5)
+
+        assert [chunk_id for chunk_id, _score in result] == expected
+        assert result[0][1] == pytest.approx(
+            RAGKnowledgeService.cosine_similarity(query, vectors[expected[0]]), rel=1e-5
+        )
+
+    def test_add_incremental_y_remove(self):
+        """test_add_incremental_y_remove."""
+        index = VectorIndex()
+        index.add([1, 2], [[1.0, 0.0], [0.0, 1.0]])
+        index.add([3], [[0.7, 0.7]])
+        assert len(index) == 3
+
+        index.remove([1])
+        assert 1 not in index
+        assert [cid for cid, _ in index.search([1.0, 0.1], 3)] == [3, 2]
+
+    def test_reemplazo_y_compactacion(self):
+        """test_reemplazo_y_compactacion."""
+        index = VectorIndex()
+        index.add(list(range(10)), [[1.0, float(i)] for i in range(10)])
+        index.add([0], [[0.0, -1.0]])
+        index.remove(range(1, 9))
+
+        assert index.ids == {0, 9}
+        assert index.search([0.0, -1.0], 1)[0][0] == 0
+
+    def test_query_de_otra_dimension_retorna_vacio(self):
+        """test_query_de_otra_dimension_retorna_vacio."""
+        index = VectorIndex()
+        index.add([1], [[1.0, 0.0]])
+        assert index.search([1.0, 0.0, 0.0], 3) == []
+        assert index.search([0.0, 0.0], 3) == []
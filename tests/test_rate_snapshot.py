@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from apps.finance.services.rate_snapshot import RateSnapshotService
+from core.context_processors import agency_context
+from core.models import Agencia, UsuarioAgencia
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+HOY = date.today()
+
+
+def _snapshot(fecha=HOY):
+    return {
+        "usd": "36.50",
+        "eur": "39.80",
+        "p2p": "38.10",
+        "fechas": {"USD": fecha, "EUR": fecha, "P2P": fecha},
+    }
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def build():
+    with patch.object(RateSnapshotService, "_build", return_value=_snapshot()) as mock:
+        yield mock
+
+
+@pytest.fixture
+def vinculo():
+    user = get_user_model().objects.create_user(username="vendedor", password="x")
+    agencia = Agencia.objects.create(nombre="Agencia Uno", email_principal="uno@example.com")
+    return UsuarioAgencia.objects.create(usuario=user, agencia=agencia, rol="vendedor")
+
+
+def _request(user):
+    request = RequestFactory().get("/")
+    request.user = user
+    request.session = {}
+    return request
+
+
+class TestRateSnapshotService:
+    """TestRateSnapshotService."""
+
+    def test_cache_caliente_no_reconstruye(self, build):
+        """test_cache_caliente_no_reconstruye."""
+        first = RateSnapshotService.get()
+        second = RateSnapshotService.get()
+
+        assert first == second
+        assert first["usd"] == "36.50"
+        assert first["es_obsoleta"] is False
+        assert build.call_count == 1
+
+    def test_refresh_publica_en_la_escritura(self, build):
+        """test_refresh_publica_en_la_escritura."""
+        RateSnapshotService.get()
+        build.return_value = {**_snapshot(), "usd": "40.00"}
+
+        RateSnapshotService.refresh()
+
+        assert RateSnapshotService.get()["usd"] == "40.00"
+        assert build.call_count == 2
+
+    def test_formato_anterior_se_reconstruye(self, build):
+        """test_formato_anterior_se_reconstruye."""
+        cache.set("tasa_bcv_context", {"usd": "1", "eur": "2", "p2p": "3"})
+        assert RateSnapshotService.get()["usd"] == "36.50"
+        assert build.call_count == 1
+
+    def test_frescura(self):
+        """test_frescura."""
+        assert RateSnapshotService.es_obsoleta(_snapshot()) is False
+        assert RateSnapshotService.es_obsoleta(_snapshot(HOY - timedelta(days=1))) is True
+        incompleto = _snapshot()
+        incompleto["fechas"]["P2P"] = None
+        assert RateSnapshotService.es_obsoleta(incompleto) is True
+
+
+class TestAgencyContext:
+    """TestAgencyContext."""
+
+    def test_render_con_cache_caliente_sin_consultas(
+        self, build, vinculo, django_assert_num_queries
+    ):
+        """test_render_con_cache_caliente_sin_consultas."""
+        request = _request(vinculo.usuario)
+        request.agencia = vinculo.agencia
+        agency_context(request)
+
+        with django_assert_num_queries(0):
+            context = agency_context(_request(vinculo.usuario))
+
+        assert context["tasa_usd"] == "36.50"
+        assert [v.agencia_id for v in context["user_agencies"]] == [vinculo.agencia_id]
+
+    def test_cambio_de_membresia_invalida(self, build, vinculo):
+        """test_cambio_de_membresia_invalida."""
+        assert len(agency_context(_request(vinculo.usuario))["user_agencies"]) == 1
+
+        vinculo.activo = False
+        vinculo.save()
+
+        assert agency_context(_request(vinculo.usuario))["user_agencies"] == []
+
+    def test_tasa_obsoleta_dispara_una_sincronizacion(self, build, vinculo):
+        """test_tasa_obsoleta_dispara_una_sincronizacion."""
+        build.return_value = _snapshot(HOY - timedelta(days=1))
+        with patch("apps.contabilidad.tasks.sync_bcv_rates.delay") as delay:
+            agency_context(_request(vinculo.usuario))
+            agency_context(_request(vinculo.usuario))
+        assert delay.call_count == 1
@@ -0,0 +1,135 @@
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from apps.finance.models_stubs import ConciliacionBoleto, ReporteReconciliacion
+from apps.finance.services.reconciliation_matcher import (
+    ReconciliationMatcher,
+    Registro,
+    tokens_pasajero,
+)
+from apps.finance.services.smart_reconciliation_service import SmartReconciliationService
+
+pytestmark = [pytest.mark.unit]
+
+
+def _boleto(id, numero="", pnr="", pasajero="", total="100.00", fecha=date(2026, 3, 10)):
+    return {
+        "id_boleto_importado": id,
+        "numero_boleto": numero,
+        "localizador_pnr": pnr,
+        "nombre_pasajero_completo": pasajero,
+        "total_boleto": Decimal(total),
+        "tarifa_base": Decimal(total) - 20,
+        "impuestos_total_calculado": Decimal("20.00"),
+        "fecha_emision_boleto": fecha,
+    }
+
+
+def _linea(id, numero="", pnr="", pasajero="", total="100.00", fecha="2026-03-10"):
+    return Registro.desde_linea(
+        {
+            "id_linea": id,
+            "numero_boleto_reportado": numero,
+            "tarifa_base_cobrada": Decimal(total) - 20,
+            "impuestos_cobrados": Decimal("20.00"),
+            "total_cobrado": Decimal(total),
+            "raw_data": {"pnr": pnr, "pasajero": pasajero, "fecha_emision": fecha},
+        }
+    )
+
+
+@pytest.fixture
+def matcher():
+    return ReconciliationMatcher(
+        [
+            _boleto(1, "134-7258019382", "ABC123", "NAVAS/MANUEL MR", "350.00"),
+            _boleto(2, "", "XYZ789", "PEREZ/ANA MRS", "210.00"),
+            _boleto(3, "", "", "GOMEZ/LUIS", "480.00", date(2026, 3, 12)),
+            _boleto(4, "", "", "GOMEZ/LUIS", "90.00"),
+            _boleto(5, "", "", "ROJAS/CARLA", "1000.00"),
+        ],
+        umbral=0.6,
+        ventana_dias=3,
+        tolerancia_monto=0.05,
+    )
+
+
+class TestReconciliationMatcher:
+    """TestReconciliationMatcher."""
+
+    def test_normaliza_nombre_gds(self):
+        """test_normaliza_nombre_gds."""
+        assert tokens_pasajero("NAVAS/MANUEL MR") == tokens_pasajero("Manuel Navás")
+
+    def test_bloques_boleto_pnr_y_pasajero(self, matcher):
+        """test_bloques_boleto_pnr_y_pasajero."""
+        por_boleto, _ = matcher.match(_linea(10, "7258019382", total="351.00"))
+        por_pnr, _ = matcher.match(_linea(11, pnr="xyz789", pasajero="ANA PEREZ", total="210"))
+        por_nombre, _ = matcher.match(_linea(12, pasajero="LUIS GOMEZ", total="485.00"))
+
+        assert (por_boleto.id, por_pnr.id, por_nombre.id) == (1, 2, 3)
+        # El boleto 4 comparte nombre pero no banda de monto: no es candidato.
+        assert not matcher.asignado(4)
+
+    def test_un_boleto_no_se_asigna_dos_veces(self, matcher):
+        """test_un_boleto_no_se_asigna_dos_veces."""
+        primero, _ = matcher.match(_linea(10, "0017258019382"))
+        segundo, _ = matcher.match(_linea(11, "0017258019382"))
+
+        assert primero.id == 1
+        assert segundo is None
+        assert [b.id for b in matcher.pendientes()] == [2, 3, 4, 5]
+
+    def test_sin_evidencia_suficiente_queda_como_residuo(self, matcher):
+        """test_sin_evidencia_suficiente_queda_como_residuo."""
+        boleto, puntaje = matcher.match(_linea(10, pasajero="CARLA ROJAS", total="700.00"))
+
+        assert boleto is None
+        assert puntaje == 0
+        # Para la IA sí hay una lista corta por monto cercano.
+        linea = _linea(11, pasajero="C ROJAS", total="1001.00", fecha="2026-04-30")
+        assert [b.id for b in matcher.shortlist(linea, 3)] == [5]
+
+
+class TestCruceResiduosIA:
+    """TestCruceResiduosIA."""
+
+    @override_settings(RECONCILIATION_AI_BATCH_SIZE=2)
+    def test_ia_solo_ve_residuos_con_candidatos(self, matcher):
+        """test_ia_solo_ve_residuos_con_candidatos."""
+        reporte = ReporteReconciliacion(proveedor="BSP")
+        residuos = [
+            _linea(20, pasajero="ROJAS CARLA", total="1010.00", fecha="2026-05-01"),
+            _linea(21, pasajero="SIN PAREJA", total="99999.00"),
+            _linea(22, pasajero="L GOMEZ", total="92.00", fecha="2026-06-01"),
+        ]
+        resumen = {"cuadrados_ok": 0, "discrepancias": 0, "match_ia": 0, "llamadas_ia": 0}
+
+        def _fake(reporte, chunk, candidatos, matcher, resumen):
+            linea = chunk[0]
+            boleto = candidatos[5]
+            matcher.asignar(boleto.id)
+            return {
+                linea.id: SmartReconciliationService._crear_conciliacion(
+                    reporte, linea, boleto, resumen
+                )
+            }
+
+        with patch.object(
+            SmartReconciliationService, "_procesar_lote_fuzzy_ia", side_effect=_fake
+        ) as lote:
+            conciliados = SmartReconciliationService._cruce_residuos_ia(
+                reporte, residuos, matcher, resumen
+            )
+
+        lote.assert_called_once()
+        chunk, candidatos = lote.call_args.args[1:3]
+        assert [linea.id for linea in chunk] == [20, 22]
+        assert set(candidatos) == {4, 5}
+        assert resumen["llamadas_ia"] == 1
+        assert conciliados[20].estado == ConciliacionBoleto.EstadosCruce.DISCREPANCIA
+        assert conciliados[20].diferencia_total == Decimal("10.00")
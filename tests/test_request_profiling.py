@@ -0,0 +1,164 @@
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+from prometheus_client import REGISTRY
+
+from core.middleware_performance import UNRESOLVED_ROUTE, RequestProfilingMiddleware
+from core.models import Agencia
+from core.request_profiling import fingerprint, slow_requests
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+@pytest.fixture(autouse=True)
+def _limpio(settings):
+    settings.DEBUG = False
+    settings.REQUEST_PROFILING_HEADERS = True
+    cache.clear()
+    slow_requests.clear()
+
+
+def _request(path):
+    """Request con ``resolver_match`` como lo deja el URLResolver (None si no resuelve)."""
+    request = RequestFactory().get(path)
+    try:
+        request.resolver_match = resolve(path)
+    except Resolver404:
+        pass
+    return request
+
+
+def _vista(request):
+    list(Agencia.objects.filter(pk__in=[1, 2, 3]))
+    list(Agencia.objects.filter(pk__in=[4, 5]))
+    Agencia.objects.count()
+    cache.set("perfil:a", 1)
+    cache.get("perfil:a")
+    cache.get("perfil:b")
+    cache.get_many(["perfil:a", "perfil:c"])
+    return HttpResponse("ok")
+
+
+def _muestras(nombre, route):
+    return REGISTRY.get_sample_value(nombre, {"method": "GET", "route": route}) or 0
+
+
+class TestRequestProfilingMiddleware:
+    """TestRequestProfilingMiddleware."""
+
+    def test_cuenta_consultas_y_cache_sin_debug(self):
+        """test_cuenta_consultas_y_cache_sin_debug."""
+        response = RequestProfilingMiddleware(_vista)(_request("/x/"))
+
+        assert response["X-DB-Queries"] == "3"
+        assert float(response["X-DB-Time-Ms"]) > 0
+        assert (response["X-Cache-Hits"], response["X-Cache-Misses"]) == ("2", "2")
+
+    def test_etiqueta_por_ruta_resuelta_y_no_por_path(self):
+        """test_etiqueta_por_ruta_resuelta_y_no_por_path."""
+        route = "core:factura_detalle"
+        antes = _muestras("travelhub_request_db_queries_count", route)
+        middleware = RequestProfilingMiddleware(_vista)
+
+        for pk in (1, 2, 3):
+            middleware(_request(f"/system/facturacion/{pk}/"))
+        middleware(_request("/no-existe/"))
+
+        assert _muestras("travelhub_request_db_queries_count", route) - antes == 3
+        assert _muestras("travelhub_request_db_queries_sum", UNRESOLVED_ROUTE) >= 3
+        hits = REGISTRY.get_sample_value(
+            "travelhub_request_cache_lookups_total", {"route": route, "result": "hit"}
+        )
+        assert hits >= 6
+        rutas = {
+            sample.labels.get("route")
+            for metric in REGISTRY.collect()
+            if metric.name == "travelhub_request_duration_seconds"
+            for sample in metric.samples
+        }
+        assert not any(str(r).startswith("/system/facturacion/") for r in rutas)
+
+    def test_peticiones_lentas_con_huellas_sql(self, settings):
+        """test_peticiones_lentas_con_huellas_sql."""
+        settings.REQUEST_PROFILING_SLOW_MS = 0
+        RequestProfilingMiddleware(_vista)(_request("/system/facturacion/7/"))
+        settings.REQUEST_PROFILING_SLOW_MS = 60_000
+        RequestProfilingMiddleware(_vista)(_request("/system/facturacion/8/"))
+
+        (muestra,) = slow_requests.snapshot()
+        assert (muestra["route"], muestra["path"], muestra["queries"]) == (
+            "core:factura_detalle",
+            "/system/facturacion/7/",
+            3,
+        )
+        assert muestra["total_ms"] >= muestra["db_ms"] > 0
+        # Los dos IN de distinta longitud comparten huella.
+        huellas = {s["sql"]: s["count"] for s in muestra["top_sql"]}
+        assert len(huellas) == 2
+        assert any("IN (...)" in sql and count == 2 for sql, count in huellas.items())
+
+    def test_sin_cabeceras_fuera_de_debug(self, settings):
+        """test_sin_cabeceras_fuera_de_debug."""
+        del settings.REQUEST_PROFILING_HEADERS
+
+        response = RequestProfilingMiddleware(_vista)(_request("/x/"))
+
+        assert not response.has_header("X-DB-Queries")
+
+
+def test_fingerprint_normaliza_literales_y_listas_in():
+    """test_fingerprint_normaliza_literales_y_listas_in."""
+    sql = (
+        'SELECT "t1"."id", "t1"."nombre" FROM "t1" WHERE "t1"."id" IN (%s, %s, %s)\n'
+        "  AND \"t1\".\"nombre\" = 'o''hara' LIMIT 21"
+    )
+
+    assert fingerprint(sql) == (
+        'SELECT ... FROM "t1" WHERE "t1"."id" IN (...) AND "t1"."nombre" = ? LIMIT ?'
+    )
+    assert fingerprint('SELECT COUNT(*) AS "__count" FROM "t1"') == (
+        'SELECT COUNT(*) AS "__count" FROM "t1"'
+    )
+
+
+def test_slow_requests_view_solo_superusuarios(django_user_model):
+    """test_slow_requests_view_solo_superusuarios."""
+    from core.metrics import slow_requests_view
+
+    slow_requests.add({"route": "core:factura_detalle"})
+    request = RequestFactory().get("/health/slow-requests/")
+    request.user = django_user_model(username="staff", is_staff=True)
+    assert slow_requests_view(request).status_code == 403
+
+    request.user = django_user_model(username="root", is_superuser=True)
+    response = slow_requests_view(request)
+    assert response.status_code == 200
+    assert b"core:factura_detalle" in response.content
+
+
+def test_redis_caido_con_ignore_exceptions_cuenta_fallos(monkeypatch):
+    """test_redis_caido_con_ignore_exceptions_cuenta_fallos."""
+    from django_redis.cache import RedisCache as DjangoRedisCache
+
+    from core.cache_backends import RedisCache
+    from core.request_profiling import profiling
+
+    redis = RedisCache(
+        "redis://127.0.0.1:1/0",
+        {"OPTIONS": {"IGNORE_EXCEPTIONS": True, "SOCKET_CONNECT_TIMEOUT": 0.1}},
+    )
+
+    with profiling() as perfil:
+        assert redis.get("perfil:caido") is None
+        redis.get_many(["perfil:a", "perfil:b"])
+
+    assert (perfil.cache_hits, perfil.cache_misses) == (0, 3)
+
+    # Versiones de django_redis cuyo ``get`` decorado con ``@omit_exception`` da None.
+    monkeypatch.setattr(DjangoRedisCache, "get", lambda self, key, default=None, **kw: None)
+    with profiling() as perfil:
+        assert redis.get("perfil:caido", "x") is None
+
+    assert (perfil.cache_hits, perfil.cache_misses) == (0, 1)
@@ -0,0 +1,124 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from apps.bookings.models import FeeVenta, ItemVenta, PagoVenta, Venta
+from apps.bookings.services.recalc_coalescer import SaleRecalcCoalescer
+from apps.common.models import Moneda
+from apps.crm.models import Cliente
+from apps.finance.services.finance_service import FinanceService
+from core.middleware import agency_context
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+@pytest.fixture(autouse=True)
+def _aislamiento():
+    cache.clear()
+    # Sin agencia en contexto: otros tests pueden dejar agency_var asignado.
+    with agency_context(None):
+        yield
+    cache.clear()
+
+
+@pytest.fixture
+def venta(django_capture_on_commit_callbacks):
+    moneda, _ = Moneda.objects.get_or_create(
+        codigo_iso="USD", defaults={"nombre": "Dólar", "simbolo": "$"}
+    )
+    cliente = Cliente.objects.create(nombres="Ana", apellidos="Ruiz", email="ana@example.com")
+    with django_capture_on_commit_callbacks(execute=True):
+        return Venta.objects.create(cliente=cliente, moneda=moneda, descripcion_general="Grupo")
+
+
+@pytest.fixture
+def contadores():
+    with (
+        patch.object(
+            FinanceService,
+            "recalculate_sale_finances",
+            wraps=FinanceService.recalculate_sale_finances,
+        ) as recalc,
+        patch("apps.bookings.services.revenue_auditor.RevenueAuditorService.audit_venta") as audit,
+    ):
+        yield recalc, audit
+
+
+def _item(venta, precio="100.00"):
+    return ItemVenta(
+        venta=venta,
+        descripcion_personalizada="Tramo",
+        precio_unitario_venta=Decimal(precio),
+        impuestos_item_venta=Decimal("10.00"),
+    )
+
+
+class TestSaleRecalcCoalescer:
+    """TestSaleRecalcCoalescer."""
+
+    def test_un_recalculo_y_una_auditoria_por_transaccion(
+        self, venta, contadores, django_capture_on_commit_callbacks
+    ):
+        """test_un_recalculo_y_una_auditoria_por_transaccion."""
+        recalc, audit = contadores
+        SaleRecalcCoalescer.reset_stats()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            for _ in range(9):
+                _item(venta).save()
+            FeeVenta.objects.create(venta=venta, monto=Decimal("15.00"))
+            PagoVenta.objects.create(venta=venta, monto=Decimal("50.00"), moneda=venta.moneda)
+
+        assert recalc.call_count == 1
+        assert audit.call_count == 1
+        venta.refresh_from_db()
+        assert venta.subtotal == Decimal("900.00")
+        assert venta.impuestos == Decimal("90.00")
+        assert venta.total_venta == Decimal("1005.00")
+        assert venta.saldo_pendiente == Decimal("955.00")
+
+        stats = SaleRecalcCoalescer.get_stats()
+        assert stats["recalc_requested"] == 11
+        assert stats["recalc_executed"] == 1
+        assert stats["avoided"] >= 10
+
+    def test_rollback_descarta_el_lote(self, venta, contadores, django_capture_on_commit_callbacks):
+        """test_rollback_descarta_el_lote."""
+        from django.db import transaction
+
+        recalc, _ = contadores
+        with django_capture_on_commit_callbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    _item(venta).save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            _item(venta, precio="40.00").save()
+
+        assert recalc.call_count == 1
+        venta.refresh_from_db()
+        assert venta.subtotal == Decimal("40.00")
+
+    @override_settings(SALE_RECALC_DEBOUNCE_SECONDS=30)
+    def test_ventana_celery_no_reencola_venta_pendiente(
+        self, venta, django_capture_on_commit_callbacks
+    ):
+        """test_ventana_celery_no_reencola_venta_pendiente."""
+        with patch(
+            "apps.bookings.tasks.recalcular_ventas_coalescidas_task.apply_async"
+        ) as apply_async:
+            for _ in range(2):
+                with django_capture_on_commit_callbacks(execute=True):
+                    _item(venta).save()
+
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs["args"] == [[venta.pk]]
+        assert apply_async.call_args.kwargs["countdown"] == 30
+
+        SaleRecalcCoalescer.run_deferred([venta.pk])
+        venta.refresh_from_db()
+        assert venta.subtotal == Decimal("200.00")
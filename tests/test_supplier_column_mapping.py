@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from django.core.cache import cache
+
+from apps.finance.services.smart_reconciliation_service import SmartReconciliationService
+
+pytestmark = [pytest.mark.unit]
+
+MAPEO_IA = {
+    "TKT NUMBER": "numero_boleto",
+    "PAX": "pasajero",
+    "FARE": "tarifa_neta",
+    "TAX": "impuestos",
+    "NET PAY": "total_pagar",
+    "RUTA": "itinerario",
+}
+
+
+@pytest.fixture(autouse=True)
+def _cache_limpia():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _reporte(filas=3):
+    return pd.DataFrame(
+        {
+            "TKT NUMBER": [1347258019382.0, np.nan, 1347258019384.0][:filas],
+            "PAX": ["  NAVAS/MANUEL ", "PEREZ/ANA", None][:filas],
+            "FARE": ["$1,234.50", "80,25", "n/d"][:filas],
+            "TAX": [10, 20, 30][:filas],
+            "NET PAY": [1244.5, 100.25, np.nan][:filas],
+            "RUTA": ["CCS/MAD", "MAD/CCS", "CCS/MIA"][:filas],
+        }
+    )
+
+
+class TestMapeoColumnasProveedor:
+    """TestMapeoColumnasProveedor."""
+
+    def test_conversion_vectorizada(self):
+        """test_conversion_vectorizada."""
+        with patch.object(SmartReconciliationService, "_pedir_mapeo_ia", return_value=MAPEO_IA):
+            datos = SmartReconciliationService._mapear_columnas_df_con_ia(_reporte(), "BSP")
+
+        assert datos["items"][0] == {
+            "numero_boleto": "1347258019382",
+            "pnr": "",
+            "pasajero": "NAVAS/MANUEL",
+            "tarifa_neta": 1234.5,
+            "impuestos": 10.0,
+            "comision_monto": 0.0,
+            "total_pagar": 1244.5,
+            "moneda": "USD",
+        }
+        assert [i["numero_boleto"] for i in datos["items"]] == [
+            "1347258019382",
+            "",
+            "1347258019384",
+        ]
+        assert [i["tarifa_neta"] for i in datos["items"]] == [1234.5, 80.25, 0.0]
+        assert datos["items"][2]["total_pagar"] == 0.0
+        assert datos["items"][2]["pasajero"] == ""
+
+    def test_montos_con_separadores_de_miles_y_decimales(self):
+        """test_montos_con_separadores_de_miles_y_decimales."""
+        serie = pd.Series(
+            ["1.234,50", "1,234.50", "$ 1.200.000,00", "1,200,000.50", "12,50", "1,500", "-3.5"]
+        )
+
+        montos = SmartReconciliationService._columna_monto(serie).tolist()
+
+        assert montos == [1234.5, 1234.5, 1200000.0, 1200000.5, 12.5, 1500.0, -3.5]
+
+    def test_layout_repetido_no_llama_a_la_ia(self):
+        """test_layout_repetido_no_llama_a_la_ia."""
+        with patch.object(
+            SmartReconciliationService, "_pedir_mapeo_ia", return_value=MAPEO_IA
+        ) as ia:
+            SmartReconciliationService._mapear_columnas_df_con_ia(_reporte(), "BSP")
+            # Mismas columnas en otro orden y con espacios: misma firma.
+            otro = _reporte(2)[["RUTA", "NET PAY", "TAX", "FARE", "PAX", "TKT NUMBER"]]
+            datos = SmartReconciliationService._mapear_columnas_df_con_ia(otro, " bsp ")
+            SmartReconciliationService._mapear_columnas_df_con_ia(_reporte(), "KIU")
+
+        assert ia.call_count == 2
+        assert len(datos["items"]) == 2
+        # El destino inválido ("itinerario") no se guarda en el mapeo.
+        mapeo = cache.get(SmartReconciliationService._mapeo_cache_key("BSP", _reporte().columns))
+        assert "RUTA" not in mapeo
+
+    def test_cabecera_estandar_no_usa_ia(self):
+        """test_cabecera_estandar_no_usa_ia."""
+        df = pd.DataFrame({"numero_boleto": ["7258019382"], "total_pagar": ["150"]})
+        with patch.object(SmartReconciliationService, "_pedir_mapeo_ia") as ia:
+            datos = SmartReconciliationService._mapear_columnas_df_con_ia(df, "SABRE")
+
+        ia.assert_not_called()
+        assert datos["items"][0]["total_pagar"] == 150.0
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from apps.automation.parsers.pdf_generation import PdfGenerationService
+from apps.automation.services.ticket_pdf_cache import TicketPdfCache
+
+PDF = b"%PDF-1.4 " + b"x" * 200
+
+
+@pytest.fixture(autouse=True)
+def _pdf_cache(tmp_path):
+    cache.clear()
+    with (
+        override_settings(TICKET_PDF_CACHE_ENABLED=True, MEDIA_ROOT=str(tmp_path)),
+        patch(
+            "apps.automation.parsers.pdf_generation.PdfRendererService.render_html_to_pdf",
+            return_value=PDF,
+        ) as render,
+    ):
+        yield render
+    cache.clear()
+
+
+def _ticket(**extra):
+    return {"NOMBRE_DEL_PASAJERO": "PEREZ/JUAN", "NUMERO_DE_BOLETO": "111", **extra}
+
+
+def _agencia(**extra):
+    values = {"pk": 1, "nombre": "AG", "color_primario": "#0052cc", **extra}
+    return SimpleNamespace(**values)
+
+
+@pytest.mark.django_db
+class TestTicketPdfCache:
+    """TestTicketPdfCache."""
+
+    def test_segunda_generacion_no_renderiza(self, _pdf_cache):
+        """test_segunda_generacion_no_renderiza."""
+        first = PdfGenerationService.generate_ticket(_ticket())
+        second = PdfGenerationService.generate_ticket(_ticket())
+
+        assert first == second == (PDF, "Boleto_111_PEREZ_JUAN.pdf")
+        assert _pdf_cache.call_count == 1
+        stats = TicketPdfCache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_datos_distintos_o_use_cache_false_renderizan(self, _pdf_cache):
+        """test_datos_distintos_o_use_cache_false_renderizan."""
+        PdfGenerationService.generate_ticket(_ticket())
+        PdfGenerationService.generate_ticket(_ticket(TOTAL="999.00"))
+        PdfGenerationService.generate_ticket(_ticket(), use_cache=False)
+        assert _pdf_cache.call_count == 3
+
+    def test_cambio_de_branding_o_plantilla_invalida(self):
+        """test_cambio_de_branding_o_plantilla_invalida."""
+        data = _ticket()
+        key = TicketPdfCache.key_for(data, _agencia())
+
+        assert TicketPdfCache.key_for(data, _agencia()) == key
+        assert TicketPdfCache.key_for(data, _agencia(color_primario="#000000")) != key
+        with override_settings(TICKET_PDF_TEMPLATE_VERSION="2"):
+            assert TicketPdfCache.key_for(data, _agencia()) != key
+
+    def test_archivo_borrado_del_storage_es_miss(self, _pdf_cache):
+        """test_archivo_borrado_del_storage_es_miss."""
+        from django.core.files.storage import default_storage
+
+        PdfGenerationService.generate_ticket(_ticket())
+        key = TicketPdfCache.key_for(_ticket(), None)
+        default_storage.delete(f"pdf_cache/tickets/{key}.pdf")
+
+        assert PdfGenerationService.generate_ticket(_ticket())[0] == PDF
+        assert _pdf_cache.call_count == 2
+
+    def test_pdf_fallido_no_se_cachea(self, _pdf_cache):
+        """test_pdf_fallido_no_se_cachea."""
+        _pdf_cache.return_value = b""
+        PdfGenerationService.generate_ticket(_ticket())
+        PdfGenerationService.generate_ticket(_ticket())
+        assert _pdf_cache.call_count == 2
+        assert TicketPdfCache.get_stats()["stores"] == 0
@@ -0,0 +1,227 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.communications.services.evolution_api_service import EvolutionService
+from apps.communications.services.whatsapp_scheduled import (
+    STALE_ERROR,
+    ScheduledWhatsAppDispatcher,
+)
+from apps.crm.models import MensajeWhatsApp, WhatsAppScheduledMessage
+from core.models import Agencia
+
+pytestmark = [pytest.mark.django_db, pytest.mark.unit]
+
+
+@pytest.fixture
+def agencia(db):
+    agencia = Agencia.objects.create(nombre="Agencia WA", email_principal="wa@agency.com")
+    agencia.configuracion.evolution_instance_name = "wa_principal"
+    agencia.configuracion.save()
+    return agencia
+
+
+@pytest.fixture
+def evolution(monkeypatch):
+    """Evolution falso: registra envíos y verificaciones de instancia."""
+    llamadas = {"send": [], "ensure": []}
+    lock = threading.Lock()
+
+    def send_text(instance_name, number, text, ensure_instance=True):
+        assert ensure_instance is False
+        with lock:
+            llamadas["send"].append((instance_name, number, text))
+        if "boom" in text:
+            raise RuntimeError("timeout")
+        return "falla" not in text
+
+    monkeypatch.setattr(EvolutionService, "send_text", send_text)
+    monkeypatch.setattr(EvolutionService, "_ensure_instance", llamadas["ensure"].append)
+    return llamadas
+
+
+def _programado(agencia, texto="Hola", minutos=-5, estado="scheduled", telefono="+58 414 000"):
+    return WhatsAppScheduledMessage.all_objects.create(
+        agencia=agencia,
+        telefono=telefono,
+        texto=texto,
+        programado_para=timezone.now() + timedelta(minutes=minutos),
+        estado=estado,
+    )
+
+
+class TestScheduledWhatsAppDispatcher:
+    """TestScheduledWhatsAppDispatcher."""
+
+    def test_claim_reclama_vencidos_en_orden_y_respeta_limite(self, agencia):
+        """test_claim_reclama_vencidos_en_orden_y_respeta_limite."""
+        vencidos = [_programado(agencia, minutos=-m) for m in (3, 9, 6)]
+        _programado(agencia, minutos=30)
+        _programado(agencia, estado="sending")
+        _programado(agencia, estado="cancelled")
+
+        first = ScheduledWhatsAppDispatcher.claim(2)
+        second = ScheduledWhatsAppDispatcher.claim(2)
+
+        assert first == [vencidos[1].pk, vencidos[2].pk]
+        assert second == [vencidos[0].pk]
+        assert ScheduledWhatsAppDispatcher.claim(2) == []
+        estados = WhatsAppScheduledMessage.all_objects.filter(pk__in=first + second)
+        assert set(estados.values_list("estado", flat=True)) == {"sending"}
+
+    def test_run_envia_y_persiste_el_lote_con_escrituras_constantes(self, agencia, evolution):
+        """test_run_envia_y_persiste_el_lote_con_escrituras_constantes."""
+        otra = Agencia.objects.create(nombre="Otra WA", email_principal="otra@agency.com")
+        ok = [_programado(agencia, texto=f"Hola {i}") for i in range(6)]
+        ok.append(_programado(otra, texto="Hola otra"))
+        falla = _programado(agencia, texto="falla")
+        boom = _programado(otra, texto="boom")
+
+        with CaptureQueriesContext(connection) as queries:
+            report = ScheduledWhatsAppDispatcher.run(batch_size=50)
+
+        escrituras = [
+            q for q in queries.captured_queries if q["sql"].startswith(("INSERT", "UPDATE"))
+        ]
+        # interrumpidos + reclamo + bulk_create + bulk_update, sin importar el tamaño.
+        assert len(escrituras) == 4
+        assert (report.claimed, report.sent, report.failed, report.released) == (9, 7, 2, 0)
+        assert report.throughput > 0 and report.lag_max_s >= report.lag_avg_s >= 300
+        assert sorted(evolution["ensure"]) == sorted(["wa_principal", f"agencia_{otra.pk}"])
+
+        msg = WhatsAppScheduledMessage.all_objects.get(pk=ok[0].pk)
+        assert msg.estado == "sent"
+        assert (msg.mensaje_resultante.texto, msg.mensaje_resultante.direccion) == ("Hola 0", "OUT")
+        assert msg.mensaje_resultante.agencia_id == agencia.pk
+        assert MensajeWhatsApp.all_objects.filter(estado="sent").count() == 7
+        falla.refresh_from_db()
+        boom.refresh_from_db()
+        assert (falla.estado, falla.error_msg) == ("failed", "Error al enviar vía Evolution")
+        assert (boom.estado, boom.error_msg) == ("failed", "timeout")
+
+    def test_circuito_abierto_devuelve_a_la_cola(self, agencia, monkeypatch):
+        """test_circuito_abierto_devuelve_a_la_cola."""
+        monkeypatch.setattr(EvolutionService, "_ensure_instance", lambda name: None)
+        monkeypatch.setattr(
+            EvolutionService,
+            "send_text",
+            lambda *args, **kwargs: {"error": "Circuit breaker whatsapp is open."},
+        )
+        pendientes = [_programado(agencia) for _ in range(3)]
+
+        report = ScheduledWhatsAppDispatcher.run(batch_size=2)
+
+        assert (report.batches, report.released, report.sent) == (1, 2, 0)
+        estados = WhatsAppScheduledMessage.all_objects.filter(pk__in=[p.pk for p in pendientes])
+        assert sorted(estados.values_list("estado", flat=True)) == ["scheduled"] * 3
+        assert not MensajeWhatsApp.all_objects.exists()
+
+    def test_reclamados_sin_confirmar_se_marcan_fallidos(self, agencia, evolution):
+        """test_reclamados_sin_confirmar_se_marcan_fallidos."""
+        colgado = _programado(agencia, estado="sending")
+        reciente = _programado(agencia, estado="sending")
+        WhatsAppScheduledMessage.all_objects.filter(pk=colgado.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        assert ScheduledWhatsAppDispatcher.run().interrupted == 1
+
+        colgado.refresh_from_db()
+        reciente.refresh_from_db()
+        assert (colgado.estado, colgado.error_msg) == ("failed", STALE_ERROR)
+        assert reciente.estado == "sending"
+        assert evolution["send"] == []
+
+    def test_ritmo_por_instancia_e_instancias_en_paralelo(self, agencia, monkeypatch, settings):
+        """test_ritmo_por_instancia_e_instancias_en_paralelo."""
+        settings.EVOLUTION_SCHEDULED_RATE_PER_INSTANCE = 10
+        settings.EVOLUTION_SCHEDULED_CONCURRENCY_PER_INSTANCE = 2
+        otra = Agencia.objects.create(nombre="Paralela WA", email_principal="par@agency.com")
+        marcas = {}
+
+        def send_text(instance_name, number, text, ensure_instance=True):
+            marcas.setdefault(instance_name, []).append(time.monotonic())
+            time.sleep(0.01)
+            return True
+
+        monkeypatch.setattr(EvolutionService, "_ensure_instance", lambda name: None)
+        monkeypatch.setattr(EvolutionService, "send_text", send_text)
+        for i in range(5):
+            _programado(agencia, texto=f"a{i}")
+            _programado(otra, texto=f"b{i}")
+
+        inicio = time.monotonic()
+        report = ScheduledWhatsAppDispatcher.run()
+        duracion = time.monotonic() - inicio
+
+        assert report.sent == 10
+        for tiempos in map(sorted, marcas.values()):
+            # 10 msg/s por instancia: al menos 100 ms entre envíos consecutivos.
+            assert all(b - a >= 0.095 for a, b in zip(tiempos, tiempos[1:], strict=False))
+        # Las dos instancias avanzan a la vez: ~4 x 100 ms en lugar de ~9 x 100 ms.
+        assert duracion < 0.75
+
+    def test_ritmo_se_mantiene_entre_lotes(self, agencia, monkeypatch, settings):
+        """test_ritmo_se_mantiene_entre_lotes."""
+        settings.EVOLUTION_SCHEDULED_RATE_PER_INSTANCE = 10
+        settings.EVOLUTION_SCHEDULED_CONCURRENCY_PER_INSTANCE = 1
+        marcas = []
+
+        def send_text(instance_name, number, text, ensure_instance=True):
+            marcas.append(time.monotonic())
+            return True
+
+        monkeypatch.setattr(EvolutionService, "_ensure_instance", lambda name: None)
+        monkeypatch.setattr(EvolutionService, "send_text", send_text)
+        for i in range(6):
+            _programado(agencia, texto=f"m{i}")
+
+        report = ScheduledWhatsAppDispatcher.run(batch_size=2)
+
+        assert (report.batches, report.sent) == (3, 6)
+        # El primer envío de cada lote también respeta el ritmo del lote anterior: con
+        # limitadores por lote habría envíos casi simultáneos y ~300 ms en total.
+        marcas.sort()
+        assert all(b - a >= 0.05 for a, b in zip(marcas, marcas[1:], strict=False))
+        assert marcas[-1] - marcas[0] >= 0.45
+
+    def test_tarea_delega_en_el_dispatcher(self, agencia, evolution):
+        """test_tarea_delega_en_el_dispatcher."""
+        from apps.common.tasks import process_scheduled_whatsapp_messages
+
+        _programado(agencia)
+        _programado(agencia, minutos=10)
+
+        assert process_scheduled_whatsapp_messages() == 1
+        assert WhatsAppScheduledMessage.all_objects.filter(estado="scheduled").count() == 1
+
+
+class TestEvolutionRateLimit:
+    """TestEvolutionRateLimit."""
+
+    def test_limite_por_hora_es_atomico_entre_hilos(self, settings):
+        """test_limite_por_hora_es_atomico_entre_hilos."""
+        settings.EVOLUTION_MAX_MSG_PER_HOUR = 10
+        cache.delete("evo_rate:wa_concurrente")
+        permitidos = []
+
+        def enviar():
+            for _ in range(5):
+                permitidos.append(
+                    EvolutionService._check_and_increment_rate_limit("wa_concurrente")
+                )
+
+        hilos = [threading.Thread(target=enviar) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        assert permitidos.count(True) == 10
+        assert cache.get("evo_rate:wa_concurrente") == 10
@@ -117,6 +117,11 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": 3600.0,  # cada hora — evalúa qué reportes están pendientes
         "args": (),
     },
+    "reparar-kpi-rollups-nocturno": {
+        "task": "apps.reports.tasks.reparar_kpi_rollups_task",
+        "schedule": crontab(hour=2, minute=30),  # corrige lo escrito sin señales (update/bulk)
+        "args": (),
+    },
     # Health checks de proveedores IA y claves API cada 60 minutos
     "health-check-providers": {
         "task": "apps.automation.tasks.health_check_providers_task",
@@ -189,7 +189,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "core.middleware_saas.SaaSLimitMiddleware",
     "core.middleware_ai_ratelimit.AIRateLimitMiddleware",
-    "core.middleware_performance.QueryCountDebugMiddleware",
+    "core.middleware_performance.RequestProfilingMiddleware",
     "core.middleware_performance.CacheHeaderMiddleware",
     "waffle.middleware.WaffleMiddleware",
     "django_prometheus.middleware.PrometheusAfterMiddleware",
@@ -686,12 +686,13 @@ if "redis://" in _cache_url:
 
     CACHES = {
         "default": {
-            "BACKEND": "django_redis.cache.RedisCache",
+            "BACKEND": "core.cache_backends.RedisCache",
             "LOCATION": _cache_url,
             "OPTIONS": _cache_options,
             "KEY_PREFIX": "th",
             "TIMEOUT": 300,
         },
+        # Sin perfilado: las lecturas de sesión no cuentan en los aciertos por ruta.
         "sessions": {
             "BACKEND": "django_redis.cache.RedisCache",
             "LOCATION": _session_url,
@@ -706,7 +707,7 @@ if "redis://" in _cache_url:
 else:
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "BACKEND": "core.cache_backends.LocMemCache",
             "LOCATION": "unique-snowflake",
         }
     }
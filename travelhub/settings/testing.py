@@ -59,11 +59,15 @@ USE_R2 = False
 
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "core.cache_backends.LocMemCache",
         "LOCATION": "test-cache",
     }
 }
 
+# Cache de PDFs de boletos: los tests de generación esperan renderizar cada vez
+# (tests/test_ticket_pdf_cache.py la activa explícitamente).
+TICKET_PDF_CACHE_ENABLED = False
+
 # ---------------------------------------------------------------------------
 # Sesiones: en base de datos (sin Redis en CI)
 # ---------------------------------------------------------------------------